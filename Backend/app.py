@@ -6,6 +6,7 @@ from flask_talisman import Talisman
 from dotenv import load_dotenv
 import os
 import sys
+import threading
 from pathlib import Path
 import warnings
 
@@ -24,18 +25,33 @@ sys.path.insert(0, str(Path(__file__).resolve().parent))
 
 from services.NotificationService.notification_service import get_demo_notifications
 from services.NotificationService.notification_engine import notification_engine
+from services.NotificationService.fanout import notification_fanout
 from flask_apscheduler import APScheduler
 from werkzeug.utils import secure_filename
 import pandas as pd
 import json
 import uuid
-from datetime import datetime
 from middleware.auth import init_firebase, require_auth
+from middleware.token_cache import token_verifier
+from middleware.structured_logging import get_logger
+from middleware.metrics import metrics
+from middleware.tracing import tracer
+from services.LLMCore.context_store import context_store
+from services.LLMCore.stream_tracker import stream_tracker
+from services.LLMCore.sse import sse_writer, frame as sse_frame
+from services.LLMCore.prompt_assembly import prefill_tracker
+from services.LLMCore.concurrency import llm_slots
+from services.JobQueue.job_queue import job_queue
+from services.Profiles.profile_repository import profile_repository
 import firebase_admin
 
 
 
 app = Flask(__name__)
+metrics.init_app(app)
+tracer.init_app(app)
+http_log = get_logger("http")
+stt_log = get_logger("stt")
 
 # Initialize Firebase before any routes or scheduler tasks invoke it
 init_firebase()
@@ -46,38 +62,39 @@ app.config['SCHEDULER_API_ENABLED'] = True
 scheduler.init_app(app)
 scheduler.start()
 
-# Scheduled Job: Runs every 30 minutes to generate notifications for active users
-@scheduler.task('interval', id='generate_notifications_job', minutes=30)
+# Scheduled Job: Runs every NOTIF_FANOUT_MINUTES to generate notifications for all users
+# Unchanged cohorts are skipped (delta_trigger.py), so a cycle is cheap unless weather or news moved
+@scheduler.task('interval', id='generate_notifications_job', minutes=int(os.getenv("NOTIF_FANOUT_MINUTES", "15")))
 def scheduled_notification_generation():
     with app.app_context():
         print("[SCHEDULER] Starting scheduled notification generation...")
         try:
-           db = firebase_admin.firestore.client()
-           users = db.collection('users').limit(20).stream() # Limit for verified performance
-           for user in users:
-               # asyncio.run(notification_engine.generate_notifications_for_user(user.id))
-               # Note: In synchronous Flask context without async loop, we might need a wrapper or run sync
-               # For now, we'll keep it simple or use a helper if needed. 
-               # Since `generate_notifications_for_user` is async, we need a runner.
-               import asyncio
-               asyncio.run(notification_engine.generate_notifications_for_user(user.id))
+            # Pages through every user, resuming an interrupted run from its checkpoint
+            import asyncio
+            asyncio.run(notification_fanout.run())
         except Exception as e:
             print(f"[SCHEDULER] Error: {e}")
 
 
+# Scheduled Job: Threshold alerts (rain, heat, wind, disease risk) for all users, no LLM
+@scheduler.task('interval', id='rule_alerts_job', minutes=int(os.getenv("NOTIF_RULES_MINUTES", "15")))
+def scheduled_rule_alerts():
+    with app.app_context():
+        try:
+            import asyncio
+            asyncio.run(notification_fanout.run_rules())
+        except Exception as e:
+            print(f"[SCHEDULER] Rule alerts error: {e}")
+
+
 @app.route('/ping')
 def ping():
     return jsonify({'status': 'pong'}), 200
 
 @app.before_request
 def log_request():
-    try:
-        msg = f"Incoming: {request.method} {request.url}\n"
-        print(msg.strip())
-        with open("app_debug.log", "a", encoding='utf-8') as f:
-            f.write(msg)
-    except:
-        pass
+    # Queued and written by the logging thread (echoed to the console in development)
+    http_log.info("Incoming", extra={"method": request.method, "url": request.url})
 
 # CORS Configuration - Must be set BEFORE Talisman
 # In development, allow all origins so phone/emulator can access the API
@@ -160,8 +177,12 @@ BUSINESS_ADVISOR_DIR = Path(__file__).resolve().parent / 'services' / 'BusinessA
 if str(BUSINESS_ADVISOR_DIR) not in sys.path:
     sys.path.append(str(BUSINESS_ADVISOR_DIR))
 
-from krishi_chatbot import KrishiSahAIAdvisor, FarmerProfile
+from krishi_chatbot import KrishiSahAIAdvisor, FarmerProfile, recommendation_output, warm_chains as warm_advisor_chains
 advisor_sessions = {}
+try:
+    warm_advisor_chains()
+except Exception as e:
+    print(f"Warning: Business Advisor chain warm-up failed: {e}")
 
 # --- Waste To Value Setup ---
 WASTE_TO_VALUE_DIR = Path(__file__).resolve().parent / 'services' / 'WasteToValue' / 'src'
@@ -278,8 +299,29 @@ def health_check():
     except Exception as e:
          health_data['memory'] = str(e)
 
+    # 4. Prompt prefix reuse (prefill tokens evaluated vs. saved per call site)
+    health_data['prefill'] = prefill_tracker.stats()
+    health_data['llm_slots'] = llm_slots.stats()
+    health_data['streams'] = stream_tracker.stats()
+    health_data['sse'] = sse_writer.stats()
+    health_data['roadmap_cache'] = roadmap_generator.cache.stats()
+    health_data['jobs'] = job_queue.stats()
+    health_data['notification_fanout'] = notification_fanout.stats()
+    health_data['notification_store'] = notification_engine.store.stats()
+    health_data['profiles'] = profile_repository.stats()
+    health_data['auth'] = token_verifier.stats()
+    health_data['tracing'] = tracer.stats()
+
+    # 5. Structured output quality (parse failures / wasted generations)
+    health_data['structured_output'] = {recommendation_output.name: recommendation_output.stats()}
+
     return jsonify(health_data)
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Per-stage latency histograms and recent p50/p95/p99 (Prometheus text format)."""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # --- Disease Detector Routes ---
 @app.route('/api/disease/detect', methods=['POST'])
 @require_auth
@@ -295,13 +337,15 @@ def detect_disease():
         
         filename = secure_filename(file.filename)
         image_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(image_path)
+        with metrics.timer("disease.upload_save"):
+            file.save(image_path)
         
         print(f"[SCAN] Request received: {filename}")
         result = predict_disease(image_path)
         print(f"[SCAN] Result: {result.get('disease')} ({int(result.get('confidence',0)*100)}%)")
         
-        disease_info = get_disease_info(result['crop'], result['disease'])
+        with metrics.timer("disease.info_lookup"):
+            disease_info = get_disease_info(result['crop'], result['disease'])
         
         treatment = []
         if disease_info:
@@ -356,7 +400,8 @@ def detect_pest():
         
         filename = secure_filename(file.filename)
         image_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(image_path)
+        with metrics.timer("pest.upload_save"):
+            file.save(image_path)
         
         print(f"[PEST] Request received: {filename}")
         result = pest_predict(image_path)
@@ -381,70 +426,73 @@ def detect_pest():
         return jsonify({'error': str(e)}), 500
 
 # --- Business Advisor Routes ---
+def _build_farmer_profile(data) -> FarmerProfile:
+    """FarmerProfile from a business-advisor init payload."""
+    def safe_float(val, default=0.0):
+        try:
+            return float(val) if val is not None else default
+        except (ValueError, TypeError):
+            return default
+
+    return FarmerProfile(
+        name=data.get('name', 'Farmer'),
+        land_size=safe_float(data.get('land_size'), 5.0),
+        capital=safe_float(data.get('capital'), 100000.0),
+        market_access=data.get('market_access', 'moderate'),
+        skills=data.get('skills', []),
+        risk_level=data.get('risk_level', 'medium'),
+        time_availability=data.get('time_availability', 'full-time'),
+        experience_years=int(data.get('experience_years', 0)),
+        language=data.get('language', 'english').lower(),
+        selling_preference=data.get('selling_preference'),
+        recovery_timeline=data.get('recovery_timeline'),
+        loss_tolerance=data.get('loss_tolerance'),
+        risk_preference=data.get('risk_preference'),
+        age=data.get('age'),
+        role=data.get('role', 'farmer'),
+        state=data.get('state'),
+        district=data.get('district'),
+        village=data.get('village'),
+        soil_type=data.get('soil_type'),
+        water_availability=data.get('water_availability'),
+        crops_grown=data.get('crops_grown', []),
+        land_unit=data.get('land_unit', 'acres'),
+        
+        # Additional Fields
+        current_profit=data.get('current_profit'),
+        running_plan=data.get('running_plan'),
+        space_type=data.get('space_type'),
+        covered_space=data.get('covered_space'),
+        infra_type=data.get('infra_type'),
+        electricity=data.get('electricity'),
+        animal_handling=data.get('animal_handling'),
+        daily_labor=data.get('daily_labor'),
+        hands_on_work=data.get('hands_on_work'),
+        income_comfort=data.get('income_comfort'),
+        main_goal=data.get('main_goal'),
+        interests=data.get('interests', []),
+        total_land=safe_float(data.get('total_land'), 0.0),
+        farm_name=data.get('farm_name')
+    )
+
 @app.route('/api/business-advisor/init', methods=['POST'])
 @require_auth
 def init_advisor():
     try:
         data = request.json
-        name = data.get('name', 'Farmer')
-        print(f"[ADVISOR] Init -> Farmer: {name}")
+        print(f"[ADVISOR] Init -> Farmer: {data.get('name', 'Farmer')}")
+        if _wants_async(data):
+            payload = {k: v for k, v in data.items() if k != 'async'}
+            return _submit_job('advisor_init', payload, request.user.get('uid'))
         
-        def safe_float(val, default=0.0):
-            try:
-                return float(val) if val is not None else default
-            except (ValueError, TypeError):
-                return default
-
-        profile = FarmerProfile(
-            name=name,
-            land_size=safe_float(data.get('land_size'), 5.0),
-            capital=safe_float(data.get('capital'), 100000.0),
-            market_access=data.get('market_access', 'moderate'),
-            skills=data.get('skills', []),
-            risk_level=data.get('risk_level', 'medium'),
-            time_availability=data.get('time_availability', 'full-time'),
-            experience_years=int(data.get('experience_years', 0)),
-            language=data.get('language', 'english').lower(),
-            selling_preference=data.get('selling_preference'),
-            recovery_timeline=data.get('recovery_timeline'),
-            loss_tolerance=data.get('loss_tolerance'),
-            risk_preference=data.get('risk_preference'),
-            age=data.get('age'),
-            role=data.get('role', 'farmer'),
-            state=data.get('state'),
-            district=data.get('district'),
-            village=data.get('village'),
-            soil_type=data.get('soil_type'),
-            water_availability=data.get('water_availability'),
-            crops_grown=data.get('crops_grown', []),
-            land_unit=data.get('land_unit', 'acres'),
-            
-            # Additional Fields
-            current_profit=data.get('current_profit'),
-            running_plan=data.get('running_plan'),
-            space_type=data.get('space_type'),
-            covered_space=data.get('covered_space'),
-            infra_type=data.get('infra_type'),
-            electricity=data.get('electricity'),
-            animal_handling=data.get('animal_handling'),
-            daily_labor=data.get('daily_labor'),
-            hands_on_work=data.get('hands_on_work'),
-            income_comfort=data.get('income_comfort'),
-            main_goal=data.get('main_goal'),
-            interests=data.get('interests', []),
-            total_land=safe_float(data.get('total_land'), 0.0),
-            farm_name=data.get('farm_name')
-        )
+        profile = _build_farmer_profile(data)
         
         import uuid
         session_id = str(uuid.uuid4())
         advisor = KrishiSahAIAdvisor(profile)
         advisor_sessions[session_id] = advisor
         
-        try:
-            recommendations = advisor.generate_recommendations()
-        except Exception as rec_err:
-             recommendations = advisor._get_fallback_recommendations()
+        recommendations, enrichment = _ranked_advisor_cards(advisor, data, request.user.get('uid'))
         
         print(f"[ADVISOR] Success -> Session: {session_id[:8]}... ({len(recommendations)} recs)")
         
@@ -452,6 +500,7 @@ def init_advisor():
             'success': True,
             'session_id': session_id,
             'recommendations': recommendations,
+            'enrichment': enrichment,
             'message': 'Business advisor initialized successfully'
         })
     except Exception as e:
@@ -460,6 +509,47 @@ def init_advisor():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/business-advisor/init/stream', methods=['POST'])
+@require_auth
+def init_advisor_stream():
+    """Same as /init, but each recommendation is pushed over SSE as soon as it is generated."""
+    try:
+        data = request.json
+        print(f"[ADVISOR] Stream Init -> Farmer: {data.get('name', 'Farmer')}")
+        profile = _build_farmer_profile(data)
+        
+        import uuid
+        session_id = str(uuid.uuid4())
+        advisor = KrishiSahAIAdvisor(profile)
+        advisor_sessions[session_id] = advisor
+        
+        user_id = request.user.get('uid')
+        
+        def events():
+            yield {'session_id': session_id}
+            recommendations, enrichment = [], None
+            try:
+                ranked, enrichment = _ranked_advisor_cards(advisor, data, user_id)
+                for rec in ranked:
+                    recommendations.append(rec)
+                    yield {'recommendation': rec, 'index': len(recommendations) - 1}
+            except Exception as e:
+                print(f"[ADVISOR] Stream Init Generator Error: {e}")
+                yield {'error': str(e)}
+            print(f"[ADVISOR] Success -> Session: {session_id[:8]}... ({len(recommendations)} recs, streamed)")
+            yield {'done': True, 'session_id': session_id, 'recommendations': recommendations, 'enrichment': enrichment}
+
+        def generate():
+            yield from sse_writer.events(events())
+        
+        response = Response(generate(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    except Exception as e:
+        print(f"[ADVISOR] Stream Init Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/business-advisor/chat', methods=['POST'])
 @require_auth
 def chat_advisor_api():
@@ -500,23 +590,14 @@ def chat_advisor_stream():
             
         advisor = advisor_sessions[session_id]
         print(f"[ADVISOR] Stream Chat -> Input: \"{message[:50]}...\"")
-        with open("debug.log", "a", encoding='utf-8') as f:
-            f.write(f"Stream initiated for session {session_id}\n")
         
         def generate():
             try:
-                for i, chunk in enumerate(advisor.stream_chat(message, language=data.get('language'))):
-                    if i == 0:
-                        with open("debug.log", "a", encoding='utf-8') as f:
-                            f.write(f"First chunk yielded for session {session_id}\n")
-                    yield f"data: {json.dumps({'chunk': chunk})}\n\n"
-                with open("debug.log", "a", encoding='utf-8') as f:
-                    f.write(f"Stream completed for session {session_id}\n")
+                chunks = advisor.stream_chat(message, language=data.get('language'))
+                yield from sse_writer.stream(stream_tracker.track('advisor.chat', chunks, num_predict=getattr(advisor.llm, 'num_predict', None)))
             except Exception as e:
                 print(f"[ADVISOR] Generator Error: {e}")
-                with open("debug.log", "a", encoding='utf-8') as f:
-                    f.write(f"Generator Error: {e}\n")
-                yield f"data: {json.dumps({'error': str(e)})}\n\n"
+                yield sse_frame({'error': str(e)})
         
         response = Response(generate(), mimetype='text/event-stream')
         response.headers['Cache-Control'] = 'no-cache'
@@ -603,29 +684,73 @@ def analyze_waste():
         result = waste_engine.analyze_waste(crop, language)
         print(f"[WASTE] Success -> Result: {result.get('conclusion', {}).get('title', 'N/A')}")
         
-        return jsonify({'success': True, 'result': result})
+        # Server-side handle so follow-up chats don't resend the whole analysis
+        context_id = context_store.put('waste', result) if not result.get('error') else None
+        
+        return jsonify({'success': True, 'result': result, 'context_id': context_id})
     except Exception as e:
         print(f"[WASTE] Analyze Error: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/waste-to-value/analyze/stream', methods=['POST'])
+@require_auth
+def analyze_waste_stream():
+    """Streams the conclusion and each option card as soon as the model finishes it."""
+    try:
+        data = request.json
+        crop = data.get('crop')
+        language = data.get('language', 'English')
+        print(f"[WASTE] Stream Analyze -> Crop: {crop}, Lang: {language}")
+        
+        if not crop:
+            return jsonify({'error': 'Crop name is required'}), 400
+        
+        if waste_engine is None:
+            return jsonify({'error': 'Waste-to-Value service is currently unavailable.'}), 503
+        
+        def events():
+            for event in waste_engine.stream_analyze_waste(crop, language):
+                if event['type'] == 'done':
+                    event['context_id'] = context_store.put('waste', event['result'])
+                yield event
+
+        def generate():
+            try:
+                yield from sse_writer.events(events())
+            except Exception as e:
+                print(f"[WASTE] Stream Analyze Generator Error: {e}")
+                yield sse_frame({'type': 'error', 'error': str(e)})
+        
+        response = Response(generate(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    except Exception as e:
+        print(f"[WASTE] Stream Analyze Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/waste-to-value/chat', methods=['POST'])
 @require_auth
 def chat_waste_api():
     try:
         data = request.json
         context = data.get('context')
+        context_id = data.get('context_id')
         question = data.get('question')
         language = data.get('language', 'English')
         
-        print(f"[WASTE] Chat -> Question: \"{question[:50]}...\"")
+        if not (context or context_id) or not question:
+            return jsonify({'error': 'Context (or context_id) and question are required'}), 400
+        if not context and context_store.get(context_id) is None:
+            # The client re-sends the full context on 404
+            return jsonify({'error': 'Unknown or expired context_id', 'code': 'context_expired'}), 404
         
-        if not context or not question:
-            return jsonify({'error': 'Context and question are required'}), 400
+        print(f"[WASTE] Chat -> Question: \"{question[:50]}...\"")
         
         if waste_engine is None:
             return jsonify({'error': 'Waste-to-Value service is currently unavailable.'}), 503
         
-        response = waste_engine.chat_waste(context, question, language)
+        response = waste_engine.chat_waste(context, question, language, context_id=context_id)
         print(f"[WASTE] Success -> Response Length: {len(response)} chars")
         
         return jsonify({'success': True, 'response': response})
@@ -639,24 +764,28 @@ def chat_waste_stream():
     try:
         data = request.json
         context = data.get('context')
+        context_id = data.get('context_id')
         question = data.get('question')
         language = data.get('language', 'English')
         
-        print(f"[WASTE] Stream Chat -> Question: \"{question[:50]}...\"")
+        if not (context or context_id) or not question:
+            return jsonify({'error': 'Context (or context_id) and question are required'}), 400
+        if not context and context_store.get(context_id) is None:
+            # The client re-sends the full context on 404
+            return jsonify({'error': 'Unknown or expired context_id', 'code': 'context_expired'}), 404
         
-        if not context or not question:
-            return jsonify({'error': 'Context and question are required'}), 400
+        print(f"[WASTE] Stream Chat -> Question: \"{question[:50]}...\"")
         
         if waste_engine is None:
             return jsonify({'error': 'Waste-to-Value service is currently unavailable.'}), 503
         
         def generate():
             try:
-                for chunk in waste_engine.stream_chat_waste(context, question, language):
-                    yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+                chunks = waste_engine.stream_chat_waste(context, question, language, context_id=context_id)
+                yield from sse_writer.stream(stream_tracker.track('waste.chat', chunks, num_predict=waste_engine.chat_llm.num_predict))
             except Exception as e:
                 print(f"[WASTE] Generator Error: {e}")
-                yield f"data: {json.dumps({'error': str(e)})}\n\n"
+                yield sse_frame({'error': str(e)})
         
         response = Response(generate(), mimetype='text/event-stream')
         response.headers['Cache-Control'] = 'no-cache'
@@ -690,37 +819,84 @@ def analyze_farm_health():
         result = health_engine.analyze_health(crop, soil_data, location, soil_type, language)
         print(f"[FARM_HEALTH] Success -> recommendation generated")
         
-        return jsonify({'success': True, 'result': result})
+        context_id = context_store.put('farm_health', result)
+        
+        return jsonify({'success': True, 'result': result, 'context_id': context_id})
     except Exception as e:
         print(f"[FARM_HEALTH] Analyze Error: {e}")
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/farm-health/analyze/stream', methods=['POST'])
+@require_auth
+def analyze_farm_health_stream():
+    """Streams each fertilizer option as soon as the model finishes it."""
+    try:
+        data = request.json
+        crop = data.get('crop')
+        soil_data = data.get('soil_data', {})
+        language = data.get('language', 'English')
+        location = data.get('location', 'Unknown Region, India')
+        soil_type = data.get('soil_type', 'Unknown Soil Type')
+        
+        print(f"[FARM_HEALTH] Stream Analyze -> Crop: {crop}, Loc: {location}, Soil: {soil_type}, Lang: {language}")
+        
+        if not crop:
+            return jsonify({'error': 'Crop name is required'}), 400
+            
+        if health_engine is None:
+            return jsonify({'error': 'Farm Health AI Engine is currently unavailable.'}), 503
+        
+        def events():
+            for event in health_engine.stream_analyze_health(crop, soil_data, location, soil_type, language):
+                if event['type'] == 'done':
+                    event['context_id'] = context_store.put('farm_health', event['result'])
+                yield event
+
+        def generate():
+            try:
+                yield from sse_writer.events(events())
+            except Exception as e:
+                print(f"[FARM_HEALTH] Stream Analyze Generator Error: {e}")
+                yield sse_frame({'type': 'error', 'error': str(e)})
+        
+        response = Response(generate(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    except Exception as e:
+        print(f"[FARM_HEALTH] Stream Analyze Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/farm-health/chat/stream', methods=['POST'])
 @require_auth
 def chat_health_stream():
     try:
         data = request.json
         context = data.get('context')
+        context_id = data.get('context_id')
         question = data.get('question')
         language = data.get('language', 'English')
         
-        print(f"[FARM_HEALTH] Stream Chat -> Question: \"{question[:50]}...\"")
+        if not (context or context_id) or not question:
+            return jsonify({'error': 'Context (or context_id) and question are required'}), 400
+        if not context and context_store.get(context_id) is None:
+            # The client re-sends the full context on 404
+            return jsonify({'error': 'Unknown or expired context_id', 'code': 'context_expired'}), 404
         
-        if not context or not question:
-            return jsonify({'error': 'Context and question are required'}), 400
+        print(f"[FARM_HEALTH] Stream Chat -> Question: \"{question[:50]}...\"")
             
         if health_engine is None:
             return jsonify({'error': 'Farm Health AI service is currently unavailable.'}), 503
             
         def generate():
             try:
-                for chunk in health_engine.stream_chat_health(context, question, language):
-                    yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+                chunks = health_engine.stream_chat_health(context, question, language, context_id=context_id)
+                yield from sse_writer.stream(stream_tracker.track('farm_health.chat', chunks, num_predict=health_engine.chat_llm.num_predict))
             except Exception as e:
                 print(f"[FARM_HEALTH] Generator Error: {e}")
-                yield f"data: {json.dumps({'error': str(e)})}\n\n"
+                yield sse_frame({'error': str(e)})
                 
         response = Response(generate(), mimetype='text/event-stream')
         response.headers['Cache-Control'] = 'no-cache'
@@ -739,6 +915,31 @@ roadmap_generator = SustainabilityRoadmapGenerator()
 from services.Planner.planner_service import CropPlannerGenerator
 crop_planner_generator = CropPlannerGenerator()
 
+from services.Planner.plan_store import CropPlanStore
+crop_plan_store = None
+try:
+    crop_plan_store = CropPlanStore()
+except Exception as e:
+    print(f"Warning: Precomputed crop plan store unavailable: {e}")
+
+# Off-peak pre-generation of crop-dependent content (see services/Pregeneration)
+if os.getenv("PREGENERATION_ENABLED", "false").lower() == "true":
+    from services.Pregeneration.pregeneration_job import PregenerationJob
+
+    @scheduler.task('cron', id='pregenerate_crop_content_job', hour=int(os.getenv("PREGEN_HOUR", "1")), minute=0)
+    def scheduled_pregeneration():
+        print("[SCHEDULER] Starting off-peak pre-generation...")
+        try:
+            job = PregenerationJob(
+                waste_engine=waste_engine,
+                crop_planner=crop_planner_generator,
+                plan_store=crop_plan_store,
+                window=os.getenv("PREGEN_WINDOW", "01:00-05:00")
+            )
+            job.run()
+        except Exception as e:
+            print(f"[SCHEDULER] Pre-generation Error: {e}")
+
 @app.route('/api/generate-roadmap', methods=['POST'])
 @require_auth
 def generate_roadmap():
@@ -758,7 +959,10 @@ def generate_roadmap():
             
         print(f"[ROADMAP] Generating for User: {user_id}, Business: {business_name}, Language: {language}")
         
-        roadmap = roadmap_generator.generate_roadmap(user_id, business_name, language)
+        if _wants_async(data):
+            return _submit_job('roadmap', {'user_id': user_id, 'business_name': business_name, 'language': language, 'mode': data.get('mode')}, user_id)
+        
+        roadmap = roadmap_generator.generate_roadmap(user_id, business_name, language, mode=data.get('mode'))
         
         return jsonify({'success': True, 'roadmap': roadmap})
 
@@ -769,6 +973,124 @@ def generate_roadmap():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/generate-roadmap/stream', methods=['POST'])
+@require_auth
+def generate_roadmap_stream():
+    """Streams each roadmap section as soon as its own generation finishes."""
+    try:
+        data = request.json
+        user_id = request.user.get('uid')
+
+        if not user_id and os.getenv("FLASK_ENV") == "development":
+             user_id = data.get('user_id', 'test_user')
+
+        business_name = data.get('business_name') or data.get('selected_business_name')
+        language = data.get('language', 'en')
+
+        if not business_name:
+            return jsonify({'error': 'Business name is required'}), 400
+
+        print(f"[ROADMAP] Stream Generating for User: {user_id}, Business: {business_name}, Language: {language}")
+
+        def generate():
+            try:
+                yield from sse_writer.events(roadmap_generator.stream_roadmap(user_id, business_name, language))
+            except Exception as e:
+                print(f"[ROADMAP] Stream Generator Error: {e}")
+                yield sse_frame({'type': 'error', 'error': str(e)})
+
+        response = Response(generate(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    except Exception as e:
+        print(f"[ROADMAP] Stream Generation Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/generate-roadmap/cache/invalidate', methods=['POST'])
+@require_auth
+def invalidate_roadmap_cache():
+    """Called after a profile edit: drops the user's cached business roadmaps."""
+    try:
+        data = request.json or {}
+        user_id = request.user.get('uid')
+
+        if not user_id and os.getenv("FLASK_ENV") == "development":
+             user_id = data.get('user_id', 'test_user')
+
+        business_name = data.get('business_name') or data.get('business_id')
+        business_id = None
+        if business_name:
+            meta = roadmap_generator.get_business_metadata(business_name)
+            business_id = meta['id'] if meta['id'] != "unknown" else meta['title']
+
+        removed = roadmap_generator.cache.invalidate(user_id, business_id)
+        # The edited profile must be re-read by the next roadmap, notification or news request
+        profile_repository.invalidate(user_id)
+        return jsonify({'success': True, 'removed': removed, 'cache': roadmap_generator.cache.stats()})
+    except Exception as e:
+        print(f"[ROADMAP] Cache Invalidate Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+def _crop_plan_ref(user_id, crop_name, language):
+    """users/{uid}/crop_plans/{crop}_{lang}, or None when Firestore isn't available."""
+    from firebase_admin import firestore
+    try:
+        db = firestore.client()
+        return db.collection('users').document(user_id).collection('crop_plans').document(f"{crop_name}_{language}")
+    except Exception as e:
+        print(f"[CROP-ROADMAP WARNING] Firestore not available: {e}")
+        return None
+
+def _saved_crop_roadmap(doc_ref):
+    if doc_ref is None:
+        return None
+    try:
+        doc = doc_ref.get()
+        if doc.exists:
+            return doc.to_dict().get('roadmap')
+    except Exception as e:
+        print(f"[CROP-ROADMAP WARNING] Firestore not available: {e}")
+    return None
+
+def _generate_crop_roadmap(user_id, crop_name, language, doc_ref):
+    """A fresh plan personalised from the user's profile, saved to doc_ref."""
+    from firebase_admin import firestore
+
+    roadmap = crop_planner_generator.generate_crop_roadmap(user_id, crop_name, language)
+    if doc_ref is not None and roadmap and not roadmap.get('overview', '').startswith('Error'):
+        try:
+            doc_ref.set({'roadmap': roadmap, 'created_at': firestore.SERVER_TIMESTAMP})
+            print(f"[CROP-ROADMAP] Saved new plan for {crop_name} in {language}")
+        except Exception as e:
+            print(f"[CROP-ROADMAP WARNING] Failed to save plan: {e}")
+    return roadmap
+
+def _get_crop_roadmap(user_id, crop_name, language):
+    """The user's saved plan from Firestore, else a fresh personalised generation (saved back)."""
+    doc_ref = _crop_plan_ref(user_id, crop_name, language)
+    roadmap = _saved_crop_roadmap(doc_ref)
+    if roadmap:
+        print(f"[CROP-ROADMAP] Returning existing plan for {crop_name} in {language}")
+        return roadmap
+    return _generate_crop_roadmap(user_id, crop_name, language, doc_ref)
+
+def _placeholder_crop_roadmap(user_id, crop_name, language):
+    """
+    The precomputed generic plan plus a job generating the personalised one, or
+    None when there is no precomputed plan. The generic plan is built from a
+    guest profile, so it is only shown while the job runs and never saved as
+    the user's plan.
+    """
+    placeholder = crop_plan_store.get(crop_name, language) if crop_plan_store else None
+    if not placeholder:
+        return None
+    job, deduplicated = job_queue.submit('crop_roadmap', {'user_id': user_id, 'crop_name': crop_name, 'language': language}, user_id=user_id)
+    print(f"[CROP-ROADMAP] Serving precomputed placeholder for {crop_name} in {language} while job {job['job_id'][:8]} personalises it")
+    return {'success': True, 'roadmap': placeholder, 'placeholder': True, **_job_handle(job, deduplicated)}
+
 @app.route('/api/generate-crop-roadmap', methods=['POST'])
 @require_auth
 def generate_crop_roadmap():
@@ -787,32 +1109,20 @@ def generate_crop_roadmap():
             
         print(f"[CROP-ROADMAP] Generating for User: {user_id}, Crop: {crop_name}, Language: {language}")
         
-        import firebase_admin
-        from firebase_admin import firestore
-        
-        db = None
-        doc_ref = None
-        try:
-            db = firestore.client()
-            plan_id = f"{crop_name}_{language}"
-            doc_ref = db.collection('users').document(user_id).collection('crop_plans').document(plan_id)
-            
-            doc = doc_ref.get()
-            if doc.exists:
-                print(f"[CROP-ROADMAP] Returning existing plan for {crop_name} in {language}")
-                return jsonify({'success': True, 'roadmap': doc.to_dict().get('roadmap')})
-        except Exception as e:
-            print(f"[CROP-ROADMAP WARNING] Firestore not available: {e}")
-            
-        roadmap = crop_planner_generator.generate_crop_roadmap(user_id, crop_name, language)
-        
-        if db and doc_ref and roadmap and not roadmap.get('overview', '').startswith('Error'):
-            try:
-                doc_ref.set({'roadmap': roadmap, 'created_at': firestore.SERVER_TIMESTAMP})
-                print(f"[CROP-ROADMAP] Saved new plan for {crop_name} in {language}")
-            except Exception as e:
-                print(f"[CROP-ROADMAP WARNING] Failed to save plan: {e}")
-        
+        if _wants_async(data):
+            return _submit_job('crop_roadmap', {'user_id': user_id, 'crop_name': crop_name, 'language': language}, user_id)
+
+        doc_ref = _crop_plan_ref(user_id, crop_name, language)
+        saved = _saved_crop_roadmap(doc_ref)
+        if saved:
+            print(f"[CROP-ROADMAP] Returning existing plan for {crop_name} in {language}")
+            return jsonify({'success': True, 'roadmap': saved})
+
+        placeholder = _placeholder_crop_roadmap(user_id, crop_name, language)
+        if placeholder:
+            return jsonify(placeholder)
+
+        roadmap = _generate_crop_roadmap(user_id, crop_name, language, doc_ref)
         return jsonify({'success': True, 'roadmap': roadmap})
 
     except Exception as e:
@@ -822,6 +1132,157 @@ def generate_crop_roadmap():
         return jsonify({'error': str(e)}), 500
 
 
+# --- Background Jobs (long LLM generations) ---
+def _wants_async(data):
+    """Clients opt in with {"async": true} (or ?async=1) and get a job id back immediately."""
+    flag = (data or {}).get('async', request.args.get('async'))
+    return str(flag).lower() in ('true', '1', 'yes')
+
+def _job_handle(job, deduplicated):
+    return {
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'deduplicated': deduplicated,
+        'poll_url': f"/api/jobs/{job['job_id']}",
+        'events_url': f"/api/jobs/{job['job_id']}/events"
+    }
+
+def _submit_job(kind, payload, user_id):
+    job, deduplicated = job_queue.submit(kind, payload, user_id=user_id)
+    return jsonify({'success': True, **_job_handle(job, deduplicated)}), 202
+
+def _enrichment_job(data, recommendations, user_id):
+    """Queue the LLM pass that personalises ranked advisor cards; None when disabled or not queued."""
+    if os.getenv("ADVISOR_ENRICHMENT", "background").lower() != "background":
+        return None
+    try:
+        payload = {'profile': {k: v for k, v in data.items() if k != 'async'}, 'recommendations': recommendations}
+        return _job_handle(*job_queue.submit('advisor_enrich', payload, user_id=user_id))
+    except Exception as e:
+        print(f"[ADVISOR] Enrichment job not queued: {e}")
+        return None
+
+def _ranked_advisor_cards(advisor, data, user_id):
+    """
+    Ranked cards, plus the handle of the job personalising them (the frontend
+    swaps the enriched cards in). The catalogue text is English only, so for
+    Hindi and Marathi the cards are enriched inline instead, in the farmer's
+    language, and no job is queued.
+    """
+    recommendations = advisor.rank_recommendations()
+    if not advisor.catalogue_in_language():
+        return advisor.enrich_recommendations(recommendations), None
+    return recommendations, _enrichment_job(data, recommendations, user_id)
+
+def _roadmap_job(payload, progress):
+    if str(payload.get('mode') or os.getenv("ROADMAP_GENERATION_MODE", "parallel")).lower() == "single":
+        return roadmap_generator.generate_roadmap(payload['user_id'], payload['business_name'], payload['language'], mode='single')
+    for event in roadmap_generator.stream_roadmap(payload['user_id'], payload['business_name'], payload['language']):
+        if event['type'] == 'done':
+            return event['roadmap']
+        if event['type'] in ('error', 'partial'):
+            raise RuntimeError(event['error'])
+        progress(event)
+    raise RuntimeError("Roadmap generation ended without a result")
+
+def _crop_roadmap_job(payload, progress):
+    return _get_crop_roadmap(payload['user_id'], payload['crop_name'], payload['language'])
+
+def _advisor_init_job(payload, progress):
+    import uuid
+    session_id = str(uuid.uuid4())
+    advisor = KrishiSahAIAdvisor(_build_farmer_profile(payload))
+    advisor_sessions[session_id] = advisor
+    recommendations = advisor.rank_recommendations()
+    # Ranked cards reach followers at once; the job result carries the enriched ones
+    progress({'session_id': session_id, 'recommendations': recommendations})
+    recommendations = advisor.enrich_recommendations(recommendations)
+    print(f"[ADVISOR] Success -> Session: {session_id[:8]}... ({len(recommendations)} recs, background)")
+    return {'session_id': session_id, 'recommendations': recommendations}
+
+def _advisor_enrich_job(payload, progress):
+    advisor = KrishiSahAIAdvisor(_build_farmer_profile(payload['profile']))
+    return {'recommendations': advisor.enrich_recommendations(payload['recommendations'])}
+
+job_queue.register('roadmap', _roadmap_job)
+job_queue.register('crop_roadmap', _crop_roadmap_job)
+# Its session lives in this process's memory, so a finished job's session_id may already be gone
+job_queue.register('advisor_init', _advisor_init_job, reuse_results=False)
+job_queue.register('advisor_enrich', _advisor_enrich_job)
+_jobs_recovered = threading.Event()
+
+@app.before_request
+def _recover_jobs_once():
+    # On the first request served rather than at import: the Flask reloader's parent
+    # process imports this module too but never serves, so it never takes jobs over
+    if _jobs_recovered.is_set():
+        return
+    _jobs_recovered.set()
+    try:
+        job_queue.recover()
+    except Exception as e:
+        print(f"Warning: Job recovery failed: {e}")
+
+def _job_for_request(job_id):
+    """The job if it exists and belongs to the caller, else an error response."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return None, (jsonify({'error': 'Job not found or expired'}), 404)
+    if job.get('user_id') and job['user_id'] != request.user.get('uid') and os.getenv("FLASK_ENV") != "development":
+        return None, (jsonify({'error': 'Forbidden'}), 403)
+    return job, None
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@require_auth
+def get_job(job_id):
+    try:
+        job, error = _job_for_request(job_id)
+        if error:
+            return error
+        return jsonify({'success': True, 'job': job})
+    except Exception as e:
+        print(f"[JOBS] Get Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+@require_auth
+def job_events(job_id):
+    """SSE: status changes, generator progress (e.g. roadmap sections), then the result."""
+    try:
+        job, error = _job_for_request(job_id)
+        if error:
+            return error
+        
+        def events():
+            # follow()'s own heartbeats only wake the pump; sse_writer sends the keep-alives
+            for kind, item in job_queue.follow(job_id):
+                if kind == 'heartbeat':
+                    continue
+                elif kind == 'progress':
+                    yield {'type': 'progress', 'job_id': job_id, 'event': item}
+                elif item['status'] == 'done':
+                    yield {'type': 'done', 'job_id': job_id, 'result': item.get('result')}
+                elif item['status'] == 'failed':
+                    yield {'type': 'error', 'job_id': job_id, 'error': item.get('error')}
+                else:
+                    yield {'type': 'status', 'job_id': job_id, 'status': item['status']}
+
+        def generate():
+            try:
+                yield from sse_writer.events(events())
+            except Exception as e:
+                print(f"[JOBS] Events Generator Error: {e}")
+                yield sse_frame({'type': 'error', 'job_id': job_id, 'error': str(e)})
+        
+        response = Response(generate(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    except Exception as e:
+        print(f"[JOBS] Events Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 # --- Weather & News Services ---
 from services.WeatherNewsIntegration.weather_service import WeatherService
 from services.WeatherNewsIntegration.news_service import NewsService
@@ -842,11 +1303,9 @@ def get_personalized_news(user_id):
         location = "India"
         
         try:
-            db = firebase_admin.firestore.client()
-            user_doc = db.collection('users').document(user_id).get()
-            
-            if user_doc.exists:
-                user_data = user_doc.to_dict()
+            user_data = profile_repository.get(user_id)
+
+            if user_data:
                 # Frontend uses 'crops_grown' from the UserProfile interface
                 crops = user_data.get('crops_grown') or user_data.get('mainCrops') or user_data.get('crops', [])
                 
@@ -917,16 +1376,15 @@ def uploaded_audio(filename):
 @require_auth
 def speech_to_text():
     try:
-        with open("app_debug.log", "a", encoding='utf-8') as f:
-            f.write(f"\n[STT] Request received at {datetime.now()}\n")
+        stt_log.info("Request received")
 
         if 'audio' not in request.files:
-            with open("app_debug.log", "a", encoding='utf-8') as f: f.write("[STT] No audio file provided\n")
+            stt_log.warning("No audio file provided")
             return jsonify({'error': 'No audio file provided'}), 400
             
         file = request.files['audio']
         if file.filename == '':
-            with open("app_debug.log", "a", encoding='utf-8') as f: f.write("[STT] No file selected\n")
+            stt_log.warning("No file selected")
             return jsonify({'error': 'No file selected'}), 400
             
         # Save temporarily
@@ -936,16 +1394,13 @@ def speech_to_text():
         audio_folder_str = str(AUDIO_FOLDER)
         filepath = os.path.join(audio_folder_str, filename)
         
-        with open("app_debug.log", "a", encoding='utf-8') as f:
-            f.write(f"[STT] Saving file to: {filepath}\n")
-            
+        stt_log.debug("Saving upload", extra={"path": filepath})
         file.save(filepath)
-        
-        with open("app_debug.log", "a", encoding='utf-8') as f: f.write("[STT] File saved, calling transcribe...\n")
-        
+
+        stt_log.debug("File saved, calling transcribe")
         result = voice_service.transcribe(filepath)
-        
-        with open("app_debug.log", "a", encoding='utf-8') as f: f.write(f"[STT] Transcription result: {result}\n")
+
+        stt_log.info("Transcription finished", extra={"result": result})
         
         # Cleanup
         try:
@@ -959,15 +1414,8 @@ def speech_to_text():
         return jsonify({'success': True, 'text': result['text']})
         
     except Exception as e:
-        error_msg = f"[STT] Route Error: {str(e)}"
-        print(error_msg)
-        try:
-            with open("app_debug.log", "a", encoding='utf-8') as f:
-                import traceback
-                f.write(f"{error_msg}\n")
-                f.write(traceback.format_exc())
-        except:
-            pass
+        print(f"[STT] Route Error: {str(e)}")
+        stt_log.exception("Route error")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/voice/tts', methods=['POST'])
@@ -1074,10 +1522,11 @@ def get_current_weather():
 def get_notifications():
     try:
         user_id = request.user.get('uid')
-        notifications = notification_engine.get_notifications(user_id)
+        unread_only = request.args.get('unread', 'false').lower() == 'true'
+        notifications = notification_engine.get_notifications(user_id, unread_only=unread_only)
         
-        # Fallback to demo if empty (for Hackathon demo purposes if engine hasn't run yet)
-        if not notifications:
+        # Demo alerts only when explicitly enabled: they'd mix fake items into the stored read/unread state
+        if not notifications and not unread_only and os.getenv("NOTIF_DEMO_DATA", "false").lower() == "true":
              print(f"[NOTIF] No live notifications for {user_id}, returning demo data.")
              notifications = get_demo_notifications(user_id)
              
@@ -1086,14 +1535,27 @@ def get_notifications():
         print(f"[NOTIF] Error: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/notifications/read', methods=['POST'])
+@require_auth
+def mark_notifications_read():
+    """Body: {"ids": [...]} marks those notifications read; no ids marks all of them."""
+    try:
+        user_id = request.user.get('uid')
+        data = request.get_json(silent=True) or {}
+        ids = data.get('ids')
+        if ids is not None and not isinstance(ids, list):
+            return jsonify({'error': 'ids must be a list'}), 400
+        marked = notification_engine.store.mark_read(user_id, ids)
+        return jsonify({'success': True, 'marked': marked, 'unread': notification_engine.store.unread_count(user_id)})
+    except Exception as e:
+        print(f"[NOTIF] Mark read error: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/notifications/trigger', methods=['POST'])
 @require_auth
 def trigger_notifications():
     try:
         user_id = request.user.get('uid')
-        print(f"[DEBUG] /api/notifications/trigger reached for {user_id}")
-        with open("d:/Projects/KrishiSahAI TechFiesta/app_debug.log", "a") as f:
-            f.write(f"[DEBUG] Trigger path called for {user_id}\n")
         print(f"[NOTIF] Manual trigger initiated for {user_id}")
         
         import asyncio
@@ -0,0 +1,188 @@
+"""
+ASGI serving mode: async chat streams in front of the Flask app.
+
+    uvicorn asgi_app:create_app --factory --host 0.0.0.0 --port 5000
+
+The three chat SSE endpoints are served natively as async generators over
+chain.astream, so an idle stream waiting on Ollama is a coroutine instead of a
+pinned WSGI thread. Every other route falls through to the unchanged Flask app
+(run in a thread pool by the WSGI adapter). `python app.py` keeps working as before.
+The native routes get the same request span and per-route timing as the Flask
+ones (middleware/tracing.py, middleware/metrics.py), both lasting until the
+stream ends.
+"""
+
+import os
+import time
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from middleware.auth import AuthError, verify_request_token
+from middleware.metrics import metrics
+from middleware.tracing import aiter_in_span, tracer
+from services.LLMCore.context_store import context_store
+from services.LLMCore.sse import frame, sse_writer
+from services.LLMCore.stream_tracker import stream_tracker
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'Connection': 'keep-alive'}
+
+
+def _cors_middleware():
+    # Same policy as the Flask CORS setup in app.py
+    if os.getenv('FLASK_ENV') == 'development':
+        origins, credentials = ["*"], False
+    else:
+        origins = os.getenv('ALLOWED_ORIGINS', 'http://localhost:3000,http://localhost:5173').split(',')
+        credentials = True
+    return Middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers=["Content-Type", "Authorization"],
+        allow_credentials=credentials,
+    )
+
+
+async def _authenticate(request, verify):
+    """(user, None) or (None, 401 response); token verification may fetch certs, so it runs off the loop."""
+    try:
+        return await run_in_threadpool(verify, request.headers.get('Authorization')), None
+    except AuthError as e:
+        return None, JSONResponse({'error': str(e)}, status_code=401)
+
+
+async def _read_json(request):
+    try:
+        data = await request.json()
+    except Exception:
+        data = None
+    return data if isinstance(data, dict) else {}
+
+
+def _stream_response(chunks, tag: str, site: str, num_predict: int = None) -> StreamingResponse:
+    async def generate():
+        try:
+            # On disconnect Starlette cancels this generator; atrack aborts the Ollama stream with it
+            async for data in sse_writer.astream(stream_tracker.atrack(site, chunks, num_predict)):
+                yield data
+        except Exception as e:
+            print(f"[{tag}] Generator Error: {e}")
+            yield frame({'error': str(e)})
+
+    return StreamingResponse(generate(), media_type='text/event-stream', headers=SSE_HEADERS)
+
+
+def _instrumented(endpoint, path: str):
+    """Request span and http timing around a native route; for a stream both end when the stream does."""
+    async def instrumented(request):
+        span = tracer.start_server_span(request.method, request.url.path, request.headers.get('traceparent'))
+        span.name = f"{request.method} {path}"
+        span.set_attribute("http.route", path)
+        started = time.perf_counter()
+
+        def finish(error=None):
+            metrics.observe(f"http {request.method} {path}", time.perf_counter() - started)
+            tracer.end_span(span, error)
+
+        token = tracer.activate(span)
+        try:
+            response = await endpoint(request)
+        except Exception as e:
+            finish(e)
+            raise
+        finally:
+            tracer.deactivate(token)
+        span.set_attribute("http.status_code", response.status_code)
+        response.headers['X-Trace-Id'] = span.trace_id
+        if isinstance(response, StreamingResponse):
+            response.body_iterator = aiter_in_span(response.body_iterator, span, finish)
+        else:
+            finish()
+        return response
+    return instrumented
+
+
+def create_stream_routes(advisor_sessions: dict, waste_engine=None, health_engine=None, verify=verify_request_token):
+    """Async versions of the three /chat/stream routes, same request and event format as the Flask ones."""
+
+    async def chat_advisor_stream(request):
+        user, error = await _authenticate(request, verify)
+        if error is not None:
+            return error
+        data = await _read_json(request)
+        session_id = data.get('session_id')
+        message = data.get('message')
+
+        if not session_id or session_id not in advisor_sessions:
+            return JSONResponse({'error': 'Invalid session_id'}, status_code=400)
+        if not message:
+            return JSONResponse({'error': 'message is required'}, status_code=400)
+
+        advisor = advisor_sessions[session_id]
+        print(f"[ADVISOR] Async Stream Chat -> Input: \"{message[:50]}...\"")
+        return _stream_response(advisor.astream_chat(message, language=data.get('language')), "ADVISOR",
+                                "advisor.chat", getattr(advisor.llm, 'num_predict', None))
+
+    def context_chat(engine, method: str, site: str, tag: str, unavailable: str):
+        async def endpoint(request):
+            user, error = await _authenticate(request, verify)
+            if error is not None:
+                return error
+            data = await _read_json(request)
+            context = data.get('context')
+            context_id = data.get('context_id')
+            question = data.get('question')
+            language = data.get('language', 'English')
+
+            if not (context or context_id) or not question:
+                return JSONResponse({'error': 'Context (or context_id) and question are required'}, status_code=400)
+            if not context and context_store.get(context_id) is None:
+                return JSONResponse({'error': 'Unknown or expired context_id', 'code': 'context_expired'}, status_code=404)
+
+            print(f"[{tag}] Async Stream Chat -> Question: \"{question[:50]}...\"")
+
+            if engine is None:
+                return JSONResponse({'error': unavailable}, status_code=503)
+            chunks = getattr(engine, method)(context, question, language, context_id=context_id)
+            return _stream_response(chunks, tag, site, engine.chat_llm.num_predict)
+        return endpoint
+
+    endpoints = {
+        '/api/business-advisor/chat/stream': chat_advisor_stream,
+        '/api/waste-to-value/chat/stream':
+            context_chat(waste_engine, 'astream_chat_waste', 'waste.chat', 'WASTE', 'Waste-to-Value service is currently unavailable.'),
+        '/api/farm-health/chat/stream':
+            context_chat(health_engine, 'astream_chat_health', 'farm_health.chat', 'FARM_HEALTH', 'Farm Health AI service is currently unavailable.'),
+    }
+    return [Route(path, _instrumented(endpoint, path), methods=['POST']) for path, endpoint in endpoints.items()]
+
+
+def build_asgi_app(flask_app, stream_routes) -> Starlette:
+    """Stream routes answered natively (with their own CORS), everything else mounted Flask."""
+    try:
+        from a2wsgi import WSGIMiddleware
+    except ImportError:
+        # Deprecated in Starlette, but enough when a2wsgi is not installed
+        from starlette.middleware.wsgi import WSGIMiddleware
+
+    streams = Starlette(routes=stream_routes, middleware=[_cors_middleware()])
+    # Passing the sub-app as endpoint lets preflight OPTIONS reach its CORS middleware
+    routes = [Route(route.path, streams) for route in stream_routes]
+    routes.append(Mount('/', app=WSGIMiddleware(flask_app)))
+    return Starlette(routes=routes)
+
+
+def create_app() -> Starlette:
+    # Importing app builds the Flask app, engines and session store exactly as `python app.py` does
+    import app as flask_module
+
+    print("[ASGI] Serving chat streams natively, all other routes via Flask")
+    return build_asgi_app(
+        flask_module.app,
+        create_stream_routes(flask_module.advisor_sessions, flask_module.waste_engine, flask_module.health_engine)
+    )
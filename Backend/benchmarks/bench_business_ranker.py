@@ -0,0 +1,99 @@
+"""
+Benchmark: business advisor pre-ranking (services/BusinessAdvisor/business_ranker.py).
+
+Random farmer profiles are drawn from the frontend's form options (EN/HI/MR
+labels, budgets, land sizes, space types, interests) and ranked one at a
+time, the way /init does it, then scored in a single batch. Reports latency
+per profile and how often each business makes the top 3, as a sanity check
+that the feature table doesn't starve or flood any business.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_business_ranker.py --profiles 5000
+"""
+
+import argparse
+import collections
+import contextlib
+import io
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import numpy as np
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from services.BusinessAdvisor.business_ranker import _GOAL_OPTIONS, _INTEREST_OPTIONS, _OPTION_LEVELS
+    from services.BusinessAdvisor.krishi_chatbot import BUSINESS_OPTIONS, FarmerProfile, business_ranker
+
+BUDGETS = (50_000, 200_000, 450_000, 800_000, 1_500_000)  # the form's budget buttons
+SPACES = ("Agri", "Non-Agri", "Water")
+
+
+def random_profile(rng: random.Random) -> FarmerProfile:
+    language = rng.randrange(3)  # index into the EN/HI/MR labels
+
+    def option(field):
+        return rng.choice(_OPTION_LEVELS[field])[1][language] if rng.random() > 0.1 else None
+
+    return FarmerProfile(
+        name="Farmer",
+        land_size=rng.choice((0.25, 0.5, 1, 2, 5)),
+        capital=rng.choice(BUDGETS),
+        market_access=option("market_access") or "moderate",
+        skills=[],
+        risk_level=rng.choice(("low", "medium", "high")),
+        time_availability="full-time",
+        language=("english", "hindi", "marathi")[language],
+        space_type=rng.choice(SPACES),
+        water_availability=option("water_availability"),
+        electricity=option("electricity"),
+        covered_space=option("covered_space"),
+        animal_handling=option("animal_handling"),
+        daily_labor=option("daily_labor"),
+        loss_tolerance=option("loss_tolerance"),
+        main_goal=rng.choice(list(_GOAL_OPTIONS.values()))[language] if rng.random() > 0.1 else None,
+        interests=[labels[language] for labels in rng.sample(list(_INTEREST_OPTIONS.values()), rng.randrange(3))],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--profiles", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    profiles = [random_profile(rng) for _ in range(args.profiles)]
+
+    timings, picks = [], collections.Counter()
+    for profile in profiles:
+        started = time.perf_counter()
+        cards = business_ranker.rank(profile)
+        timings.append(time.perf_counter() - started)
+        picks.update(card["id"] for card in cards)
+
+    timings.sort()
+    print(f"{args.profiles} random profiles, rank() one at a time (as /init does)")
+    print(f"  p50 {statistics.median(timings) * 1e6:.0f} us   p99 {timings[int(len(timings) * 0.99)] * 1e6:.0f} us   "
+          f"max {timings[-1] * 1e3:.2f} ms")
+
+    encoded = [business_ranker.encode(profile) for profile in profiles]
+    batch = {key: np.array([e[key] for e in encoded]) for key in ("have", "tolerance", "goals", "spaces", "interests")}
+    started = time.perf_counter()
+    business_ranker.score(**batch)
+    elapsed = time.perf_counter() - started
+    print(f"  batch score() of all {args.profiles}: {elapsed * 1e3:.1f} ms ({elapsed / args.profiles * 1e6:.2f} us/profile)")
+
+    print("\nTop-3 appearances per business:")
+    for option in BUSINESS_OPTIONS:
+        count = picks[option["id"]]
+        print(f"  {option['id']:>2} {option['title'][:40]:<40} {count:>6} ({count / args.profiles:.0%})")
+
+
+if __name__ == "__main__":
+    main()
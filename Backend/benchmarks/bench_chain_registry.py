@@ -0,0 +1,105 @@
+"""
+Microbenchmark: per-request Python overhead of the LLM call path before and
+after the chain registry.
+
+"before" rebuilds ChatPromptTemplate.from_messages(...) and the
+`prompt | llm | parser` chain on every call (the old chat_waste /
+analyze_health behaviour); "after" fetches the precompiled chain from the
+registry. Both invoke a zero-latency fake chat model so only the Python-side
+overhead is measured.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_chain_registry.py --iterations 2000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from services.LLMCore.chain_registry import ChainRegistry
+
+SYSTEM_TEMPLATE = """You are a helpful agricultural expert assistant.
+The user has just received an analysis for converting specific crop waste into value.
+
+CONTEXT (The analysis results):
+{context_str}
+
+Respond in the specified LANGUAGE: {language}.
+Keep responses concise but well-structured."""
+
+INPUTS = {"context_str": '{"crop":"Sugarcane","options":[]}', "question": "Which option is cheapest?"}
+
+
+def build_chain(llm, language):
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_TEMPLATE),
+        ("human", "{question}"),
+    ])
+    return prompt.partial(language=language) | llm | StrOutputParser()
+
+
+def time_calls(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "mean_us": statistics.fmean(samples),
+        "p50_us": samples[len(samples) // 2],
+        "p95_us": samples[int(len(samples) * 0.95)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    llm = FakeListChatModel(responses=["ok"])
+    registry = ChainRegistry()
+
+    def before():
+        build_chain(llm, "Hindi").invoke(INPUTS)
+
+    def build_only():
+        build_chain(llm, "Hindi")
+
+    def after():
+        registry.get(("waste", "chat", "Hindi"), lambda: build_chain(llm, "Hindi")).invoke(INPUTS)
+
+    def lookup_only():
+        registry.get(("waste", "chat", "Hindi"), lambda: build_chain(llm, "Hindi"))
+
+    # Warm-up both paths (imports, pydantic caches)
+    for fn in (before, after):
+        for _ in range(50):
+            fn()
+
+    results = {
+        "rebuild per call (build only)": time_calls(build_only, args.iterations),
+        "registry lookup (lookup only)": time_calls(lookup_only, args.iterations),
+        "rebuild per call (build + invoke)": time_calls(before, args.iterations),
+        "registry (lookup + invoke)": time_calls(after, args.iterations),
+    }
+
+    print(f"{'path':<36}{'mean':>12}{'p50':>12}{'p95':>12}")
+    for name, r in results.items():
+        print(f"{name:<36}{r['mean_us']:>10.1f}us{r['p50_us']:>10.1f}us{r['p95_us']:>10.1f}us")
+
+    saved = results["rebuild per call (build + invoke)"]["mean_us"] - results["registry (lookup + invoke)"]["mean_us"]
+    print(f"\nPer-request Python overhead saved: {saved:.1f}us (registry builds: {registry.builds})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark: per-request logging overhead, inline file appends vs. the queued
+JSON logger (middleware/structured_logging.py).
+
+Times what a request used to pay (open app_debug.log, append, close; the STT
+route did that six times per request) against log.info() through the queue
+handler, from --threads request threads. Afterwards it waits for the writer
+thread to drain, checks that every line is valid JSON and reports how many
+rotated files the --max-bytes limit produced.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_logging.py --requests 20000 --threads 8
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from middleware.structured_logging import get_logger, setup_logging, shutdown_logging
+
+URL = "http://localhost:5000/api/notifications?unread=true"
+
+
+def run(handle_request, threads: int, per_thread: int) -> list:
+    timings, lock = [], threading.Lock()
+
+    def worker(worker_id):
+        local = []
+        for i in range(per_thread):
+            started = time.perf_counter()
+            handle_request(worker_id, i)
+            local.append(time.perf_counter() - started)
+        with lock:
+            timings.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return sorted(timings)
+
+
+def report(label: str, timings: list):
+    p99 = timings[int(len(timings) * 0.99)]
+    print(f"  {label:<26} p50 {statistics.median(timings) * 1e6:8.1f} us   p99 {p99 * 1e6:8.1f} us   "
+          f"max {timings[-1] * 1e3:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--lines", type=int, default=1, help="log lines per request (the STT route wrote 6)")
+    parser.add_argument("--max-bytes", type=int, default=1024 * 1024, help="rotation size for the queued logger")
+    args = parser.parse_args()
+    per_thread = args.requests // args.threads
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inline_path = Path(tmp) / "app_debug.log"
+
+        def inline(worker_id, i):
+            for _ in range(args.lines):
+                with open(inline_path, "a", encoding='utf-8') as f:
+                    f.write(f"Incoming: GET {URL}\n")
+
+        setup_logging(log_file=Path(tmp) / "app.jsonl", max_bytes=args.max_bytes, backup_count=1000, console=False)
+        log = get_logger("http")
+
+        def queued(worker_id, i):
+            for _ in range(args.lines):
+                log.info("Incoming", extra={"method": "GET", "url": URL, "worker": worker_id})
+
+        print(f"{per_thread * args.threads} requests from {args.threads} threads, {args.lines} line(s) each")
+        report("inline open/append/close", run(inline, args.threads, per_thread))
+        started = time.perf_counter()
+        report("queued JSON logger", run(queued, args.threads, per_thread))
+        shutdown_logging()  # waits for the writer thread to drain the queue
+        drained = time.perf_counter() - started
+
+        files = sorted(Path(tmp).glob("app.jsonl*"))
+        lines = 0
+        for path in files:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    json.loads(line)
+                    lines += 1
+        print(f"\nWriter thread wrote {lines} JSON lines into {len(files)} file(s) "
+              f"(rotating at {args.max_bytes // 1024} KB), all drained {drained:.2f}s after the first request")
+
+
+if __name__ == "__main__":
+    main()
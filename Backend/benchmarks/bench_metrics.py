@@ -0,0 +1,74 @@
+"""
+Benchmark: cost of the stage instrumentation (middleware/metrics.py).
+
+Times an empty `with metrics.timer(stage):` block (what every instrumented
+stage now pays), a bare observe(), and a /metrics scrape (render()) once
+--stages stages hold a full sample window each. Every timer block is also a
+tracing span, so its cost depends on TRACE_EXPORTER and TRACE_SAMPLE_RATE;
+the block is timed inside a sampled and an unsampled request span.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_metrics.py --stages 60
+    TRACE_EXPORTER=file TRACE_SAMPLE_RATE=1.0 python benchmarks/bench_metrics.py
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from middleware.metrics import MetricsRegistry
+from middleware.tracing import tracer
+
+
+def per_call(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--stages", type=int, default=60, help="distinct stages (routes + service stages)")
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    rng = random.Random(1)
+
+    def timed_block():
+        with registry.timer("pest.inference"):
+            pass
+
+    def in_request(sampled: bool) -> float:
+        span = tracer.start_span("GET /bench", kind="server", sampled=sampled)
+        token = tracer.activate(span)
+        try:
+            return per_call(timed_block, args.calls)
+        finally:
+            tracer.deactivate(token)
+
+    stats = tracer.stats()
+    print(f"tracing          exporter={stats['exporter']} sample_rate={stats['sample_rate']}")
+    print(f"timer block      {per_call(timed_block, args.calls) * 1e6:6.2f} us per stage (new trace each)")
+    print(f"  sampled        {in_request(True) * 1e6:6.2f} us per stage")
+    print(f"  unsampled      {in_request(False) * 1e6:6.2f} us per stage")
+    print(f"observe()        {per_call(lambda: registry.observe('pest.nms', 0.004), args.calls) * 1e6:6.2f} us")
+
+    for stage in range(args.stages):
+        for _ in range(registry.window):
+            registry.observe(f"stage.{stage}", rng.lognormvariate(-4, 1.5))
+    started = time.perf_counter()
+    text = registry.render()
+    elapsed = time.perf_counter() - started
+    print(f"render()         {elapsed * 1e3:6.2f} ms for {args.stages} stages x {registry.window} samples "
+          f"({len(text.splitlines())} lines, {len(text) // 1024} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Benchmark: notification fan-out with one LLM call per farmer vs. one per
+(district, crops) cohort (services/NotificationService/cohort_engine.py).
+
+Builds a synthetic user base (districts and crops drawn with a skewed,
+Zipf-like popularity, 1-3 crops per farmer, random names, land sizes and
+irrigation sources) behind an in-memory Firestore stand-in, then runs the
+real NotificationFanout over it in both modes. Weather/news fetches and the
+LLM are replaced by counters (plus an optional simulated latency), so the
+report shows LLM calls, external fetches, the wall time they would take at
+--llm-seconds per generation, and the per-farmer cost of templating. A
+last row repeats the cohort run with unchanged weather and news, which the
+delta trigger (delta_trigger.py) skips without any LLM call.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_notification_cohorts.py --users 100000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from services.NotificationService.cohort_engine import CohortNotificationEngine
+    from services.NotificationService.fanout import NotificationFanout, cohort_key
+    from services.NotificationService.notification_engine import NotificationEngine
+    from services.NotificationService.notification_store import NotificationStore
+
+DISTRICTS = [
+    ("Pune", "Maharashtra"), ("Nashik", "Maharashtra"), ("Ahmednagar", "Maharashtra"), ("Solapur", "Maharashtra"),
+    ("Satara", "Maharashtra"), ("Kolhapur", "Maharashtra"), ("Sangli", "Maharashtra"), ("Jalgaon", "Maharashtra"),
+    ("Aurangabad", "Maharashtra"), ("Latur", "Maharashtra"), ("Nagpur", "Maharashtra"), ("Amravati", "Maharashtra"),
+    ("Beed", "Maharashtra"), ("Nanded", "Maharashtra"), ("Yavatmal", "Maharashtra"), ("Akola", "Maharashtra"),
+    ("Ludhiana", "Punjab"), ("Bathinda", "Punjab"), ("Karnal", "Haryana"), ("Hisar", "Haryana"),
+    ("Indore", "Madhya Pradesh"), ("Ujjain", "Madhya Pradesh"), ("Guntur", "Andhra Pradesh"), ("Belagavi", "Karnataka"),
+    ("Rajkot", "Gujarat"), ("Banaskantha", "Gujarat"), ("Meerut", "Uttar Pradesh"), ("Bareilly", "Uttar Pradesh"),
+    ("Varanasi", "Uttar Pradesh"), ("Jaipur", "Rajasthan"), ("Kota", "Rajasthan"), ("Thanjavur", "Tamil Nadu"),
+]
+CROPS = ["Sugarcane", "Soybean", "Cotton", "Wheat", "Onion", "Rice", "Jowar", "Tur", "Gram", "Grapes",
+         "Pomegranate", "Tomato", "Maize", "Bajra", "Groundnut", "Banana", "Chilli", "Turmeric"]
+IRRIGATION = ["Drip Irrigation", "Sprinkler", "Canal", "Borewell", "Open Well", "Rainfed", "Farm Pond", "Unknown"]
+NAMES = ["Ramesh", "Suresh", "Sunita", "Ganesh", "Anita", "Vijay", "Lakshmi", "Prakash", "Savita", "Mahesh"]
+
+TEMPLATE = [
+    {"title": "Rain expected tomorrow", "message": "{name}, 70% rain chance over {land_size} of {crops}.",
+     "type": "weather", "priority": "high", "action": "Hold irrigation for two days.", "source": "AI Inference"},
+    {"title": "Watch for leaf spots", "message": "Humid nights favour fungal spots on {crops}.",
+     "type": "disease", "priority": "medium", "action": "Scout the lower leaves this week.", "source": "AI Inference"},
+    {"title": "Irrigation advisory", "message": "Soil stays moist; plan {irrigation} for the weekend.",
+     "type": "advisory", "priority": "low", "action": "Water early in the morning.", "source": "AI Inference"},
+]
+
+
+def zipf_choice(rng: random.Random, items: list, skew: float):
+    weights = [1 / (rank + 1) ** skew for rank in range(len(items))]
+    return rng.choices(items, weights)[0]
+
+
+def synthetic_users(count: int, skew: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    users = {}
+    for i in range(count):
+        district, state = zipf_choice(rng, DISTRICTS, skew)
+        crops = []
+        for _ in range(rng.choice((1, 1, 2, 2, 3))):
+            crop = zipf_choice(rng, CROPS, skew)
+            if crop not in crops:
+                crops.append(crop)
+        users[f"user{i:07d}"] = {
+            "name": f"{rng.choice(NAMES)} {rng.choice(('Patil', 'Pawar', 'Jadhav', 'Singh', 'Yadav'))}",
+            "district": district,
+            "state": state,
+            "crops_grown": crops,
+            "land_size": f"{rng.choice((0.5, 1, 2, 3, 5, 8))} Acres",
+            "irrigation_source": rng.choice(IRRIGATION),
+        }
+    return users
+
+
+class _Doc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return self._data
+
+
+class _Query:
+    """Just enough of a Firestore query for NotificationFanout._fetch_page."""
+
+    def __init__(self, ids, docs, limit=None, after=None):
+        self.ids, self.docs, self._limit, self._after = ids, docs, limit, after
+
+    def select(self, fields):
+        return self
+
+    def order_by(self, field):
+        return self
+
+    def limit(self, count):
+        return _Query(self.ids, self.docs, count, self._after)
+
+    def start_after(self, cursor):
+        return _Query(self.ids, self.docs, self._limit, cursor["__name__"])
+
+    def stream(self):
+        import bisect
+        start = bisect.bisect_right(self.ids, self._after) if self._after else 0
+        return [_Doc(doc_id, self.docs[doc_id]) for doc_id in self.ids[start:start + self._limit]]
+
+
+class FakeFirestore:
+    def __init__(self, docs: dict):
+        self.docs = docs
+        self.ids = sorted(docs)
+
+    def collection(self, name):
+        return _Query(self.ids, self.docs)
+
+
+class CountingEngine(NotificationEngine):
+    """NotificationEngine with weather/news and the LLM replaced by counters."""
+
+    def __init__(self, llm_seconds: float, store_path=None):
+        self.store = NotificationStore(store_path or ":memory:")
+        self.llm_seconds = llm_seconds
+        self.fetches = 0
+        self.llm_calls = 0
+
+    async def fetch_context(self, profile):
+        self.fetches += 1
+        return {"temperature": 29, "rainfall_probability": 72}, []
+
+    async def _generate_ai_insights(self, profile, weather, news, rules=None, site="notifications"):
+        self.llm_calls += 1
+        if self.llm_seconds:
+            await asyncio.sleep(self.llm_seconds)
+        return [dict(item) for item in TEMPLATE]
+
+
+def run_mode(users: dict, cohort_mode: bool, args, cycles: int = 1) -> dict:
+    """Fan out over `users`; with cycles > 1, the numbers are those of the last (unchanged) cycle."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = CountingEngine(args.simulate_llm_ms / 1000, Path(tmp) / "notifications.sqlite3")
+        fanout = NotificationFanout(engine=engine, db=FakeFirestore(users), page_size=args.page_size,
+                                    concurrency=args.concurrency, checkpoint_path=Path(tmp) / "checkpoint.json",
+                                    cohort_mode=cohort_mode, snapshot_path=Path(tmp) / "snapshots.json")
+        for _ in range(cycles):
+            engine.fetches = engine.llm_calls = 0
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = asyncio.run(fanout.run())
+            elapsed = time.perf_counter() - started
+        return {"stats": stats, "llm_calls": engine.llm_calls, "fetches": engine.fetches,
+                "seconds": elapsed, "stored": engine.store.stats()["rows"]}
+
+
+def personalize_cost(users: dict, rounds: int = 20000) -> float:
+    cohort = CohortNotificationEngine(CountingEngine(0))
+    profiles = [NotificationEngine.profile_from_doc(data) for data in list(users.values())[:rounds]]
+    started = time.perf_counter()
+    for profile in profiles:
+        cohort.personalize(TEMPLATE, profile)
+    return (time.perf_counter() - started) / len(profiles) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent for district/crop popularity")
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=2, help="Ollama parallel generations")
+    parser.add_argument("--llm-seconds", type=float, default=6.0, help="Seconds per notification generation, for the wall-time estimate")
+    parser.add_argument("--simulate-llm-ms", type=float, default=0.0, help="Actually sleep this long per LLM call")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    users = synthetic_users(args.users, args.skew, args.seed)
+    engine = CountingEngine(0)
+    cohorts = {cohort_key(engine, NotificationEngine.profile_from_doc(data)) for data in users.values()}
+    print(f"{args.users} synthetic users, {len(cohorts)} (district, crops) cohorts, skew {args.skew}")
+    print(f"  average cohort size {args.users / len(cohorts):.1f} farmers\n")
+
+    print(f"{'mode':<10} {'LLM calls':>10} {'fetches':>9} {'stored':>8} {'run time':>10} {'est. LLM time':>15}")
+    results = {}
+    # "unchanged": a second cohort cycle with the same weather and news, which the delta trigger skips
+    for name, cohort_mode, cycles in (("per-user", False, 1), ("cohort", True, 1), ("unchanged", True, 2)):
+        r = results[name] = run_mode(users, cohort_mode, args, cycles)
+        estimate = r["llm_calls"] * args.llm_seconds / args.concurrency / 3600
+        print(f"{name:<10} {r['llm_calls']:>10} {r['fetches']:>9} {r['stored']:>8} {r['seconds']:>9.1f}s "
+              f"{estimate:>13.1f} h")
+    reduction = results["per-user"]["llm_calls"] / max(1, results["cohort"]["llm_calls"])
+    print(f"\nLLM calls reduced {reduction:.0f}x "
+          f"(at {args.llm_seconds:.0f}s per generation and {args.concurrency} parallel slots)")
+    print(f"Templating one farmer's notifications: {personalize_cost(users):.1f} us")
+
+
+if __name__ == "__main__":
+    main()
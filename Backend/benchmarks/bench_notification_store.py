@@ -0,0 +1,116 @@
+"""
+Benchmark: notification store reads and batched writes
+(services/NotificationService/notification_store.py).
+
+Fills a fresh SQLite store with --users farmers at a full ring buffer, then
+times GET-style reads (a user's live notifications, high priority first)
+from reader threads, once on an idle store and once while a writer thread
+keeps flushing fan-out sized batches, the way a scheduled run does.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_notification_store.py --users 20000 --readers 1
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services.NotificationService.notification_store import NotificationStore
+
+TYPES = ("weather", "disease", "market", "advisory", "pesticide")
+PRIORITIES = ("high", "medium", "low")
+
+
+def notifications_for(rng: random.Random, run: int, count: int = 4) -> list:
+    return [{
+        "id": f"{run}-{i}",
+        "title": f"Alert {rng.randrange(40)} for this week",
+        "message": "Rainfall probability is 72%. Secure your harvested crops.",
+        "type": rng.choice(TYPES),
+        "priority": rng.choice(PRIORITIES),
+        "action": "Do not irrigate. Cover harvested produce.",
+        "source": "AI Inference",
+    } for i in range(count)]
+
+
+def fill(store: NotificationStore, users: list, runs: int, batch_size: int, rng: random.Random) -> float:
+    started = time.perf_counter()
+    for run in range(runs):
+        for start in range(0, len(users), batch_size):
+            store.put_many({uid: notifications_for(rng, run) for uid in users[start:start + batch_size]})
+    return time.perf_counter() - started
+
+
+def read_timings(store: NotificationStore, users: list, readers: int, reads: int) -> list:
+    timings, lock = [], threading.Lock()
+
+    def reader(seed):
+        rng, local = random.Random(seed), []
+        for _ in range(reads):
+            uid = rng.choice(users)
+            started = time.perf_counter()
+            store.get(uid)
+            local.append(time.perf_counter() - started)
+        with lock:
+            timings.extend(local)
+
+    threads = [threading.Thread(target=reader, args=(seed,)) for seed in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sorted(timings)
+
+
+def report(label: str, timings: list):
+    p99 = timings[int(len(timings) * 0.99)]
+    print(f"  {label:<28} p50 {statistics.median(timings) * 1e3:.3f} ms   p99 {p99 * 1e3:.3f} ms   "
+          f"max {timings[-1] * 1e3:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=8, help="fan-out runs used to fill the rings")
+    parser.add_argument("--batch", type=int, default=100, help="users per write transaction")
+    parser.add_argument("--readers", type=int, default=1, help="reader threads (more threads add GIL waits to the tail)")
+    parser.add_argument("--reads", type=int, default=5000, help="reads per reader thread")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    users = [f"user{i:07d}" for i in range(args.users)]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NotificationStore(Path(tmp) / "notifications.sqlite3", ring_size=30)
+        elapsed = fill(store, users, args.runs, args.batch, rng)
+        writes = args.users * args.runs
+        print(f"Filled {store.stats()['rows']} rows: {writes} user writes in {elapsed:.1f}s "
+              f"({elapsed / writes * 1e6:.0f} us per user, {args.batch} users per transaction)")
+
+        print(f"\nstore.get() from {args.readers} threads:")
+        report("idle store", read_timings(store, users, args.readers, args.reads))
+
+        stop = threading.Event()
+
+        def writer():
+            run = args.runs
+            while not stop.is_set():
+                store.put_many({uid: notifications_for(rng, run) for uid in rng.sample(users, args.batch)})
+                run += 1
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        report("during batch writes", read_timings(store, users, args.readers, args.reads))
+        stop.set()
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: profile reads through services/Profiles/profile_repository.py.
+
+Simulates request threads that each need a farmer's profile (the
+notification, roadmap and news routes) against the in-memory Firestore
+stand-in with --latency-ms per round-trip. Compares the old one
+document().get() per request with the repository on a cold cache (misses
+coalesced into get_all() batches) and on a warm cache, then checks that a
+snapshot listener refreshes a cached profile after an edit.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_profile_repository.py --requests 2000 --threads 32
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services.Profiles.fake_client import FakeFirestore
+from services.Profiles.profile_repository import ProfileRepository
+
+
+def make_client(users: int, latency: float) -> FakeFirestore:
+    docs = {f"user{i:06d}": {"name": f"Farmer {i}", "district": "Pune", "state": "Maharashtra",
+                             "crops_grown": ["Onion", "Wheat"], "land_size": 3} for i in range(users)}
+    return FakeFirestore({"users": docs}, latency=latency)
+
+
+def run(fetch, uids: list, threads: int) -> dict:
+    def timed(uid):
+        started = time.perf_counter()
+        fetch(uid)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        timings = sorted(pool.map(timed, uids))
+    return {"seconds": time.perf_counter() - started, "p50": statistics.median(timings),
+            "p99": timings[int(len(timings) * 0.99)]}
+
+
+def report(label: str, result: dict, client: FakeFirestore):
+    trips = client.round_trips["get"] + client.round_trips["get_all"]
+    print(f"  {label:<22} {result['seconds']:6.2f}s   p50 {result['p50'] * 1e3:7.2f} ms   "
+          f"p99 {result['p99'] * 1e3:7.2f} ms   {trips:>6} round-trips")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=32, help="concurrent request threads")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated Firestore round-trip")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    uids = [f"user{rng.randrange(args.users):06d}" for _ in range(args.requests)]
+    latency = args.latency_ms / 1000
+    print(f"{args.requests} profile reads for {len(set(uids))} distinct users, {args.threads} threads, "
+          f"{args.latency_ms:.0f} ms per round-trip")
+
+    client = make_client(args.users, latency)
+    report("document().get()", run(lambda uid: client.collection('users').document(uid).get().to_dict(), uids, args.threads), client)
+
+    client = make_client(args.users, latency)
+    repo = ProfileRepository(db=client, ttl_seconds=300, listen=False)
+    report("repository, cold", run(repo.get, uids, args.threads), client)
+    report("repository, warm", run(repo.get, uids, args.threads), client)
+    stats = repo.stats()
+    print(f"  {stats['batches']} get_all batches, {stats['reads']} documents read, "
+          f"{stats['coalesced']} misses joined an in-flight read, hit rate {stats['hit_rate']:.0%}")
+
+    repo.db = client
+    repo.start_listener()
+    client.collection('users').document(uids[0]).set({"district": "Nashik"}, merge=True)
+    refreshed = repo.get(uids[0])["district"] == "Nashik"
+    print(f"\nSnapshot listener refreshed the edited profile without a read: {refreshed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+Benchmark: roadmap Markdown parsing, per-section regex searches vs. the shared
+single-pass parser (services/LLMCore/roadmap_parser.py).
+
+The "legacy" functions below are verbatim copies of the parse_markdown_roadmap
+methods that used to live in roadmap_service.py and planner_service.py. Every
+document of the corpus is parsed by both, outputs are compared field for field,
+then both are timed over the whole corpus.
+
+The corpus is either a JSONL file of recorded outputs, one
+{"kind": "business" | "crop", "language": "EN", "text": "..."} per line, or
+(by default) 1,000 synthetic outputs in EN/HI/MR covering the formatting
+slips seen in practice: preambles, bullet/numbered actions, lowercase or
+trailing-space headers, missing sections, CRLF line endings and missing or
+translated disclaimers.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_roadmap_parser.py --size 1000 --rounds 5
+    python benchmarks/bench_roadmap_parser.py --corpus recorded_roadmaps.jsonl
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from services.FiveToTenYear.roadmap_service import LANG_CONFIG, ROADMAP_DISCLAIMER, ROADMAP_PARSER
+    from services.Planner.planner_service import CROP_LANG_CONFIG, CROP_PLAN_PARSER
+
+
+# --- Legacy parsers (verbatim) ---
+
+def legacy_parse_business(text, business_name, language='EN'):
+    """
+    Parses the multi-section Markdown output into a dictionary for the frontend.
+    """
+    import re
+
+    title_prefix = "10-Year Sustainability & Profit"
+    roadmap = {
+        "title": f"{title_prefix} Planner for {business_name}",
+        "overview": "",
+        "years": [],
+        "labor_analysis": "",
+        "sustainability_plan": "",
+        "resilience_strategy": "",
+        "verdict": "",
+        "disclaimer": ""
+    }
+
+    # Multi-language header mapping for the parser
+    # We look for ANY of these patterns to demarcate sections
+    HEADERS = {
+        "overview": r'# (?:Overview|अवलोकन|आढावा|Crop Overview|फसल अवलोकन|पीक आढावा)',
+        "planner": r'# (?:1\. 10-Year Growth & Profit Planner|1\. 10-वर्षीय विकास और लाभ योजनाकार|1\. 10-वर्षांचे विकास आणि नफा नियोजक|1\. Crop Lifecycle Planner|1\. फसल जीवनचक्र योजनाकार|1\. पीक जीवनचक्र नियोजक)',
+        "labor": r'# (?:2\. Labor & Aging Analysis|2\. श्रम और उम्र बढ़ने का विश्लेषण|2\. श्रम आणि वृद्धत्व विश्लेषण|2\. Resource & Labor Management|2\. संसाधन और श्रम प्रबंधन|2\. संसाधन आणि श्रम व्यवस्थापन)',
+        "sustainability": r'# (?:3\. Sustainability & Succession|3\. स्थिरता और उत्तराधिकार|3\. शाश्वतता आणि उत्तराधिकार|3\. Quality & Harvest Sustainability|3\. गुणवत्ता और फसल स्थिरता|3\. गुणवत्ता आणि पीक शाश्वतता)',
+        "resilience": r'# (?:4\. Financial Resilience|4\. वित्तीय लचीलापन|4\. आर्थिक लवचिकता|4\. Market & Risk Management|4\. बाजार और जोखिम प्रबंधन|4\. बाजार आणि जोखीम व्यवस्थापन)',
+        "verdict": r'# (?:5\. Final Verdict|5\. अंतिम निर्णय|5\. अंतिम निकाल|5\. Final Harvest Verdict|5\. अंतिम फसल निर्णय|5\. अंतिम पीक निकाल)'
+    }
+
+    def extract_between(start_regex, end_regex=None):
+        if end_regex:
+            pattern = rf'{start_regex}\n(.*?)(?={end_regex}|\Z)'
+        else:
+            pattern = rf'{start_regex}\n(.*)'
+        match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
+        return match.group(1).strip() if match else ""
+
+    roadmap['overview'] = extract_between(HEADERS['overview'], HEADERS['planner'])
+    roadmap['labor_analysis'] = extract_between(HEADERS['labor'], HEADERS['sustainability'])
+    roadmap['sustainability_plan'] = extract_between(HEADERS['sustainability'], HEADERS['resilience'])
+    roadmap['resilience_strategy'] = extract_between(HEADERS['resilience'], HEADERS['verdict'])
+
+    # Extract verdict and disclaimer
+    verdict_block = extract_between(HEADERS['verdict'])
+    if "DISCLAIMER:" in verdict_block or "अस्वीकरण:" in verdict_block:
+        parts = re.split(r'(?:DISCLAIMER:|अस्वीकरण:)', verdict_block, flags=re.IGNORECASE)
+        roadmap['verdict'] = parts[0].strip()
+        roadmap['disclaimer'] = parts[1].strip()
+    else:
+        roadmap['verdict'] = verdict_block
+
+    # Parse Years/Phases (Flexible for "Year", "वर्ष", "Phase", etc.)
+    year_pattern = r'## (?:Year|वर्ष|Phase) (\d+): (.*?)\n(.*?)(?=## (?:Year|वर्ष|Phase) \d+:|\Z|# [2345])'
+    year_blocks = re.findall(year_pattern, text, re.DOTALL | re.IGNORECASE)
+
+    # Labels for inner fields can also be translated
+    focus_labels = r'(?:\*\*Strategic Focus\*\*|\*\*रणनीतिक फोकस\*\*|\*\*धोरणात्मक लक्ष\*\*|\*\*Critical Focus\*\*|\*\*महत्वपूर्ण फोकस\*\*|\*\*गंभीर लक्ष\*\*)'
+    profit_labels = r'(?:\*\*Expected Profit\*\*|\*\*अपेक्षित लाभ\*\*|\*\*अपेक्षित नफा\*\*|\*\*Projected Value/Yield\*\*|\*\*अनुमानित मूल्य/उपज\*\*|\*\*अपेक्षित मूल्य/उत्पन्न\*\*)'
+    actions_labels = r'(?:\*\*Key Actions\*\*|\*\*मुख्य कार्य\*\*|\*\*मुख्य कृती\*\*|\*\*Required Actions\*\*|\*\*आवश्यक कार्य\*\*|\*\*आवश्यक कृती\*\*)'
+
+    for year_num, goal, content in year_blocks:
+        year_data = {
+            "year": f"{'Year' if language=='EN' else 'वर्ष'} {year_num}",
+            "goal": goal.strip(),
+            "focus": "",
+            "actions": [],
+            "profit": ""
+        }
+
+        focus_match = re.search(rf'{focus_labels}:\s*(.*)', content, re.IGNORECASE)
+        year_data['focus'] = focus_match.group(1).strip() if focus_match else ""
+
+        profit_match = re.search(rf'{profit_labels}:\s*(.*)', content, re.IGNORECASE)
+        year_data['profit'] = profit_match.group(1).strip() if profit_match else ""
+
+        actions_match = re.search(rf'{actions_labels}:\s*(.*?)(?={profit_labels}|\Z)', content, re.DOTALL | re.IGNORECASE)
+        if actions_match:
+            raw_actions = actions_match.group(1).strip()
+            lines = raw_actions.split('\n')
+            year_data['actions'] = [re.sub(r'^[-*]\s*', '', l).strip() for l in lines if l.strip()]
+
+        roadmap['years'].append(year_data)
+
+    if not roadmap['years']:
+        print("[ROADMAP WARNING] Regex year/phase extraction failed. Possible format mismatch.")
+
+    return roadmap
+
+
+def legacy_parse_crop(text, crop_name, language='EN'):
+    import re
+
+    title_prefix = "Crop Lifecycle"
+    roadmap = {
+        "title": f"{title_prefix} Planner for {crop_name}",
+        "overview": "",
+        "years": [],
+        "labor_analysis": "",
+        "sustainability_plan": "",
+        "resilience_strategy": "",
+        "verdict": "",
+        "disclaimer": ""
+    }
+
+    # Multi-language header mapping for the parser
+    HEADERS = {
+        "overview": r'# (?:Overview|अवलोकन|आढावा|Crop Overview|फसल अवलोकन|पीक आढावा)',
+        "planner": r'# (?:1\. 10-Year Growth & Profit Planner|1\. 10-वर्षीय विकास और लाभ योजनाकार|1\. 10-वर्षांचे विकास आणि नफा नियोजक|1\. Crop Lifecycle Planner|1\. फसल जीवनचक्र योजनाकार|1\. पीक जीवनचक्र नियोजक)',
+        "labor": r'# (?:2\. Labor & Aging Analysis|2\. श्रम और उम्र बढ़ने का विश्लेषण|2\. श्रम आणि वृद्धत्व विश्लेषण|2\. Resource & Labor Management|2\. संसाधन और श्रम प्रबंधन|2\. संसाधन आणि श्रम व्यवस्थापन)',
+        "sustainability": r'# (?:3\. Sustainability & Succession|3\. स्थिरता और उत्तराधिकार|3\. शाश्वतता आणि उत्तराधिकार|3\. Quality & Harvest Sustainability|3\. गुणवत्ता और फसल स्थिरता|3\. गुणवत्ता आणि पीक शाश्वतता)',
+        "resilience": r'# (?:4\. Financial Resilience|4\. वित्तीय लचीलापन|4\. आर्थिक लवचिकता|4\. Market & Risk Management|4\. बाजार और जोखिम प्रबंधन|4\. बाजार आणि जोखीम व्यवस्थापन)',
+        "verdict": r'# (?:5\. Final Verdict|5\. अंतिम निर्णय|5\. अंतिम निकाल|5\. Final Harvest Verdict|5\. अंतिम फसल निर्णय|5\. अंतिम पीक निकाल)'
+    }
+
+    def extract_between(start_regex, end_regex=None):
+        if end_regex:
+            pattern = rf'{start_regex}\n(.*?)(?={end_regex}|\Z)'
+        else:
+            pattern = rf'{start_regex}\n(.*)'
+        match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
+        return match.group(1).strip() if match else ""
+
+    roadmap['overview'] = extract_between(HEADERS['overview'], HEADERS['planner'])
+    roadmap['labor_analysis'] = extract_between(HEADERS['labor'], HEADERS['sustainability'])
+    roadmap['sustainability_plan'] = extract_between(HEADERS['sustainability'], HEADERS['resilience'])
+    roadmap['resilience_strategy'] = extract_between(HEADERS['resilience'], HEADERS['verdict'])
+
+    # Extract verdict and disclaimer
+    verdict_block = extract_between(HEADERS['verdict'])
+    if "DISCLAIMER:" in verdict_block or "अस्वीकरण:" in verdict_block:
+        parts = re.split(r'(?:DISCLAIMER:|अस्वीकरण:)', verdict_block, flags=re.IGNORECASE)
+        roadmap['verdict'] = parts[0].strip()
+        roadmap['disclaimer'] = parts[1].strip()
+    else:
+        roadmap['verdict'] = verdict_block
+
+    # Parse Years/Phases (Flexible for "Year", "वर्ष", "Phase", etc.)
+    year_pattern = r'## (?:Year|वर्ष|Phase) (\d+): (.*?)\n(.*?)(?=## (?:Year|वर्ष|Phase) \d+:|\Z|# [2345])'
+    year_blocks = re.findall(year_pattern, text, re.DOTALL | re.IGNORECASE)
+
+    # Labels for inner fields can also be translated (robust to asterisks and colons)
+    focus_labels_re = r'(?:Strategic Focus|रणनीतिक फोकस|धोरणात्मक लक्ष|Critical Focus|महत्वपूर्ण फोकस|गंभीर लक्ष)'
+    profit_labels_re = r'(?:Expected Profit|अपेक्षित लाभ|अपेक्षित नफा|Projected Value/Yield|अनुमानित मूल्य/उपज|अपेक्षित मूल्य/उत्पन्न)'
+    actions_labels_re = r'(?:Key Actions|मुख्य कार्य|मुख्य कृती|Required Actions|आवश्यक कार्य|आवश्यक कृती)'
+
+    for year_num, goal, content in year_blocks:
+        year_data = {
+            "year": f"Phase {year_num}",
+            "goal": goal.strip(),
+            "focus": "",
+            "actions": [],
+            "profit": ""
+        }
+
+        focus_match = re.search(rf'{focus_labels_re}[*\s:]+(.*)', content, re.IGNORECASE)
+        year_data['focus'] = focus_match.group(1).strip() if focus_match else ""
+
+        profit_match = re.search(rf'{profit_labels_re}[*\s:]+(.*)', content, re.IGNORECASE)
+        year_data['profit'] = profit_match.group(1).strip() if profit_match else ""
+
+        actions_match = re.search(rf'{actions_labels_re}[*\s:]+(.*?)(?=\s*[-*]*\s*{profit_labels_re}|\Z)', content, re.DOTALL | re.IGNORECASE)
+        if actions_match:
+            raw_actions = actions_match.group(1).strip()
+            lines = raw_actions.split('\n')
+            # Remove starting hyphen, asterisk, numbers or dots
+            year_data['actions'] = [re.sub(r'^[-*\d.]+\s*', '', l).strip() for l in lines if l.strip() and not l.strip().startswith('**')]
+
+        roadmap['years'].append(year_data)
+
+    if not roadmap['years']:
+        print("[ROADMAP WARNING] Regex year/phase extraction failed. Possible format mismatch.")
+
+    return roadmap
+
+
+# --- Synthetic corpus ---
+
+SENTENCES = {
+    "EN": ["Drip irrigation keeps water use low during the dry months.",
+           "Reinvest a third of the profit into a second unit.",
+           "Tie up with the district FPO for assured procurement.",
+           "Keep a cash reserve of at least three months of expenses."],
+    "HI": ["शुष्क महीनों में ड्रिप सिंचाई से पानी की बचत होती है।",
+           "लाभ का एक तिहाई दूसरी इकाई में पुनः निवेश करें।",
+           "सुनिश्चित खरीद के लिए जिले के एफपीओ से जुड़ें।"],
+    "MR": ["कोरड्या महिन्यांत ठिबक सिंचनामुळे पाण्याची बचत होते.",
+           "नफ्याचा एक तृतीयांश भाग दुसऱ्या युनिटमध्ये गुंतवा.",
+           "खात्रीशीर खरेदीसाठी जिल्ह्यातील एफपीओशी जोडा."],
+}
+
+
+def _paragraph(rng, lang, n):
+    return " ".join(rng.choice(SENTENCES[lang]) for _ in range(n))
+
+
+def synthetic_document(rng):
+    kind = rng.choice(("business", "crop"))
+    lang = rng.choice(("EN", "HI", "MR"))
+    cfg = (LANG_CONFIG if kind == "business" else CROP_LANG_CONFIG)[lang]
+    headers = list(cfg["headers"])
+    if rng.random() < 0.05:
+        headers = [h.lower() for h in headers]
+    term = cfg.get("year_term", "Phase") if kind == "business" else rng.choice(("Phase", "Phase", "वर्ष"))
+    blocks_count = 10 if kind == "business" else rng.randint(4, 7)
+
+    def header(i):
+        trailing = " " if rng.random() < 0.03 else ""
+        return f"# {headers[i]}{trailing}\n"
+
+    parts = []
+    if rng.random() < 0.3:
+        parts.append("Sure! Here is the detailed roadmap you asked for.\n\n")
+    parts.append(header(0) + _paragraph(rng, lang, rng.randint(3, 5)) + "\n\n")
+    parts.append(header(1))
+    for n in range(1, blocks_count + 1):
+        bold = kind == "business" or rng.random() < 0.7
+        label = (lambda t: f"**{t}**") if bold else (lambda t: t)
+        bullet = rng.choice(("- ", "* ", ""))
+        lines = [f"## {term} {n}: {_paragraph(rng, lang, 1)[:40]}"]
+        lines.append(f"{bullet}{label(cfg['focus'])}: {_paragraph(rng, lang, rng.randint(1, 2))}")
+        actions = [f"{i}. {rng.choice(SENTENCES[lang])}" if rng.random() < 0.6 else f"- {rng.choice(SENTENCES[lang])}"
+                   for i in range(1, rng.randint(3, 5) + 1)]
+        if rng.random() < 0.2:
+            lines.append(f"{bullet}{label(cfg['actions'])}: {actions[0]}")
+            lines.extend(f"  {a}" for a in actions[1:])
+        else:
+            lines.append(f"{bullet}{label(cfg['actions'])}:")
+            lines.extend(f"  {a}" for a in actions)
+        if rng.random() < 0.05:
+            lines.append(f"  **Note**: {rng.choice(SENTENCES[lang])}")
+        if rng.random() > 0.03:
+            lines.append(f"{bullet}{label(cfg['profit'])}: ₹{rng.randint(1, 99) * 10000:,}")
+        parts.append("\n".join(lines) + "\n" + ("\n" if rng.random() < 0.7 else ""))
+
+    for i in range(2, 6):
+        if rng.random() < 0.04:
+            continue  # the model skipped a section
+        parts.append("\n" + header(i) + _paragraph(rng, lang, rng.randint(2, 6)) + "\n")
+
+    roll = rng.random()
+    if roll < 0.6:
+        parts.append(f"\nDISCLAIMER: {ROADMAP_DISCLAIMER}\n")
+    elif roll < 0.75:
+        parts.append(f"\nअस्वीकरण: {_paragraph(rng, lang, 1)}\n")
+
+    text = "".join(parts)
+    if rng.random() < 0.02:
+        text = text.replace("\n", "\r\n")
+    return {"kind": kind, "language": lang, "text": text}
+
+
+def load_corpus(path, size, seed):
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    rng = random.Random(seed)
+    return [synthetic_document(rng) for _ in range(size)]
+
+
+# --- Benchmark ---
+
+PARSERS = {
+    "business": (legacy_parse_business, ROADMAP_PARSER.parse),
+    "crop": (legacy_parse_crop, CROP_PLAN_PARSER.parse),
+}
+
+
+def run_corpus(corpus, index):
+    for doc in corpus:
+        PARSERS[doc["kind"]][index](doc["text"], "Test", doc.get("language", "EN"))
+
+
+def time_rounds(corpus, index, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run_corpus(corpus, index)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", help="JSONL file of recorded roadmap outputs")
+    parser.add_argument("--size", type=int, default=1000, help="synthetic corpus size")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.size, args.seed)
+    total_chars = sum(len(doc["text"]) for doc in corpus)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        mismatches = []
+        for i, doc in enumerate(corpus):
+            legacy, single_pass = PARSERS[doc["kind"]]
+            expected = legacy(doc["text"], "Test", doc.get("language", "EN"))
+            actual = single_pass(doc["text"], "Test", doc.get("language", "EN"))
+            if expected != actual:
+                mismatches.append((i, expected, actual))
+
+        legacy_times = time_rounds(corpus, 0, args.rounds)
+        single_times = time_rounds(corpus, 1, args.rounds)
+
+    print(f"Corpus: {len(corpus)} documents, {total_chars / 1e6:.2f}M chars")
+    print(f"Equivalence: {len(corpus) - len(mismatches)}/{len(corpus)} identical outputs")
+    for i, expected, actual in mismatches[:3]:
+        diff = {k: (expected.get(k), actual.get(k)) for k in expected if expected.get(k) != actual.get(k)}
+        print(f"  document {i} differs: {json.dumps(diff, ensure_ascii=False)[:400]}")
+
+    legacy_mean, single_mean = statistics.fmean(legacy_times), statistics.fmean(single_times)
+    print(f"\n{'parser':<28}{'corpus':>12}{'per doc':>12}")
+    print(f"{'legacy per-section regex':<28}{legacy_mean * 1e3:>10.1f}ms{legacy_mean / len(corpus) * 1e6:>10.1f}us")
+    print(f"{'single-pass tokenizer':<28}{single_mean * 1e3:>10.1f}ms{single_mean / len(corpus) * 1e6:>10.1f}us")
+    print(f"\nSpeed-up: {legacy_mean / single_mean:.2f}x")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Benchmark: vectorized threshold alerts (services/NotificationService/rules_engine.py).
+
+Uses the synthetic user base of bench_notification_cohorts.py and random
+weather per district, then times the NumPy evaluation of every rule for all
+users at once, building the alert notifications, the same rules applied one
+farmer at a time, and a full NotificationFanout.run_rules() pass over the
+in-memory Firestore stand-in (weather fetch stubbed, alerts written to a
+temporary store).
+
+Usage (from the Backend directory):
+    python benchmarks/bench_rules_engine.py --users 100000
+"""
+
+import argparse
+import asyncio
+import collections
+import contextlib
+import io
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from bench_notification_cohorts import DISTRICTS, CountingEngine, FakeFirestore, synthetic_users
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from services.NotificationService.fanout import NotificationFanout
+    from services.NotificationService.rules_engine import rules_engine
+
+
+def random_weather(rng: random.Random) -> dict:
+    return {
+        "temperature": rng.uniform(12, 38),
+        "humidity": rng.uniform(30, 98),
+        "wind_speed": rng.uniform(0, 50),
+        "daily_max_temp": rng.uniform(24, 45),
+        "daily_min_temp": rng.uniform(8, 26),
+        "rainfall_probability": rng.choice((0, 10, 20, 40, 60, 80, 95)),
+    }
+
+
+class WeatherEngine(CountingEngine):
+    """CountingEngine whose weather service returns the benchmark's weather per location."""
+
+    def __init__(self, weathers: dict, store_path):
+        super().__init__(0, store_path)
+        engine = self
+
+        class _Weather:
+            async def get_weather(self, location):
+                engine.fetches += 1
+                return weathers[location]
+
+        self.weather_service = _Weather()
+
+
+def timed(fn, repeat: int = 5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    users = synthetic_users(args.users, 1.0, args.seed)
+    weathers = {f"{district}, {state}": random_weather(rng) for district, state in DISTRICTS}
+    crop_lists = [data["crops_grown"] for data in users.values()]
+    user_weather = [weathers[f"{data['district']}, {data['state']}"] for data in users.values()]
+
+    crops = rules_engine.crop_matrix(crop_lists)
+    weather = rules_engine.weather_matrix(user_weather)
+    _, evaluate = timed(lambda: rules_engine.evaluate(weather, crops))
+    alerts, batch = timed(lambda: rules_engine.alerts_batch(crop_lists, user_weather), 1)
+
+    sample = min(args.users, 10_000)
+    single, loop = timed(lambda: [rules_engine.alerts({"crops": c}, w) for c, w in zip(crop_lists[:sample], user_weather[:sample])], 1)
+    strip = lambda user_alerts: [(n["id"], n["message"]) for n in user_alerts]
+    assert all(strip(a) == strip(b) for a, b in zip(alerts, single)), "batch and per-user alerts differ"
+
+    print(f"{args.users} users, {len(weathers)} district forecasts")
+    print(f"  evaluate all rules  {evaluate * 1e3:8.1f} ms   (NumPy on encoded matrices, best of 5)")
+    print(f"  alerts_batch()      {batch * 1e3:8.1f} ms   (encode + evaluate + build notifications)")
+    print(f"  one user at a time  {loop / sample * args.users * 1e3:8.1f} ms   (extrapolated from {sample})")
+
+    kinds = collections.Counter(n["id"].split("_")[1] for user_alerts in alerts for n in user_alerts)
+    alerted = sum(1 for user_alerts in alerts if user_alerts)
+    print(f"\n{alerted} users alerted ({alerted / args.users:.0%}), by rule: {dict(kinds.most_common())}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = WeatherEngine(weathers, Path(tmp) / "notifications.sqlite3")
+        fanout = NotificationFanout(engine=engine, db=FakeFirestore(users), page_size=args.page_size,
+                                    checkpoint_path=Path(tmp) / "checkpoint.json",
+                                    snapshot_path=Path(tmp) / "snapshots.json")
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = asyncio.run(fanout.run_rules())
+        elapsed = time.perf_counter() - started
+        print(f"\nrun_rules() over the whole user base: {elapsed:.1f}s, {engine.fetches} weather fetches, "
+              f"{stats['alerts']} alerts stored for {stats['alerted_users']} users")
+
+
+if __name__ == "__main__":
+    main()
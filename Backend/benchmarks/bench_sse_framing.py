@@ -0,0 +1,161 @@
+"""
+Benchmark: SSE framing of chat answers, one frame per token (the old route
+code) vs. the coalescing SSEWriter (services/LLMCore/sse.py).
+
+Sample EN/HI/MR answers are cut into Ollama-sized tokens (3-4 characters) and
+replayed at a fixed generation rate, then framed both ways. Every yielded
+frame is one write + flush on the socket (werkzeug writes and flushes each
+item of a streamed response, uvicorn sends each body message), so frames per
+answer is the send() syscalls per answer. Also reported: bytes on the wire
+per answer, and the extra delay coalescing adds between a token arriving and
+the frame that carries it going out.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_sse_framing.py
+    python benchmarks/bench_sse_framing.py --rates 20,60 --tokens 300 --mode async
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import sys
+import time
+import timeit
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services.LLMCore import sse
+from services.LLMCore.sse import SSEWriter
+
+ANSWERS = {
+    "EN": ("For wheat at the tillering stage, apply 50 kg of urea per acre as a top dressing, "
+           "preferably right after the first irrigation so the nitrogen reaches the roots. "
+           "Watch the lower leaves for yellowing: it usually means the crop is short of nitrogen. "
+           "If you see rust spots, spray propiconazole at 1 ml per litre of water in the evening. "),
+    "HI": ("गेहूं में कल्ले निकलने की अवस्था पर प्रति एकड़ 50 किलो यूरिया टॉप ड्रेसिंग के रूप में डालें, "
+           "बेहतर है कि पहली सिंचाई के तुरंत बाद डालें ताकि नाइट्रोजन जड़ों तक पहुंचे। "
+           "निचली पत्तियों का पीलापन नाइट्रोजन की कमी का संकेत है। "
+           "रतुआ के धब्बे दिखें तो शाम के समय प्रोपिकोनाज़ोल 1 मिली प्रति लीटर पानी में छिड़कें। "),
+    "MR": ("गव्हाला फुटवे येण्याच्या अवस्थेत एकरी 50 किलो युरिया वरखत म्हणून द्या, "
+           "शक्यतो पहिल्या पाण्यानंतर लगेच द्या म्हणजे नत्र मुळांपर्यंत पोहोचेल. "
+           "खालची पाने पिवळी पडणे हे नत्राच्या कमतरतेचे लक्षण आहे. "
+           "तांबेरा दिसल्यास संध्याकाळी प्रोपिकोनाझोल 1 मिली प्रति लिटर पाण्यात फवारा. "),
+}
+TOKEN = re.compile(r"\s?\S{1,4}")
+
+
+def tokens_for(text: str, count: int) -> list:
+    tokens = TOKEN.findall(text)
+    return (tokens * (count // len(tokens) + 1))[:count]
+
+
+def legacy_frame(chunk: str) -> str:
+    # What the three chat routes used to yield for every token
+    return f"data: {json.dumps({'chunk': chunk})}\n\n"
+
+
+def paced(tokens: list, rate: float, arrivals: list):
+    interval = 1.0 / rate
+    start = time.monotonic()
+    for i, token in enumerate(tokens):
+        time.sleep(max(0.0, start + i * interval - time.monotonic()))
+        arrivals.append(time.monotonic())
+        yield token
+
+
+async def apaced(tokens: list, rate: float, arrivals: list):
+    interval = 1.0 / rate
+    start = time.monotonic()
+    for i, token in enumerate(tokens):
+        await asyncio.sleep(max(0.0, start + i * interval - time.monotonic()))
+        arrivals.append(time.monotonic())
+        yield token
+
+
+def delays(arrivals: list, sent: list, tokens: list) -> list:
+    """Seconds each token waited between arriving and the frame carrying it going out."""
+    result, i = [], 0
+    for emitted, text in sent:
+        taken = 0
+        while i < len(tokens) and taken + len(tokens[i]) <= len(text):
+            taken += len(tokens[i])
+            result.append(emitted - arrivals[i])
+            i += 1
+    return result
+
+
+def summary(sent: list) -> dict:
+    return {
+        "frames": len(sent),
+        "bytes": sum(len(data.encode("utf-8")) for _, data in sent),
+        "sent": [(at, json.loads(data[6:])["chunk"]) for at, data in sent if data.startswith("data: ")],
+    }
+
+
+def measure(frames) -> dict:
+    return summary([(time.monotonic(), data) for data in frames])
+
+
+async def ameasure(frames) -> dict:
+    return summary([(time.monotonic(), data) async for data in frames])
+
+
+def run(language: str, rate: float, count: int, mode: str, writer: SSEWriter) -> dict:
+    tokens = tokens_for(ANSWERS[language], count)
+    legacy_arrivals, arrivals = [], []
+    legacy = measure(legacy_frame(token) for token in paced(tokens, rate, legacy_arrivals))
+    if mode == "async":
+        coalesced = asyncio.run(ameasure(writer.astream(apaced(tokens, rate, arrivals))))
+    else:
+        coalesced = measure(writer.stream(paced(tokens, rate, arrivals)))
+    waits = delays(arrivals, coalesced["sent"], tokens)
+    assert "".join(text for _, text in coalesced["sent"]) == "".join(tokens), "coalesced text differs"
+    return {
+        "legacy": legacy,
+        "coalesced": coalesced,
+        "delay_p50_ms": statistics.median(waits) * 1e3,
+        "delay_max_ms": max(waits) * 1e3,
+    }
+
+
+def encoder_cost(rounds: int = 20000) -> dict:
+    """Microseconds to frame one coalesced chunk, stdlib json (old framing) vs. the writer's encoder."""
+    chunk = "".join(tokens_for(ANSWERS["HI"], 8))
+    return {
+        "json": timeit.timeit(lambda: legacy_frame(chunk), number=rounds) / rounds * 1e6,
+        "orjson" if sse.orjson is not None else "json (no orjson)": timeit.timeit(lambda: sse.frame({"chunk": chunk}), number=rounds) / rounds * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rates", default="15,40,100", help="comma-separated generation rates (tokens/s)")
+    parser.add_argument("--tokens", type=int, default=200, help="tokens per answer")
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync",
+                        help="SSEWriter.stream (Flask routes) or SSEWriter.astream (ASGI routes)")
+    parser.add_argument("--coalesce-ms", type=float, default=None, help="override SSE_COALESCE_MS")
+    args = parser.parse_args()
+
+    writer = SSEWriter(interval_ms=args.coalesce_ms, heartbeat=0)
+    print(f"{args.tokens} tokens per answer, SSEWriter.{'astream' if args.mode == 'async' else 'stream'}, "
+          f"coalescing {writer.interval * 1e3:.0f}ms / {writer.max_chars} chars\n")
+    print(f"{'lang':<5}{'tok/s':>6} | {'frames (send calls)':>20} | {'bytes':>17} | {'added delay p50/max':>20}")
+    for rate in (float(r) for r in args.rates.split(",")):
+        for language in ANSWERS:
+            r = run(language, rate, args.tokens, args.mode, writer)
+            legacy, coalesced = r["legacy"], r["coalesced"]
+            print(f"{language:<5}{rate:>6.0f} | {legacy['frames']:>8} -> {coalesced['frames']:<9} | "
+                  f"{legacy['bytes']:>7} -> {coalesced['bytes']:<7} | "
+                  f"{r['delay_p50_ms']:>8.1f} / {r['delay_max_ms']:.1f} ms")
+
+    print("\nFraming cost per 8-token chunk:")
+    for name, micros in encoder_cost().items():
+        print(f"  {name:<18} {micros:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: Firebase ID-token verification with and without middleware/token_cache.py.
+
+Signs ID tokens with a throwaway RSA key and serves its certificate through
+CertificateCache (no network, no Firebase project needed), then times:
+firebase_admin's full verification per request (what require_auth used to do,
+minus the certificate HTTP cache and the debug log appends), the first
+verification of a token through TokenVerifier, a cached repeat, and a cached
+rejection of a bad token.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_token_cache.py --requests 20000
+"""
+
+import argparse
+import datetime
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from firebase_admin import _auth_utils, _token_gen, auth
+from google.auth import crypt, jwt
+
+from middleware.token_cache import CertificateCache, TokenVerifier
+
+PROJECT_ID = "krishisahai-bench"
+
+
+def signing_setup():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "bench")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(1).not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1)).sign(key, hashes.SHA256()))
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption())
+    signer = crypt.RSASigner.from_string(pem, key_id="bench-key")
+    certs = {"bench-key": cert.public_bytes(serialization.Encoding.PEM).decode()}
+    return signer, certs
+
+
+def id_token(signer, uid: str) -> str:
+    now = int(time.time())
+    return jwt.encode(signer, {"iss": f"https://securetoken.google.com/{PROJECT_ID}", "aud": PROJECT_ID,
+                               "sub": uid, "iat": now, "exp": now + 3600, "auth_time": now}).decode()
+
+
+class MemoryCertificates(CertificateCache):
+    """CertificateCache preloaded with the benchmark's certificate instead of Google's."""
+
+    def __init__(self, certs: dict):
+        super().__init__()
+        self._body, self._expires_at = json.dumps(certs).encode(), time.time() + 3600
+        self._refresher = True  # nothing to refresh
+
+
+def firebase_verifier():
+    return _token_gen._JWTVerifier(
+        project_id=PROJECT_ID, short_name='ID token', operation='verify_id_token()',
+        doc_url='https://firebase.google.com/docs/auth/admin/verify-id-tokens',
+        cert_url=_token_gen.ID_TOKEN_CERT_URI, issuer=_token_gen.ID_TOKEN_ISSUER_PREFIX,
+        invalid_token_error=_auth_utils.InvalidIdTokenError, expired_token_error=_token_gen.ExpiredIdTokenError)
+
+
+def timed(fn, items) -> list:
+    timings = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)
+
+
+def report(label: str, timings: list):
+    p99 = timings[int(len(timings) * 0.99)]
+    print(f"  {label:<30} p50 {statistics.median(timings) * 1e6:9.1f} us   p99 {p99 * 1e6:9.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=200, help="distinct tokens in flight")
+    args = parser.parse_args()
+
+    signer, certs = signing_setup()
+    tokens = [id_token(signer, f"user{i}") for i in range(args.users)]
+    requests = [tokens[i % args.users] for i in range(args.requests)]
+    certificates = MemoryCertificates(certs)
+
+    verifier = firebase_verifier()
+    full = timed(lambda token: verifier.verify(token, certificates), requests[:min(2000, args.requests)])
+
+    cache = TokenVerifier(certificates=certificates)
+    cache._jwt_verifier = verifier
+    first = timed(cache.verify, tokens)
+    repeat = timed(cache.verify, requests)
+
+    forged = tokens[0][:-4] + ("AAAA" if not tokens[0].endswith("AAAA") else "BBBB")
+
+    def reject(token):
+        try:
+            cache.verify(token)
+        except auth.InvalidIdTokenError:
+            pass
+    rejected = timed(reject, [forged] * 1000)
+
+    print(f"{args.requests} authenticated requests from {args.users} tokens")
+    report("full verification per request", full)
+    report("TokenVerifier, first sighting", first)
+    report("TokenVerifier, cached token", repeat)
+    report("forged token, cached rejection", rejected)
+    print(f"\n{cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: cost of request tracing (middleware/tracing.py), and what a trace shows.
+
+Times an empty `with tracer.span(name):` block (in-memory exporter), then runs
+--requests synthetic requests shaped like the notification trigger: a
+profile read, weather and news fetched concurrently with asyncio.gather,
+and an LLM call on a thread pool, each sleeping a random latency. One in
+--slow-every requests gets a slow news fetch. The summary lists which child
+span dominated the slowest traces.
+
+Usage (from the Backend directory):
+    python benchmarks/bench_tracing.py --requests 200
+"""
+
+import argparse
+import asyncio
+import contextvars
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from middleware.tracing import InMemorySpanExporter, Tracer, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--slow-every", type=int, default=20, help="every Nth request has a slow news fetch")
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+
+    exporter = InMemorySpanExporter(max_spans=args.calls + args.requests * 10)
+    tracer = Tracer(exporter=exporter)
+    rng = random.Random(1)
+
+    started = time.perf_counter()
+    for _ in range(args.calls):
+        with tracer.span("noop"):
+            pass
+    print(f"span block       {(time.perf_counter() - started) / args.calls * 1e6:6.2f} us per span")
+    exporter.clear()
+
+    async def fetch(name: str, seconds: float):
+        with tracer.span(name):
+            await asyncio.sleep(seconds)
+
+    def llm(seconds: float):
+        with tracer.span("llm notifications", kind="client"):
+            time.sleep(seconds)
+
+    async def gather(slow: bool):
+        await asyncio.gather(fetch("weather.fetch", rng.uniform(0.002, 0.006)),
+                             fetch("news.fetch", 0.08 if slow else rng.uniform(0.002, 0.008)))
+
+    pool = ThreadPoolExecutor(max_workers=4)
+    for i in range(args.requests):
+        with tracer.span("POST /api/notifications/trigger", kind="server"):
+            with tracer.span("firestore.profiles_get_all"):
+                time.sleep(rng.uniform(0.001, 0.003))
+            asyncio.run(gather(slow=i % args.slow_every == 0))
+            pool.submit(contextvars.copy_context().run, llm, rng.uniform(0.01, 0.03)).result()
+    pool.shutdown()
+
+    spans = [span.to_otlp() for span in exporter.spans()]
+    orphans = sum(1 for s in spans if s.get("parentSpanId") is None and s["name"] != "POST /api/notifications/trigger")
+    report = summarize(spans, slowest=args.requests // args.slow_every)
+    print(f"{len(spans)} spans, {orphans} outside a request trace")
+    print(f"{'span':<36} {'count':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, s in sorted(report["spans"].items(), key=lambda item: -item[1]["p99_ms"]):
+        print(f"{name:<36} {s['count']:>6} {s['p50_ms']:>8} {s['p99_ms']:>8}")
+    print(f"dominant child in the {len(report['slowest_traces'])} slowest traces: {report['dominant_children']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+Load test: concurrent chat SSE streams through the ASGI serving mode (asgi_app.py).
+
+A fake Ollama server (POST /api/chat, NDJSON tokens with a fixed inter-token
+delay) runs on a local port and the real engines/chains are pointed at it, so
+each stream goes route -> chain.astream -> ollama AsyncClient -> HTTP, exactly
+as in production, minus the model. N clients open their streams at once; the
+report shows time to first chunk, stream duration, completed streams and the
+peak number of OS threads in the process while they were open.
+
+--abandon makes that fraction of clients hang up after a couple of chunks; the
+fake server counts the generations that were aborted as a result and the
+stream tracker's tokens-saved estimate is reported.
+
+--compare-wsgi repeats the run against the thread-per-request Flask/werkzeug
+server with the synchronous stream_chat_health, for the thread count contrast.
+
+Usage (from the Backend directory):
+    python benchmarks/load_asgi_streams.py --streams 500
+    python benchmarks/load_asgi_streams.py --streams 500 --route health --compare-wsgi
+    python benchmarks/load_asgi_streams.py --streams 200 --abandon 0.5 --compare-wsgi
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+ROUTES = ("advisor", "waste", "health")
+SAMPLE_REPORT = {
+    "crop": "Wheat",
+    "fertilizer_options": [{"name": "Urea", "action": "Top dressing", "quantity": "50 kg/acre",
+                            "timing": "Tillering", "advantages": ["Cheap"]}],
+    "market_advice": "Sell after Holi",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class FakeOllama:
+    """
+    Streams `tokens` chat chunks per request, `delay` seconds apart. GET /stats
+    returns (and resets) peak concurrency, generated tokens and generations
+    aborted because the caller closed the connection.
+    """
+
+    def __init__(self, tokens: int, delay: float):
+        self.tokens = tokens
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = 0
+        self.generated = 0
+        self.aborted = 0
+
+    async def chat(self, request):
+        body = await request.json()
+        self.requests += 1
+
+        async def ndjson():
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            finished = False
+            try:
+                for i in range(self.tokens):
+                    await asyncio.sleep(self.delay)
+                    self.generated += 1
+                    yield json.dumps({"model": body.get("model"), "created_at": "2026-01-01T00:00:00Z",
+                                      "message": {"role": "assistant", "content": f"tok{i} "}, "done": False}) + "\n"
+                yield json.dumps({"model": body.get("model"), "created_at": "2026-01-01T00:00:00Z",
+                                  "message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop",
+                                  "prompt_eval_count": 64, "eval_count": self.tokens}) + "\n"
+                finished = True
+            finally:
+                self.in_flight -= 1
+                # Like Ollama, stop decoding once the connection is gone
+                self.aborted += not finished
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    async def stats(self, request):
+        stats = {"peak": self.peak, "requests": self.requests, "generated": self.generated, "aborted": self.aborted}
+        self.peak = self.generated = self.aborted = 0
+        return JSONResponse(stats)
+
+    def app(self):
+        return Starlette(routes=[Route("/api/chat", self.chat, methods=["POST"]),
+                                 Route("/stats", self.stats, methods=["GET"])])
+
+
+def run_fake_ollama(port: int, tokens: int, delay: float):
+    # Own process, so the fake model does not compete with the server under test for the GIL
+    uvicorn.run(FakeOllama(tokens, delay).app(), host="127.0.0.1", port=port, log_level="warning",
+                lifespan="off", backlog=4096)
+
+
+def start_fake_ollama(tokens: int, delay: float) -> str:
+    port = free_port()
+    process = multiprocessing.get_context("spawn").Process(target=run_fake_ollama, args=(port, tokens, delay), daemon=True)
+    process.start()
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            httpx.get(base_url + "/stats", timeout=1.0)
+            return base_url
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    raise RuntimeError("fake Ollama server did not start")
+
+
+def serve_in_thread(app, port: int, **config):
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                           lifespan="off", backlog=4096, **config))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.02)
+    return server
+
+
+def build_payloads(streams: int, route: str, advisor_sessions: dict, context_ids: dict):
+    from services.BusinessAdvisor.krishi_chatbot import FarmerProfile, KrishiSahAIAdvisor
+
+    payloads = []
+    for i in range(streams):
+        kind = ROUTES[i % len(ROUTES)] if route == "mixed" else route
+        if kind == "advisor":
+            session_id = f"load-{i}"
+            advisor_sessions[session_id] = KrishiSahAIAdvisor(FarmerProfile(
+                name="Load Test", land_size=2.0, capital=50000, market_access="good", skills=["farming"],
+                risk_level="medium", time_availability="full-time"
+            ))
+            payloads.append(("/api/business-advisor/chat/stream", {"session_id": session_id, "message": f"Question {i}?"}))
+        elif kind == "waste":
+            payloads.append(("/api/waste-to-value/chat/stream",
+                             {"context_id": context_ids["waste"], "question": f"Question {i}?", "language": "English"}))
+        else:
+            payloads.append(("/api/farm-health/chat/stream",
+                             {"context_id": context_ids["farm_health"], "question": f"Question {i}?", "language": "English"}))
+    return payloads
+
+
+async def post_sse(port: int, path: str, payload: dict):
+    """
+    Minimal HTTP/1.1 client, one connection per stream: yields (status, data line)
+    for every SSE "data:" line. httpx's async parser burns more CPU than the
+    server under test, and on a small box that would distort the numbers.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer load-test\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii") + body
+    )
+    try:
+        status = int((await reader.readline()).split()[1])
+        chunked = False
+        while (header := await reader.readline()) not in (b"\r\n", b""):
+            chunked = chunked or header.lower().replace(b" ", b"") == b"transfer-encoding:chunked\r\n"
+        buffer = b""
+        while True:
+            if chunked:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    break
+                buffer += (await reader.readexactly(size + 2))[:-2]
+            else:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.startswith(b"data: "):
+                    yield status, line[6:]
+        if status != 200:
+            yield status, None
+    finally:
+        writer.close()
+
+
+async def run_streams(port: int, payloads, last_token: str, abandon: float = 0.0, abandon_after: int = 2):
+    results = []
+    peak_threads = threading.active_count()
+    done = asyncio.Event()
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while not done.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.05)
+
+    async def one(i, path, payload):
+        started = time.perf_counter()
+        first, text, error, chunks = None, "", None, 0
+        # Spread the abandoned streams evenly over the run (and over routes)
+        abandons = int((i + 1) * abandon) > int(i * abandon)
+        stream = post_sse(port, path, payload)
+        try:
+            async for status, data in stream:
+                if status != 200:
+                    error = f"HTTP {status}"
+                    break
+                if first is None:
+                    first = time.perf_counter() - started
+                event = json.loads(data)
+                if "error" in event:
+                    error = event["error"]
+                text += event.get("chunk", "")
+                chunks += 1
+                if abandons and chunks >= abandon_after:
+                    break  # farmer closes the app mid-answer
+        except Exception as e:
+            error = repr(e)
+        finally:
+            await stream.aclose()
+        if error is None and not abandons and last_token not in text:
+            error = f"incomplete stream: {text[-60:]!r}"
+        results.append({"ttfb": first, "total": time.perf_counter() - started, "error": error, "abandoned": abandons})
+
+    sampler = asyncio.create_task(sample_threads())
+    started, cpu_started = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(one(i, path, payload) for i, (path, payload) in enumerate(payloads)))
+    if abandon:
+        await asyncio.sleep(0.5)  # let the server notice the last disconnects
+    wall = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    done.set()
+    await sampler
+    return results, wall, cpu, peak_threads
+
+
+def report(label: str, results, wall: float, cpu: float, peak_threads: int, baseline_threads: int, args, fake: dict,
+           tracked: dict):
+    ok = [r for r in results if r["error"] is None]
+    errors = [r["error"] for r in results if r["error"] is not None]
+    ttfb = sorted(r["ttfb"] for r in ok if r["ttfb"] is not None)
+    totals = sorted(r["total"] for r in ok if not r["abandoned"])
+    abandoned = sum(r["abandoned"] for r in results)
+
+    def pct(values, p):
+        return values[min(len(values) - 1, int(p * len(values)))] * 1e3 if values else float("nan")
+
+    print(f"\n== {label} ==")
+    print(f"Completed streams : {len(ok)}/{len(results)} in {wall:.2f}s wall, {cpu:.2f}s CPU (server + load client)")
+    print(f"First chunk       : p50 {pct(ttfb, 0.5):.0f}ms  p95 {pct(ttfb, 0.95):.0f}ms  max {pct(ttfb, 1.0):.0f}ms")
+    print(f"Stream duration   : p50 {pct(totals, 0.5):.0f}ms  p95 {pct(totals, 0.95):.0f}ms  "
+          f"(ideal {args.tokens * args.delay * 1e3:.0f}ms)")
+    print(f"Fake Ollama       : peak {fake['peak']} concurrent generations, "
+          f"{fake['generated']}/{len(results) * args.tokens} tokens generated")
+    if abandoned:
+        print(f"Abandoned streams : {abandoned} (after {args.abandon_after} chunks), {fake['aborted']} generations aborted, "
+              f"~{tracked['tokens_saved_est']} tokens saved (stream tracker)")
+    print(f"OS threads        : {baseline_threads} before, peak {peak_threads} while streaming")
+    for error in errors[:3]:
+        print(f"  error: {error}")
+    return len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, default=500)
+    parser.add_argument("--route", choices=ROUTES + ("mixed",), default="mixed")
+    parser.add_argument("--tokens", type=int, default=10, help="tokens per fake generation")
+    # A CPU Ollama box decodes a few tokens/s per request: most of a stream's life is waiting
+    parser.add_argument("--delay", type=float, default=1.0, help="seconds between fake tokens")
+    parser.add_argument("--abandon", type=float, default=0.0, help="fraction of clients that disconnect mid-answer")
+    parser.add_argument("--abandon-after", type=int, default=2, help="chunks read before disconnecting")
+    parser.add_argument("--compare-wsgi", action="store_true", help="also run the Flask thread-per-stream baseline")
+    args = parser.parse_args()
+
+    ollama_url = start_fake_ollama(args.tokens, args.delay)
+
+    # Must be set before the engines build their ChatOllama clients
+    os.environ["OLLAMA_BASE_URL"] = ollama_url
+    os.environ["OLLAMA_MAX_CONNECTIONS"] = str(args.streams)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from asgi_app import create_stream_routes
+        from services.FarmHealth.src.health_service import FarmHealthEngine
+        from services.LLMCore.context_store import context_store
+        from services.LLMCore.sse import sse_writer
+        from services.LLMCore.stream_tracker import stream_tracker
+        # Same import path as app.py (waste_service imports its sibling prompts module)
+        sys.path.append(str(BACKEND_DIR / "services" / "WasteToValue" / "src"))
+        from waste_service import WasteToValueEngine
+
+        waste_engine, health_engine = WasteToValueEngine(), FarmHealthEngine()
+        context_ids = {kind: context_store.put(kind, SAMPLE_REPORT) for kind in ("waste", "farm_health")}
+        advisor_sessions = {}
+        payloads = build_payloads(args.streams, args.route, advisor_sessions, context_ids)
+
+    routes = create_stream_routes(advisor_sessions, waste_engine, health_engine, verify=lambda header: {"uid": "load"})
+    stream_port = free_port()
+    baseline_threads = threading.active_count()
+    serve_in_thread(Starlette(routes=routes), stream_port, limit_concurrency=None)
+
+    def measure(label, port, payloads, baseline_threads):
+        httpx.get(ollama_url + "/stats")  # reset the fake server's counters
+        saved_before = stream_tracker.stats()["tokens_saved_est"]
+        with contextlib.redirect_stdout(io.StringIO()):
+            results, wall, cpu, peak = asyncio.run(run_streams(port, payloads, f"tok{args.tokens - 1}",
+                                                               args.abandon, args.abandon_after))
+        tracked = {"tokens_saved_est": stream_tracker.stats()["tokens_saved_est"] - saved_before}
+        return report(label, results, wall, cpu, peak, baseline_threads, args,
+                      httpx.get(ollama_url + "/stats").json(), tracked)
+
+    print(f"{args.streams} concurrent streams ({args.route}), {args.tokens} tokens x {args.delay * 1e3:.0f}ms each")
+    failures = measure("ASGI (async generators over astream)", stream_port, payloads, baseline_threads)
+
+    if args.compare_wsgi:
+        from flask import Flask, Response, request
+        from werkzeug.serving import make_server
+
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        flask_app = Flask("load_wsgi")
+
+        @flask_app.route('/api/farm-health/chat/stream', methods=['POST'])
+        def chat_health_stream():
+            data = request.json
+
+            def generate():
+                chunks = health_engine.stream_chat_health(data.get('context'), data.get('question'),
+                                                          data.get('language', 'English'), context_id=data.get('context_id'))
+                yield from sse_writer.stream(stream_tracker.track('farm_health.chat', chunks,
+                                                                  num_predict=health_engine.chat_llm.num_predict))
+            return Response(generate(), mimetype='text/event-stream')
+
+        wsgi_port = free_port()
+        server = make_server("127.0.0.1", wsgi_port, flask_app, threaded=True)
+        server.socket.listen(4096)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        wsgi_payloads = [("/api/farm-health/chat/stream", {"context_id": context_ids["farm_health"],
+                                                             "question": f"Question {i}?", "language": "English"})
+                         for i in range(args.streams)]
+        measure("WSGI baseline (werkzeug thread per stream, health route)", wsgi_port, wsgi_payloads,
+                threading.active_count())
+        server.shutdown()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
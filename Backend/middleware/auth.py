@@ -3,6 +3,7 @@ import firebase_admin
 from firebase_admin import credentials, auth
 from functools import wraps
 from flask import request, jsonify
+from middleware.token_cache import token_verifier
 
 def init_firebase():
     """Initialize Firebase Admin SDK"""
@@ -24,45 +25,42 @@ def init_firebase():
     except Exception as e:
         print(f"[WARNING] Firebase Admin initialization failed: {e}")
 
+class AuthError(Exception):
+    """Raised by verify_request_token; the message is safe to return to the client."""
+
+
+def auth_bypassed() -> bool:
+    return os.getenv("FLASK_ENV") == "development" and os.getenv("DISABLE_AUTH") == "true"
+
+
+def verify_request_token(auth_header):
+    """Decoded Firebase ID token for an 'Authorization: Bearer ...' header (shared by Flask and ASGI routes)"""
+    # Development Bypass
+    if auth_bypassed():
+        return {"uid": "dev_user", "email": "dev@krishi.ai"}
+
+    if not auth_header or not auth_header.startswith('Bearer '):
+        raise AuthError('Missing or invalid authorization header')
+
+    token = auth_header.split(' ')[1]
+    try:
+        # Verified once per token, then served from cache until it expires
+        return token_verifier.verify(token)
+    except Exception as e:
+        print(f"[AUTH] Token verification failed: {e}")
+        raise AuthError('Invalid or expired token')
+
 def require_auth(f):
     """Decorator to require Firebase ID Token authentication"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        try:
-            with open("app_debug.log", "a") as logf:
-                logf.write(f"[AUTH] Checking auth for {request.url}\n")
-        except:
-            pass
-
         if request.method == 'OPTIONS':
             return jsonify({'status': 'ok'}), 200
 
-        auth_header = request.headers.get('Authorization')
-        
-        # Development Bypass
-        if os.getenv("FLASK_ENV") == "development" and os.getenv("DISABLE_AUTH") == "true":
-             request.user = {"uid": "dev_user", "email": "dev@krishi.ai"}
-             return f(*args, **kwargs)
-
-        if not auth_header or not auth_header.startswith('Bearer '):
-            try:
-                with open("app_debug.log", "a") as logf:
-                    logf.write(f"[AUTH] Missing header: {auth_header}\n")
-            except: pass
-            return jsonify({'error': 'Missing or invalid authorization header'}), 401
-
-        token = auth_header.split(' ')[1]
         try:
-            # Verify the token
-            decoded_token = auth.verify_id_token(token)
-            request.user = decoded_token
-        except Exception as e:
-            print(f"[AUTH] Token verification failed: {e}")
-            try:
-                with open("app_debug.log", "a") as logf:
-                    logf.write(f"[AUTH] Verification failed: {e}\n")
-            except: pass
-            return jsonify({'error': 'Invalid or expired token'}), 401
+            request.user = verify_request_token(request.headers.get('Authorization'))
+        except AuthError as e:
+            return jsonify({'error': str(e)}), 401
             
         return f(*args, **kwargs)
     return decorated_function
@@ -0,0 +1,193 @@
+"""
+Per-stage latency metrics, served at /metrics in Prometheus text format.
+
+StageTimer follows the Profile timer of the bundled YOLOv5
+(services/PestDetector/yolov5_custom/utils/general.py): a ContextDecorator,
+usable as `with metrics.timer("stage"):` or `@metrics.timer("stage")`, that
+accumulates `t` and keeps the last duration in `dt` (and can synchronize CUDA
+first, like Profile). On exit it also records the duration in the stage's
+histogram. general.py itself isn't imported: it pulls in torch, cv2 and
+pandas at import time. Unlike Profile, the start time and span of each entry
+live on a per-context stack, not on the timer, so one decorated function can
+run in several threads or tasks at once.
+
+Each stage keeps cumulative Prometheus buckets plus a ring of its last
+METRICS_WINDOW samples, from which p50/p95/p99 are computed at scrape time.
+Stage names are dotted (pest.inference, firestore.profiles_get_all,
+llm.notifications.ttft); HTTP requests are recorded per route as
+"http GET /api/pest/detect".
+
+Every timed stage is also a tracing span (middleware/tracing.py), a child of
+whatever span is current, so stage timings show up in request traces.
+"""
+
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+
+from middleware.tracing import tracer
+
+# Upper bounds in seconds: 1 ms up to the slow LLM generations
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_NAME = "krishisahai_stage_duration_seconds"
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS, window: int = 2048):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantiles(self, quantiles=QUANTILES) -> dict:
+        samples = sorted(self.recent)
+        if not samples:
+            return {}
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in quantiles}
+
+
+# (timer, start, span, span token) of every StageTimer entered in this thread or task, innermost last
+_entries = contextvars.ContextVar("krishisahai_stage_timers", default=())
+
+
+class StageTimer(contextlib.ContextDecorator):
+    """Profile-style timer (t accumulates, dt is the last run) that reports each run to a registry."""
+
+    def __init__(self, registry, stage: str, t: float = 0.0, cuda: bool = False):
+        self.registry = registry
+        self.stage = stage
+        self.t = t
+        self.cuda = cuda
+
+    def __enter__(self):
+        span = tracer.start_span(self.stage)
+        token = tracer.activate(span)
+        _entries.set(_entries.get() + ((self, self.time(), span, token),))
+        return self
+
+    def __exit__(self, type, value, traceback):
+        entries = _entries.get()
+        i = max(i for i, entry in enumerate(entries) if entry[0] is self)
+        _, start, span, token = entries[i]
+        _entries.set(entries[:i] + entries[i + 1:])
+        self.dt = self.time() - start  # delta-time
+        self.t += self.dt  # accumulate dt
+        self.registry.observe(self.stage, self.dt)
+        tracer.deactivate(token)
+        tracer.end_span(span, value)
+
+    def time(self):
+        if self.cuda:
+            import torch
+            torch.cuda.synchronize()
+        return time.perf_counter()
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS, window: int = None):
+        self.buckets = buckets
+        self.window = window or int(os.getenv("METRICS_WINDOW", "2048"))
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(self.buckets, self.window)
+            histogram.observe(seconds)
+
+    def timer(self, stage: str, cuda: bool = False) -> StageTimer:
+        return StageTimer(self, stage, cuda=cuda)
+
+    async def track(self, stage: str, awaitable):
+        """Await `awaitable` and record how long it took (for coroutines passed to asyncio.gather)."""
+        with self.timer(stage):
+            return await awaitable
+
+    def init_app(self, app):
+        """Time every Flask request per route (the rule, not the URL, so ids don't explode the label set)."""
+        from flask import g, request
+
+        @app.before_request
+        def _start_request_timer():
+            g._metrics_started = time.perf_counter()
+
+        @app.after_request
+        def _time_streamed_response(response):
+            # A streamed (SSE) response is iterated after teardown; time it until it closes
+            started = g.get("_metrics_started")
+            if started is not None and response.is_streamed and not response.direct_passthrough:
+                stage = self._request_stage(request)
+                response.call_on_close(lambda: self.observe(stage, time.perf_counter() - started))
+                g.pop("_metrics_started")
+            return response
+
+        @app.teardown_request
+        def _record_request_time(exc=None):
+            started = g.pop("_metrics_started", None)
+            if started is not None:
+                self.observe(self._request_stage(request), time.perf_counter() - started)
+
+    @staticmethod
+    def _request_stage(request) -> str:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        return f"http {request.method} {route}"
+
+    def render(self) -> str:
+        """All stages in Prometheus text exposition format."""
+        with self._lock:
+            stages = {stage: (list(h.counts), h.count, h.sum, h.quantiles()) for stage, h in self._stages.items()}
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent per request stage.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for stage, (counts, count, total, _) in sorted(stages.items()):
+            label = _label(stage)
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{label}",le="+Inf"}} {count}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{label}"}} {total:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{label}"}} {count}')
+
+        lines += [
+            f"# HELP {METRIC_NAME}_recent Quantiles over each stage's last {self.window} samples.",
+            f"# TYPE {METRIC_NAME}_recent gauge",
+        ]
+        for stage, (_, _, _, quantiles) in sorted(stages.items()):
+            for q, value in quantiles.items():
+                lines.append(f'{METRIC_NAME}_recent{{stage="{_label(stage)}",quantile="{q}"}} {value:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def stats(self) -> dict:
+        """JSON view: per stage count, mean and recent p50/p95/p99 in milliseconds."""
+        with self._lock:
+            return {
+                stage: dict(count=h.count, mean_ms=round(h.sum / h.count * 1e3, 2),
+                            **{f"p{int(q * 100)}_ms": round(v * 1e3, 2) for q, v in h.quantiles().items()})
+                for stage, h in sorted(self._stages.items())
+            }
+
+
+# Singleton Instance
+metrics = MetricsRegistry()
@@ -0,0 +1,154 @@
+"""
+Central logging: JSON lines written off the request path.
+
+Routes and services used to open app_debug.log (one even a hardcoded d:/
+path), append a line and close it again, inline on every request. Now they
+log through get_logger(name), which returns the "krishisahai.<name>" logger:
+
+- the handler only puts the record on a queue; a QueueListener thread does
+  the formatting and the file I/O
+- each record is one JSON object per line: ts, level, logger, msg, any
+  `extra={...}` fields, and the traceback (exc) for log.exception()
+- the file (LOG_FILE, default logs/app.jsonl) rotates at LOG_MAX_BYTES and
+  keeps LOG_BACKUP_COUNT old files
+- LOG_LEVEL sets the default level and LOG_LEVELS overrides it per module,
+  e.g. LOG_LEVELS="notifications=DEBUG,http=WARNING"
+- LOG_CONSOLE (default on in development) echoes records to stderr too
+- records logged inside a traced request carry its trace_id and span_id
+  (middleware/tracing.py), so log lines and spans can be joined
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from middleware.tracing import current_span
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_LOG_FILE = BASE_DIR / 'logs' / 'app.jsonl'
+ROOT_LOGGER = "krishisahai"
+
+# Attributes every LogRecord has; anything else on a record came in through `extra`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_setup_lock = threading.Lock()
+_listener = None
+_traceback_formatter = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Merges args and renders the traceback before queueing (so the record holds
+    no live objects), but leaves the JSON formatting to the listener thread.
+    The "krishisahai" logger doesn't propagate and this is its only handler,
+    so the record is finished in place instead of copied, and no handler lock
+    is taken: SimpleQueue.put is already thread-safe.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        span = current_span()
+        if span is not None:
+            record.trace_id, record.span_id = span.trace_id, span.span_id
+        return record
+
+    def handle(self, record: logging.LogRecord):
+        if self.filter(record):
+            self.emit(record)
+            return True
+        return False
+
+
+def _parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in (spec or "").split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(log_file=None, max_bytes: int = None, backup_count: int = None,
+                  level: str = None, module_levels: dict = None, console: bool = None):
+    """Attach the queue handler and start the writer thread (once; later calls are no-ops)."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        path = Path(log_file or os.getenv("LOG_FILE", DEFAULT_LOG_FILE))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handlers = [logging.handlers.RotatingFileHandler(
+            path, encoding="utf-8",
+            maxBytes=max_bytes or int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            backupCount=backup_count if backup_count is not None else int(os.getenv("LOG_BACKUP_COUNT", "5")))]
+        if console is None:
+            console = os.getenv("LOG_CONSOLE", "true" if os.getenv("FLASK_ENV") == "development" else "false").lower() == "true"
+        if console:
+            handlers.append(logging.StreamHandler())
+        formatter = JsonFormatter()
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        records = queue.SimpleQueue()
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(level or os.getenv("LOG_LEVEL", "INFO").upper())
+        root.propagate = False
+        root.addHandler(_QueueHandler(records))
+        levels = module_levels if module_levels is not None else _parse_levels(os.getenv("LOG_LEVELS", ""))
+        for name, module_level in levels.items():
+            logging.getLogger(f"{ROOT_LOGGER}.{name}").setLevel(module_level)
+
+        _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+def shutdown_logging():
+    """Flush the queue and stop the writer thread."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+            root = logging.getLogger(ROOT_LOGGER)
+            for handler in list(root.handlers):
+                if isinstance(handler, _QueueHandler):
+                    root.removeHandler(handler)
+
+
+def get_logger(name: str) -> logging.Logger:
+    setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
@@ -0,0 +1,207 @@
+"""
+Cached Firebase ID-token verification.
+
+auth.verify_id_token() re-checks the RSA signature on every request and goes
+through an HTTP cache (CacheControl) to find Google's signing certificates,
+which blocks a request whenever those expire. The frontend reuses an ID token
+for up to an hour, so TokenVerifier:
+
+- keeps the claims of every token it verified, keyed by the token's SHA-256,
+  until the token's own `exp`: a repeat request is a dict lookup, no crypto
+- remembers rejected tokens for AUTH_FAILURE_CACHE_SECONDS, so a client
+  retrying a bad token doesn't cost a signature check each time
+- holds the signing certificates in memory (CertificateCache) and refreshes
+  them in a background thread before their Cache-Control max-age runs out
+
+The first sighting of a token is still checked by firebase_admin's own
+verifier (signature, aud, iss, sub, exp), only fed certificates from memory.
+That verifier is private API, so it is only used on the firebase_admin major
+versions listed in VERIFIED_FIREBASE_ADMIN_MAJORS; on any other version, or if
+it isn't reachable, verification falls back to auth.verify_id_token().
+Certificate fetch failures reach the verifier as google.auth TransportErrors,
+which it reports as CertificateFetchError, so they never get a valid token
+cached as rejected.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import firebase_admin
+from firebase_admin import auth
+from google.auth.exceptions import TransportError
+
+ID_TOKEN_CERT_URI = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+# Majors whose auth._get_client(None)._token_verifier.id_token_verifier.verify(token, request) was checked
+VERIFIED_FIREBASE_ADMIN_MAJORS = (7,)
+
+
+class CertificateCache:
+    """
+    Google's ID-token signing certificates, kept in memory. Callable as a
+    google.auth transport request: the certificate URL is answered from
+    memory, anything else is passed through to a real request.
+    """
+
+    def __init__(self, url: str = ID_TOKEN_CERT_URI, timeout: float = 10):
+        self.url = url
+        self.timeout = timeout
+        self._body = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._transport = None
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    def _fetch(self):
+        import requests
+        response = requests.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        certificates = json.loads(response.content)
+        if not isinstance(certificates, dict) or not certificates:
+            raise ValueError("Certificate response holds no certificates")  # don't cache a garbled body
+        match = _MAX_AGE_RE.search(response.headers.get('Cache-Control', ''))
+        max_age = int(match.group(1)) if match else 3600
+        self._body, self._expires_at = response.content, time.time() + max_age
+        self.fetches += 1
+        return max_age
+
+    def _refresh_loop(self):
+        while True:
+            # Refresh once 80% of the max-age is used up; retry failures every minute
+            wait = max(60.0, (self._expires_at - time.time()) * 0.8)
+            time.sleep(wait)
+            try:
+                with self._lock:
+                    self._fetch()
+            except Exception as e:
+                self.fetch_errors += 1
+                print(f"[AUTH] Certificate refresh failed (keeping cached copy): {e}")
+
+    def body(self) -> bytes:
+        if self._body is None or time.time() >= self._expires_at:
+            with self._lock:
+                if self._body is None or time.time() >= self._expires_at:
+                    self._fetch()
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_loop, name="auth-cert-refresh", daemon=True)
+                self._refresher.start()
+        return self._body
+
+    def __call__(self, url, method='GET', body=None, headers=None, timeout=None, **kwargs):
+        if url == self.url and method == 'GET':
+            try:
+                return SimpleNamespace(status=200, data=self.body(), headers={})
+            except Exception as e:
+                # google.auth callers treat TransportError as "couldn't fetch", not as a bad token
+                self.fetch_errors += 1
+                raise TransportError(f"Could not fetch ID token certificates: {e}") from e
+        if self._transport is None:
+            from google.auth.transport.requests import Request
+            self._transport = Request()
+        return self._transport(url, method=method, body=body, headers=headers, timeout=timeout, **kwargs)
+
+    def stats(self) -> dict:
+        return {"fetches": self.fetches, "fetch_errors": self.fetch_errors,
+                "expires_in": round(self._expires_at - time.time()) if self._body else None}
+
+
+def _private_api_supported() -> bool:
+    version = getattr(firebase_admin, "__version__", "")
+    major = version.split(".")[0]
+    if major.isdigit() and int(major) in VERIFIED_FIREBASE_ADMIN_MAJORS:
+        return True
+    print(f"[AUTH] firebase_admin {version or '?'} not verified with the cached certificate path; "
+          f"using auth.verify_id_token()")
+    return False
+
+
+class TokenVerifier:
+    def __init__(self, max_entries: int = None, failure_ttl: float = None, certificates: CertificateCache = None):
+        self.max_entries = max_entries or int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+        self.failure_ttl = float(failure_ttl if failure_ttl is not None else os.getenv("AUTH_FAILURE_CACHE_SECONDS", "30"))
+        self.certificates = certificates or CertificateCache()
+        self._verified = OrderedDict()  # sha256 -> (claims, exp)
+        self._rejected = OrderedDict()  # sha256 -> (message, until)
+        self._lock = threading.Lock()
+        self._jwt_verifier = None
+        self._private_api_ok = _private_api_supported()
+        self.counters = {"hits": 0, "verified": 0, "rejected": 0, "rejected_cached": 0, "fallbacks": 0}
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def _firebase_verifier(self):
+        """firebase_admin's own ID-token checks, which accept the transport to fetch certificates with."""
+        if self._jwt_verifier is None:
+            client = auth._get_client(None)
+            verifier = client._token_verifier.id_token_verifier
+            if not callable(getattr(verifier, "verify", None)):
+                raise AttributeError("id_token_verifier has no verify()")
+            self._jwt_verifier = verifier
+        return self._jwt_verifier
+
+    def _verify_signature(self, token: str) -> dict:
+        verifier = None
+        if self._private_api_ok:
+            try:
+                verifier = self._firebase_verifier()
+            except Exception:
+                pass
+        if verifier is None:
+            self.counters["fallbacks"] += 1
+            return auth.verify_id_token(token)
+        return verifier.verify(token, self.certificates)
+
+    def verify(self, token: str) -> dict:
+        """Decoded claims of a valid ID token (a copy); raises like auth.verify_id_token() otherwise."""
+        key, now = self._key(token), time.time()
+        with self._lock:
+            entry = self._verified.get(key)
+            if entry is not None:
+                if now < entry[1]:
+                    self._verified.move_to_end(key)
+                    self.counters["hits"] += 1
+                    return dict(entry[0])
+                del self._verified[key]
+            rejected = self._rejected.get(key)
+            if rejected is not None:
+                if now < rejected[1]:
+                    self.counters["rejected_cached"] += 1
+                    raise auth.InvalidIdTokenError(rejected[0])
+                del self._rejected[key]
+
+        try:
+            claims = self._verify_signature(token)
+        except auth.InvalidIdTokenError as e:
+            # Only the token's own faults are remembered, not certificate fetch failures
+            with self._lock:
+                self.counters["rejected"] += 1
+                self._rejected[key] = (str(e), now + self.failure_ttl)
+                while len(self._rejected) > self.max_entries:
+                    self._rejected.popitem(last=False)
+            raise
+
+        with self._lock:
+            self.counters["verified"] += 1
+            self._verified[key] = (claims, float(claims.get("exp", now)))
+            while len(self._verified) > self.max_entries:
+                self._verified.popitem(last=False)
+        return dict(claims)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters, cached_tokens=len(self._verified), rejected_tokens=len(self._rejected),
+                        certificates=self.certificates.stats())
+
+
+# Singleton Instance
+token_verifier = TokenVerifier()
@@ -0,0 +1,458 @@
+"""
+Request tracing: one trace id per request, spans for everything it touches.
+
+The current span lives in a contextvars.ContextVar, so it follows the work
+without being passed around:
+
+- Flask requests (init_app): a server span per request, continuing the
+  caller's W3C `traceparent` header if there is one; the trace id goes back in
+  the X-Trace-Id response header. Streamed (SSE) responses are iterated after
+  the request is torn down, so their generator runs through iter_in_span: the
+  request span is current while each chunk is produced and ends when the
+  stream does. The ASGI chat streams (asgi_app.py) do the same with
+  aiter_in_span
+- asyncio: tasks copy the context when created, so coroutines passed to
+  asyncio.gather (weather, news) become children of the span that gathered
+- thread pools: submit through contextvars.copy_context().run (as the SSE
+  pump already does) and the worker continues the submitting request's trace
+- LangChain: prefill_tracker.callbacks(site), which every LLM call site
+  passes, includes a handler that opens an "llm <site>" span per model call
+  under the span that was current when the callbacks were built, with the time
+  to first token and Ollama's token counts as attributes
+- every metrics.timer() stage (Firestore reads, detector stages, ...) is a span
+
+Finished spans go to an exporter (TRACE_EXPORTER): "file" appends OTLP/JSON
+lines (one ExportTraceServiceRequest per span, the format of the
+OpenTelemetry collector's file exporter) to TRACE_FILE from a background
+thread, "memory" keeps the last spans in a deque, "none" drops them.
+TRACE_SAMPLE_RATE decides per trace whether it is exported; ids are
+propagated either way. It defaults to 1.0 with FLASK_ENV=development and to
+PRODUCTION_SAMPLE_RATE otherwise: an exported span costs a record on the
+writer queue and a line on disk, which roughly doubles the price of a
+metrics.timer block (benchmarks/bench_metrics.py).
+
+`python -m middleware.tracing logs/traces.jsonl` summarizes a trace file:
+latency per span name and, for the slowest traces, which child span took
+most of the time.
+"""
+
+import argparse
+import atexit
+import collections
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_TRACE_FILE = BASE_DIR / 'logs' / 'traces.jsonl'
+SERVICE_NAME = "krishisahai-backend"
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+# Share of traces exported when TRACE_SAMPLE_RATE is unset outside development
+PRODUCTION_SAMPLE_RATE = "0.05"
+# OTLP span kinds
+KINDS = {"internal": 1, "server": 2, "client": 3}
+
+_current_span = contextvars.ContextVar("krishisahai_span", default=None)
+
+
+def current_span():
+    return _current_span.get()
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "error", "sampled")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str = None, kind: str = "internal",
+                 attributes: dict = None, sampled: bool = True):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64) or 1:016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.sampled = sampled
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def _export_request(spans: list) -> dict:
+    return {"resourceSpans": [{
+        "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+        "scopeSpans": [{"scope": {"name": "krishisahai.tracing"}, "spans": [s.to_otlp() for s in spans]}],
+    }]}
+
+
+# --- Exporters ---
+
+class InMemorySpanExporter:
+    def __init__(self, max_spans: int = 10000):
+        self._spans = collections.deque(maxlen=max_spans)
+        self.exported = 0
+
+    def export(self, span: Span):
+        self._spans.append(span)
+        self.exported += 1
+
+    def spans(self) -> list:
+        return list(self._spans)
+
+    def clear(self):
+        self._spans.clear()
+
+    def shutdown(self):
+        pass
+
+
+class _OtlpLineFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(_export_request([record.msg]), ensure_ascii=False, default=str)
+
+
+class JsonlSpanExporter:
+    """OTLP/JSON lines written by a background thread; rotates at max_bytes."""
+
+    def __init__(self, path=None, max_bytes: int = None, backup_count: int = 3):
+        self.path = Path(path or os.getenv("TRACE_FILE", DEFAULT_TRACE_FILE))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            self.path, encoding="utf-8", backupCount=backup_count,
+            maxBytes=max_bytes or int(os.getenv("TRACE_MAX_BYTES", str(20 * 1024 * 1024))))
+        handler.setFormatter(_OtlpLineFormatter())
+        self._queue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(self._queue, handler)
+        self._listener.start()
+        atexit.register(self.shutdown)
+        self.exported = 0
+
+    def export(self, span: Span):
+        # Formatted on the writer thread; the span is finished and no longer mutated
+        self._queue.put(logging.makeLogRecord({"msg": span, "levelno": logging.INFO, "levelname": "INFO"}))
+        self.exported += 1
+
+    def shutdown(self):
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+
+
+def _default_exporter():
+    kind = os.getenv("TRACE_EXPORTER", "file").lower()
+    if kind == "memory":
+        return InMemorySpanExporter()
+    if kind == "file":
+        try:
+            return JsonlSpanExporter()
+        except Exception as e:
+            print(f"[TRACING] File exporter unavailable, keeping spans in memory: {e}")
+            return InMemorySpanExporter()
+    return None
+
+
+def iter_in_span(iterable, span: Span, on_end):
+    """Iterate `iterable` with `span` current while each item is produced; on_end(error) runs once it ends or is closed."""
+    iterator = iter(iterable)
+    error = None
+    try:
+        while True:
+            token = _current_span.set(span)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _current_span.reset(token)
+            yield item
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):
+            error = e
+        raise
+    finally:
+        try:
+            if hasattr(iterator, "close"):
+                iterator.close()
+        finally:
+            on_end(error)
+
+
+async def aiter_in_span(iterable, span: Span, on_end):
+    """Async version of iter_in_span, for async generators streamed by Starlette."""
+    iterator = iterable.__aiter__()
+    error = None
+    try:
+        while True:
+            token = _current_span.set(span)
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                _current_span.reset(token)
+            yield item
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):
+            error = e
+        raise
+    finally:
+        try:
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+        finally:
+            on_end(error)
+
+
+# --- Tracer ---
+
+class Tracer:
+    def __init__(self, exporter=None, sample_rate: float = None):
+        self.exporter = exporter if exporter is not None else _default_exporter()
+        if sample_rate is None:
+            default = "1.0" if os.getenv("FLASK_ENV") == "development" else PRODUCTION_SAMPLE_RATE
+            sample_rate = os.getenv("TRACE_SAMPLE_RATE", default)
+        self.sample_rate = float(sample_rate)
+        self._lock = threading.Lock()
+        self.counters = {"traces": 0, "spans": 0, "errors": 0, "continued": 0}
+
+    def start_span(self, name: str, parent: Span = None, kind: str = "internal", attributes: dict = None,
+                   trace_id: str = None, parent_id: str = None, sampled: bool = None) -> Span:
+        """A started span under `parent` (default: the current span), or the root of a new trace."""
+        parent = parent if parent is not None else _current_span.get()
+        if parent is not None:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        elif trace_id is None:
+            trace_id = f"{random.getrandbits(128) or 1:032x}"
+            with self._lock:
+                self.counters["traces"] += 1
+        if sampled is None:
+            sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        return Span(name, trace_id, parent_id, kind, attributes, sampled)
+
+    def end_span(self, span: Span, error: BaseException = None):
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        with self._lock:
+            self.counters["spans"] += 1
+            if span.error:
+                self.counters["errors"] += 1
+        if span.sampled and self.exporter is not None:
+            self.exporter.export(span)
+
+    @staticmethod
+    def activate(span: Span):
+        """Make `span` current; returns the token for deactivate()."""
+        return _current_span.set(span)
+
+    @staticmethod
+    def deactivate(token):
+        _current_span.reset(token)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes):
+        span = self.start_span(name, kind=kind, attributes=attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    # --- W3C trace context ---
+
+    @staticmethod
+    def traceparent(span: Span = None) -> str:
+        span = span or _current_span.get()
+        if span is None:
+            return None
+        return f"00-{span.trace_id}-{span.span_id}-{'01' if span.sampled else '00'}"
+
+    def inject(self, headers: dict = None) -> dict:
+        """`headers` plus the current traceparent, for calls to services that understand it."""
+        headers = dict(headers or {})
+        value = self.traceparent()
+        if value:
+            headers["traceparent"] = value
+        return headers
+
+    @staticmethod
+    def parse_traceparent(value: str):
+        """(trace_id, parent span id, sampled) from a traceparent header, or None if malformed."""
+        match = _TRACEPARENT_RE.match((value or "").strip().lower())
+        if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+            return None
+        return match.group(1), match.group(2), int(match.group(3), 16) & 1 == 1
+
+    # --- Integrations ---
+
+    def start_server_span(self, method: str, target: str, traceparent: str = None) -> Span:
+        """The span of an incoming HTTP request, continuing the caller's trace if `traceparent` is valid."""
+        incoming = self.parse_traceparent(traceparent)
+        trace_id, parent_id, sampled = incoming or (None, None, None)
+        if incoming:
+            with self._lock:
+                self.counters["continued"] += 1
+        return self.start_span(f"{method} {target}", kind="server", trace_id=trace_id,
+                               parent_id=parent_id, sampled=sampled,
+                               attributes={"http.method": method, "http.target": target})
+
+    def init_app(self, app):
+        """A server span around every Flask request, continuing an incoming traceparent."""
+        from flask import g, request
+
+        @app.before_request
+        def _start_request_span():
+            span = self.start_server_span(request.method, request.path, request.headers.get("traceparent"))
+            g._trace_span, g._trace_token = span, _current_span.set(span)
+
+        @app.after_request
+        def _tag_response(response):
+            span = g.get("_trace_span")
+            if span is not None:
+                if request.url_rule is not None:
+                    span.name = f"{request.method} {request.url_rule.rule}"
+                    span.set_attribute("http.route", request.url_rule.rule)
+                span.set_attribute("http.status_code", response.status_code)
+                response.headers["X-Trace-Id"] = span.trace_id
+                if response.is_streamed and not response.direct_passthrough:
+                    # Teardown runs before the stream is iterated; the span ends with the stream instead
+                    response.response = iter_in_span(response.response, span,
+                                                     lambda error: self.end_span(span, error))
+                    g._trace_streamed = True
+            return response
+
+        @app.teardown_request
+        def _end_request_span(exc=None):
+            span, token = g.pop("_trace_span", None), g.pop("_trace_token", None)
+            if span is None:
+                return
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                _current_span.set(None)  # torn down in a different context than it started in
+            if not g.pop("_trace_streamed", False):
+                self.end_span(span, exc)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters, sample_rate=self.sample_rate,
+                        exporter=type(self.exporter).__name__ if self.exporter else None,
+                        exported=getattr(self.exporter, "exported", 0))
+
+
+# Singleton Instance
+tracer = Tracer()
+
+
+# --- Trace file analysis ---
+
+def load_spans(path) -> list:
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            for resource in json.loads(line).get("resourceSpans", []):
+                for scope in resource.get("scopeSpans", []):
+                    spans.extend(scope.get("spans", []))
+    return spans
+
+
+def summarize(spans: list, slowest: int = 10) -> dict:
+    """Latency per span name, and for the slowest traces the child span that took the longest."""
+    def ms(span):
+        return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+
+    by_name = collections.defaultdict(list)
+    children = collections.defaultdict(list)
+    roots = []
+    for span in spans:
+        by_name[span["name"]].append(ms(span))
+        if span.get("parentSpanId"):
+            children[span["parentSpanId"]].append(span)
+        else:
+            roots.append(span)
+
+    names = {}
+    for name, durations in by_name.items():
+        durations.sort()
+        names[name] = {"count": len(durations), "p50_ms": round(durations[len(durations) // 2], 2),
+                       "p99_ms": round(durations[min(len(durations) - 1, int(len(durations) * 0.99))], 2)}
+
+    dominant = collections.Counter()
+    slow = []
+    for root in sorted(roots, key=ms, reverse=True)[:slowest]:
+        kids = children.get(root["spanId"], [])
+        top = max(kids, key=ms) if kids else None
+        if top is not None:
+            dominant[top["name"]] += 1
+        slow.append({"trace": root["traceId"], "name": root["name"], "ms": round(ms(root), 2),
+                     "dominant_child": top["name"] if top else None,
+                     "dominant_ms": round(ms(top), 2) if top else None})
+    return {"spans": names, "slowest_traces": slow, "dominant_children": dict(dominant.most_common())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize an OTLP/JSON lines trace file.")
+    parser.add_argument("file", nargs="?", default=str(DEFAULT_TRACE_FILE))
+    parser.add_argument("--slowest", type=int, default=10)
+    args = parser.parse_args()
+
+    report = summarize(load_spans(args.file), args.slowest)
+    print(f"{'span':<48} {'count':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, s in sorted(report["spans"].items(), key=lambda item: -item[1]["p99_ms"]):
+        print(f"{name[:48]:<48} {s['count']:>7} {s['p50_ms']:>9} {s['p99_ms']:>9}")
+    print(f"\nSlowest {len(report['slowest_traces'])} traces:")
+    for t in report["slowest_traces"]:
+        print(f"  {t['trace']} {t['name']}: {t['ms']} ms, dominated by {t['dominant_child']} ({t['dominant_ms']} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,500 @@
+"""
+Deterministic pre-ranker for the business advisor.
+
+The 15 catalogue businesses are scored against a FarmerProfile in one
+vectorized pass: the profile becomes a vector of resource levels (capital,
+land, water, power, livestock experience, covered space, labour, market
+reach), each business a row of the levels it needs. Shortfalls are weighted
+and subtracted; using the farmer's land and livestock experience, sizing to
+the budget, risk tolerance, goal and interests adjust the score.
+Ranking takes well under a millisecond, so /init answers at once with a
+complete top 3 and the LLM only personalises the card text in the background.
+
+Form answers arrive as the frontend's option labels (EN/HI/MR); they are
+mapped to levels through the tables below, unknown answers get a neutral level.
+"""
+
+import math
+
+import numpy as np
+
+# Resource columns, in order, for both the profile vector and the needs table
+RESOURCES = ("capital", "land", "water", "power", "animals", "covered", "labor", "market")
+# How hard a shortfall in each resource counts against a business
+SHORTFALL_WEIGHTS = np.array([2.0, 1.0, 0.8, 0.8, 0.6, 0.5, 0.4, 0.5])
+# Bonus for putting the farmer's land and livestock experience to use
+STRENGTH_WEIGHTS = np.array([0.0, 0.1, 0.0, 0.0, 0.25, 0.0, 0.0, 0.0])
+# Capital levels a business may leave unused before it counts as undersized
+CAPITAL_SLACK = 0.3
+GOALS = ("monthly_income", "growth", "asset")
+SPACES = ("Agri", "Non-Agri", "Water")
+INTERESTS = ("dairy", "poultry", "goat", "fishery", "mushroom", "nursery", "organic", "manufacturing")
+
+# Capital is compared on a log scale: ₹25k -> 0, ₹2.5 lakh -> 0.5, ₹25 lakh -> 1
+CAPITAL_FLOOR, CAPITAL_CEILING = 25_000, 2_500_000
+# Land level saturates at 2 acres; nothing in the catalogue needs more
+LAND_CEILING = 2.0
+
+# id -> what the business needs (0..1 per resource, capital in rupees, land in
+# acres), its risk, how well it serves each goal, where it can run, which
+# interests it matches, and the card shown before (or without) LLM enrichment.
+BUSINESS_FEATURES = {
+    "1": {
+        "min_capital": 1_000_000, "land": 0.25, "water": 0.9, "power": 0.6, "animals": 0.0,
+        "covered": 0.0, "labor": 0.7, "market": 0.9, "risk": 0.7,
+        "goals": (0.5, 0.9, 0.7), "spaces": (1.0, 0.2, 0.0), "interests": ("nursery",),
+        "card": {
+            "detailed_description": "Gerbera is grown in a polyhouse with drip irrigation and harvested year-round. A 1,000 m² unit gives 35-40 flowers per m² per year for wedding, event and florist markets. Polyhouse construction qualifies for NHM subsidy, and the structure can later be used for other high-value crops.",
+            "estimated_cost": "₹10-15 Lakh (1,000 m² polyhouse, before subsidy)",
+            "profit_potential": "₹40-70k/month",
+            "timeline": "3-4 months to first flowering",
+            "requirements": ["0.25 acre level land", "Polyhouse with drip and fogger", "Assured water supply", "2-3 workers", "Transport to a city flower market"],
+            "risk_factors": ["Price swings outside the wedding season - tie up with florists in advance", "Fungal disease in humidity - strict polyhouse hygiene", "High upfront cost - apply for NHM subsidy"],
+            "market_demand": "High",
+            "market_demand_analysis": "Bought by florists, event decorators and city wholesale flower markets. Demand peaks in the wedding season and festivals.",
+            "implementation_steps": ["Apply for NHM polyhouse subsidy", "Build polyhouse and raised beds", "Install drip irrigation and foggers", "Plant tissue-culture seedlings", "Harvest, grade and ship to the flower market"],
+        },
+    },
+    "2": {
+        "min_capital": 1_500_000, "land": 0.0, "water": 1.0, "power": 1.0, "animals": 0.0,
+        "covered": 0.8, "labor": 0.6, "market": 0.8, "risk": 0.6,
+        "goals": (0.7, 0.8, 0.8), "spaces": (0.5, 1.0, 0.2), "interests": ("manufacturing",),
+        "card": {
+            "detailed_description": "A small RO plant fills 20-litre jars and bottles for homes, shops and offices. BIS certification and a tested water source are mandatory. Revenue comes from daily jar deliveries on fixed routes, and the plant can add bottling lines as demand grows.",
+            "estimated_cost": "₹15-25 Lakh",
+            "profit_potential": "₹50k-1 Lakh/month",
+            "timeline": "4-6 months (licensing and setup)",
+            "requirements": ["1,000-1,500 sq.ft covered space", "Borewell with tested water", "24/7 electricity", "BIS and FSSAI licences", "Delivery vehicle and 3-4 workers"],
+            "risk_factors": ["Licence delays - start BIS paperwork first", "Competition from local brands - build fixed delivery routes", "Water quality failures - test every batch"],
+            "market_demand": "High",
+            "market_demand_analysis": "Households, shops, offices and events in nearby towns buy jars daily. Summer demand is 30-40% higher.",
+            "implementation_steps": ["Get water tested and apply for BIS/FSSAI", "Set up the RO plant and filling room", "Buy jars and a delivery vehicle", "Start trial production and quality checks", "Build delivery routes with shops and offices"],
+        },
+    },
+    "3": {
+        "min_capital": 200_000, "land": 0.0, "water": 0.2, "power": 1.0, "animals": 0.0,
+        "covered": 0.3, "labor": 0.4, "market": 0.8, "risk": 0.3,
+        "goals": (1.0, 0.4, 0.3), "spaces": (0.3, 1.0, 0.1), "interests": ("dairy",),
+        "card": {
+            "detailed_description": "An Amul parlour sells milk, ice cream, butter and other Amul products on a fixed margin. Amul supplies the stock and branding, so no production is involved. Income depends on footfall, so a location on a busy road or market is essential.",
+            "estimated_cost": "₹2-6 Lakh",
+            "profit_potential": "₹25-50k/month",
+            "timeline": "1-2 months to open",
+            "requirements": ["100-300 sq.ft shop on a busy street", "Reliable electricity for freezers", "Franchise application with Amul", "1-2 people to run the counter", "Working capital for stock"],
+            "risk_factors": ["Low footfall - choose the location carefully", "Power cuts spoil stock - keep a backup", "Thin margins - add ice cream and seasonal products"],
+            "market_demand": "High",
+            "market_demand_analysis": "Everyday buyers of milk and dairy products in towns. Ice cream sales peak in summer.",
+            "implementation_steps": ["Shortlist a high-footfall location", "Apply for the Amul franchise", "Set up the shop and freezers", "Stock the opening inventory", "Promote locally and track fast-moving items"],
+        },
+    },
+    "4": {
+        "min_capital": 300_000, "land": 0.05, "water": 0.9, "power": 0.5, "animals": 0.0,
+        "covered": 0.6, "labor": 0.4, "market": 0.8, "risk": 0.6,
+        "goals": (0.6, 0.8, 0.4), "spaces": (0.8, 0.9, 0.5), "interests": (),
+        "card": {
+            "detailed_description": "Spirulina is a protein-rich algae grown in shallow tanks and dried into powder or tablets. It needs clean water, warm weather and careful pH control. Dried spirulina sells to health-food brands, pharmacies and nutrition buyers at a high price per kg.",
+            "estimated_cost": "₹3-6 Lakh",
+            "profit_potential": "₹25-60k/month",
+            "timeline": "2-3 months to first harvest",
+            "requirements": ["Tanks under a shade net (500+ sq.ft)", "Clean water supply", "Electricity for paddle wheels", "Drying and packing setup", "Training in culture management"],
+            "risk_factors": ["Culture contamination - train before starting", "Niche market - line up buyers before scaling", "Weather sensitivity - use a shade net"],
+            "market_demand": "Moderate",
+            "market_demand_analysis": "Health-food brands, pharmacies and gyms buy dried spirulina. Demand is growing steadily in cities.",
+            "implementation_steps": ["Take a spirulina cultivation training", "Build tanks under a shade net", "Start culture and monitor pH daily", "Harvest, dry and pack", "Sign supply deals with health-food buyers"],
+        },
+    },
+    "5": {
+        "min_capital": 800_000, "land": 1.0, "water": 0.8, "power": 0.4, "animals": 1.0,
+        "covered": 0.6, "labor": 0.8, "market": 0.3, "risk": 0.4,
+        "goals": (1.0, 0.5, 0.7), "spaces": (1.0, 0.3, 0.2), "interests": ("dairy",),
+        "card": {
+            "detailed_description": "A 6-8 cow unit produces milk daily for a cooperative collection centre or direct buyers. Dung and urine can be sold or turned into manure for extra income. Green fodder from own land keeps feed costs under control.",
+            "estimated_cost": "₹8-12 Lakh",
+            "profit_potential": "₹20-40k/month",
+            "timeline": "Immediate (with milking cows)",
+            "requirements": ["1 acre for green fodder", "Cattle shed", "Assured water", "Family or hired labour, twice daily", "Experience with animals"],
+            "risk_factors": ["Disease - vaccinate and insure the herd", "High feed cost - grow own fodder", "Milk price changes - join a cooperative"],
+            "market_demand": "High",
+            "market_demand_analysis": "Cooperatives, dairies and households buy milk every day. Demand is steady all year.",
+            "implementation_steps": ["Build the cattle shed", "Plant green fodder", "Buy high-yield cows with insurance", "Tie up with a milk collection centre", "Sell dung as manure or vermicompost"],
+        },
+    },
+    "6": {
+        "min_capital": 300_000, "land": 0.5, "water": 0.5, "power": 0.2, "animals": 0.9,
+        "covered": 0.5, "labor": 0.6, "market": 0.6, "risk": 0.5,
+        "goals": (0.8, 0.6, 0.6), "spaces": (1.0, 0.4, 0.1), "interests": ("goat",),
+        "card": {
+            "detailed_description": "A unit of 20-25 milch goats supplies goat milk, which sells at a premium for its health value. Kids born each year can be sold or kept to grow the herd. Goats need less feed and space than cows and are hardy in dry areas.",
+            "estimated_cost": "₹3-5 Lakh",
+            "profit_potential": "₹15-30k/month",
+            "timeline": "1-2 months",
+            "requirements": ["0.5 acre with shed and grazing", "20-25 milch goats", "Daily labour for milking", "Veterinary access", "Buyers for goat milk"],
+            "risk_factors": ["Disease outbreaks - vaccinate and deworm", "Limited goat milk buyers - sell to health stores and dairies", "Theft and predators - secure night shelter"],
+            "market_demand": "Moderate",
+            "market_demand_analysis": "Goat milk buyers are health-conscious families, ayurvedic units and some dairies. Kids sell well before Eid and festivals.",
+            "implementation_steps": ["Build a raised goat shed", "Buy healthy milch goats", "Arrange fodder and mineral mix", "Find goat milk buyers", "Sell surplus kids each season"],
+        },
+    },
+    "7": {
+        "min_capital": 75_000, "land": 0.0, "water": 0.4, "power": 0.3, "animals": 0.0,
+        "covered": 0.5, "labor": 0.4, "market": 0.6, "risk": 0.4,
+        "goals": (0.8, 0.6, 0.2), "spaces": (0.7, 1.0, 0.1), "interests": ("mushroom",),
+        "card": {
+            "detailed_description": "Oyster mushrooms grow indoors on pasteurised straw bags, so no farmland is needed. A crop cycle takes 25-30 days and can run all year in a closed, humid room. Fresh mushrooms sell to vegetable markets, hotels and restaurants, and surplus can be dried.",
+            "estimated_cost": "₹1.5-3 Lakh",
+            "profit_potential": "₹15-35k/month",
+            "timeline": "25-30 days per cycle",
+            "requirements": ["Closed room or shed (300+ sq.ft)", "Straw and spawn supply", "Humidity control", "Daily care", "Nearby vegetable market or hotels"],
+            "risk_factors": ["Contamination - pasteurise straw properly", "Short shelf life - sell within 2 days or dry", "Summer heat - keep the room cool and humid"],
+            "market_demand": "High",
+            "market_demand_analysis": "Restaurants, hotels and city vegetable markets buy fresh oyster mushrooms. Dried mushroom has a longer market reach.",
+            "implementation_steps": ["Set up a dark, humid growing room", "Pasteurise straw substrate", "Spawn and bag the substrate", "Incubate and harvest flushes", "Sell fresh to hotels and markets"],
+        },
+    },
+    "8": {
+        "min_capital": 250_000, "land": 0.1, "water": 0.6, "power": 0.7, "animals": 0.7,
+        "covered": 0.7, "labor": 0.5, "market": 0.3, "risk": 0.5,
+        "goals": (0.8, 0.7, 0.5), "spaces": (1.0, 0.6, 0.1), "interests": ("poultry",),
+        "card": {
+            "detailed_description": "Broiler chicks are raised to market weight in about 40 days in a ventilated shed. Integrator companies supply chicks and feed and buy back the birds, which lowers the risk for a first unit. Several batches a year give regular income.",
+            "estimated_cost": "₹2.5-5 Lakh (1,000-bird shed)",
+            "profit_potential": "₹20-40k/month",
+            "timeline": "40-45 days per batch",
+            "requirements": ["1,000-1,500 sq.ft shed", "Electricity and water", "Integrator contract or feed supplier", "Daily care", "Biosecurity measures"],
+            "risk_factors": ["Bird disease - vaccinate and restrict visitors", "Feed price spikes - work with an integrator", "Heat stress - ventilate and use foggers"],
+            "market_demand": "High",
+            "market_demand_analysis": "Chicken is bought daily by retailers, hotels and integrators. Demand rises in winter and festivals.",
+            "implementation_steps": ["Sign with an integrator", "Build a ventilated shed", "Receive chicks and brood them", "Follow the vaccination schedule", "Sell birds at market weight"],
+        },
+    },
+    "9": {
+        "min_capital": 50_000, "land": 0.1, "water": 0.5, "power": 0.1, "animals": 0.2,
+        "covered": 0.4, "labor": 0.5, "market": 0.4, "risk": 0.2,
+        "goals": (0.5, 0.5, 0.3), "spaces": (1.0, 0.6, 0.1), "interests": ("organic",),
+        "card": {
+            "detailed_description": "Earthworms turn cow dung and farm waste into vermicompost in beds under shade. It needs little money or skill and uses material that is already on the farm. The compost improves your own soil and sells to organic farmers and nurseries.",
+            "estimated_cost": "₹50k-1.5 Lakh",
+            "profit_potential": "₹10-25k/month",
+            "timeline": "2-3 months for the first batch",
+            "requirements": ["Shaded area for beds", "Cow dung and crop waste", "Earthworms (Eisenia fetida)", "Water for moisture", "Packing bags"],
+            "risk_factors": ["Worm loss in heat - keep beds shaded and moist", "Low local price - pack and sell to nurseries", "Raw material shortage - tie up with dairies"],
+            "market_demand": "Moderate",
+            "market_demand_analysis": "Organic farmers, nurseries and home gardeners buy vermicompost. Demand is highest before the sowing seasons.",
+            "implementation_steps": ["Build shaded vermi-beds", "Collect dung and crop waste", "Introduce earthworms", "Harvest and sieve compost", "Pack and sell to farmers and nurseries"],
+        },
+    },
+    "10": {
+        "min_capital": 150_000, "land": 0.25, "water": 0.8, "power": 0.3, "animals": 0.0,
+        "covered": 0.3, "labor": 0.6, "market": 0.5, "risk": 0.4,
+        "goals": (0.5, 0.7, 0.6), "spaces": (1.0, 0.5, 0.0), "interests": ("nursery",),
+        "card": {
+            "detailed_description": "A nursery raises vegetable seedlings, fruit saplings and ornamental plants under a shade net. Vegetable seedlings turn over every 4-6 weeks, while fruit and ornamental plants add higher-margin sales. Buyers are local farmers, gardeners and government plantation drives.",
+            "estimated_cost": "₹1.5-4 Lakh",
+            "profit_potential": "₹20-40k/month",
+            "timeline": "1-2 months for first seedlings",
+            "requirements": ["0.25 acre with shade net", "Reliable water", "Pro-trays, cocopeat and seeds", "2 workers", "Nursery registration"],
+            "risk_factors": ["Seedling loss - control watering and pests", "Seasonal demand - plan batches to sowing seasons", "Competition - offer quality and timely delivery"],
+            "market_demand": "High",
+            "market_demand_analysis": "Farmers buy vegetable seedlings before each season, and gardeners and plantation drives buy saplings. Monsoon is the peak.",
+            "implementation_steps": ["Put up a shade-net house", "Prepare beds and pro-trays", "Sow seedlings in batches", "Register the nursery", "Sell to farmers and plantation drives"],
+        },
+    },
+    "11": {
+        "min_capital": 100_000, "land": 0.1, "water": 0.4, "power": 0.3, "animals": 0.4,
+        "covered": 0.4, "labor": 0.5, "market": 0.4, "risk": 0.3,
+        "goals": (0.5, 0.6, 0.3), "spaces": (1.0, 0.6, 0.1), "interests": ("organic",),
+        "card": {
+            "detailed_description": "Cow dung and urine are processed into compost, jeevamrut, panchagavya and other bio-inputs for organic farming. Raw material is cheap or free from dairies. The products sell to organic farmers and FPOs and cut your own input costs.",
+            "estimated_cost": "₹1-3 Lakh",
+            "profit_potential": "₹15-30k/month",
+            "timeline": "1-2 months",
+            "requirements": ["Steady cow dung and urine supply", "Small shed and drums", "Packing and labelling", "Basic training", "Buyers among organic farmers"],
+            "risk_factors": ["Inconsistent quality - follow standard recipes", "Slow awareness - run field demonstrations", "Registration for sale - check fertilizer rules"],
+            "market_demand": "Moderate",
+            "market_demand_analysis": "Organic and natural farming groups and FPOs buy bio-inputs. Demand grows with government natural farming programmes.",
+            "implementation_steps": ["Arrange dung and urine supply", "Set up a processing shed", "Prepare standard bio-input batches", "Pack and label products", "Demonstrate and sell to farmer groups"],
+        },
+    },
+    "12": {
+        "min_capital": 50_000, "land": 0.0, "water": 0.2, "power": 0.5, "animals": 0.3,
+        "covered": 0.5, "labor": 0.6, "market": 0.7, "risk": 0.3,
+        "goals": (0.5, 0.6, 0.2), "spaces": (0.7, 1.0, 0.0), "interests": ("manufacturing", "organic"),
+        "card": {
+            "detailed_description": "Cow dung is mixed, moulded and dried into dhoop sticks, diyas, pots and other eco-friendly products. The work suits family and women's groups and needs only moulds and a small machine. Sales peak around Diwali and other festivals, through shops and online.",
+            "estimated_cost": "₹50k-1.5 Lakh",
+            "profit_potential": "₹15-30k/month",
+            "timeline": "1 month",
+            "requirements": ["Cow dung supply", "Moulds and a small pressing machine", "Drying space", "Packaging", "Retail or online sales channel"],
+            "risk_factors": ["Seasonal sales - build stock before festivals", "Breakage - improve binding and packing", "Marketing effort - partner with shops and online stores"],
+            "market_demand": "Moderate",
+            "market_demand_analysis": "Urban buyers and temples buy eco-friendly dhoop and diyas. Demand peaks around Diwali and wedding seasons.",
+            "implementation_steps": ["Arrange dung supply and moulds", "Train the team on mixing and moulding", "Dry and finish products", "Pack with branding", "Sell via shops, fairs and online"],
+        },
+    },
+    "13": {
+        "min_capital": 100_000, "land": 0.0, "water": 0.1, "power": 0.8, "animals": 0.0,
+        "covered": 0.5, "labor": 0.5, "market": 0.6, "risk": 0.3,
+        "goals": (0.7, 0.5, 0.4), "spaces": (0.6, 1.0, 0.0), "interests": ("manufacturing",),
+        "card": {
+            "detailed_description": "Dona-pattal machines press leaves or areca sheaths into plates and bowls. They replace plastic disposables and sell in bulk to caterers, temples and shops. A small machine can be run by one or two people.",
+            "estimated_cost": "₹1-3 Lakh",
+            "profit_potential": "₹15-30k/month",
+            "timeline": "1 month",
+            "requirements": ["Leaf plate machine", "Electricity", "Supply of sal/areca leaves", "200-500 sq.ft work space", "Bulk buyers (caterers, shops)"],
+            "risk_factors": ["Raw leaf supply - contract collectors in advance", "Machine breakdowns - keep spares", "Price competition - supply caterers directly"],
+            "market_demand": "High",
+            "market_demand_analysis": "Caterers, temples, weddings and street food vendors buy plates in bulk. Plastic bans have raised demand.",
+            "implementation_steps": ["Buy a dona-pattal machine", "Arrange leaf supply", "Set up the work space", "Produce sample batches", "Sign bulk orders with caterers and shops"],
+        },
+    },
+    "14": {
+        "min_capital": 300_000, "land": 0.0, "water": 0.0, "power": 0.5, "animals": 0.0,
+        "covered": 0.4, "labor": 0.3, "market": 0.3, "risk": 0.4,
+        "goals": (0.8, 0.6, 0.4), "spaces": (0.5, 1.0, 0.1), "interests": ("organic",),
+        "card": {
+            "detailed_description": "An agri-input shop sells seeds, fertilizers, pesticides and tools to farmers in and around the village. It needs dealer licences and working capital for stock. Knowing local crops and giving sound advice builds a loyal customer base.",
+            "estimated_cost": "₹3-8 Lakh",
+            "profit_potential": "₹20-50k/month",
+            "timeline": "2-3 months (licences)",
+            "requirements": ["Shop of 200-400 sq.ft", "Seed, fertilizer and pesticide licences", "Working capital for stock", "Knowledge of local crops", "Credit policy for farmers"],
+            "risk_factors": ["Credit sales not repaid - keep limits", "Unsold seasonal stock - order close to season", "Licence compliance - keep records updated"],
+            "market_demand": "High",
+            "market_demand_analysis": "Every farmer in the area buys inputs before each season. Kharif and rabi sowing are the peaks.",
+            "implementation_steps": ["Apply for input dealer licences", "Set up the shop", "Tie up with distributors", "Stock seasonal inputs", "Offer advice to build loyal customers"],
+        },
+    },
+    "15": {
+        "min_capital": 300_000, "land": 0.5, "water": 1.0, "power": 0.4, "animals": 0.3,
+        "covered": 0.0, "labor": 0.5, "market": 0.5, "risk": 0.6,
+        "goals": (0.4, 0.7, 0.8), "spaces": (0.7, 0.0, 1.0), "interests": ("fishery",),
+        "card": {
+            "detailed_description": "Fish such as rohu, catla and pangasius are raised in a farm pond and harvested after 8-10 months. A pond also stores water for the farm. PMMSY subsidies cover part of the pond and input costs.",
+            "estimated_cost": "₹3-6 Lakh per acre of pond",
+            "profit_potential": "₹1.5-3 Lakh per acre per year",
+            "timeline": "8-10 months to harvest",
+            "requirements": ["0.5-1 acre pond or water body", "Year-round water", "Fingerlings and feed", "Aerator (electricity)", "Buyers or a fish market nearby"],
+            "risk_factors": ["Oxygen depletion - aerate and monitor", "Disease - manage water quality", "Price drops at harvest - stagger harvests"],
+            "market_demand": "High",
+            "market_demand_analysis": "Local fish markets, traders and hotels buy fresh fish. Demand is strong in most of India all year.",
+            "implementation_steps": ["Apply for PMMSY support", "Prepare or dig the pond", "Stock fingerlings", "Feed and monitor water quality", "Harvest and sell to traders"],
+        },
+    },
+}
+
+# Option labels as sent by the frontend (en/hi/mr locales) -> level
+_OPTION_LEVELS = {
+    "water_availability": [
+        (1.0, ("Borewell", "बोरवेल", "बोअरवेल")),
+        (0.8, ("Canal", "नहर", "कालवा")),
+        (0.3, ("Seasonal/Rainfed only", "केवल मौसमी/वर्षा आधारित", "केवळ हंगामी/पावसावर आधारित")),
+    ],
+    "electricity": [
+        (1.0, ("Yes, 24/7", "हाँ, 24/7", "हो, २४/७")),
+        (0.5, ("Yes, but frequent power cuts", "हाँ, लेकिन बार-बार बिजली कटौती", "हो, पण वारंवार वीज कपात")),
+        (0.0, ("No electricity", "बिजली नहीं", "वीज नाही")),
+    ],
+    "animal_handling": [
+        (1.0, ("Yes, regularly", "हाँ, नियमित रूप से", "हो, नियमितपणे")),
+        (0.5, ("Yes, limited", "हाँ, सीमित", "हो, मर्यादित")),
+        (0.0, ("No experience", "कोई अनुभव नहीं", "काहीही अनुभव नाही")),
+    ],
+    "daily_labor": [
+        (0.4, ("Mostly myself", "ज्यादातर खुद", "मुख्यतः स्वतः")),
+        (0.7, ("My family", "मेरा परिवार", "माझे कुटुंब")),
+        (1.0, ("External labor", "बाहरी श्रम", "बाहेरील मजूर")),
+    ],
+    "market_access": [
+        (0.25, ("Village only", "केवल गांव", "केवळ गाव", "poor")),
+        (0.5, ("Small town within 10 km", "10 किमी के भीतर छोटा शहर", "१० किमीच्या आत लहान शहर", "moderate")),
+        (0.8, ("City within 30 km", "30 किमी के भीतर शहर", "३० किमीच्या आत शहर", "good")),
+        (1.0, ("Direct buyers already available", "प्रत्यक्ष खरीदार पहले से ही उपलब्ध हैं", "थेट खरेदीदार आधीच उपलब्ध आहेत")),
+    ],
+    "covered_space": [
+        (0.3, ("< 500 sq.ft", "< 500 वर्ग फुट", "< ५०० चौ.फूट")),
+        (0.6, ("500-1,000 sq.ft", "500-1,000 वर्ग फुट", "५००-१,००0 चौ.फूट")),
+        (1.0, ("1,000-5,000 sq.ft", "1,000-5,000 वर्ग फुट", "१,०००-५,००० चौ.फूट")),
+    ],
+    "loss_tolerance": [
+        (0.8, ("I understand initial losses are possible", "मैं समझता हूँ कि शुरुआती नुकसान संभव है", "मला समजते की सुरुवातीला नुकसान होऊ शकते")),
+        (0.5, ("Small losses acceptable", "छोटा नुकसान स्वीकार्य", "कमी नुकसान स्वीकार्य")),
+        (0.2, ("I cannot afford losses", "मैं नुकसान नहीं उठा सकता", "मला नुकसान परवडणार नाही")),
+    ],
+    "risk_level": [
+        (0.3, ("low",)),
+        (0.5, ("medium",)),
+        (0.8, ("high",)),
+    ],
+}
+_GOAL_OPTIONS = {
+    "monthly_income": ("Stable monthly income", "स्थिर मासिक आय", "स्थिर मासिक उत्पन्न"),
+    "growth": ("High growth & scaling", "उच्च विकास और स्केलिंग", "उच्च वाढ आणि स्केलिंग"),
+    "asset": ("Asset building", "संपत्ति निर्माण", "मालमत्ता निर्मिती"),
+}
+_INTEREST_OPTIONS = {
+    "dairy": ("Dairy", "डेयरी", "डेअरी"),
+    "poultry": ("Poultry", "पोल्ट्री", "पोल्ट्री"),
+    "goat": ("Goat farming", "बकरी पालन", "शेळीपालन"),
+    "fishery": ("Fishery", "मत्स्य पालन", "मत्स्यपालन"),
+    "mushroom": ("Mushroom", "मशरूम", "मशरूम"),
+    "nursery": ("Nursery", "नर्सरी", "नर्सरी"),
+    "organic": ("Organic inputs", "जैविक इनपुट", "सेंद्रिय इनपुट"),
+    "manufacturing": ("Manufacturing", "विनिर्माण", "उत्पादन"),
+}
+# Levels for answers that are missing or not in the tables
+_NEUTRAL = {"water_availability": 0.6, "electricity": 0.6, "animal_handling": 0.3, "daily_labor": 0.6,
+            "market_access": 0.5, "covered_space": 0.5}
+_GAP_LABELS = {"water": "water", "power": "electricity", "animals": "animal handling",
+               "covered": "covered space", "labor": "labour", "market": "market access"}
+_GOAL_PHRASES = {"monthly_income": "steady monthly income", "growth": "fast growth", "asset": "building long-term assets"}
+
+
+def _key(label) -> str:
+    return str(label).strip().lower()
+
+
+_LEVELS = {field: {_key(label): level for level, labels in options for label in labels}
+           for field, options in _OPTION_LEVELS.items()}
+_GOAL_LOOKUP = {_key(label): goal for goal, labels in _GOAL_OPTIONS.items() for label in labels}
+_INTEREST_LOOKUP = {_key(label): interest for interest, labels in _INTEREST_OPTIONS.items() for label in labels}
+_INTEREST_LOOKUP.update({interest: interest for interest in INTERESTS})
+
+
+def _level(field: str, value, default: float = None):
+    if value is None or value == "":
+        return default if default is not None else _NEUTRAL.get(field)
+    level = _LEVELS[field].get(_key(value))
+    return level if level is not None else (default if default is not None else _NEUTRAL.get(field))
+
+
+def _capital_level(rupees: float) -> float:
+    rupees = max(float(rupees or 0), 1.0)
+    span = math.log10(CAPITAL_CEILING) - math.log10(CAPITAL_FLOOR)
+    return min(1.0, max(0.0, (math.log10(rupees) - math.log10(CAPITAL_FLOOR)) / span))
+
+
+def _land_level(acres: float) -> float:
+    return min(1.0, max(0.0, float(acres or 0) / LAND_CEILING))
+
+
+def _format_rupees(amount: float) -> str:
+    if amount >= 100_000:
+        return f"₹{amount / 100_000:.1f} lakh".replace(".0 lakh", " lakh")
+    return f"₹{amount / 1000:.0f}k"
+
+
+class BusinessRanker:
+    def __init__(self, options: list):
+        missing = [option["id"] for option in options if option["id"] not in BUSINESS_FEATURES]
+        if missing:
+            raise ValueError(f"No ranking features for business ids {missing}")
+        self.options = options
+        self.ids = [option["id"] for option in options]
+        rows = [BUSINESS_FEATURES[i] for i in self.ids]
+        # Needs table (businesses x resources), in RESOURCES order
+        self.needs = np.array([
+            [_capital_level(f["min_capital"]), _land_level(f["land"]), f["water"], f["power"],
+             f["animals"], f["covered"], f["labor"], f["market"]]
+            for f in rows
+        ])
+        self.risk = np.array([f["risk"] for f in rows])
+        self.goals = np.array([f["goals"] for f in rows])
+        self.spaces = np.array([f["spaces"] for f in rows])
+        self.interests = np.array([[interest in f["interests"] for interest in INTERESTS] for f in rows], dtype=float)
+
+    def encode(self, profile) -> dict:
+        """Profile -> resource levels, risk tolerance, goal, space and interest vectors."""
+        space = profile.space_type if profile.space_type in SPACES else "Agri"
+        if space == "Non-Agri":
+            land, covered = 0.0, _level("covered_space", profile.covered_space)
+        elif space == "Water":
+            # A pond or water body is the land; a shed can usually go next to it
+            land, covered = max(profile.land_size or 0, 0.5), 0.3
+        else:
+            # Open farmland: a shed or room can be built if there is any land
+            land = profile.land_size or 0
+            covered = max(_level("covered_space", profile.covered_space, 0.0), 0.7 if land >= 0.1 else 0.3)
+
+        water = 1.0 if space == "Water" else _level("water_availability", profile.water_availability)
+        have = np.array([
+            _capital_level(profile.capital), _land_level(land), water,
+            _level("electricity", profile.electricity),
+            _level("animal_handling", profile.animal_handling),
+            covered,
+            _level("daily_labor", profile.daily_labor),
+            _level("market_access", profile.market_access),
+        ])
+
+        tolerance = _level("loss_tolerance", profile.loss_tolerance, -1.0)
+        if tolerance < 0:
+            tolerance = _level("risk_level", profile.risk_level, 0.5)
+
+        goal = _GOAL_LOOKUP.get(_key(profile.main_goal)) if profile.main_goal else None
+        goals = np.array([1.0 if g == goal else 0.0 for g in GOALS]) if goal else np.full(len(GOALS), 1 / len(GOALS))
+
+        picked = set()
+        for label in list(profile.interests or []) + list(profile.skills or []):
+            interest = _INTEREST_LOOKUP.get(_key(label))
+            if interest:
+                picked.add(interest)
+        interests = np.array([1.0 if i in picked else 0.0 for i in INTERESTS])
+        spaces = np.array([1.0 if s == space else 0.0 for s in SPACES])
+
+        return {"have": have, "tolerance": tolerance, "goals": goals, "spaces": spaces,
+                "interests": interests, "goal": goal, "capital": float(profile.capital or 0)}
+
+    def score(self, have, tolerance, goals, spaces, interests) -> np.ndarray:
+        """
+        Scores for a batch of encoded profiles (arrays with a leading profile
+        axis), shape (profiles, businesses). Roughly 0..1.4, higher is better.
+        """
+        shortfall = np.clip(self.needs[None, :, :] - have[:, None, :], 0.0, None)
+        fit = np.clip(1.0 - shortfall @ SHORTFALL_WEIGHTS, 0.0, 1.0)
+        affinity = spaces @ self.spaces.T
+        strength = (self.needs[None, :, :] * have[:, None, :]) @ STRENGTH_WEIGHTS
+        undersized = np.clip(have[:, None, 0] - self.needs[None, :, 0] - CAPITAL_SLACK, 0.0, None)
+        risk = np.clip(self.risk[None, :] - tolerance[:, None], 0.0, None)
+        goal = goals @ self.goals.T
+        interest = np.minimum(interests @ self.interests.T, 1.0)
+        return (fit * affinity + strength - 0.3 * undersized - 0.6 * risk
+                + 0.15 * goal + 0.25 * interest)
+
+    def rank(self, profile, top: int = 3) -> list:
+        """Top `top` recommendation cards for one profile, best first."""
+        encoded = self.encode(profile)
+        scores = self.score(encoded["have"][None, :], np.array([encoded["tolerance"]]), encoded["goals"][None, :],
+                            encoded["spaces"][None, :], encoded["interests"][None, :])[0]
+        # Stable sort keeps catalogue order between equal scores
+        order = np.argsort(-scores, kind="stable")[:top]
+        return [self._card(index, float(scores[index]), encoded) for index in order]
+
+    def _card(self, index: int, score: float, encoded: dict) -> dict:
+        business_id = self.ids[index]
+        features = BUSINESS_FEATURES[business_id]
+        return {
+            "id": business_id,
+            "title": self.options[index]["title"],
+            "reason": self._reason(index, encoded),
+            "match_score": int(np.clip(round(40 + 42 * score), 10, 98)),
+            **features["card"],
+        }
+
+    def _reason(self, index: int, encoded: dict) -> str:
+        features = BUSINESS_FEATURES[self.ids[index]]
+        have, needs = encoded["have"], self.needs[index]
+        parts = []
+        if have[0] >= needs[0]:
+            parts.append(f"Fits your budget of {_format_rupees(encoded['capital'])}")
+        else:
+            parts.append(f"Needs about {_format_rupees(features['min_capital'])} to start, above your budget")
+        matched = [INTERESTS[i] for i in np.flatnonzero(encoded["interests"] * self.interests[index])]
+        if matched:
+            parts.append(f"matches your interest in {_INTEREST_OPTIONS[matched[0]][0].lower()}")
+        if encoded["goal"] and features["goals"][GOALS.index(encoded["goal"])] >= 0.7:
+            parts.append(f"suited to {_GOAL_PHRASES[encoded['goal']]}")
+        if needs[4] >= 0.7 and have[4] >= needs[4]:
+            parts.append("uses your experience with animals")
+        gaps = [_GAP_LABELS[RESOURCES[i]] for i in np.flatnonzero(needs[2:] - have[2:] > 0.3) + 2]
+        if gaps:
+            parts.append(f"plan for {' and '.join(gaps[:2])} needs")
+        reason = "; ".join(parts[:3])
+        return reason[0].upper() + reason[1:] + "."
@@ -3,20 +3,33 @@ KrishiSahAI Business Advisor Chatbot
 AI-powered business advisor for Indian farmers using LangChain + Ollama
 """
 
+import asyncio
 import os
+import sys
+from pathlib import Path
 from typing import Optional, List
 import json
 import re
 import html
 
+# Allow running this module directly (python krishi_chatbot.py)
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
 # --- LANGCHAIN IMPORTS (Refactored for correctness) ---
-from langchain_community.chat_models import ChatOllama
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, SystemMessagePromptTemplate, HumanMessagePromptTemplate
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage
-from langchain_core.output_parsers import StrOutputParser
+# langchain_ollama: JSON-schema `format` and a native async client (astream for the ASGI routes)
+from langchain_ollama import ChatOllama
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 from langchain_core.runnables import RunnableSerializable
 from pydantic import BaseModel, field_validator
 
+from services.BusinessAdvisor.business_ranker import BusinessRanker
+from services.LLMCore.chain_registry import chain_registry, InlineStrOutputParser
+from services.LLMCore.concurrency import chat_client_kwargs
+from services.LLMCore.prompt_assembly import LAYERED_PROMPT, prompt_assembler, prefill_tracker
+from services.LLMCore.structured_output import StructuredOutput
+
 # ============================================
 # BUSINESS OPTIONS (STRICT LIST)
 # ============================================
@@ -39,6 +52,9 @@ BUSINESS_OPTIONS = [
     {"id": "15", "title": "INLAND FISH FARMING (POND-BASED)"}
 ]
 
+# Picks the top 3 deterministically; the LLM only personalises their text
+business_ranker = BusinessRanker(BUSINESS_OPTIONS)
+
 # ============================================
 # GLOBAL CONFIGURATION
 # ============================================
@@ -248,6 +264,177 @@ RULES:
 
 
 
+# Map language codes to supported prompt keys
+LANGUAGE_PROMPT_KEYS = {
+    "en": "english",
+    "hi": "hindi",
+    "mr": "marathi",
+    "hindi": "hindi",
+    "marathi": "marathi",
+    "english": "english",
+    "hinglish": "hinglish"
+}
+
+# Language mandates live in the static system rules (not the user turn), so
+# the rules -> profile -> history prefix stays identical from turn to turn.
+LANGUAGE_MANDATES = {
+    "english": "(MANDATORY: RESPOND IN ENGLISH ONLY — IGNORE INPUT LANGUAGE)",
+    "hindi": "(MANDATORY: RESPOND IN HINDI DEVANAGARI ONLY — IGNORE INPUT LANGUAGE)",
+    "marathi": "(MANDATORY: RESPOND IN MARATHI DEVANAGARI ONLY — IGNORE INPUT LANGUAGE)",
+    "hinglish": "(MANDATORY: RESPOND IN HINGLISH ONLY — IGNORE INPUT LANGUAGE)",
+}
+
+# Fixed opening exchange that anchors the Devanagari languages
+LANGUAGE_PRIMERS = {
+    "marathi": ("तुम्ही कोण आहात?", "मी तुमचा कृषी-मार्गदर्शक आहे. मी फक्त मराठीतच बोलणार आहे."),
+    "hindi": ("आप कौन हैं?", "मैं आपका कृषि-सहायक हूँ। मैं केवल हिंदी में बात करूँगा।"),
+}
+
+# Rules, farmer profile, history and turn are passed in per call, so one
+# compiled prompt/chain serves every advisor session and language.
+ADVISOR_PROMPT = LAYERED_PROMPT
+
+
+def get_advisor_rules(prompt_key: str) -> str:
+    """Byte-identical system rules (language mandate + prompt) for a language."""
+    prompt_key = prompt_key if prompt_key in SYSTEM_PROMPTS else "english"
+    return prompt_assembler.static(
+        ("advisor", prompt_key),
+        lambda: f"{LANGUAGE_MANDATES[prompt_key]}\n\n{SYSTEM_PROMPTS[prompt_key]}"
+    )
+
+
+RECOMMENDATION_RULES = """
+Task:
+The farmer's top 3 business options have already been selected and scored (they follow the farmer's profile).
+For each of them, write advice tailored to this farmer's land, capital, skills, location and goals.
+Keep the ids, titles, match scores and order exactly as given. Write every text field in the requested language.
+
+Return ONLY a JSON object with this format:
+{
+    "recommendations": [
+        {
+            "id": "business_id_1",
+            "title": "Title 1",
+            "reason": "Brief reason why it matches this farmer",
+            "detailed_description": "A comprehensive 5-6 sentence overview of the business. Explain the daily operations, why it is profitable in the long run, and how it scales. Include specific details about the product and value addition.",
+            "match_score": 95,
+            "estimated_cost": "Cost range (e.g., ₹2-5 Lakhs)",
+            "profit_potential": "Profit range (e.g., ₹30-50k/month)",
+            "timeline": "Time to first harvest/profit (e.g., 3-4 months)",
+            "requirements": ["Requirement 1 (Land/Water)", "Requirement 2 (Equipment)", "Requirement 3 (Labor)", "Requirement 4 (Skill)", "Requirement 5 (License/Compliance)"],
+            "risk_factors": ["Risk 1 - Mitigation Strategy", "Risk 2 - Mitigation Strategy", "Risk 3 - Mitigation Strategy"],
+            "market_demand": "High/Moderate/Low",
+            "market_demand_analysis": "3-4 sentences explaining WHO buys this product (local/export), seasonal demand peaks, and pricing trends.",
+            "implementation_steps": [
+                "Step 1: Planning and Sourcing (Detailed)",
+                "Step 2: Infrastructure Setup (Detailed)",
+                "Step 3: Planting/Production Start",
+                "Step 4: Maintenance and Quality Control",
+                "Step 5: Harvesting and Marketing"
+            ]
+        }
+    ]
+}
+
+Do not add any markdown formatting (like ```json). Just the raw JSON string.
+""".strip()
+
+# Card fields the LLM may rewrite; id, title, score and cost figures stay the ranker's
+ENRICHED_FIELDS = (
+    "reason", "detailed_description", "timeline", "requirements", "risk_factors",
+    "market_demand", "market_demand_analysis", "implementation_steps",
+)
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+# Passed to Ollama as `format`, so decoding can only produce this shape
+# (and only IDs from the catalogue).
+RECOMMENDATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "recommendations": {
+            "type": "array",
+            "minItems": 3,
+            "maxItems": 3,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string", "enum": [b["id"] for b in BUSINESS_OPTIONS]},
+                    "title": {"type": "string"},
+                    "reason": {"type": "string"},
+                    "detailed_description": {"type": "string"},
+                    "match_score": {"type": "integer"},
+                    "estimated_cost": {"type": "string"},
+                    "profit_potential": {"type": "string"},
+                    "timeline": {"type": "string"},
+                    "requirements": _STRING_LIST,
+                    "risk_factors": _STRING_LIST,
+                    "market_demand": {"type": "string"},
+                    "market_demand_analysis": {"type": "string"},
+                    "implementation_steps": _STRING_LIST,
+                },
+                "required": [
+                    "id", "title", "reason", "detailed_description", "match_score",
+                    "estimated_cost", "profit_potential", "timeline", "requirements",
+                    "risk_factors", "market_demand", "implementation_steps",
+                ],
+            },
+        }
+    },
+    "required": ["recommendations"],
+}
+
+recommendation_output = StructuredOutput("advisor.recommendations", RECOMMENDATION_SCHEMA, items_key="recommendations")
+
+TITLE_RULES = "Summarize the following user request into a short 3-5 word title. Return ONLY the title without quotes or punctuation:"
+
+
+def _build_advisor_llm() -> ChatOllama:
+    return ChatOllama(
+        model=DEFAULT_OLLAMA_MODEL,
+        temperature=0.1,  # Lower temperature for stricter language adherence
+        num_ctx=4096,     # Full context window for complete conversation memory
+        num_predict=1200, # Balanced response length for streaming
+        base_url=DEFAULT_OLLAMA_BASE_URL,
+        **chat_client_kwargs(),
+    )
+
+
+def get_advisor_llm() -> ChatOllama:
+    return chain_registry.get(("advisor", "llm"), _build_advisor_llm)
+
+
+def get_recommendation_llm() -> ChatOllama:
+    # Three detailed cards need more room than a chat turn; truncation breaks JSON
+    return chain_registry.get(
+        ("advisor", "recommendations_llm"),
+        lambda: ChatOllama(
+            model=DEFAULT_OLLAMA_MODEL,
+            temperature=0.1,
+            num_ctx=4096,
+            num_predict=int(os.getenv("RECOMMENDATION_NUM_PREDICT", "2500")),
+            base_url=DEFAULT_OLLAMA_BASE_URL,
+        )
+    )
+
+
+def get_advisor_chain() -> RunnableSerializable:
+    # Chain: Prompt -> LLM -> String Output
+    return chain_registry.get(
+        ("advisor", "chat"),
+        lambda: ADVISOR_PROMPT | get_advisor_llm() | InlineStrOutputParser()
+    )
+
+
+def warm_chains():
+    """Compile the shared advisor chain and freeze the per-language rules at server start-up."""
+    get_advisor_chain()
+    get_recommendation_llm()
+    for prompt_key in SYSTEM_PROMPTS:
+        get_advisor_rules(prompt_key)
+
+
 # ============================================
 # CHATBOT CLASS
 # ============================================
@@ -260,6 +447,11 @@ class KrishiSahAIAdvisor:
         self.llm: Optional[ChatOllama] = None
         self.chain: Optional[RunnableSerializable] = None
         self.chat_history: List[BaseMessage] = []
+        self.static_rules: str = ""
+        self.profile_context: str = ""
+        self.prompt_key: str = "english"
+        # Rendered farmer profile per prompt language, reused across toggles
+        self._profile_contexts = {}
         # Track the last language received from the API/UI toggle
         self.last_api_language = farmer_profile.language.lower()
         self._initialize_llm()
@@ -268,13 +460,7 @@ class KrishiSahAIAdvisor:
     def _initialize_llm(self):
         """Initialize ChatOllama LLM"""
         try:
-            self.llm = ChatOllama(
-                model=DEFAULT_OLLAMA_MODEL,
-                temperature=0.1,  # Lower temperature for stricter language adherence
-                num_ctx=4096,     # Full context window for complete conversation memory
-                num_predict=1200, # Balanced response length for streaming
-                base_url=DEFAULT_OLLAMA_BASE_URL,
-            )
+            self.llm = get_advisor_llm()
         except Exception as e:
             print(f"Error initializing ChatOllama: {e}")
             print(
@@ -294,7 +480,7 @@ class KrishiSahAIAdvisor:
         return None
 
     def _initialize_chain(self, language: str = None):
-        """Build the LangChain workflow for processing queries"""
+        """Attach the shared compiled chain and the system context for the active language"""
         if not self.llm:
             print("Warning: LLM not available, chain will not be initialized")
             return
@@ -304,32 +490,16 @@ class KrishiSahAIAdvisor:
 
         # Get system prompt based on language
         lang_input = self.profile.language.lower()
-        
-        # Map language codes to supported prompt keys
-        lang_map = {
-            "en": "english",
-            "hi": "hindi",
-            "mr": "marathi",
-            "hindi": "hindi",
-            "marathi": "marathi",
-            "english": "english",
-            "hinglish": "hinglish"
-        }
-        
-        prompt_key = lang_map.get(lang_input, "english")
-        system_rules = SYSTEM_PROMPTS.get(prompt_key, SYSTEM_PROMPTS["english"])
-        
-        full_system_context = f"{system_rules}\n\n{self.profile.to_context()}"
-        print(f"[ADVISOR] Priming chain for {lang_input} with Rules (len: {len(system_rules)})")
-        
-        prompt = ChatPromptTemplate.from_messages([
-            SystemMessage(content=full_system_context),
-            MessagesPlaceholder(variable_name="chat_history"),
-            HumanMessagePromptTemplate.from_template("{input}")
-        ])
-        
-        # Chain: Prompt -> LLM -> String Output
-        self.chain = prompt | self.llm | StrOutputParser()
+        prompt_key = LANGUAGE_PROMPT_KEYS.get(lang_input, "english")
+
+        if prompt_key not in self._profile_contexts:
+            self._profile_contexts[prompt_key] = self.profile.to_context()
+            print(f"[ADVISOR] Priming profile context for {lang_input}")
+        self.static_rules = get_advisor_rules(prompt_key)
+        self.profile_context = self._profile_contexts[prompt_key]
+        self.prompt_key = prompt_key
+
+        self.chain = get_advisor_chain()
     
     def chat(self, user_message: str, language: str = None) -> str:
         """Send message and get response (Synchronous)"""
@@ -357,30 +527,13 @@ class KrishiSahAIAdvisor:
             return "Error: AI not initialized. Check server logs."
             
         try:
-            # Iron Curtain Wrapper: Prepend a strict language instruction to every message
-            # to reinforce the LLM to respond only in the selected language.
-            lang_key = self.profile.language.lower()
-            if lang_key in ["marathi", "mr"]:
-                if not self.chat_history:
-                    self.chat_history.append(HumanMessage(content="तुम्ही कोण आहात?"))
-                    self.chat_history.append(AIMessage(content="मी तुमचा कृषी-मार्गदर्शक आहे. मी फक्त मराठीतच बोलणार आहे."))
-                clean_message = f"(MANDATORY: RESPOND IN MARATHI DEVANAGARI ONLY — IGNORE INPUT LANGUAGE) {user_message}"
-            elif lang_key in ["hindi", "hi"]:
-                if not self.chat_history:
-                    self.chat_history.append(HumanMessage(content="आप कौन हैं?"))
-                    self.chat_history.append(AIMessage(content="मैं आपका कृषि-सहायक हूँ। मैं केवल हिंदी में बात करूँगा।"))
-                clean_message = f"(MANDATORY: RESPOND IN HINDI DEVANAGARI ONLY — IGNORE INPUT LANGUAGE) {user_message}"
-            else:
-                clean_message = f"(MANDATORY: RESPOND IN ENGLISH ONLY — IGNORE INPUT LANGUAGE) {user_message}"
-            
-            # Invoke chain with current history
-            response = self.chain.invoke({
-                "chat_history": self.chat_history,
-                "input": clean_message
-            })
+            response = self.chain.invoke(
+                self._layered_inputs(user_message),
+                config={"callbacks": prefill_tracker.callbacks("advisor.chat", self.static_rules)}
+            )
             
             # Update history manually
-            self.chat_history.append(HumanMessage(content=clean_message))
+            self.chat_history.append(HumanMessage(content=user_message))
             self.chat_history.append(AIMessage(content=response))
             
             return response.strip()
@@ -388,8 +541,8 @@ class KrishiSahAIAdvisor:
             print(f"Chat Error: {e}")
             return f"Error: {str(e)}"
 
-    def stream_chat(self, user_message: str, language: str = None):
-        """Send message and yield response tokens (Streaming)"""
+    def _prepare_turn(self, user_message: str, language: str = None) -> bool:
+        """Apply the UI language toggle before a streamed turn; False if the chain is unavailable."""
         # STRICT RULE: UI Toggle is the SOLE source of truth for language.
         # We NEVER auto-detect language from user input.
         api_lang = language.lower() if language else self.profile.language.lower()
@@ -406,45 +559,82 @@ class KrishiSahAIAdvisor:
             self.last_api_language = api_lang
             self.chat_history = []  # Clear history for clean language context
 
-        if not self.chain:
+        return self.chain is not None
+
+    def _record_turn(self, user_message: str, response: str):
+        # Update history after full response is generated
+        self.chat_history.append(HumanMessage(content=user_message))
+        self.chat_history.append(AIMessage(content=response))
+
+    def _record_partial_turn(self, user_message: str, partial: str):
+        if partial.strip():
+            self._record_turn(user_message, partial)
+            print(f"[ADVISOR] Stream abandoned after {len(partial)} chars; partial answer kept in history")
+
+    def stream_chat(self, user_message: str, language: str = None):
+        """Send message and yield response tokens (Streaming)"""
+        if not self._prepare_turn(user_message, language):
             yield "Error: AI not initialized. Check server logs."
             return
 
         try:
-            # Iron Curtain Wrapper: Prepend a strict language instruction to every message
-            # to reinforce the LLM to respond only in the selected language.
-            lang_key = self.profile.language.lower()
-            if lang_key in ["marathi", "mr"]:
-                if not self.chat_history:
-                    self.chat_history.append(HumanMessage(content="तुम्ही कोण आहात?"))
-                    self.chat_history.append(AIMessage(content="मी तुमचा कृषी-मार्गदर्शक आहे. मी फक्त मराठीतच बोलणार आहे."))
-                clean_message = f"(MANDATORY: RESPOND IN MARATHI DEVANAGARI ONLY — IGNORE INPUT LANGUAGE) {user_message}"
-            elif lang_key in ["hindi", "hi"]:
-                if not self.chat_history:
-                    self.chat_history.append(HumanMessage(content="आप कौन हैं?"))
-                    self.chat_history.append(AIMessage(content="मैं आपका कृषि-सहायक हूँ। मैं केवल हिंदी में बात करूँगा।"))
-                clean_message = f"(MANDATORY: RESPOND IN HINDI DEVANAGARI ONLY — IGNORE INPUT LANGUAGE) {user_message}"
-            else:
-                clean_message = f"(MANDATORY: RESPOND IN ENGLISH ONLY — IGNORE INPUT LANGUAGE) {user_message}"
-            
             full_response = ""
 
             # Use the .stream() method of the chain
-            for chunk in self.chain.stream({
-                "chat_history": self.chat_history,
-                "input": clean_message
-            }):
+            for chunk in self.chain.stream(
+                self._layered_inputs(user_message),
+                config={"callbacks": prefill_tracker.callbacks("advisor.chat", self.static_rules)}
+            ):
                 full_response += chunk
                 yield chunk
-            
-            # Update history after full response is generated
-            self.chat_history.append(HumanMessage(content=clean_message))
-            self.chat_history.append(AIMessage(content=full_response))
-            
+
+            self._record_turn(user_message, full_response)
+
+        except GeneratorExit:
+            # Client disconnected: keep what the farmer already saw so the next turn has context
+            self._record_partial_turn(user_message, full_response)
+            raise
         except Exception as e:
             print(f"Stream Chat Error: {e}")
             yield f"Error: {str(e)}"
-    
+
+    async def astream_chat(self, user_message: str, language: str = None):
+        """Async twin of stream_chat: tokens come from chain.astream, no thread is held while waiting"""
+        if not self._prepare_turn(user_message, language):
+            yield "Error: AI not initialized. Check server logs."
+            return
+
+        try:
+            full_response = ""
+            async for chunk in self.chain.astream(
+                self._layered_inputs(user_message),
+                config={"callbacks": prefill_tracker.callbacks("advisor.chat", self.static_rules)}
+            ):
+                full_response += chunk
+                yield chunk
+
+            self._record_turn(user_message, full_response)
+
+        except (GeneratorExit, asyncio.CancelledError):
+            self._record_partial_turn(user_message, full_response)
+            raise
+        except Exception as e:
+            print(f"Stream Chat Error: {e}")
+            yield f"Error: {str(e)}"
+
+    def _layered_inputs(self, user_message: str) -> dict:
+        """Rules -> profile -> history -> turn; the language mandate is part of the rules."""
+        primer = LANGUAGE_PRIMERS.get(self.prompt_key)
+        if primer and not self.chat_history:
+            self.chat_history.append(HumanMessage(content=primer[0]))
+            self.chat_history.append(AIMessage(content=primer[1]))
+        return prompt_assembler.inputs(
+            self.static_rules,
+            dynamic_context=self.profile_context,
+            history=self.chat_history,
+            turn=user_message
+        )
+
     def get_chat_history(self) -> str:
         """Get conversation history as a formatted string (for debugging/display)"""
         formatted = ""
@@ -458,89 +648,68 @@ class KrishiSahAIAdvisor:
         self.chat_history = []
         print("Conversation memory cleared")
 
-    def generate_recommendations(self) -> List[dict]:
-        """Generate top 3 business recommendations based on profile"""
-        if not self.llm:
-             # Fallback immediately if LLM is down
-             return self._get_fallback_recommendations()
+    def rank_recommendations(self) -> List[dict]:
+        """Top 3 business recommendations from the deterministic ranker (no LLM call)"""
+        try:
+            return business_ranker.rank(self.profile)
+        except Exception as e:
+            print(f"Error ranking recommendations: {e}")
+            return self._get_fallback_recommendations()
 
-        prompt_text = f"""
-        Analyze this farmer's profile:
-        {self.profile.to_context()}
-        
-        Available Business Options:
-        {json.dumps(BUSINESS_OPTIONS, indent=2)}
-        
-        Task:
-        Select exactly 3 business options from the list above that best match the farmer's land, capital, skills, and risk profile.
-        
-        Return ONLY a JSON array with this format:
-        [
-            {{
-                "id": "business_id_1",
-                "title": "Title 1",
-                "reason": "Brief reason why it matches",
-                "detailed_description": "A comprehensive 5-6 sentence overview of the business. Explain the daily operations, why it is profitable in the long run, and how it scales. Include specific details about the product and value addition.",
-                "match_score": 95,
-                "estimated_cost": "Cost range (e.g., ₹2-5 Lakhs)",
-                "profit_potential": "Profit range (e.g., ₹30-50k/month)",
-                "timeline": "Time to first harvest/profit (e.g., 3-4 months)",
-                "requirements": ["Requirement 1 (Land/Water)", "Requirement 2 (Equipment)", "Requirement 3 (Labor)", "Requirement 4 (Skill)", "Requirement 5 (License/Compliance)"],
-                "risk_factors": ["Risk 1 - Mitigation Strategy", "Risk 2 - Mitigation Strategy", "Risk 3 - Mitigation Strategy"],
-                "market_demand": "High/Moderate/Low",
-                "market_demand_analysis": "3-4 sentences explaining WHO buys this product (local/export), seasonal demand peaks, and pricing trends.",
-                "implementation_steps": [
-                    "Step 1: Planning and Sourcing (Detailed)", 
-                    "Step 2: Infrastructure Setup (Detailed)", 
-                    "Step 3: Planting/Production Start",
-                    "Step 4: Maintenance and Quality Control",
-                    "Step 5: Harvesting and Marketing"
-                ]
-            }}
-        ]
-        
-        Do not add any markdown formatting (like ```json). Just the raw JSON string.
+    def catalogue_in_language(self) -> bool:
+        """The ranker's catalogue card text is English; other languages only get cards in their language from the LLM"""
+        return LANGUAGE_PROMPT_KEYS.get(str(self.profile.language or "en").lower(), "english") == "english"
+
+    def enrich_recommendations(self, recommendations: List[dict]) -> List[dict]:
         """
-        
+        Let the LLM personalise the text of already ranked cards. Ids, order and
+        scores are kept; a card the LLM skipped or broke keeps its catalogue text.
+        """
+        if not self.llm or not recommendations:
+            return recommendations
+
+        ids = {rec['id'] for rec in recommendations}
         try:
-            # Use LLM directly for one-off generation
-            response_msg = self.llm.invoke(prompt_text)
-            response = response_msg.content
-            
-            # Robust JSON extraction
-            cleaned_response = response.strip()
-            
-            # Remove markdown code fences
-            cleaned_response = re.sub(r'```json\s*|\s*```', '', cleaned_response)
-            
-            # Try to extract JSON array from text (in case LLM added explanation)
-            json_match = re.search(r'\[\s*\{.*\}\s*\]', cleaned_response, re.DOTALL)
-            if json_match:
-                cleaned_response = json_match.group(0)
-            
-            # Remove trailing commas before closing braces/brackets (common LLM error)
-            cleaned_response = re.sub(r',(\s*[}\]])', r'\1', cleaned_response)
-            
-            try:
-                recommendations = json.loads(cleaned_response)
-            except json.JSONDecodeError as json_err:
-                print(f"Warning: JSON parse error: {json_err}")
-                print(f"Raw response (first 500 chars): {response[:500]}")
-                print(f"Cleaned response (first 500 chars): {cleaned_response[:500]}")
-                raise  # Re-raise to trigger fallback
-            
-            # Ensure we strictly have 3 items and they match our ID list
-            valid_ids = {b['id'] for b in BUSINESS_OPTIONS}
-            valid_recs = [r for r in recommendations if r.get('id') in valid_ids]
-            
-            # Return top 3, or fallback if empty
-            if not valid_recs:
-                raise ValueError("No valid recommendations generated")
-            
-            return valid_recs[:3]
+            enriched = recommendation_output.generate(
+                get_recommendation_llm(),
+                self._recommendation_prompt(recommendations),
+                config={"callbacks": prefill_tracker.callbacks("advisor.recommendations", RECOMMENDATION_RULES)},
+                keep=lambda rec: str(rec.get('id')) in ids
+            ) or []
         except Exception as e:
-            print(f"Error generating recommendations: {e}")
-            return self._get_fallback_recommendations()
+            print(f"Error enriching recommendations: {e}")
+            return recommendations
+
+        by_id = {}
+        for rec in enriched:
+            by_id.setdefault(str(rec['id']), rec)
+        merged = []
+        for rec in recommendations:
+            update = by_id.get(rec['id'])
+            if update is None:
+                merged.append(rec)
+                continue
+            fields = {field: update[field] for field in ENRICHED_FIELDS if update.get(field)}
+            merged.append({**rec, **fields, 'enriched': True})
+        return merged
+
+    def generate_recommendations(self) -> List[dict]:
+        """Top 3 business recommendations, ranked instantly and then enriched by the LLM (blocking)"""
+        return self.enrich_recommendations(self.rank_recommendations())
+
+    def _recommendation_prompt(self, recommendations: List[dict]) -> str:
+        # Static task first, then the farmer profile and the ranker's picks
+        prompt_key = LANGUAGE_PROMPT_KEYS.get(self.profile.language.lower(), "english")
+        picks = [{key: rec.get(key) for key in ("id", "title", "match_score", "reason", "estimated_cost", "profit_potential")}
+                 for rec in recommendations]
+        return prompt_assembler.text(
+            RECOMMENDATION_RULES,
+            dynamic_context=(
+                f"Farmer profile:\n{self.profile.to_context()}\n\n"
+                f"Selected businesses:\n{json.dumps(picks, indent=2, ensure_ascii=False)}\n\n"
+                f"Language: {prompt_key.title()}"
+            )
+        )
 
     def generate_title(self) -> str:
         """Generate a short 3-5 word summary title for the chat session"""
@@ -552,10 +721,13 @@ class KrishiSahAIAdvisor:
         if not first_user_msg:
             return "New Chat"
 
-        prompt_text = f"Summarize the following user request into a short 3-5 word title. Return ONLY the title without quotes or punctuation: {first_user_msg[:200]}"
+        prompt_text = f"{TITLE_RULES} {first_user_msg[:200]}"
         
         try:
-            response = self.llm.invoke(prompt_text)
+            response = self.llm.invoke(
+                prompt_text,
+                config={"callbacks": prefill_tracker.callbacks("advisor.title", TITLE_RULES)}
+            )
             title = response.content.strip().strip('"').strip("'")
             # Remove trailing ellipsis or punctuation if LLM added them
             title = re.sub(r'[.\s]+$', '', title)
@@ -8,6 +8,7 @@ detected crop, disease and confidence score.
 from __future__ import annotations
 
 import os
+import sys
 from pathlib import Path
 from typing import Dict, Any
 
@@ -22,6 +23,11 @@ from PIL import Image
 BASE_DIR = Path(__file__).resolve().parent
 MODEL_PATH = BASE_DIR / "plant_disease_model.h5"
 
+BACKEND_DIR = BASE_DIR.parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+from middleware.metrics import metrics
+
 # Class labels used during model training (must keep ordering intact).
 CLASS_NAMES = [
     'Apple___Apple_scab',
@@ -115,8 +121,10 @@ def predict(image_path: str | os.PathLike) -> Dict[str, Any]:
             "confidence": 0.0,
             "severity": "low",
         }
-    processed = _preprocess(image_path)
-    prediction = model.predict(processed, verbose=0)[0]
+    with metrics.timer("disease.preprocess"):
+        processed = _preprocess(image_path)
+    with metrics.timer("disease.inference"):
+        prediction = model.predict(processed, verbose=0)[0]
     class_idx = int(np.argmax(prediction))
     confidence = float(prediction[class_idx])
 
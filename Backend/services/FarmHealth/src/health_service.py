@@ -1,11 +1,33 @@
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_ollama import ChatOllama
-from langchain_core.output_parsers import JsonOutputParser
-from services.FarmHealth.src.prompts import HEALTH_ANALYSIS_SYSTEM_PROMPT, HEALTH_GUARDRAIL_PROMPT
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
+from services.FarmHealth.src.prompts import HEALTH_ANALYSIS_SYSTEM_PROMPT, HEALTH_GUARDRAIL_PROMPT, HEALTH_CHAT_SYSTEM_PROMPT, HEALTH_CHAT_CONTEXT_LABEL
+from services.LLMCore.chain_registry import chain_registry, SUPPORTED_LANGUAGES, InlineStrOutputParser
+from services.LLMCore.context_store import context_store
+from services.LLMCore.concurrency import chat_client_kwargs, llm_slots
+from services.LLMCore.prompt_assembly import LAYERED_PROMPT, prompt_assembler, prefill_tracker
+from services.LLMCore.json_stream import iter_json_events
 import json
 import os
 import threading
 
+# Static agronomy rules first; the farm context travels in the human turn
+ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", HEALTH_ANALYSIS_SYSTEM_PROMPT + "\n" + HEALTH_GUARDRAIL_PROMPT),
+    ("human", "Farm context:\nCrop: {crop_name}\nContext: {soil_data}\n\n"
+              "Analyze recommendations for {crop_name} in {location}. Output in {language} where possible."),
+])
+
+# Chat turns: frozen per-language rules -> report context -> question
+CHAT_PROMPT = LAYERED_PROMPT
+
+
+def chat_rules(language: str) -> str:
+    build = lambda: HEALTH_CHAT_SYSTEM_PROMPT.format(language=language)
+    if language not in SUPPORTED_LANGUAGES:
+        return build().strip()
+    return prompt_assembler.static(("farm_health_chat", language), build)
+
 class FarmHealthEngine:
     def __init__(self):
         # FIX: Ensure consistent model and url naming
@@ -27,24 +49,43 @@ class FarmHealthEngine:
             model=self.model_name,
             temperature=0.4,
             base_url=self.base_url,
-            num_predict=1500
+            num_predict=1500,
+            # Keep the model (and its KV cache of the context prefix) loaded between follow-ups
+            keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+            **chat_client_kwargs()
         )
 
-    def analyze_health(self, crop_name: str, soil_data: dict, location: str, soil_type: str, language: str = "English") -> dict:
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", HEALTH_ANALYSIS_SYSTEM_PROMPT + "\n" + HEALTH_GUARDRAIL_PROMPT),
-            ("human", "Analyze recommendations for {crop_name} in {location}. Output in {language} where possible."),
-        ])
-        
-        chain = prompt | self.json_llm | JsonOutputParser()
+        # Compile the analysis and chat chains and freeze the chat rules once at start-up
+        self._get_analysis_chain()
+        self._get_analysis_stream_chain()
+        self._get_chat_chain()
+        for language in SUPPORTED_LANGUAGES:
+            chat_rules(language)
 
-        # Build context from your input variables
-        soil_context = (
-            f"Soil Type: {soil_type}, Location: {location}, "
-            f"N-P-K: {soil_data.get('n')}-{soil_data.get('p')}-{soil_data.get('k')}, "
-            f"pH: {soil_data.get('ph')}"
+    def _get_analysis_chain(self):
+        return chain_registry.get(
+            ("farm_health", "analysis"),
+            lambda: ANALYSIS_PROMPT | self.json_llm | JsonOutputParser()
+        )
+
+    def _get_analysis_stream_chain(self):
+        # Raw text out, so fertilizer options can be parsed as they are generated
+        return chain_registry.get(
+            ("farm_health", "analysis_stream"),
+            lambda: ANALYSIS_PROMPT | self.json_llm | StrOutputParser()
+        )
+
+    def _get_chat_chain(self):
+        return chain_registry.get(
+            ("farm_health", "chat"),
+            lambda: CHAT_PROMPT | self.chat_llm | InlineStrOutputParser()
         )
 
+    def analyze_health(self, crop_name: str, soil_data: dict, location: str, soil_type: str, language: str = "English") -> dict:
+        chain = self._get_analysis_chain()
+
+        soil_context = self._soil_context(soil_data, location, soil_type)
+
         try:
             with self.lock:
                 print(f"[FARM_HEALTH] Processing request for: {crop_name}")
@@ -54,13 +95,94 @@ class FarmHealthEngine:
                     "location": location,
                     "soil_data": soil_context,
                     "language": language
-                })
+                }, config={"callbacks": prefill_tracker.callbacks("farm_health.analysis", HEALTH_ANALYSIS_SYSTEM_PROMPT)})
                 return response
         except Exception as e:
             print(f"Error in FarmHealthEngine: {e}")
             # Ensure we return valid JSON even on error so UI stops loading
             return self.get_error_fallback()
 
+    def stream_analyze_health(self, crop_name: str, soil_data: dict, location: str, soil_type: str, language: str = "English"):
+        """
+        Streams the analysis as events: each fertilizer option as soon as its JSON
+        closes, market advice / insights as their fields close, then "done".
+        The generation holds an LLM slot rather than self.lock: a slot is released
+        when the client disconnects and the generator is closed, and a slow reader
+        doesn't hold up every other analysis.
+        """
+        chain = self._get_analysis_stream_chain()
+        options, fields = [], {}
+
+        try:
+            with llm_slots.slot("farm_health.analysis"):
+                print(f"[FARM_HEALTH] Streaming request for: {crop_name}")
+                chunks = chain.stream({
+                    "crop_name": crop_name,
+                    "location": location,
+                    "soil_data": self._soil_context(soil_data, location, soil_type),
+                    "language": language
+                }, config={"callbacks": prefill_tracker.callbacks("farm_health.analysis", HEALTH_ANALYSIS_SYSTEM_PROMPT)})
+                for kind, key, value in iter_json_events(chunks, array_key="fertilizer_options"):
+                    if kind == "item" and isinstance(value, dict) and value.get("name"):
+                        options.append(value)
+                        yield {"type": "fertilizer_option", "index": len(options) - 1, "option": value}
+                    elif kind == "field":
+                        fields[key] = value
+                        yield {"type": "field", "key": key, "value": value}
+                    elif kind == "done":
+                        result = value if isinstance(value, dict) else dict(fields, fertilizer_options=options)
+            if not result.get("fertilizer_options"):
+                raise ValueError("No fertilizer options generated")
+            yield {"type": "done", "result": result}
+        except Exception as e:
+            print(f"Error in FarmHealthEngine stream: {e}")
+            yield {"type": "error", "error": str(e), "result": self.get_error_fallback()}
+
+    def _soil_context(self, soil_data: dict, location: str, soil_type: str) -> str:
+        # Build context from your input variables
+        return (
+            f"Soil Type: {soil_type}, Location: {location}, "
+            f"N-P-K: {soil_data.get('n')}-{soil_data.get('p')}-{soil_data.get('k')}, "
+            f"pH: {soil_data.get('ph')}"
+        )
+
+    def _chat_inputs(self, context, user_question: str, language: str, context_id: str = None):
+        # Stored compact rendering keeps the prompt prefix byte-identical across turns
+        _, context_str = context_store.resolve("farm_health", context_id, context)
+        if context_str is None:
+            raise ValueError("Unknown or expired context_id and no context provided")
+        rules = chat_rules(language)
+        inputs = prompt_assembler.inputs(
+            rules,
+            dynamic_context=f"{HEALTH_CHAT_CONTEXT_LABEL}\n{context_str}",
+            turn=user_question
+        )
+        return inputs, {"callbacks": prefill_tracker.callbacks("farm_health.chat", rules)}
+
+    def stream_chat_health(self, context, user_question: str, language: str = "English", context_id: str = None):
+        """Answers follow-up questions about a soil health report (Streaming)."""
+        chat_chain = self._get_chat_chain()
+
+        try:
+            inputs, config = self._chat_inputs(context, user_question, language, context_id)
+            for chunk in chat_chain.stream(inputs, config=config):
+                yield chunk
+        except Exception as e:
+            print(f"Error in Farm Health Stream Chat: {e}")
+            yield "I apologize, but I'm having trouble connecting to the knowledge base right now. Please try again."
+
+    async def astream_chat_health(self, context, user_question: str, language: str = "English", context_id: str = None):
+        """Async twin of stream_chat_health for the ASGI streaming routes."""
+        chat_chain = self._get_chat_chain()
+
+        try:
+            inputs, config = self._chat_inputs(context, user_question, language, context_id)
+            async for chunk in chat_chain.astream(inputs, config=config):
+                yield chunk
+        except Exception as e:
+            print(f"Error in Farm Health Stream Chat: {e}")
+            yield "I apologize, but I'm having trouble connecting to the knowledge base right now. Please try again."
+
     def get_error_fallback(self):
         return {
             "fertilizer_options": [
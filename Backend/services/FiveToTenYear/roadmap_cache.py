@@ -0,0 +1,152 @@
+"""
+Two-tier cache for business roadmaps.
+
+A 10-year roadmap only depends on the business, the output language, the
+prompt rules and the handful of profile fields rendered into the farmer
+context. Those are hashed into the key, so an unchanged profile is served from
+an in-process LRU, then from Firestore (users/{uid}/business_roadmaps, next to
+the existing crop_plans), and only regenerated on a miss. Editing the profile
+changes the hash; invalidate() also drops the user's old entries explicitly.
+
+Only complete roadmaps are cached: the generator passes is_complete, and a
+roadmap missing any section is neither stored nor served from Firestore.
+"""
+
+import copy
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from middleware.metrics import metrics
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", str(text or "").lower()).strip("-") or "unknown"
+
+
+def profile_hash(farmer_context: str, prompt_version: str = "") -> str:
+    """Fingerprint of everything profile-dependent that reaches the prompt."""
+    digest = hashlib.sha256(f"{prompt_version}\n{farmer_context}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class RoadmapCache:
+    def __init__(self, prompt_version: str = "", max_entries: int = None, db=None, is_complete=None):
+        self.prompt_version = prompt_version
+        self.is_complete = is_complete or (lambda roadmap: True)
+        self.max_entries = max_entries or int(os.getenv("ROADMAP_CACHE_SIZE", "256"))
+        self.db = db
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def make_key(self, user_id: str, business_id: str, language: str, farmer_context: str):
+        """(uid, document id) with document id = {business}_{lang}_{profilehash}."""
+        doc_id = f"{_slug(business_id)}_{str(language).upper()}_{profile_hash(farmer_context, self.prompt_version)}"
+        return (str(user_id), doc_id)
+
+    def _collection(self, user_id: str):
+        return self.db.collection('users').document(user_id).collection('business_roadmaps')
+
+    def get(self, key):
+        with self._lock:
+            roadmap = self._memory.get(key)
+            if roadmap is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                # Hand out a copy so callers can't mutate the cached entry
+                return copy.deepcopy(roadmap)
+
+        roadmap = None
+        if self.db is not None:
+            try:
+                with metrics.timer("firestore.roadmap_cache_get"):
+                    doc = self._collection(key[0]).document(key[1]).get()
+                if doc.exists:
+                    roadmap = doc.to_dict().get('roadmap')
+                    if roadmap is not None and not self.is_complete(roadmap):
+                        # Stored before incomplete roadmaps were rejected; regenerate it
+                        roadmap = None
+            except Exception as e:
+                print(f"[ROADMAP-CACHE WARNING] Firestore read failed: {e}")
+
+        with self._lock:
+            if roadmap is None:
+                self.misses += 1
+                return None
+            self.store_hits += 1
+            self._remember(key, copy.deepcopy(roadmap))
+        print(f"[ROADMAP-CACHE] Loaded {key[1]} from Firestore")
+        return roadmap
+
+    def put(self, key, roadmap: dict, business_name: str = None):
+        """Cache a complete roadmap; error fallbacks, year-less parses and partial roadmaps are never stored."""
+        if not roadmap or not roadmap.get('years') or str(roadmap.get('title', '')).endswith('(Error)'):
+            return False
+        if roadmap.get('missing_sections') or not self.is_complete(roadmap):
+            print(f"[ROADMAP-CACHE] Not caching incomplete roadmap {key[1]}")
+            return False
+        with self._lock:
+            self._remember(key, copy.deepcopy(roadmap))
+        if self.db is not None:
+            try:
+                from firebase_admin import firestore
+                self._collection(key[0]).document(key[1]).set({
+                    'roadmap': roadmap,
+                    'business_name': business_name,
+                    'profile_hash': key[1].rsplit('_', 1)[-1],
+                    'created_at': firestore.SERVER_TIMESTAMP
+                })
+            except Exception as e:
+                print(f"[ROADMAP-CACHE WARNING] Failed to save roadmap: {e}")
+        return True
+
+    def _remember(self, key, roadmap):
+        self._memory[key] = roadmap
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def invalidate(self, user_id: str, business_id: str = None) -> int:
+        """Drop a user's cached roadmaps (all of them, or one business) from both tiers."""
+        prefix = f"{_slug(business_id)}_" if business_id else ""
+        with self._lock:
+            stale = [k for k in self._memory if k[0] == str(user_id) and k[1].startswith(prefix)]
+            for k in stale:
+                del self._memory[k]
+            self.invalidations += 1
+        removed = len(stale)
+
+        if self.db is not None:
+            try:
+                deleted = 0
+                for doc in self._collection(str(user_id)).stream():
+                    if doc.id.startswith(prefix):
+                        doc.reference.delete()
+                        deleted += 1
+                # Memory entries are copies of stored documents
+                removed = max(removed, deleted)
+            except Exception as e:
+                print(f"[ROADMAP-CACHE WARNING] Firestore invalidation failed: {e}")
+        print(f"[ROADMAP-CACHE] Invalidated {removed} entries for {user_id}")
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.store_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "memory_hits": self.memory_hits,
+                "store_hits": self.store_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "prompt_version": self.prompt_version,
+            }
@@ -1,11 +1,18 @@
 
 import os
+import re
+import contextvars
 import json
+import hashlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import firebase_admin
 from firebase_admin import firestore
 from langchain_ollama import ChatOllama
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from services.LLMCore.prompt_assembly import prompt_assembler, prefill_tracker
+from services.LLMCore.concurrency import llm_slots
+from services.FiveToTenYear.roadmap_cache import RoadmapCache
+from services.LLMCore.roadmap_parser import MarkdownRoadmapParser
+from services.Profiles.profile_repository import profile_repository
 
 # Initialize Firestore (assuming firebase_admin is already initialized in app.py)
 # Initialize Firestore lazily
@@ -37,6 +44,172 @@ BUSINESS_OPTIONS = [
     {"id": "15", "title": "INLAND FISH FARMING (POND-BASED)"}
 ]
 
+# Language-specific labels/headers for the prompt
+LANG_CONFIG = {
+    "EN": {
+        "milestone": "Strategic Milestone Name",
+        "focus": "Strategic Focus",
+        "actions": "Key Actions",
+        "profit": "Expected Profit",
+        "year_term": "Year",
+        "headers": ["Overview", "1. 10-Year Growth & Profit Planner", "2. Labor & Aging Analysis", "3. Sustainability & Succession", "4. Financial Resilience", "5. Final Verdict"]
+    },
+    "HI": {
+        "milestone": "रणनीतिक उपलब्धि का नाम",
+        "focus": "रणनीतिक फोकस",
+        "actions": "मुख्य कार्य",
+        "profit": "अपेक्षित लाभ",
+        "year_term": "वर्ष",
+        "headers": ["अवलोकन", "1. 10-वर्षीय विकास और लाभ योजनाकार", "2. श्रम और उम्र बढ़ने का विश्लेषण", "3. स्थिरता और उत्तराधिकार", "4. वित्तीय लचीलापन", "5. अंतिम निर्णय"]
+    },
+    "MR": {
+        "milestone": "धोरणात्मक मैलाचा दगड",
+        "focus": "धोरणात्मक लक्ष",
+        "actions": "मुख्य कृती",
+        "profit": "अपेक्षित नफा",
+        "year_term": "वर्ष",
+        "headers": ["आढावा", "1. 10-वर्षांचे विकास आणि नफा नियोजक", "2. श्रम आणि वृद्धत्व विश्लेषण", "3. शाश्वतता आणि उत्तराधिकार", "4. आर्थिक लवचिकता", "5. अंतिम निकाल"]
+    }
+}
+
+ROADMAP_PARSER = MarkdownRoadmapParser(
+    "10-Year Sustainability & Profit",
+    year_label=lambda year_num, language: f"{'Year' if language == 'EN' else 'वर्ष'} {year_num}"
+)
+
+# Static part of the roadmap prompt, rendered once per language. Everything
+# farmer- or business-specific is appended after it so the prefix is shared.
+ROADMAP_RULES = """You are an expert Agricultural Decision Intelligence Consultant.
+Create a HIGHLY DETAILED and professional 10-Year Business Roadmap for the business named after these instructions, for the farmer profile given below it.
+STRICTLY generate the ENTIRE response in {language_name} language. EVERY SINGLE WORD must be in {language_name}.
+
+Guidelines:
+1. Provide granular, actionable advice tailored to the specific context (soil, water, experience).
+2. For each year, explain WHY these actions are chosen and HOW they lead to the profit goals.
+3. STRICTLY NO EMOJIS. Use professional Markdown formatting.
+4. Ensure the 10-year timeline shows clear progression (Scale-up, Diversification, Automation).
+5. All assumptions, costs, and market details MUST reflect the Indian agricultural economy.
+6. All financial values MUST be in Indian Rupees (₹). Do NOT use dollars ($).
+7. Output the response in {language_name}.
+
+Structure (Use these exact Headers in {language_name}):
+
+# {headers[0]}
+[A comprehensive 3-5 sentence summary in {language_name}. Analyze how the business integrated with current farm resources and the farmer's experience can lead to long-term success in the Indian context.]
+
+# {headers[1]}
+[Provide a meticulous Year-wise breakdown ({year_term} 1 to {year_term} 10). Each year must be a clear block:]
+
+## {year_term} 1: [{milestone}]
+- **{focus}**: [Detailed objective for the year]
+- **{actions}**: [3-5 highly specific, numbered steps in {language_name}. Mention Indian equipment or methods where applicable.]
+- **{profit}**: ₹[Amount in Indian Rupees]
+
+... (Repeat for {year_term} 2 through 10, showing scale-up and reinvestment) ...
+
+# {headers[2]}
+[Explain how labor needs will be managed as the farmer ages over the next 10 years in {language_name}. Specify hardware/automation triggers for Year 4, 7, and 10 to reduce physical strain.]
+
+# {headers[3]}
+[Document soil health management, resource recycling (e.g., waste-to-value), and a legacy plan for multi-generational wealth in {language_name}.]
+
+# {headers[4]}
+[Compare risk mitigation strategies for a 'Bad Year' in the early stage (Years 1-3) vs. the mature stage (Years 7-10) in {language_name}. Focus on cash reserves and insurance.]
+
+# {headers[5]}
+[Detailed feasibility score (0-100) and analysis of long-term Return on Investment (ROI) in {language_name}.]
+
+DISCLAIMER: {disclaimer}
+"""
+
+ROADMAP_DISCLAIMER = "This roadmap is an AI-generated simulation based on provided data and regional averages. Actual results may vary due to market fluctuations, climate conditions, and individual management. This should not be considered financial or legal advice. Consult with local agricultural experts before major investments."
+
+# Section-parallel mode: every section is its own prompt sharing this frozen
+# prefix plus the farmer context; only the final turn (the section task) differs.
+ROADMAP_SECTION_RULES = """You are an expert Agricultural Decision Intelligence Consultant.
+You are writing ONE section of a HIGHLY DETAILED and professional 10-Year Business Roadmap for the business named after these instructions, for the farmer profile given below it. Other sections are written separately, so write only the section you are asked for.
+STRICTLY generate the ENTIRE response in {language_name} language. EVERY SINGLE WORD must be in {language_name}.
+
+Guidelines:
+1. Provide granular, actionable advice tailored to the specific context (soil, water, experience).
+2. STRICTLY NO EMOJIS. Use professional Markdown formatting.
+3. The 10-year timeline progresses through Foundation (Years 1-3), Scale-up and Diversification (Years 4-7) and Automation and Legacy (Years 8-10).
+4. All assumptions, costs, and market details MUST reflect the Indian agricultural economy.
+5. All financial values MUST be in Indian Rupees (₹). Do NOT use dollars ($).
+6. Do NOT write the section title, any '#' header other than the ones you are asked for, or a disclaimer.
+"""
+
+# (section, roadmap header index, task); years sections carry their year range
+ROADMAP_SECTIONS = [
+    ("overview", 0, "Write the '{headers[0]}' section: a comprehensive 3-5 sentence summary in {language_name}. Analyze how the business integrated with current farm resources and the farmer's experience can lead to long-term success in the Indian context."),
+    ("years_1_3", 1, None),
+    ("years_4_7", 1, None),
+    ("years_8_10", 1, None),
+    ("labor", 2, "Write the '{headers[2]}' section: explain how labor needs will be managed as the farmer ages over the next 10 years in {language_name}. Specify hardware/automation triggers for Year 4, 7, and 10 to reduce physical strain."),
+    ("sustainability", 3, "Write the '{headers[3]}' section: document soil health management, resource recycling (e.g., waste-to-value), and a legacy plan for multi-generational wealth in {language_name}."),
+    ("resilience", 4, "Write the '{headers[4]}' section: compare risk mitigation strategies for a 'Bad Year' in the early stage (Years 1-3) vs. the mature stage (Years 7-10) in {language_name}. Focus on cash reserves and insurance."),
+    ("verdict", 5, "Write the '{headers[5]}' section: a detailed feasibility score (0-100) and analysis of long-term Return on Investment (ROI) in {language_name}."),
+]
+
+ROADMAP_YEARS_TASK = """Write the year-wise plan for {year_term} {start} to {year_term} {end} of the 10-year roadmap ({stage}), building on what earlier years would have achieved. Each year must be exactly this block, in {language_name}:
+
+## {year_term} N: [{milestone}]
+- **{focus}**: [Detailed objective for the year]
+- **{actions}**: [3-5 highly specific, numbered steps in {language_name}. Mention Indian equipment or methods where applicable.]
+- **{profit}**: ₹[Amount in Indian Rupees]
+
+Write nothing before the first block or after the last one."""
+
+ROADMAP_YEAR_GROUPS = {
+    "years_1_3": (1, 3, "Foundation"),
+    "years_4_7": (4, 7, "Scale-up and Diversification"),
+    "years_8_10": (8, 10, "Automation and Legacy"),
+}
+
+# Roadmap dict field filled by each non-year section
+ROADMAP_SECTION_FIELDS = {
+    "overview": "overview",
+    "labor": "labor_analysis",
+    "sustainability": "sustainability_plan",
+    "resilience": "resilience_strategy",
+    "verdict": "verdict",
+}
+
+
+
+def roadmap_prompt_version() -> str:
+    """Fingerprint of every prompt that shapes a roadmap; part of the cache key."""
+    parts = [ROADMAP_RULES, ROADMAP_SECTION_RULES, ROADMAP_YEARS_TASK] + [task or "" for _, _, task in ROADMAP_SECTIONS]
+    return hashlib.sha256("".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+_YEAR_NUMBER_RE = re.compile(r'\d+')
+
+
+def roadmap_missing_sections(roadmap) -> list:
+    """ROADMAP_SECTIONS with no content in a parsed roadmap; empty when it is complete."""
+    if not roadmap:
+        return [section for section, _, _ in ROADMAP_SECTIONS]
+    years = set()
+    for entry in roadmap.get('years') or []:
+        # \d also matches Devanagari digits, which int() reads
+        match = _YEAR_NUMBER_RE.search(str(entry.get('year', '')))
+        if match:
+            years.add(int(match.group()))
+    missing = []
+    for section, _, _ in ROADMAP_SECTIONS:
+        if section in ROADMAP_YEAR_GROUPS:
+            start, end, _ = ROADMAP_YEAR_GROUPS[section]
+            if not years.issuperset(range(start, end + 1)):
+                missing.append(section)
+        elif not str(roadmap.get(ROADMAP_SECTION_FIELDS[section]) or '').strip():
+            missing.append(section)
+    return missing
+
+
+_TOP_HEADER_RE = re.compile(r'^#\s.*$\n?', re.MULTILINE)
+_DISCLAIMER_RE = re.compile(r'(?:\*\*)?(?:DISCLAIMER|अस्वीकरण)\s*:.*', re.IGNORECASE | re.DOTALL)
+
 class SustainabilityRoadmapGenerator:
     def __init__(self):
         self.llm = ChatOllama(
@@ -44,20 +217,11 @@ class SustainabilityRoadmapGenerator:
             temperature=0.5, # Increased for better structured output
             base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
         )
+        self.cache = RoadmapCache(prompt_version=roadmap_prompt_version(), db=db, is_complete=lambda r: not roadmap_missing_sections(r))
 
     def get_farmer_profile(self, user_id):
-        try:
-            if db is None:
-                 print("[WARNING] Firestore not initialized, returning None for profile")
-                 return None
-            doc_ref = db.collection('users').document(user_id)
-            doc = doc_ref.get()
-            if doc.exists:
-                return doc.to_dict()
-            return None
-        except Exception as e:
-            print(f"Error fetching farmer profile: {e}")
-            return None
+        # Cached and batched with the other profile readers (services/Profiles)
+        return profile_repository.get(user_id)
 
     def get_business_metadata(self, business_title_or_id):
         # normalize input
@@ -71,7 +235,8 @@ class SustainabilityRoadmapGenerator:
                 return b
         return {"title": business_title_or_id, "id": "unknown"}
 
-    def generate_roadmap(self, user_id, business_name, language='en'):
+    def build_context(self, user_id, business_name, language='en'):
+        """Profile + business context shared by the single-prompt and section-parallel modes."""
         # 1. Fetch Data
         profile = self.get_farmer_profile(user_id)
         if not profile:
@@ -102,6 +267,7 @@ class SustainabilityRoadmapGenerator:
             "land_size": f"{profile.get('landSize', profile.get('land_size', 0))} {profile.get('land_unit', 'acres')}",
             "capital": f"₹{profile.get('capital', 'Not specified')}",
             "business_name": business_meta['title'],
+            "business_id": business_meta['id'] if business_meta['id'] != "unknown" else business_meta['title'],
             "age": profile.get('age', 35),
             "experience": profile.get('experience_years', profile.get('experience', 'Not specified')),
             "soil_type": profile.get('soil_type', 'Not specified'),
@@ -112,95 +278,68 @@ class SustainabilityRoadmapGenerator:
             "language_name": {"EN": "English", "HI": "Hindi", "MR": "Marathi"}[lang_upper]
         }
 
-        # Language-specific labels/headers for the prompt
-        LANG_CONFIG = {
-            "EN": {
-                "milestone": "Strategic Milestone Name",
-                "focus": "Strategic Focus",
-                "actions": "Key Actions",
-                "profit": "Expected Profit",
-                "year_term": "Year",
-                "headers": ["Overview", "1. 10-Year Growth & Profit Planner", "2. Labor & Aging Analysis", "3. Sustainability & Succession", "4. Financial Resilience", "5. Final Verdict"]
-            },
-            "HI": {
-                "milestone": "रणनीतिक उपलब्धि का नाम",
-                "focus": "रणनीतिक फोकस",
-                "actions": "मुख्य कार्य",
-                "profit": "अपेक्षित लाभ",
-                "year_term": "वर्ष",
-                "headers": ["अवलोकन", "1. 10-वर्षीय विकास और लाभ योजनाकार", "2. श्रम और उम्र बढ़ने का विश्लेषण", "3. स्थिरता और उत्तराधिकार", "4. वित्तीय लचीलापन", "5. अंतिम निर्णय"]
-            },
-            "MR": {
-                "milestone": "धोरणात्मक मैलाचा दगड",
-                "focus": "धोरणात्मक लक्ष",
-                "actions": "मुख्य कृती",
-                "profit": "अपेक्षित नफा",
-                "year_term": "वर्ष",
-                "headers": ["आढावा", "1. 10-वर्षांचे विकास आणि नफा नियोजक", "2. श्रम आणि वृद्धत्व विश्लेषण", "3. शाश्वतता आणि उत्तराधिकार", "4. आर्थिक लवचिकता", "5. अंतिम निकाल"]
-            }
-        }
-        
-        cfg = LANG_CONFIG[lang_upper]
-
-        # 3. New Specific Roadmap Prompt
-        prompt = f"""You are an expert Agricultural Decision Intelligence Consultant. 
-Create a HIGHLY DETAILED and professional 10-Year Business Roadmap for '{context['business_name']}'.
-STRICTLY generate the ENTIRE response in {context['language_name']} language. EVERY SINGLE WORD must be in {context['language_name']}.
+        context['farmer_context'] = f"""Business: {context['business_name']}
 
 Farmer Profile:
 - Name: {context['farmer_name']}
-- Age: {context['age']} (Crucial for labor/aging analysis)
+- Age: {context['age']} (Crucial for labor/aging analysis; plan for ages {context['age']} to {context['age']+10})
 - Location: {context['location']}
 - Land: {context['land_size']} (Soil: {context['soil_type']}, Water: {context['water_availability']})
 - Current Crops: {context['crops_grown']}
 - Starting Capital: {context['capital']}
 - Experience: {context['experience']} years
 - Market Access: {context['market_access']}
-- Risk Tolerance: {context['risk_preference']}
-
-Guidelines:
-1. Provide granular, actionable advice tailored to the specific context (soil, water, experience).
-2. For each year, explain WHY these actions are chosen and HOW they lead to the profit goals.
-3. STRICTLY NO EMOJIS. Use professional Markdown formatting.
-4. Ensure the 10-year timeline shows clear progression (Scale-up, Diversification, Automation).
-5. All assumptions, costs, and market details MUST reflect the Indian agricultural economy.
-6. All financial values MUST be in Indian Rupees (₹). Do NOT use dollars ($).
-7. Output the response in {context['language_name']}.
+- Risk Tolerance: {context['risk_preference']}"""
+        return context, lang_upper
 
-Structure (Use these exact Headers in {context['language_name']}):
+    def cache_key(self, user_id, context, lang_upper):
+        return self.cache.make_key(user_id, context['business_id'], lang_upper, context['farmer_context'])
 
-# {cfg['headers'][0]}
-[A comprehensive 3-5 sentence summary in {context['language_name']}. Analyze how {context['business_name']} integrated with current farm resources and the farmer's experience can lead to long-term success in the Indian context.]
-
-# {cfg['headers'][1]}
-[Provide a meticulous Year-wise breakdown ({cfg['year_term']} 1 to {cfg['year_term']} 10). Each year must be a clear block:]
-
-## {cfg['year_term']} 1: [{cfg['milestone']}]
-- **{cfg['focus']}**: [Detailed objective for the year]
-- **{cfg['actions']}**: [3-5 highly specific, numbered steps in {context['language_name']}. Mention Indian equipment or methods where applicable.]
-- **{cfg['profit']}**: ₹[Amount in Indian Rupees]
-
-... (Repeat for {cfg['year_term']} 2 through 10, showing scale-up and reinvestment) ...
-
-# {cfg['headers'][2]}
-[Explain how labor needs will be managed as the farmer ages from {context['age']} to {context['age']+10} in {context['language_name']}. Specify hardware/automation triggers for Year 4, 7, and 10 to reduce physical strain.]
-
-# {cfg['headers'][3]}
-[Document soil health management, resource recycling (e.g., waste-to-value), and a legacy plan for multi-generational wealth in {context['language_name']}.]
-
-# {cfg['headers'][4]}
-[Compare risk mitigation strategies for a 'Bad Year' in the early stage (Years 1-3) vs. the mature stage (Years 7-10) in {context['language_name']}. Focus on cash reserves and insurance.]
+    def generate_roadmap(self, user_id, business_name, language='en', mode=None):
+        """
+        mode='parallel' (default, ROADMAP_GENERATION_MODE) fires one prompt per
+        section concurrently; mode='single' keeps the one-shot generation.
+        """
+        context, lang_upper = self.build_context(user_id, business_name, language)
+        key = self.cache_key(user_id, context, lang_upper)
+        cached = self.cache.get(key)
+        if cached is not None:
+            print(f"[ROADMAP] Cache hit for {business_name} in {lang_upper}")
+            return cached
+
+        mode = (mode or os.getenv("ROADMAP_GENERATION_MODE", "parallel")).lower()
+        if mode == "single":
+            roadmap = self._generate_single(context, lang_upper)
+        else:
+            roadmap = None
+            for event in self._stream_sections(context, lang_upper):
+                if event['type'] in ('done', 'partial'):
+                    roadmap = event['roadmap']
+                elif event['type'] == 'error':
+                    return self._error_roadmap(business_name)
+
+        self.cache.put(key, roadmap, context['business_name'])
+        return roadmap
 
-# {cfg['headers'][5]}
-[Detailed feasibility score (0-100) and analysis of long-term Return on Investment (ROI) in {context['language_name']}.]
+    def _generate_single(self, context, lang_upper):
+        business_name = context['business_name']
+        cfg = LANG_CONFIG[lang_upper]
 
-DISCLAIMER: This roadmap is an AI-generated simulation based on provided data and regional averages. Actual results may vary due to market fluctuations, climate conditions, and individual management. This should not be considered financial or legal advice. Consult with local agricultural experts before major investments.
-"""
+        # 3. Roadmap prompt: frozen per-language rules, then business + profile
+        rules = prompt_assembler.static(
+            ("roadmap", lang_upper),
+            lambda: ROADMAP_RULES.format(language_name=context['language_name'], disclaimer=ROADMAP_DISCLAIMER, **cfg)
+        )
+        prompt = prompt_assembler.text(
+            rules,
+            dynamic_context=context['farmer_context'],
+            turn=f"Create the 10-Year Business Roadmap for '{context['business_name']}' now, in {context['language_name']}."
+        )
         
         # 4. Call LLM
         print(f"[ROADMAP] Generating roadmap for {business_name} in {lang_upper} using markdown prompt...")
         try:
-            response = self.llm.invoke(prompt)
+            response = self.llm.invoke(prompt, config={"callbacks": prefill_tracker.callbacks("roadmap", rules)})
             content = response.content.strip()
             
             # DEBUG: Show raw response
@@ -215,98 +354,146 @@ DISCLAIMER: This roadmap is an AI-generated simulation based on provided data an
 
         except Exception as e:
             print(f"[ROADMAP ERROR] Generation failed: {e}")
-            # Return a safe fallback structure so the UI doesn't crash
-            return {
-                "title": f"Roadmap for {business_name} (Error)",
-                "overview": "Could not generate detailed roadmap due to high server load.",
-                "phases": [],
-                "final_verdict": "Retry Later"
-            }
+            return self._error_roadmap(business_name)
+
+    def _error_roadmap(self, business_name):
+        # Return a safe fallback structure so the UI doesn't crash
+        return {
+            "title": f"Roadmap for {business_name} (Error)",
+            "overview": "Could not generate detailed roadmap due to high server load.",
+            "phases": [],
+            "final_verdict": "Retry Later"
+        }
 
-    def parse_markdown_roadmap(self, text, business_name, language='EN'):
+    def _section_turn(self, section, task, context, cfg):
+        if task is None:
+            start, end, stage = ROADMAP_YEAR_GROUPS[section]
+            return ROADMAP_YEARS_TASK.format(start=start, end=end, stage=stage, language_name=context['language_name'], **cfg)
+        return task.format(language_name=context['language_name'], **cfg)
+
+    def _generate_section(self, section, prompt, rules):
+        with llm_slots.slot(f"roadmap:{section}"):
+            response = self.llm.invoke(prompt, config={"callbacks": prefill_tracker.callbacks("roadmap_section", rules)})
+        return self._clean_section(section, response.content)
+
+    @staticmethod
+    def _clean_section(section, text):
+        """Drop echoed top-level headers, preamble before the first year and any disclaimer."""
+        text = _DISCLAIMER_RE.sub("", text or "")
+        text = _TOP_HEADER_RE.sub("", text)
+        if section in ROADMAP_YEAR_GROUPS and "## " in text:
+            text = text[text.index("## "):]
+        return text.strip()
+
+    def assemble_sections(self, sections, lang_upper):
+        """Stitch section bodies back into the single-prompt markdown layout."""
+        headers = LANG_CONFIG[lang_upper]["headers"]
+        blocks = [f"# {headers[0]}\n{sections.get('overview', '')}"]
+        years = "\n\n".join(sections.get(key, "") for key in ROADMAP_YEAR_GROUPS if sections.get(key))
+        blocks.append(f"# {headers[1]}\n{years}")
+        for section, header_index, _ in ROADMAP_SECTIONS:
+            if section in ROADMAP_SECTION_FIELDS and section != "overview":
+                blocks.append(f"# {headers[header_index]}\n{sections.get(section, '')}")
+        blocks.append(f"DISCLAIMER: {ROADMAP_DISCLAIMER}")
+        return "\n\n".join(blocks)
+
+    def stream_roadmap(self, user_id, business_name, language='en'):
         """
-        Parses the multi-section Markdown output into a dictionary for the frontend.
+        Section-parallel generation. Yields a "start" event, then one "section"
+        (or "years") event per section in completion order, then "done" with the
+        same roadmap dict the single-prompt mode returns. Failed sections are
+        retried ROADMAP_SECTION_RETRIES times; if some still fail, the last
+        event is "partial" (listing them in "missing") instead of "done". A
+        cached roadmap is sent straight away as "done" with cached=True.
         """
-        import re
-        
-        title_prefix = "10-Year Sustainability & Profit"
-        roadmap = {
-            "title": f"{title_prefix} Planner for {business_name}",
-            "overview": "",
-            "years": [],
-            "labor_analysis": "",
-            "sustainability_plan": "",
-            "resilience_strategy": "",
-            "verdict": "",
-            "disclaimer": ""
-        }
-
-        # Multi-language header mapping for the parser
-        # We look for ANY of these patterns to demarcate sections
-        HEADERS = {
-            "overview": r'# (?:Overview|अवलोकन|आढावा|Crop Overview|फसल अवलोकन|पीक आढावा)',
-            "planner": r'# (?:1\. 10-Year Growth & Profit Planner|1\. 10-वर्षीय विकास और लाभ योजनाकार|1\. 10-वर्षांचे विकास आणि नफा नियोजक|1\. Crop Lifecycle Planner|1\. फसल जीवनचक्र योजनाकार|1\. पीक जीवनचक्र नियोजक)',
-            "labor": r'# (?:2\. Labor & Aging Analysis|2\. श्रम और उम्र बढ़ने का विश्लेषण|2\. श्रम आणि वृद्धत्व विश्लेषण|2\. Resource & Labor Management|2\. संसाधन और श्रम प्रबंधन|2\. संसाधन आणि श्रम व्यवस्थापन)',
-            "sustainability": r'# (?:3\. Sustainability & Succession|3\. स्थिरता और उत्तराधिकार|3\. शाश्वतता आणि उत्तराधिकार|3\. Quality & Harvest Sustainability|3\. गुणवत्ता और फसल स्थिरता|3\. गुणवत्ता आणि पीक शाश्वतता)',
-            "resilience": r'# (?:4\. Financial Resilience|4\. वित्तीय लचीलापन|4\. आर्थिक लवचिकता|4\. Market & Risk Management|4\. बाजार और जोखिम प्रबंधन|4\. बाजार आणि जोखीम व्यवस्थापन)',
-            "verdict": r'# (?:5\. Final Verdict|5\. अंतिम निर्णय|5\. अंतिम निकाल|5\. Final Harvest Verdict|5\. अंतिम फसल निर्णय|5\. अंतिम पीक निकाल)'
+        context, lang_upper = self.build_context(user_id, business_name, language)
+        key = self.cache_key(user_id, context, lang_upper)
+        cached = self.cache.get(key)
+        if cached is not None:
+            print(f"[ROADMAP] Cache hit for {business_name} in {lang_upper}")
+            yield {"type": "start", "title": cached.get('title'), "sections": [], "cached": True}
+            yield {"type": "done", "roadmap": cached, "cached": True}
+            return
+
+        for event in self._stream_sections(context, lang_upper):
+            if event['type'] == 'done':
+                self.cache.put(key, event['roadmap'], context['business_name'])
+            yield event
+
+    def _stream_sections(self, context, lang_upper):
+        business_name = context['business_name']
+        cfg = LANG_CONFIG[lang_upper]
+        rules = prompt_assembler.static(
+            ("roadmap_section", lang_upper),
+            lambda: ROADMAP_SECTION_RULES.format(language_name=context['language_name'])
+        )
+        yield {"type": "start", "title": f"{ROADMAP_PARSER.title_prefix} Planner for {context['business_name']}", "sections": [s[0] for s in ROADMAP_SECTIONS]}
+
+        prompts = {
+            section: prompt_assembler.text(
+                rules,
+                dynamic_context=context['farmer_context'],
+                turn=self._section_turn(section, task, context, cfg)
+            )
+            for section, _, task in ROADMAP_SECTIONS
         }
 
-        def extract_between(start_regex, end_regex=None):
-            if end_regex:
-                pattern = rf'{start_regex}\n(.*?)(?={end_regex}|\Z)'
-            else:
-                pattern = rf'{start_regex}\n(.*)'
-            match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-            return match.group(1).strip() if match else ""
-
-        roadmap['overview'] = extract_between(HEADERS['overview'], HEADERS['planner'])
-        roadmap['labor_analysis'] = extract_between(HEADERS['labor'], HEADERS['sustainability'])
-        roadmap['sustainability_plan'] = extract_between(HEADERS['sustainability'], HEADERS['resilience'])
-        roadmap['resilience_strategy'] = extract_between(HEADERS['resilience'], HEADERS['verdict'])
-        
-        # Extract verdict and disclaimer
-        verdict_block = extract_between(HEADERS['verdict'])
-        if "DISCLAIMER:" in verdict_block or "अस्वीकरण:" in verdict_block:
-            parts = re.split(r'(?:DISCLAIMER:|अस्वीकरण:)', verdict_block, flags=re.IGNORECASE)
-            roadmap['verdict'] = parts[0].strip()
-            roadmap['disclaimer'] = parts[1].strip()
-        else:
-            roadmap['verdict'] = verdict_block
+        print(f"[ROADMAP] Generating {len(prompts)} sections for {business_name} in {lang_upper} "
+              f"(parallel, {llm_slots.limit} LLM slots)...")
+        sections = {}
+        retries = int(os.getenv("ROADMAP_SECTION_RETRIES", "1"))
+        attempts = dict.fromkeys(prompts, 0)
+        # Workers never exceed the LLM slots, so sections not yet started can be
+        # cancelled if the client goes away mid-stream. Each section runs in a copy
+        # of this context, so its LLM span joins the request's trace.
+        pool = ThreadPoolExecutor(max_workers=min(len(prompts), llm_slots.limit))
 
-        # Parse Years/Phases (Flexible for "Year", "वर्ष", "Phase", etc.)
-        year_pattern = r'## (?:Year|वर्ष|Phase) (\d+): (.*?)\n(.*?)(?=## (?:Year|वर्ष|Phase) \d+:|\Z|# [2345])'
-        year_blocks = re.findall(year_pattern, text, re.DOTALL | re.IGNORECASE)
-        
-        # Labels for inner fields can also be translated
-        focus_labels = r'(?:\*\*Strategic Focus\*\*|\*\*रणनीतिक फोकस\*\*|\*\*धोरणात्मक लक्ष\*\*|\*\*Critical Focus\*\*|\*\*महत्वपूर्ण फोकस\*\*|\*\*गंभीर लक्ष\*\*)'
-        profit_labels = r'(?:\*\*Expected Profit\*\*|\*\*अपेक्षित लाभ\*\*|\*\*अपेक्षित नफा\*\*|\*\*Projected Value/Yield\*\*|\*\*अनुमानित मूल्य/उपज\*\*|\*\*अपेक्षित मूल्य/उत्पन्न\*\*)'
-        actions_labels = r'(?:\*\*Key Actions\*\*|\*\*मुख्य कार्य\*\*|\*\*मुख्य कृती\*\*|\*\*Required Actions\*\*|\*\*आवश्यक कार्य\*\*|\*\*आवश्यक कृती\*\*)'
-
-        for year_num, goal, content in year_blocks:
-            year_data = {
-                "year": f"{'Year' if language=='EN' else 'वर्ष'} {year_num}",
-                "goal": goal.strip(),
-                "focus": "",
-                "actions": [],
-                "profit": ""
-            }
-            
-            focus_match = re.search(rf'{focus_labels}:\s*(.*)', content, re.IGNORECASE)
-            year_data['focus'] = focus_match.group(1).strip() if focus_match else ""
-            
-            profit_match = re.search(rf'{profit_labels}:\s*(.*)', content, re.IGNORECASE)
-            year_data['profit'] = profit_match.group(1).strip() if profit_match else ""
-            
-            actions_match = re.search(rf'{actions_labels}:\s*(.*?)(?={profit_labels}|\Z)', content, re.DOTALL | re.IGNORECASE)
-            if actions_match:
-                raw_actions = actions_match.group(1).strip()
-                lines = raw_actions.split('\n')
-                year_data['actions'] = [re.sub(r'^[-*]\s*', '', l).strip() for l in lines if l.strip()]
-
-            roadmap['years'].append(year_data)
+        def submit(section):
+            attempts[section] += 1
+            return pool.submit(contextvars.copy_context().run, self._generate_section, section, prompts[section], rules)
 
-        if not roadmap['years']:
-            print("[ROADMAP WARNING] Regex year/phase extraction failed. Possible format mismatch.")
+        try:
+            pending = {submit(section): section for section in prompts}
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    section = pending.pop(future)
+                    try:
+                        text = future.result()
+                        if not text:
+                            raise ValueError("empty section")
+                    except Exception as e:
+                        if attempts[section] <= retries:
+                            print(f"[ROADMAP] Section {section} failed ({e}), retrying")
+                            pending[submit(section)] = section
+                        else:
+                            print(f"[ROADMAP ERROR] Section {section} failed after {attempts[section]} attempts: {e}")
+                        continue
+                    sections[section] = text
+                    if section in ROADMAP_YEAR_GROUPS:
+                        years = self.parse_markdown_roadmap(text, context['business_name'], lang_upper)['years']
+                        yield {"type": "years", "section": section, "years": years}
+                    else:
+                        yield {"type": "section", "section": section, "field": ROADMAP_SECTION_FIELDS[section], "content": text}
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if not sections:
+            yield {"type": "error", "error": "Could not generate roadmap due to high server load."}
+            return
+
+        print(f"[ROADMAP] {len(sections)}/{len(prompts)} sections generated for {business_name}")
+        markdown = self.assemble_sections(sections, lang_upper)
+        roadmap = self.parse_markdown_roadmap(markdown, context['business_name'], lang_upper)
+        missing = [section for section in prompts if section not in sections]
+        if missing:
+            # Not presented as a finished roadmap (and never cached)
+            roadmap['missing_sections'] = missing
+            yield {"type": "partial", "roadmap": roadmap, "missing": missing,
+                   "error": f"Some sections could not be generated: {', '.join(missing)}"}
+            return
+        yield {"type": "done", "roadmap": roadmap}
 
-        return roadmap
+    def parse_markdown_roadmap(self, text, business_name, language='EN'):
+        """Parses the multi-section Markdown output into a dictionary for the frontend."""
+        return ROADMAP_PARSER.parse(text, business_name, language)
@@ -0,0 +1,313 @@
+"""
+Local background job queue for long LLM generations.
+
+Roadmaps, crop plans and advisor initialisation can keep Ollama busy for
+30-120 s on CPU. Instead of holding a Flask worker for that long, the endpoint
+submits a job and returns its id at once; a small thread pool runs the
+generation (the work is waiting on Ollama's HTTP API, so threads are enough)
+and the client polls /api/jobs/<id> or follows /api/jobs/<id>/events.
+
+Jobs are persisted in SQLite, so a restart re-queues unfinished work and
+finished results stay readable until their TTL. Every job records the process
+that owns it ("host:pid"), and a process only starts a job it claimed with a
+conditional UPDATE, so when several processes share the queue (uvicorn or
+gunicorn workers, the Flask reloader) a job runs once: recover() only takes
+over jobs whose owner is gone. Identical submissions (same
+kind + payload + user) while a job is queued, running or still retained are
+folded onto the existing job. Kinds whose result only makes sense in the
+process that produced it (an in-memory advisor session) are registered with
+reuse_results=False and are only folded onto queued or running jobs.
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from middleware.tracing import tracer
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DEFAULT_QUEUE_PATH = BASE_DIR / 'cache' / 'jobs.sqlite3'
+
+ACTIVE_STATES = ("queued", "running")
+FINAL_STATES = ("done", "failed")
+
+
+def make_dedup_key(kind: str, payload: dict, user_id: str = None) -> str:
+    raw = json.dumps({"kind": kind, "user": user_id, "payload": payload}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class JobQueue:
+    def __init__(self, path=None, workers: int = None, result_ttl: int = None):
+        self.path = Path(path or os.getenv("JOB_QUEUE_PATH", DEFAULT_QUEUE_PATH))
+        self.workers = workers or int(os.getenv("JOB_WORKERS", "4"))
+        self.result_ttl = result_ttl if result_ttl is not None else int(os.getenv("JOB_RESULT_TTL", "3600"))
+        self._handlers = {}
+        self._reuse_results = {}
+        self._lock = threading.Lock()
+        # Progress events of jobs running in this process (not persisted)
+        self._events = {}
+        self._changed = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._last_purge = 0.0
+        self.counters = {"submitted": 0, "deduplicated": 0, "completed": 0, "failed": 0, "recovered": 0}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                user_id TEXT,
+                dedup_key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                expires_at REAL,
+                owner TEXT
+            )"""
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            # Queues created before jobs had owners; their unfinished jobs count as orphaned
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_dedup ON jobs (dedup_key, status)")
+        self._conn.commit()
+
+    def register(self, kind: str, handler, reuse_results: bool = True):
+        """
+        handler(payload, progress) -> JSON-serialisable result; progress(event) feeds SSE followers.
+        With reuse_results=False an identical submission never gets a finished job's result.
+        """
+        self._handlers[kind] = handler
+        self._reuse_results[kind] = reuse_results
+
+    def submit(self, kind: str, payload: dict, user_id: str = None, dedup_key: str = None):
+        """Queue a job; returns (job dict, deduplicated)."""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        self._maybe_purge()
+        dedup_key = dedup_key or make_dedup_key(kind, payload, user_id)
+        now = time.time()
+
+        reusable = "status IN ('queued', 'running')"
+        if self._reuse_results.get(kind, True):
+            reusable += " OR (status='done' AND expires_at > :now)"
+
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT * FROM jobs WHERE dedup_key=:key AND ({reusable}) ORDER BY created_at DESC LIMIT 1",
+                {"key": dedup_key, "now": now}
+            ).fetchone()
+            if row is not None:
+                self.counters["deduplicated"] += 1
+                print(f"[JOBS] {kind} deduplicated onto {row['id'][:8]} ({row['status']})")
+                return self._to_dict(row), True
+
+            job_id = str(uuid.uuid4())
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, user_id, dedup_key, payload, status, created_at, owner) VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, user_id, dedup_key, json.dumps(payload, ensure_ascii=False), now, self.owner)
+            )
+            self._conn.commit()
+            self._events[job_id] = []
+            self.counters["submitted"] += 1
+
+        # The job's span continues the submitting request's trace
+        self._pool.submit(contextvars.copy_context().run, self._run, job_id, kind, payload)
+        print(f"[JOBS] Queued {kind} job {job_id[:8]}")
+        return self.get(job_id), False
+
+    def _claim(self, job_id: str, statuses: tuple, owner, **fields) -> bool:
+        """Atomically take job_id over from `owner` if it is still in one of `statuses`."""
+        columns = ", ".join(f"{name}=?" for name in fields)
+        marks = ", ".join("?" for _ in statuses)
+        with self._lock:
+            claimed = self._conn.execute(
+                f"UPDATE jobs SET owner=?, {columns} WHERE id=? AND owner IS ? AND status IN ({marks})",
+                (self.owner, *fields.values(), job_id, owner, *statuses)
+            ).rowcount == 1
+            self._conn.commit()
+        return claimed
+
+    def _run(self, job_id: str, kind: str, payload: dict):
+        if not self._claim(job_id, ("queued",), self.owner, status="running", started_at=time.time()):
+            print(f"[JOBS] {kind} job {job_id[:8]} was taken over by another process")
+            return
+        with self._changed:
+            self._changed.notify_all()
+
+        def progress(event):
+            with self._changed:
+                self._events.setdefault(job_id, []).append(event)
+                self._changed.notify_all()
+
+        started = time.time()
+        try:
+            with tracer.span(f"job {kind}", **{"job.id": job_id}):
+                result = self._handlers[kind](payload, progress)
+            finished = time.time()
+            self._set(job_id, status="done", result=json.dumps(result, ensure_ascii=False),
+                      finished_at=finished, expires_at=finished + self.result_ttl)
+            with self._lock:
+                self.counters["completed"] += 1
+            print(f"[JOBS] {kind} job {job_id[:8]} done in {finished - started:.1f}s")
+        except Exception as e:
+            finished = time.time()
+            self._set(job_id, status="failed", error=str(e), finished_at=finished, expires_at=finished + self.result_ttl)
+            with self._lock:
+                self.counters["failed"] += 1
+            print(f"[JOBS] {kind} job {job_id[:8]} failed: {e}")
+
+    def _set(self, job_id: str, **fields):
+        columns = ", ".join(f"{name}=?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id=?", (*fields.values(), job_id))
+            self._conn.commit()
+        with self._changed:
+            self._changed.notify_all()
+
+    def _to_dict(self, row) -> dict:
+        job = {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "user_id": row["user_id"],
+            "status": row["status"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "expires_at": row["expires_at"],
+        }
+        if row["status"] == "done":
+            job["result"] = json.loads(row["result"]) if row["result"] else None
+        elif row["status"] == "failed":
+            job["error"] = row["error"]
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def follow(self, job_id: str, heartbeat: float = 15.0):
+        """
+        Yields ("status", job) whenever the status changes, ("progress", event)
+        for each progress event, and ends after the final status. ("heartbeat",
+        None) is yielded when nothing happened for `heartbeat` seconds.
+        """
+        seen_events, last_status = 0, None
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return
+            events = self._events.get(job_id, [])
+            for event in events[seen_events:]:
+                yield "progress", event
+            seen_events = len(events)
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield "status", job
+            if job["status"] in FINAL_STATES:
+                return
+            with self._changed:
+                changed = self._changed.wait_for(
+                    lambda: len(self._events.get(job_id, [])) > seen_events or self._status(job_id) != last_status,
+                    timeout=heartbeat
+                )
+            if not changed:
+                yield "heartbeat", None
+
+    def _status(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return row["status"] if row is not None else None
+
+    def _owner_alive(self, owner) -> bool:
+        host, _, pid = str(owner or "").rpartition(":")
+        if not pid.isdigit():
+            return False
+        if host != socket.gethostname():
+            return True  # can't tell; leave it to its own host
+        if int(pid) == os.getpid():
+            return owner == self.owner
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass  # exists, owned by another user
+        return True
+
+    def recover(self) -> int:
+        """Re-queue jobs whose owning process is gone (call after register()); each job is claimed by one process."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, payload, status, owner FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+        recovered = 0
+        for row in rows:
+            if row["id"] in self._events or self._owner_alive(row["owner"]):
+                continue
+            if row["kind"] not in self._handlers:
+                self._claim(row["id"], (row["status"],), row["owner"], status="failed", error="No handler after restart",
+                            finished_at=time.time(), expires_at=time.time() + self.result_ttl)
+                continue
+            if not self._claim(row["id"], (row["status"],), row["owner"], status="queued", started_at=None):
+                continue  # another process recovered it first
+            self._events[row["id"]] = []
+            self._pool.submit(self._run, row["id"], row["kind"], json.loads(row["payload"]))
+            recovered += 1
+        if recovered:
+            with self._lock:
+                self.counters["recovered"] += recovered
+            print(f"[JOBS] Re-queued {recovered} unfinished jobs")
+        return recovered
+
+    def _maybe_purge(self):
+        if time.time() - self._last_purge > 60:
+            self.purge_expired()
+
+    def purge_expired(self) -> int:
+        """Drop finished jobs past their TTL."""
+        now = time.time()
+        self._last_purge = now
+        with self._lock:
+            expired = [r["id"] for r in self._conn.execute(
+                "SELECT id FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+            ).fetchall()]
+            if expired:
+                self._conn.execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+                self._conn.commit()
+            for job_id in expired:
+                self._events.pop(job_id, None)
+        if expired:
+            print(f"[JOBS] Purged {len(expired)} expired jobs")
+        return len(expired)
+
+    def stats(self) -> dict:
+        with self._lock:
+            by_status = {r["status"]: r["n"] for r in self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"
+            ).fetchall()}
+            counters = dict(self.counters)
+        counters.update({"workers": self.workers, "result_ttl": self.result_ttl, "jobs": by_status})
+        return counters
+
+
+# Singleton Instance
+job_queue = JobQueue()
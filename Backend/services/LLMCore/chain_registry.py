@@ -0,0 +1,88 @@
+"""
+Process-wide registry of compiled LangChain prompts and chains.
+
+Prompt templates and `prompt | llm | parser` pipelines are immutable once
+built, so each (engine, purpose, language) chain is compiled once - at engine
+start-up via `warm()` or lazily on first use - and then reused by every
+request instead of being rebuilt per call.
+"""
+
+import threading
+
+from langchain_core.messages import BaseMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.outputs import ChatGeneration, Generation
+
+SUPPORTED_LANGUAGES = ("English", "Hindi", "Marathi")
+
+
+class ChainRegistry:
+    def __init__(self):
+        self._chains = {}
+        # Re-entrant: builders may fetch shared pieces (e.g. the LLM) from the registry
+        self._lock = threading.RLock()
+        self.builds = 0
+
+    def get(self, key, builder):
+        """Return the chain registered under `key`, building it once with `builder()`."""
+        chain = self._chains.get(key)
+        if chain is not None:
+            return chain
+        with self._lock:
+            chain = self._chains.get(key)
+            if chain is None:
+                chain = builder()
+                self._chains[key] = chain
+                self.builds += 1
+        return chain
+
+    def warm(self, builders: dict):
+        """Eagerly compile a {key: builder} mapping (called at start-up)."""
+        for key, builder in builders.items():
+            self.get(key, builder)
+
+    def keys(self):
+        return list(self._chains.keys())
+
+    def clear(self):
+        with self._lock:
+            self._chains.clear()
+
+
+class InlineStrOutputParser(StrOutputParser):
+    """
+    StrOutputParser for the streamed chat chains, as a plain pass-through:
+
+    - the stock async path parses every token in the default thread pool, a
+      thread hop per token per stream;
+    - the stock transform tees the LLM stream for tracing and never closes
+      that copy, so closing an abandoned chat stream left the Ollama request
+      generating to num_predict. Closing this parser closes the LLM stream.
+    """
+
+    def _text(self, chunk) -> str:
+        if isinstance(chunk, BaseMessage):
+            return self.parse_result([ChatGeneration(message=chunk)])
+        return self.parse_result([Generation(text=chunk)])
+
+    def transform(self, input, config=None, **kwargs):
+        try:
+            for chunk in input:
+                yield self._text(chunk)
+        finally:
+            close = getattr(input, "close", None)
+            if close is not None:
+                close()
+
+    async def atransform(self, input, config=None, **kwargs):
+        try:
+            async for chunk in input:
+                yield self._text(chunk)
+        finally:
+            aclose = getattr(input, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+
+# Singleton Instance
+chain_registry = ChainRegistry()
@@ -0,0 +1,97 @@
+"""
+Process-wide limit on concurrent Ollama generations.
+
+Fan-out call sites (section-parallel roadmaps, background jobs) may run many
+prompts at once, but Ollama only decodes OLLAMA_NUM_PARALLEL requests in
+parallel and queues the rest. Every fanned-out LLM call takes a slot here
+first, so the backend never has more generations in flight than the server
+can actually run.
+"""
+
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+
+
+class LLMSlots:
+    def __init__(self, limit: int = None):
+        self.limit = max(1, int(limit or os.getenv("LLM_MAX_CONCURRENCY", "2")))
+        self._semaphore = threading.BoundedSemaphore(self.limit)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.acquired = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+
+    @contextmanager
+    def slot(self, site: str = "llm"):
+        """Hold one generation slot for the duration of the block."""
+        started = time.time()
+        if not self._semaphore.acquire(blocking=False):
+            print(f"[LLM-SLOTS] {site}: waiting for a free slot ({self.limit} in flight)")
+            self._semaphore.acquire()
+            with self._lock:
+                self.waited += 1
+                self.wait_seconds += time.time() - started
+        with self._lock:
+            self.in_flight += 1
+            self.acquired += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "acquired": self.acquired,
+                "waited": self.waited,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+class ShardedAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    Round-robins requests over several connection pools. httpcore rescans its
+    whole pool on every request event, which is quadratic with hundreds of
+    concurrent streams in one pool; shards keep each scan short.
+    """
+
+    def __init__(self, shards: int, connections: int):
+        per_shard = max(1, -(-connections // shards))
+        limits = httpx.Limits(max_connections=per_shard, max_keepalive_connections=per_shard)
+        self._shards = [httpx.AsyncHTTPTransport(limits=limits) for _ in range(shards)]
+        self._next = itertools.count()
+
+    async def handle_async_request(self, request):
+        return await self._shards[next(self._next) % len(self._shards)].handle_async_request(request)
+
+    async def aclose(self):
+        for shard in self._shards:
+            await shard.aclose()
+
+
+def chat_client_kwargs() -> dict:
+    """
+    ChatOllama client settings for the streaming chat LLMs. Each open chat
+    stream holds one HTTP connection to Ollama; beyond OLLAMA_MAX_CONNECTIONS
+    (httpx default: 100) streams wait for a free one, so the ASGI mode raises it.
+    """
+    limit = max(1, int(os.getenv("OLLAMA_MAX_CONNECTIONS", "100")))
+    shards = max(1, -(-limit // int(os.getenv("OLLAMA_POOL_SHARD_SIZE", "32"))))
+    return {
+        "client_kwargs": {"limits": httpx.Limits(max_connections=limit, max_keepalive_connections=limit)},
+        "async_client_kwargs": {"transport": ShardedAsyncTransport(shards, limit)},
+    }
+
+
+# Singleton Instance
+llm_slots = LLMSlots()
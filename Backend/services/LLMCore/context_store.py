@@ -0,0 +1,134 @@
+"""
+Server-side handles for analysis context used by follow-up chats.
+
+An analysis (waste options, farm health report) is rendered once into a
+compact, whitespace-free, field-pruned JSON string and stored under an id.
+Follow-up questions reference the id, so every turn embeds the exact same
+bytes in the system prompt - which keeps the prompt prefix identical and lets
+Ollama reuse its KV cache instead of re-prefilling pretty-printed JSON.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Keys that never help the model answer a follow-up question
+DROP_KEYS = {"id", "error", "image", "url", "timestamp", "read", "source"}
+EMPTY_VALUES = (None, "", "N/A", "n/a", "...")
+
+
+def _prune(value):
+    """Recursively drop empty / placeholder values and collapse 1-item lists."""
+    if isinstance(value, dict):
+        pruned = {}
+        for key, item in value.items():
+            if key in DROP_KEYS:
+                continue
+            item = _prune(item)
+            if item in EMPTY_VALUES or item == [] or item == {}:
+                continue
+            pruned[key] = item
+        return pruned
+    if isinstance(value, list):
+        items = [_prune(v) for v in value]
+        items = [v for v in items if v not in EMPTY_VALUES and v != [] and v != {}]
+        return items[0] if len(items) == 1 and not isinstance(items[0], (dict, list)) else items
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def _flatten_waste(context: dict) -> dict:
+    """Turn the legacy nested option schema back into flat {section: content} maps."""
+    options = []
+    for opt in context.get("options", []):
+        details = opt.get("fullDetails") or {}
+        flat = {"title": opt.get("title"), "subtitle": opt.get("subtitle")}
+        if details.get("basicIdea"):
+            flat["basicIdea"] = details["basicIdea"]
+        for section in details.get("sections", []):
+            flat[section.get("title")] = section.get("content")
+        # Already-flat options (raw LLM schema) pass through unchanged
+        for key, item in opt.items():
+            if key not in ("fullDetails",) and key not in flat:
+                flat[key] = item
+        options.append(flat)
+    return {"crop": context.get("crop"), "conclusion": context.get("conclusion"), "options": options}
+
+
+RENDERERS = {
+    "waste": _flatten_waste,
+}
+
+
+def render_compact(kind: str, context) -> str:
+    """Compact JSON rendering (no indentation, no ASCII escaping, pruned fields)."""
+    if isinstance(context, str):
+        try:
+            context = json.loads(context)
+        except (TypeError, ValueError):
+            return " ".join(context.split())
+    if isinstance(context, dict) and kind in RENDERERS:
+        context = RENDERERS[kind](context)
+    # ensure_ascii=False: \uXXXX escapes cost ~6 tokens per Devanagari character
+    return json.dumps(_prune(context), separators=(",", ":"), ensure_ascii=False)
+
+
+class AnalysisContextStore:
+    """Bounded, TTL-expiring map of context_id -> compact context string."""
+
+    def __init__(self, ttl_seconds: int = None, max_entries: int = None):
+        self.ttl_seconds = ttl_seconds or int(os.getenv("CONTEXT_TTL_SECONDS", str(6 * 3600)))
+        self.max_entries = max_entries or int(os.getenv("CONTEXT_MAX_ENTRIES", "5000"))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, kind: str, context) -> str:
+        compact = render_compact(kind, context)
+        # Content-addressed ids: re-sending the same analysis maps onto one entry
+        context_id = f"{kind}_{hashlib.sha256(compact.encode('utf-8')).hexdigest()[:24]}"
+        with self._lock:
+            self._entries[context_id] = (compact, time.time() + self.ttl_seconds)
+            self._entries.move_to_end(context_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return context_id
+
+    def get(self, context_id: str):
+        if not context_id:
+            return None
+        with self._lock:
+            entry = self._entries.get(context_id)
+            if entry is None:
+                return None
+            compact, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[context_id]
+                return None
+            self._entries.move_to_end(context_id)
+            return compact
+
+    def resolve(self, kind: str, context_id: str = None, context=None):
+        """
+        Return (context_id, compact_context) for a chat turn.
+
+        Prefers the stored handle; falls back to rendering (and storing) the raw
+        context sent by older clients or after the handle expired.
+        """
+        compact = self.get(context_id)
+        if compact is not None:
+            return context_id, compact
+        if not context:
+            return None, None
+        context_id = self.put(kind, context)
+        return context_id, self.get(context_id)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Singleton Instance
+context_store = AnalysisContextStore()
@@ -0,0 +1,160 @@
+"""
+Incremental JSON parsing over an LLM token stream.
+
+Structured generations (business recommendations, waste options, fertilizer
+options) are a few thousand tokens long, but each card is usable as soon as its
+own object closes. JSONStreamParser scans the text as it arrives and hands out
+every completed element of the target array - and every completed top-level
+field of an object root - without waiting for the whole document.
+"""
+
+import json
+import re
+
+_FENCE_RE = re.compile(r"```(?:json)?", re.IGNORECASE)
+
+
+class JSONStreamParser:
+    """
+    Feed text chunks; get back ("item", index, value) for each completed
+    element of the target array and ("field", key, value) for each completed
+    top-level field of an object root.
+
+    array_key=None targets a top-level array root (e.g. recommendations);
+    otherwise the array stored under that key of the root object.
+    """
+
+    def __init__(self, array_key: str = None):
+        self.array_key = array_key
+        self.buffer = ""
+        self._pos = 0
+        self._root_start = None
+        self._root_end = None
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._current_key = None
+        self._value_start = None
+        self._target_depth = None
+        self._item_start = None
+        self.items = 0
+
+    def feed(self, chunk: str):
+        """Consume a chunk of model output and return the events it completed."""
+        if not chunk:
+            return []
+        self.buffer += chunk
+        events = []
+        buf = self.buffer
+        while self._pos < len(buf) and self._root_end is None:
+            ch = buf[self._pos]
+            self._scan(ch, buf, events)
+            self._pos += 1
+        return events
+
+    def _scan(self, ch, buf, events):
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if len(self._stack) == 1 and self._stack[0] == "{" and self._value_start is None:
+                    self._last_string = buf[self._string_start + 1:self._pos]
+            return
+
+        depth = len(self._stack)
+        if self._root_start is None:
+            # Skip code fences / preamble until the root container opens
+            if ch in "{[":
+                self._root_start = self._pos
+                self._stack.append(ch)
+                if ch == "[" and self.array_key is None:
+                    self._target_depth = 1
+            return
+
+        if ch == '"':
+            self._in_string = True
+            self._string_start = self._pos
+        elif ch in "{[":
+            if depth == 1 and self._stack[0] == "{" and ch == "[" and self._current_key == self.array_key and self.array_key is not None:
+                self._target_depth = 2
+            elif self._target_depth is not None and depth == self._target_depth:
+                self._item_start = self._pos
+            self._stack.append(ch)
+        elif ch in "}]":
+            self._stack.pop()
+            depth = len(self._stack)
+            if self._item_start is not None and depth == self._target_depth:
+                self._emit_item(buf[self._item_start:self._pos + 1], events)
+                self._item_start = None
+            elif self._target_depth is not None and depth == self._target_depth - 1:
+                # Target array closed
+                self._target_depth = None
+            if depth == 0:
+                self._close_field(buf, events)
+                self._root_end = self._pos + 1
+        elif depth == 1 and self._stack[0] == "{":
+            if ch == ":":
+                self._current_key = self._last_string
+                self._value_start = self._pos + 1
+            elif ch == ",":
+                self._close_field(buf, events)
+
+    def _close_field(self, buf, events):
+        if self._value_start is None:
+            return
+        raw = buf[self._value_start:self._pos].strip()
+        key, self._value_start = self._current_key, None
+        if key == self.array_key or not raw:
+            return
+        try:
+            events.append(("field", key, json.loads(raw)))
+        except ValueError:
+            pass
+
+    def _emit_item(self, raw, events):
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            try:
+                value = json.loads(re.sub(r",(\s*[}\]])", r"\1", raw))
+            except ValueError:
+                # A malformed element is skipped; the final parse decides
+                return
+        events.append(("item", self.items, value))
+        self.items += 1
+
+    @property
+    def complete(self) -> bool:
+        return self._root_end is not None
+
+    def result(self):
+        """Parse the whole document once the stream has ended."""
+        text = self.buffer
+        if self._root_start is not None:
+            text = text[self._root_start:self._root_end]
+        text = _FENCE_RE.sub("", text).strip()
+        try:
+            return json.loads(text)
+        except ValueError:
+            # Trailing commas before closing brackets are the most common slip
+            return json.loads(re.sub(r",(\s*[}\]])", r"\1", text))
+
+
+def iter_json_events(chunks, array_key: str = None):
+    """Wrap an iterable of text chunks; yields parser events, then ("done", None, parsed_or_None)."""
+    parser = JSONStreamParser(array_key)
+    for chunk in chunks:
+        text = getattr(chunk, "content", chunk)
+        for event in parser.feed(text):
+            yield event
+    try:
+        parsed = parser.result()
+    except ValueError as e:
+        print(f"[JSON-STREAM] Final parse failed after {parser.items} items: {e}")
+        parsed = None
+    yield ("done", None, parsed)
@@ -0,0 +1,259 @@
+"""
+Prefix-stable prompt assembly.
+
+Ollama reuses the KV cache of the longest prompt prefix it has already
+evaluated, so every LLM call site lays its prompt out from most-static to
+most-dynamic:
+
+    system rules  ->  profile / analysis context  ->  chat history  ->  new turn
+
+The system rules are frozen once per (site, variant) so they are byte-identical
+across calls, and the prefill tracker reports how many prompt tokens Ollama
+actually evaluated (prompt_eval_count) versus the estimated full prompt size,
+i.e. the prefill tokens saved by cache reuse on each request.
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+
+from middleware.metrics import metrics
+from middleware.tracing import current_span, tracer
+
+# Rules and context travel as variables, so JSON braces inside them are never
+# parsed as template fields.
+LAYERED_PROMPT = ChatPromptTemplate.from_messages([
+    SystemMessagePromptTemplate.from_template("{static_rules}{dynamic_context}"),
+    MessagesPlaceholder(variable_name="chat_history", optional=True),
+    HumanMessagePromptTemplate.from_template("{input}")
+])
+
+SECTION_SEPARATOR = "\n\n"
+
+
+def _fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class PromptAssembler:
+    """Freezes static rule blocks and builds layered prompt inputs."""
+
+    def __init__(self):
+        self._static = {}
+        self._lock = threading.Lock()
+
+    def static(self, key, builder) -> str:
+        """Render the static rules for `key` once and hand out the same string afterwards."""
+        text = self._static.get(key)
+        if text is not None:
+            return text
+        with self._lock:
+            text = self._static.get(key)
+            if text is None:
+                text = builder().strip()
+                self._static[key] = text
+                print(f"[PROMPT] Frozen static rules for {key} ({len(text)} chars, {_fingerprint(text)})")
+            return text
+
+    def inputs(self, static_rules: str, dynamic_context: str = None, history=None, turn: str = "") -> dict:
+        """Inputs for LAYERED_PROMPT in static -> dynamic order."""
+        dynamic_context = (dynamic_context or "").strip()
+        return {
+            "static_rules": static_rules,
+            "dynamic_context": f"{SECTION_SEPARATOR}{dynamic_context}" if dynamic_context else "",
+            "chat_history": list(history or []),
+            "input": turn,
+        }
+
+    def text(self, static_rules: str, dynamic_context: str = None, turn: str = None) -> str:
+        """Single-string variant for call sites that invoke the LLM with plain text."""
+        parts = [static_rules, (dynamic_context or "").strip(), (turn or "").strip()]
+        return SECTION_SEPARATOR.join(p for p in parts if p)
+
+    def keys(self):
+        with self._lock:
+            return list(self._static.keys())
+
+
+class _PrefillCallback(BaseCallbackHandler):
+    """Per-request handler: measures the prompt size and reads Ollama's prompt_eval_count."""
+
+    # Cheap bookkeeping: under astream, run in the event loop instead of hopping to the executor
+    run_inline = True
+
+    def __init__(self, tracker, site: str, static_rules: str):
+        self.tracker = tracker
+        self.site = site
+        self.prefix = _fingerprint(static_rules or "")
+        self.prompt_chars = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.prompt_chars = sum(len(str(m.content)) for batch in messages for m in batch)
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.prompt_chars = sum(len(p) for p in prompts)
+
+    def on_llm_end(self, response, **kwargs):
+        try:
+            generation = response.generations[0][0]
+        except (AttributeError, IndexError):
+            return
+        info = dict(generation.generation_info or {})
+        message = getattr(generation, "message", None)
+        if message is not None:
+            info.update(getattr(message, "response_metadata", None) or {})
+            usage = getattr(message, "usage_metadata", None) or {}
+            info.setdefault("prompt_eval_count", usage.get("input_tokens"))
+        evaluated = info.get("prompt_eval_count")
+        if evaluated is None:
+            return
+        self.tracker.record(self.site, self.prefix, self.prompt_chars, int(evaluated))
+
+
+class _LatencyCallback(BaseCallbackHandler):
+    """Per-request handler: time to first token and total generation time, as llm.<site>.* stages."""
+
+    run_inline = True
+
+    def __init__(self, site: str):
+        self.site = site
+        self.started = None
+        self.first_token = None
+
+    def _start(self):
+        self.started, self.first_token = time.perf_counter(), None
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._start()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._start()
+
+    def on_llm_new_token(self, token, **kwargs):
+        if self.first_token is None and self.started is not None:
+            self.first_token = time.perf_counter()
+            metrics.observe(f"llm.{self.site}.ttft", self.first_token - self.started)
+
+    def on_llm_end(self, response, **kwargs):
+        if self.started is None:
+            return
+        metrics.observe(f"llm.{self.site}.total", time.perf_counter() - self.started)
+        try:
+            generation = response.generations[0][0]
+            info = dict(generation.generation_info or {})
+            info.update(getattr(getattr(generation, "message", None), "response_metadata", None) or {})
+        except (AttributeError, IndexError):
+            return
+        # Ollama's own split of the generation (nanoseconds): prompt prefill vs. decoding
+        for key, stage in (("prompt_eval_duration", "prefill"), ("eval_duration", "decode")):
+            if info.get(key):
+                metrics.observe(f"llm.{self.site}.{stage}", info[key] / 1e9)
+
+
+class _TraceCallback(BaseCallbackHandler):
+    """Per-request handler: an "llm <site>" span per model call, under the span current when it was built."""
+
+    run_inline = True
+
+    def __init__(self, site: str):
+        self.site = site
+        # Under astream the callbacks may run outside the request's context, so the parent is fixed here
+        self.parent = current_span()
+        self.spans = {}
+
+    def _start(self, run_id, model: str):
+        span = tracer.start_span(f"llm {self.site}", parent=self.parent, kind="client",
+                                 attributes={"llm.site": self.site, "llm.model": model})
+        self.spans[run_id] = span
+
+    def on_chat_model_start(self, serialized, messages, *, run_id=None, **kwargs):
+        self._start(run_id, (kwargs.get("invocation_params") or {}).get("model", ""))
+
+    def on_llm_start(self, serialized, prompts, *, run_id=None, **kwargs):
+        self._start(run_id, (kwargs.get("invocation_params") or {}).get("model", ""))
+
+    def on_llm_new_token(self, token, *, run_id=None, **kwargs):
+        span = self.spans.get(run_id)
+        if span is not None and "llm.ttft_ms" not in span.attributes:
+            span.set_attribute("llm.ttft_ms", round(span.duration_ms, 2))
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        span = self.spans.pop(run_id, None)
+        if span is None:
+            return
+        try:
+            generation = response.generations[0][0]
+            info = dict(generation.generation_info or {})
+            info.update(getattr(getattr(generation, "message", None), "response_metadata", None) or {})
+        except (AttributeError, IndexError):
+            info = {}
+        for key in ("prompt_eval_count", "eval_count"):
+            if info.get(key) is not None:
+                span.set_attribute(f"llm.{key}", int(info[key]))
+        tracer.end_span(span)
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs):
+        span = self.spans.pop(run_id, None)
+        if span is not None:
+            tracer.end_span(span, error)
+
+
+class PrefillTracker:
+    """
+    Aggregates measured prefill work per call site.
+
+    Ollama's prompt_eval_count only counts tokens it actually evaluated, so on a
+    cache hit it is smaller than the prompt. The full prompt size is estimated
+    from its length with a chars-per-token ratio calibrated on cold calls (the
+    first call for a static prefix, where the whole prompt is evaluated).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen_prefixes = set()
+        self.chars_per_token = float(os.getenv("PREFILL_CHARS_PER_TOKEN", "3.5"))
+        self.sites = {}
+
+    def callbacks(self, site: str, static_rules: str = ""):
+        """Callbacks to pass as config={"callbacks": ...} to an LLM or chain call."""
+        return [_PrefillCallback(self, site, static_rules), _LatencyCallback(site), _TraceCallback(site)]
+
+    def record(self, site: str, prefix: str, prompt_chars: int, evaluated: int):
+        with self._lock:
+            cold = (site, prefix) not in self._seen_prefixes
+            self._seen_prefixes.add((site, prefix))
+            if cold and evaluated > 0:
+                ratio = prompt_chars / evaluated
+                # Ignore samples that can't be a full evaluation (e.g. cache survived a restart)
+                if 1.0 <= ratio <= 8.0:
+                    self.chars_per_token = 0.8 * self.chars_per_token + 0.2 * ratio
+
+            estimated = max(evaluated, int(prompt_chars / self.chars_per_token))
+            saved = 0 if cold else estimated - evaluated
+
+            stats = self.sites.setdefault(site, {
+                "requests": 0, "prompt_tokens_estimated": 0, "prompt_tokens_evaluated": 0, "prefill_tokens_saved": 0
+            })
+            stats["requests"] += 1
+            stats["prompt_tokens_estimated"] += estimated
+            stats["prompt_tokens_evaluated"] += evaluated
+            stats["prefill_tokens_saved"] += saved
+            stats["last_request"] = {"evaluated": evaluated, "estimated": estimated, "saved": saved}
+
+        print(f"[PREFILL] {site}: evaluated {evaluated} of ~{estimated} prompt tokens (saved ~{saved})")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "chars_per_token": round(self.chars_per_token, 2),
+                "sites": {site: dict(s) for site, s in self.sites.items()},
+            }
+
+
+# Singleton Instances
+prompt_assembler = PromptAssembler()
+prefill_tracker = PrefillTracker()
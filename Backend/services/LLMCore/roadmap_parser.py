@@ -0,0 +1,229 @@
+"""
+Single-pass parser for the multi-section roadmap Markdown.
+
+Business roadmaps (FiveToTenYear) and crop lifecycle plans (Planner) share the
+same layout: an overview, a numbered planner of "## Year/Phase N:" blocks and
+four numbered analysis sections. Instead of one DOTALL regex search per section
+and three more per block, every header is tokenized in one scan of the document
+with a precompiled pattern, sections are sliced between token positions, and
+each block's fields come from one more scan over the block.
+
+The output matches the previous per-section regex parsers field for field.
+"""
+
+import re
+from bisect import bisect_left
+
+# Header alternatives per section (English / Hindi / Marathi, business + crop wording)
+SECTION_HEADERS = {
+    "overview": r'Overview|अवलोकन|आढावा|Crop Overview|फसल अवलोकन|पीक आढावा',
+    "planner": r'1\. 10-Year Growth & Profit Planner|1\. 10-वर्षीय विकास और लाभ योजनाकार|1\. 10-वर्षांचे विकास आणि नफा नियोजक|1\. Crop Lifecycle Planner|1\. फसल जीवनचक्र योजनाकार|1\. पीक जीवनचक्र नियोजक',
+    "labor": r'2\. Labor & Aging Analysis|2\. श्रम और उम्र बढ़ने का विश्लेषण|2\. श्रम आणि वृद्धत्व विश्लेषण|2\. Resource & Labor Management|2\. संसाधन और श्रम प्रबंधन|2\. संसाधन आणि श्रम व्यवस्थापन',
+    "sustainability": r'3\. Sustainability & Succession|3\. स्थिरता और उत्तराधिकार|3\. शाश्वतता आणि उत्तराधिकार|3\. Quality & Harvest Sustainability|3\. गुणवत्ता और फसल स्थिरता|3\. गुणवत्ता आणि पीक शाश्वतता',
+    "resilience": r'4\. Financial Resilience|4\. वित्तीय लचीलापन|4\. आर्थिक लवचिकता|4\. Market & Risk Management|4\. बाजार और जोखिम प्रबंधन|4\. बाजार आणि जोखीम व्यवस्थापन',
+    "verdict": r'5\. Final Verdict|5\. अंतिम निर्णय|5\. अंतिम निकाल|5\. Final Harvest Verdict|5\. अंतिम फसल निर्णय|5\. अंतिम पीक निकाल',
+}
+
+# section -> (roadmap field, section that ends it; None runs to the end of the text)
+SECTION_FIELDS = {
+    "overview": ("overview", "planner"),
+    "labor": ("labor_analysis", "sustainability"),
+    "sustainability": ("sustainability_plan", "resilience"),
+    "resilience": ("resilience_strategy", "verdict"),
+    "verdict": ("verdict", None),
+}
+
+FIELD_LABELS = {
+    "focus": ("Strategic Focus", "रणनीतिक फोकस", "धोरणात्मक लक्ष", "Critical Focus", "महत्वपूर्ण फोकस", "गंभीर लक्ष"),
+    "profit": ("Expected Profit", "अपेक्षित लाभ", "अपेक्षित नफा", "Projected Value/Yield", "अनुमानित मूल्य/उपज", "अपेक्षित मूल्य/उत्पन्न"),
+    "actions": ("Key Actions", "मुख्य कार्य", "मुख्य कृती", "Required Actions", "आवश्यक कार्य", "आवश्यक कृती"),
+}
+_LABEL_KINDS = {label.lower(): kind for kind, labels in FIELD_LABELS.items() for label in labels}
+
+# Section headers first so "# 2. ..." is tagged with its section; any other
+# "# 2".."# 5" still ends a year block (the "stop" token).
+_TOKEN_RE = re.compile(
+    r'(?P<year>## (?:Year|वर्ष|Phase) (?P<num>\d+):)|# (?:'
+    + "|".join(f"(?P<{name}>{alts})" for name, alts in SECTION_HEADERS.items())
+    + r'|(?P<stop>[2345]))',
+    re.IGNORECASE
+)
+_BLOCK_STOPS = ("year", "labor", "sustainability", "resilience", "verdict", "stop")
+_DISCLAIMER_SPLIT_RE = re.compile(r'(?:DISCLAIMER:|अस्वीकरण:)', re.IGNORECASE)
+
+
+def _skip(text, pos, chars=None):
+    """Position after the run of whitespace (plus `chars`) starting at pos."""
+    end = len(text)
+    while pos < end and (text[pos].isspace() or (chars and text[pos] in chars)):
+        pos += 1
+    return pos
+
+
+def _iter_tokens(text):
+    """Same matches as _TOKEN_RE.finditer, but the pattern is only tried where a '#' is."""
+    pos = text.find("#")
+    while pos != -1:
+        match = _TOKEN_RE.match(text, pos)
+        if match:
+            yield match
+            pos = text.find("#", match.end())
+        else:
+            pos = text.find("#", pos + 1)
+
+
+def _line(text, pos):
+    end = text.find("\n", pos)
+    return text[pos:] if end == -1 else text[pos:end]
+
+
+class MarkdownRoadmapParser:
+    """
+    One parser per roadmap dialect.
+
+    bold_labels=True expects "**Label**:" fields (business roadmaps); False
+    accepts the label followed by any run of '*', ':' or whitespace and drops
+    bold sub-lines and numbering from actions (crop plans).
+    """
+
+    def __init__(self, title_prefix, year_label, bold_labels=True):
+        self.title_prefix = title_prefix
+        self.year_label = year_label
+        self.bold_labels = bold_labels
+        # Matched against lowercased text: a plain case-sensitive alternation keeps
+        # the regex engine's literal-prefix scan, which IGNORECASE and named groups disable.
+        labels = "|".join(re.escape(label) for label in _LABEL_KINDS)
+        self._field_re = re.compile(rf'\*\*(?:{labels})\*\*' if bold_labels else f'(?:{labels})')
+        self._folded_field_re = re.compile(self._field_re.pattern, re.IGNORECASE)
+        self._action_prefix_re = re.compile(r'^[-*]\s*' if bold_labels else r'^[-*\d.]+\s*')
+
+    def parse(self, text, name, language='EN'):
+        roadmap = {
+            "title": f"{self.title_prefix} Planner for {name}",
+            "overview": "",
+            "years": [],
+            "labor_analysis": "",
+            "sustainability_plan": "",
+            "resilience_strategy": "",
+            "verdict": "",
+            "disclaimer": ""
+        }
+        text = text or ""
+        folded = text.lower()
+        if len(folded) != len(text):
+            folded = None  # lowercasing changed offsets; match case-insensitively instead
+
+        # One scan: start/end offsets of every header, grouped by kind
+        starts = {kind: [] for kind in ("year",) + tuple(SECTION_HEADERS) + ("stop",)}
+        ends = {kind: [] for kind in starts}
+        year_nums, block_stops = [], []
+        for match in _iter_tokens(text):
+            kind = match.lastgroup if match.lastgroup != "num" else "year"
+            starts[kind].append(match.start())
+            ends[kind].append(match.end())
+            if kind == "year":
+                year_nums.append(match.group("num"))
+            if kind in _BLOCK_STOPS:
+                block_stops.append(match.start())
+
+        for section, (field, until) in SECTION_FIELDS.items():
+            body_start = next((end + 1 for end in ends[section] if text.startswith("\n", end)), None)
+            if body_start is None:
+                continue
+            body_end = len(text)
+            if until is not None:
+                candidates = starts[until]
+                i = bisect_left(candidates, body_start)
+                if i < len(candidates):
+                    body_end = candidates[i]
+            roadmap[field] = text[body_start:body_end].strip()
+
+        # Split the disclaimer off the verdict
+        verdict_block = roadmap["verdict"]
+        if "DISCLAIMER:" in verdict_block or "अस्वीकरण:" in verdict_block:
+            parts = _DISCLAIMER_SPLIT_RE.split(verdict_block)
+            roadmap['verdict'] = parts[0].strip()
+            roadmap['disclaimer'] = parts[1].strip()
+
+        # Year / phase blocks: goal line, then everything up to the next stop
+        resume = 0
+        for start, end, year_num in zip(starts["year"], ends["year"], year_nums):
+            if start < resume or not text.startswith(" ", end):
+                continue
+            newline = text.find("\n", end + 1)
+            if newline == -1:
+                break
+            content_start = newline + 1
+            i = bisect_left(block_stops, content_start)
+            content_end = block_stops[i] if i < len(block_stops) else len(text)
+            resume = content_end
+            year_data = {"year": self.year_label(year_num, language), "goal": text[end + 1:newline].strip()}
+            year_data.update(self._fields(
+                text[content_start:content_end],
+                folded[content_start:content_end] if folded is not None else None
+            ))
+            roadmap['years'].append(year_data)
+
+        if not roadmap['years']:
+            print("[ROADMAP WARNING] Regex year/phase extraction failed. Possible format mismatch.")
+
+        return roadmap
+
+    def _iter_labels(self, content, folded):
+        """
+        Every label occurrence, including overlapping ones ("**A***B**:"), as the
+        old one-search-per-label parser would have seen them.
+        """
+        pattern, haystack = (self._field_re, folded) if folded is not None else (self._folded_field_re, content)
+        match = pattern.search(haystack)
+        while match:
+            yield match
+            match = pattern.search(haystack, match.start() + 1)
+
+    def _value_start(self, content, match):
+        """Where a label's value begins, or None if this occurrence has no separator."""
+        end = match.end()
+        if self.bold_labels:
+            return _skip(content, end + 1) if content.startswith(":", end) else None
+        value_start = _skip(content, end, "*:")
+        return value_start if value_start > end else None
+
+    def _fields(self, content, folded=None):
+        fields = {"focus": "", "actions": [], "profit": ""}
+        found = {}
+        profit_starts = []
+        for match in self._iter_labels(content, folded):
+            kind = _LABEL_KINDS[match.group().strip("*").lower()]
+            if kind == "profit":
+                profit_starts.append(match.start())
+            if kind not in found:
+                value_start = self._value_start(content, match)
+                if value_start is not None:
+                    found[kind] = value_start
+
+        for kind in ("focus", "profit"):
+            if kind in found:
+                fields[kind] = _line(content, found[kind]).strip()
+
+        if "actions" in found:
+            actions_start = found["actions"]
+            i = bisect_left(profit_starts, actions_start)
+            actions_end = len(content)
+            if i < len(profit_starts):
+                actions_end = profit_starts[i]
+                if not self.bold_labels:
+                    # The bullet / bold markers in front of the profit label are not part of the actions
+                    p = actions_end
+                    while p > actions_start and content[p - 1].isspace():
+                        p -= 1
+                    while p > actions_start and content[p - 1] in "-*":
+                        p -= 1
+                    while p > actions_start and content[p - 1].isspace():
+                        p -= 1
+                    actions_end = p
+            lines = content[actions_start:actions_end].strip().split('\n')
+            if self.bold_labels:
+                fields['actions'] = [self._action_prefix_re.sub('', l).strip() for l in lines if l.strip()]
+            else:
+                fields['actions'] = [self._action_prefix_re.sub('', l).strip() for l in lines if l.strip() and not l.strip().startswith('**')]
+        return fields
@@ -0,0 +1,232 @@
+"""
+SSE framing for the chat token streams.
+
+Ollama streams one token per chunk, so one `data:` frame per token means a
+json.dumps, a socket write and a flush for every 3-4 characters of answer.
+SSEWriter coalesces them: a token goes out at once if the previous frame is
+at least SSE_COALESCE_MS old (so the first token and slow CPU generation are
+never held back), otherwise it waits for that interval with whatever else
+arrives, or until the batch holds SSE_MAX_FRAME_CHARS. Frames keep the
+{"chunk": text} format, so clients just see fewer, longer chunks. While
+nothing arrives (e.g. a long prompt prefill) a ": keep-alive" comment goes
+out every SSE_HEARTBEAT_SECONDS so proxies don't drop the idle connection.
+
+Structured event streams (analysis cards, roadmap sections, job progress) go
+through events(): one frame per event as it arrives, same encoding and
+heartbeats, no coalescing.
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+HEARTBEAT = ": keep-alive\n\n"
+_DONE = object()
+
+
+def dumps(payload) -> str:
+    if orjson is not None:
+        return orjson.dumps(payload).decode()
+    # Raw UTF-8 instead of \u escapes: Devanagari answers take half the bytes
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def frame(payload: dict) -> str:
+    return f"data: {dumps(payload)}\n\n"
+
+
+class _Batch:
+    """Tokens waiting for the next frame; at most one frame per interval unless it fills up."""
+
+    def __init__(self, interval: float, max_chars: int):
+        self.interval = interval
+        self.max_chars = max_chars
+        self.parts = []
+        self.size = 0
+        self.last_sent = float("-inf")
+
+    def add(self, chunk: str) -> bool:
+        """Buffer a token; True when the batch should go out right away."""
+        self.parts.append(chunk)
+        self.size += len(chunk)
+        return self.size >= self.max_chars or time.monotonic() - self.last_sent >= self.interval
+
+    def due_in(self) -> float:
+        return max(0.0, self.last_sent + self.interval - time.monotonic())
+
+    def take(self) -> str:
+        text = "".join(self.parts)
+        self.parts, self.size, self.last_sent = [], 0, time.monotonic()
+        return text
+
+
+class SSEWriter:
+    def __init__(self, interval_ms: float = None, max_chars: int = None, heartbeat: float = None):
+        self.interval = float(interval_ms if interval_ms is not None else os.getenv("SSE_COALESCE_MS", "30")) / 1000
+        self.max_chars = max(1, int(max_chars or os.getenv("SSE_MAX_FRAME_CHARS", "512")))
+        self.heartbeat = float(heartbeat if heartbeat is not None else os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.tokens = 0
+        self.frames = 0
+        self.event_frames = 0
+        self.heartbeats = 0
+        self.bytes = 0
+
+    def _timeout(self, batch: _Batch):
+        """How long to wait for the next token: until the open batch is due, else until the next heartbeat."""
+        if batch.parts:
+            return batch.due_in()
+        return self.heartbeat if self.heartbeat > 0 else None
+
+    def _frame(self, key: str, batch: _Batch) -> str:
+        tokens = len(batch.parts)
+        data = frame({key: batch.take()})
+        with self._lock:
+            self.tokens += tokens
+            self.frames += 1
+            self.bytes += len(data.encode("utf-8"))
+        return data
+
+    def _heartbeat(self) -> str:
+        with self._lock:
+            self.heartbeats += 1
+        return HEARTBEAT
+
+    def _started(self):
+        with self._lock:
+            self.streams += 1
+
+    def _pump(self, source):
+        """Read a sync generator on its own thread; returns (queue of (item, error), stop event)."""
+        items = queue.Queue()
+        stop = threading.Event()
+
+        def pump():
+            try:
+                for item in source:
+                    if stop.is_set():
+                        break
+                    items.put((item, None))
+                items.put((_DONE, None))
+            except Exception as e:
+                items.put((_DONE, e))
+            finally:
+                close = getattr(source, "close", None)
+                if close is not None:
+                    close()
+
+        self._started()
+        threading.Thread(target=contextvars.copy_context().run, args=(pump,), name="sse-pump", daemon=True).start()
+        return items, stop
+
+    def events(self, events):
+        """SSE frames for a sync generator of event dicts, one per event, with heartbeats while it is quiet."""
+        items, stop = self._pump(events)
+        try:
+            while True:
+                try:
+                    event, error = items.get(timeout=self.heartbeat if self.heartbeat > 0 else None)
+                except queue.Empty:
+                    yield self._heartbeat()
+                    continue
+                if event is _DONE:
+                    if error is not None:
+                        raise error
+                    return
+                data = frame(event)
+                with self._lock:
+                    self.event_frames += 1
+                    self.bytes += len(data.encode("utf-8"))
+                yield data
+        finally:
+            stop.set()
+
+    def stream(self, chunks, key: str = "chunk"):
+        """
+        SSE frames for a sync chunk generator. A pump thread reads the source so
+        batches and heartbeats go out on time; closing this generator makes the
+        pump close the source at its next token (see stream_tracker.track).
+        """
+        items, stop = self._pump(chunks)
+        batch = _Batch(self.interval, self.max_chars)
+        try:
+            while True:
+                try:
+                    chunk, error = items.get(timeout=self._timeout(batch))
+                except queue.Empty:
+                    yield self._frame(key, batch) if batch.parts else self._heartbeat()
+                    continue
+                if chunk is _DONE:
+                    if batch.parts:
+                        yield self._frame(key, batch)
+                    if error is not None:
+                        raise error
+                    return
+                if chunk and batch.add(chunk):
+                    yield self._frame(key, batch)
+        finally:
+            stop.set()
+
+    async def astream(self, chunks, key: str = "chunk"):
+        """Async twin of stream(); the source is drained by its own task, cancelled when this generator is."""
+        items = asyncio.Queue()
+
+        async def pump():
+            try:
+                async for chunk in chunks:
+                    items.put_nowait((chunk, None))
+                items.put_nowait((_DONE, None))
+            except Exception as e:
+                items.put_nowait((_DONE, e))
+
+        self._started()
+        producer = asyncio.ensure_future(pump())
+        batch = _Batch(self.interval, self.max_chars)
+        try:
+            while True:
+                try:
+                    if items.empty():
+                        chunk, error = await asyncio.wait_for(items.get(), self._timeout(batch))
+                    else:
+                        chunk, error = items.get_nowait()
+                except asyncio.TimeoutError:
+                    yield self._frame(key, batch) if batch.parts else self._heartbeat()
+                    continue
+                if chunk is _DONE:
+                    if batch.parts:
+                        yield self._frame(key, batch)
+                    if error is not None:
+                        raise error
+                    return
+                if chunk and batch.add(chunk):
+                    yield self._frame(key, batch)
+        finally:
+            producer.cancel()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "encoder": "orjson" if orjson is not None else "json",
+                "coalesce_ms": round(self.interval * 1000, 1),
+                "streams": self.streams,
+                "tokens": self.tokens,
+                "frames": self.frames,
+                "event_frames": self.event_frames,
+                "heartbeats": self.heartbeats,
+                "bytes": self.bytes,
+                "tokens_per_frame": round(self.tokens / self.frames, 2) if self.frames else None,
+            }
+
+
+# Singleton Instance
+sse_writer = SSEWriter()
@@ -0,0 +1,130 @@
+"""
+Early cancellation of abandoned chat streams.
+
+When a farmer closes the app mid-answer, the server notices on its next write
+(Flask/werkzeug) or right away via http.disconnect (ASGI) and closes the
+response generator. The wrappers below pass that close straight down to the
+engine's generator, which unwinds the LangChain stream and closes the Ollama
+HTTP response; Ollama stops decoding a request whose connection is gone, so
+its parallel slot is free for the next one instead of running to num_predict.
+
+Every stream is counted per site. tokens_saved_est is the tokens Ollama did not
+have to generate: cancelled streams times the average completed answer length
+(capped by num_predict), minus what they had already sent. tokens_saved_max is
+the upper bound if every abandoned answer would have run to num_predict.
+"""
+
+import asyncio
+import threading
+
+# Completed streams needed before their average replaces num_predict as the expected length
+MIN_SAMPLES = 5
+
+
+class StreamTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sites = {}
+
+    def _site(self, site: str) -> dict:
+        return self._sites.setdefault(site, {
+            "completed": 0,
+            "cancelled": 0,
+            "completed_tokens": 0,
+            "tokens_before_cancel": 0,
+            "tokens_saved_max": 0,
+            "num_predict": None,
+        })
+
+    def track(self, site: str, chunks, num_predict: int = None):
+        """Wrap a sync chunk generator; closing the wrapper closes (aborts) the source too."""
+        tokens = 0
+        try:
+            for chunk in chunks:
+                if chunk:
+                    tokens += 1  # Ollama streams one token per chunk
+                yield chunk
+        except GeneratorExit:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            self._cancelled(site, tokens, num_predict)
+            raise
+        self._completed(site, tokens)
+
+    async def atrack(self, site: str, chunks, num_predict: int = None):
+        """
+        Async twin of track(). The source is drained by its own task: Starlette
+        cancels a disconnected response through an AnyIO cancel scope, which
+        re-cancels every await in the source's cleanup and left the Ollama
+        request open. A single plain cancel of the pump unwinds it properly.
+        """
+        queue = asyncio.Queue()
+
+        async def pump():
+            try:
+                async for chunk in chunks:
+                    queue.put_nowait((chunk, False, None))
+                queue.put_nowait((None, True, None))
+            except Exception as e:
+                queue.put_nowait((None, True, e))
+
+        producer = asyncio.ensure_future(pump())
+        tokens = 0
+        try:
+            while True:
+                chunk, finished, error = await queue.get()
+                if error is not None:
+                    raise error
+                if finished:
+                    break
+                if chunk:
+                    tokens += 1
+                yield chunk
+        except (GeneratorExit, asyncio.CancelledError):
+            producer.cancel()
+            self._cancelled(site, tokens, num_predict)
+            raise
+        self._completed(site, tokens)
+
+    def _completed(self, site: str, tokens: int):
+        with self._lock:
+            stats = self._site(site)
+            stats["completed"] += 1
+            stats["completed_tokens"] += tokens
+
+    def _cancelled(self, site: str, tokens: int, num_predict: int = None):
+        with self._lock:
+            stats = self._site(site)
+            stats["cancelled"] += 1
+            stats["tokens_before_cancel"] += tokens
+            if num_predict:
+                stats["num_predict"] = num_predict
+                stats["tokens_saved_max"] += max(0, num_predict - tokens)
+        print(f"[STREAM] {site}: client disconnected after {tokens} tokens, Ollama stream aborted")
+
+    def _site_stats(self, stats: dict) -> dict:
+        # Expected answer length: average completed stream once there are enough, else num_predict
+        expected = stats["num_predict"]
+        if stats["completed"] >= MIN_SAMPLES:
+            average = stats["completed_tokens"] / stats["completed"]
+            expected = min(average, expected) if expected else average
+        saved = (expected or 0) * stats["cancelled"] - stats["tokens_before_cancel"]
+        result = dict(stats, tokens_saved_est=max(0, int(round(saved))))
+        if stats["completed"]:
+            result["avg_completed_tokens"] = round(stats["completed_tokens"] / stats["completed"], 1)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            sites = {site: self._site_stats(stats) for site, stats in self._sites.items()}
+        return {
+            "sites": sites,
+            "cancelled": sum(s["cancelled"] for s in sites.values()),
+            "tokens_saved_est": sum(s["tokens_saved_est"] for s in sites.values()),
+            "tokens_saved_max": sum(s["tokens_saved_max"] for s in sites.values()),
+        }
+
+
+# Singleton Instance
+stream_tracker = StreamTracker()
@@ -0,0 +1,207 @@
+"""
+Schema-driven structured output for Ollama.
+
+The JSON schema is passed as Ollama's `format` parameter, so decoding is
+constrained to the schema and regex clean-up becomes the exception. When a
+generation still comes back damaged (usually truncated at num_predict), the
+text is repaired locally, and only the individual fields that are missing or
+mistyped are re-asked with a tiny field-level schema - the rest of the
+generation is kept instead of being thrown away.
+"""
+
+import json
+import re
+import threading
+
+_FENCE_RE = re.compile(r"```(?:json)?", re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+
+JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+
+def _close_json(text: str):
+    """Close an unterminated document; returns candidates from longest to shortest."""
+    stack, in_string, escape = [], False, False
+    cut_points = []  # (position of a separating comma, stack at that point)
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+        elif ch == ",":
+            cut_points.append((i, list(stack)))
+
+    candidates = []
+    if stack or in_string:
+        tail = text + ('"' if in_string else "")
+        candidates.append(tail + "".join(reversed(stack)))
+    # Drop the half-written last member and close what was open at that comma
+    for pos, open_stack in reversed(cut_points[-20:]):
+        candidates.append(text[:pos] + "".join(reversed(open_stack)))
+    return candidates
+
+
+def repair_json(text: str):
+    """Best-effort local repair: fences, preamble, trailing commas, truncation."""
+    text = _FENCE_RE.sub("", text or "").strip()
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return None
+    text = _TRAILING_COMMA_RE.sub(r"\1", text[min(starts):])
+    for candidate in [text] + _close_json(text):
+        try:
+            return json.loads(_TRAILING_COMMA_RE.sub(r"\1", candidate))
+        except ValueError:
+            continue
+    return None
+
+
+def field_problems(item, schema: dict) -> list:
+    """Names of properties of `item` that are missing, empty or of the wrong type."""
+    if not isinstance(item, dict):
+        return list(schema.get("required", []))
+    problems = []
+    for name in schema.get("required", []):
+        prop = schema.get("properties", {}).get(name, {})
+        value = item.get(name)
+        expected = JSON_TYPES.get(prop.get("type"))
+        if value is None or value == "" or value == []:
+            problems.append(name)
+        elif expected and (not isinstance(value, expected) or (prop.get("type") != "boolean" and isinstance(value, bool))):
+            problems.append(name)
+        elif "enum" in prop and value not in prop["enum"]:
+            problems.append(name)
+    return problems
+
+
+class StructuredOutput:
+    """
+    One schema-constrained generation with local repair and field-level retry.
+
+    `items_key` names the array in the root object whose elements are checked
+    field by field against the item schema.
+    """
+
+    def __init__(self, name: str, schema: dict, items_key: str, max_field_retries: int = 3):
+        self.name = name
+        self.schema = schema
+        self.items_key = items_key
+        self.item_schema = schema["properties"][items_key]["items"]
+        self.max_field_retries = max_field_retries
+        self._lock = threading.Lock()
+        self.counters = {
+            "generations": 0,
+            "parse_failures": 0,
+            "repaired": 0,
+            "field_retries": 0,
+            "field_retry_failures": 0,
+            "wasted_generations": 0,
+        }
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def bind(self, llm):
+        """LLM with the schema as Ollama's `format` (constrained decoding)."""
+        return llm.bind(format=self.schema)
+
+    def parse(self, text: str):
+        """Parse a finished generation; returns the document or None if it is unusable."""
+        try:
+            return json.loads(text)
+        except (TypeError, ValueError):
+            self.count("parse_failures")
+        data = repair_json(text)
+        if isinstance(data, list):
+            # Bare array instead of the wrapping object
+            data = {self.items_key: data}
+        if isinstance(data, dict):
+            self.count("repaired")
+            return data
+        return None
+
+    def generate(self, llm, prompt, config: dict = None, keep=None):
+        """
+        Run the constrained generation and return the list of valid items.
+
+        keep(item) -> bool is an optional domain filter applied after repair and
+        before any field retry, so the retry budget is only spent on items that
+        are kept (it must tolerate a malformed field). Field retries run with
+        the same config, so they keep the caller's callbacks.
+        Returns None when nothing usable came back (a wasted generation).
+        """
+        self.count("generations")
+        response = self.bind(llm).invoke(prompt, config=config)
+        data = self.parse(getattr(response, "content", response))
+        items = data.get(self.items_key) if isinstance(data, dict) else None
+        if not isinstance(items, list):
+            self.count("wasted_generations")
+            print(f"[STRUCTURED] {self.name}: unusable generation")
+            return None
+
+        valid, retries_left = [], self.max_field_retries
+        for item in items:
+            problems = field_problems(item, self.item_schema) if isinstance(item, dict) else None
+            if problems is None or (keep is not None and not keep(item)):
+                continue
+            for field in problems:
+                if retries_left <= 0:
+                    break
+                retries_left -= 1
+                self.retry_field(llm, item, field, config)
+            if field_problems(item, self.item_schema):
+                continue
+            valid.append(item)
+
+        if not valid:
+            self.count("wasted_generations")
+            return None
+        return valid
+
+    def retry_field(self, llm, item: dict, field: str, config: dict = None) -> bool:
+        """Re-ask for a single broken field of `item` with a one-property schema."""
+        self.count("field_retries")
+        prop = self.item_schema["properties"].get(field, {"type": "string"})
+        field_schema = {"type": "object", "properties": {field: prop}, "required": [field]}
+        known = {k: v for k, v in item.items() if k != field}
+        prompt = (
+            f"Here is a partially generated JSON object:\n{json.dumps(known, ensure_ascii=False)}\n\n"
+            f"Return ONLY a JSON object with the single key \"{field}\" filled in consistently with it."
+        )
+        try:
+            response = llm.bind(format=field_schema).invoke(prompt, config=config)
+            value = json.loads(response.content).get(field)
+        except Exception as e:
+            print(f"[STRUCTURED] {self.name}: retry of '{field}' failed: {e}")
+            value = None
+        if value is None or field_problems({field: value}, {"properties": {field: prop}, "required": [field]}):
+            self.count("field_retry_failures")
+            return False
+        item[field] = value
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        generations = counters["generations"] or 1
+        counters["parse_failure_rate"] = round(counters["parse_failures"] / generations, 4)
+        counters["wasted_generation_rate"] = round(counters["wasted_generations"] / generations, 4)
+        return counters
@@ -0,0 +1,112 @@
+"""
+Cohort-level notification generation.
+
+Farmers in the same district growing the same crops send the LLM the same
+weather, news and crops; only name, land size and irrigation differ. The
+cohort engine asks the LLM once per cohort for notifications written with
+{name} / {land_size} / {irrigation} / {crops} placeholders, then fills them in
+per farmer and adds an irrigation-specific step to weather and advisory
+actions. LLM calls go from one per user to one per cohort; personalizing a
+farmer's copy is plain string work.
+"""
+
+import re
+from typing import Dict, List
+
+from services.NotificationService.notification_engine import NOTIFICATION_RULES, notification_engine
+
+# Same rules prefix as the per-farmer prompt, so Ollama reuses its KV cache for both
+COHORT_RULES = NOTIFICATION_RULES + """
+6. The Farmer Profile describes a whole cohort of farmers with the same location and crops.
+   Write every notification so it fits all of them. Where it helps, use the placeholders
+   {name}, {land_size}, {irrigation} and {crops}; they are filled in for each farmer."""
+
+PLACEHOLDER = re.compile(r"\{(name|land_size|irrigation|crops)\}")
+
+# What to use when a farmer's profile lacks the value
+NEUTRAL = {
+    "name": "Farmer",
+    "land_size": "your land",
+    "irrigation": "your irrigation",
+    "crops": "your crops",
+}
+
+# Keyword in the profile's irrigation source -> extra step on weather/advisory actions
+IRRIGATION_STEPS = [
+    ("drip", "Adjust your drip run time to match."),
+    ("sprinkler", "Avoid running sprinklers in windy or rainy hours."),
+    ("canal", "Check this week's canal water schedule."),
+    ("well", "Check the well water level before pumping."),
+    ("tank", "Check the water left in your tank or pond."),
+    ("pond", "Check the water left in your tank or pond."),
+    ("rain", "Keep field drainage channels clear."),
+]
+PERSONALIZED_TYPES = ("weather", "advisory")
+
+
+class CohortNotificationEngine:
+    def __init__(self, engine=None):
+        self.engine = engine or notification_engine
+        self.llm_calls = 0
+        self.personalized = 0
+
+    @staticmethod
+    def cohort_profile(profile: Dict) -> Dict:
+        """The part of a farmer profile the whole cohort shares."""
+        location = profile.get("location", {})
+        return {
+            "location": {"district": location.get("district"), "state": location.get("state")},
+            "crops": profile.get("crops", []),
+        }
+
+    async def generate(self, profile: Dict, weather, news) -> List[Dict]:
+        """One LLM call for the cohort of `profile`; the result is a template for every farmer in it."""
+        self.llm_calls += 1
+        return await self.engine._generate_ai_insights(
+            self.cohort_profile(profile), weather, news,
+            rules=COHORT_RULES, site="notifications_cohort"
+        )
+
+    @staticmethod
+    def _values(profile: Dict) -> Dict[str, str]:
+        values = {
+            "name": str(profile.get("name") or "").split(" ")[0],
+            "land_size": str(profile.get("land_size") or ""),
+            "irrigation": str(profile.get("irrigation") or ""),
+            "crops": ", ".join(profile.get("crops", [])[:3]),
+        }
+        return {key: value if value.strip() and value != "Unknown" else NEUTRAL[key]
+                for key, value in values.items()}
+
+    @staticmethod
+    def _irrigation_step(irrigation: str):
+        source = (irrigation or "").lower()
+        for keyword, step in IRRIGATION_STEPS:
+            if keyword in source:
+                return step
+        return None
+
+    def personalize(self, insights: List[Dict], profile: Dict) -> List[Dict]:
+        """A farmer's own copy of the cohort's notifications, placeholders filled in."""
+        values = self._values(profile)
+        fill = lambda text: PLACEHOLDER.sub(lambda m: values[m.group(1)], text) if isinstance(text, str) else text
+        step = self._irrigation_step(profile.get("irrigation"))
+
+        personalized = []
+        for insight in insights:
+            if not isinstance(insight, dict):
+                continue
+            notification = {key: fill(value) for key, value in insight.items()}
+            if step and notification.get("type") in PERSONALIZED_TYPES and step not in str(notification.get("action", "")):
+                notification["action"] = f"{notification.get('action', '').rstrip()} {step}".strip()
+            personalized.append(notification)
+        self.personalized += 1
+        return personalized
+
+    def deliver(self, user_id: str, profile: Dict, insights: List[Dict], weather, news, store: bool = True) -> List[Dict]:
+        """Personalize, prioritize and store one farmer's notifications; no LLM involved."""
+        return self.engine.finalize_notifications(user_id, profile, self.personalize(insights, profile), weather, news,
+                                                  store=store)
+
+    def stats(self) -> dict:
+        return {"llm_calls": self.llm_calls, "personalized": self.personalized}
@@ -0,0 +1,175 @@
+"""
+Delta-driven regeneration of cohort notifications.
+
+The scheduled fan-out used to regenerate every cohort on every tick, even when
+its forecast and news were the same as half an hour ago. DeltaTrigger keeps a
+snapshot of what each cohort's notifications were generated from (the
+weather features and the ids of the articles the prompt sees) and only lets
+a cohort through when something meaningful changed:
+
+- no snapshot yet (new cohort, or first run)
+- rain probability moved by NOTIF_DELTA_RAIN points or more
+- daily max temperature, wind or humidity moved past their deltas
+- an article the prompt would see is new
+- the snapshot is older than NOTIF_DELTA_MAX_AGE_HOURS (periodic refresh)
+
+Weather and news are still fetched per cohort every cycle (that's what the
+deltas are computed from); what is skipped is the LLM call and the rewrite
+of every member's notifications. Snapshots are saved to a JSON file, so a
+restart doesn't regenerate everything.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DEFAULT_SNAPSHOT_PATH = BASE_DIR / 'cache' / 'notification_snapshots.json'
+
+# Weather feature -> smallest change that is worth new notifications
+DEFAULT_DELTAS = {
+    "rainfall_probability": float(os.getenv("NOTIF_DELTA_RAIN", "20")),
+    "daily_max_temp": float(os.getenv("NOTIF_DELTA_TEMP", "3")),
+    "wind_speed": float(os.getenv("NOTIF_DELTA_WIND", "15")),
+    "humidity": float(os.getenv("NOTIF_DELTA_HUMIDITY", "15")),
+}
+
+
+def article_id(article) -> str:
+    if not isinstance(article, dict):
+        return ""
+    key = article.get("url") or article.get("headline") or json.dumps(article, sort_keys=True, default=str)
+    return hashlib.sha1(str(key).encode("utf-8")).hexdigest()[:16]
+
+
+def snapshot_key(cohort: tuple) -> str:
+    return json.dumps(cohort, ensure_ascii=False)
+
+
+class DeltaTrigger:
+    def __init__(self, path=None, deltas: dict = None, max_age_hours: float = None,
+                 news_items: int = 2, history: int = 20):
+        self.path = Path(path or os.getenv("NOTIF_SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH))
+        self.deltas = deltas or DEFAULT_DELTAS
+        self.max_age = float(max_age_hours if max_age_hours is not None
+                             else os.getenv("NOTIF_DELTA_MAX_AGE_HOURS", "12")) * 3600
+        # Only the articles the prompt actually uses count as news changes
+        self.news_items = news_items
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.snapshots = {}
+        if self.path.exists():
+            try:
+                self.snapshots = json.loads(self.path.read_text(encoding='utf-8'))
+            except Exception as e:
+                print(f"[DELTA] Ignoring unreadable snapshots {self.path}: {e}")
+        self._staged = {}
+        self.cycle = None
+        self.cycles = collections.deque(maxlen=history)
+
+    def _snapshot(self, weather, news) -> dict:
+        features = {}
+        if isinstance(weather, dict) and "error" not in weather:
+            for feature in self.deltas:
+                try:
+                    features[feature] = float(weather.get(feature))
+                except (TypeError, ValueError):
+                    pass
+        articles = [article_id(a) for a in news[:self.news_items]] if isinstance(news, list) else []
+        return {"weather": features, "articles": articles, "at": time.time()}
+
+    def reasons(self, cohort: tuple, weather, news) -> list:
+        """Why `cohort` needs new notifications; an empty list means nothing meaningful changed."""
+        with self._lock:
+            old = self.snapshots.get(snapshot_key(cohort))
+        if old is None:
+            return ["new"]
+        if time.time() - old.get("at", 0) > self.max_age:
+            return ["stale"]
+        new = self._snapshot(weather, news)
+        reasons = []
+        for feature, delta in self.deltas.items():
+            before, after = old["weather"].get(feature), new["weather"].get(feature)
+            if after is None:
+                continue  # failed fetch: keep what was generated from the last good one
+            if before is None or abs(after - before) >= delta:
+                reasons.append(feature)
+        if set(new["articles"]) - set(old.get("articles", [])) - {""}:
+            reasons.append("news")
+        return reasons
+
+    def commit(self, cohort: tuple, weather, news):
+        """
+        Record what the cohort's notifications are generated from. Inside a cycle
+        this is staged and only applied by end_cycle(): if the run dies half way,
+        its resume still sees the old snapshot and regenerates the rest of the cohort.
+        """
+        snapshot = self._snapshot(weather, news)
+        with self._lock:
+            if self.cycle is not None:
+                self._staged[snapshot_key(cohort)] = snapshot
+            else:
+                self.snapshots[snapshot_key(cohort)] = snapshot
+                self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self.snapshots, ensure_ascii=False)
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(data, encoding='utf-8')
+        os.replace(tmp, self.path)
+
+    # --- Per-cycle metrics ---
+
+    def start_cycle(self, run_id: str):
+        with self._lock:
+            self._staged = {}
+        self.cycle = {"run_id": run_id, "started_at": time.time(), "regenerated": 0, "skipped": 0,
+                      "reasons": collections.Counter(), "completed": False}
+
+    def record(self, reasons: list):
+        if self.cycle is None:
+            return
+        if reasons:
+            self.cycle["regenerated"] += 1
+            self.cycle["reasons"].update(reasons)
+        else:
+            self.cycle["skipped"] += 1
+
+    def end_cycle(self, completed: bool = True):
+        """Close the cycle; snapshots staged by an incomplete run are dropped so its resume regenerates."""
+        if self.cycle is None:
+            return
+        with self._lock:
+            if completed:
+                self.snapshots.update(self._staged)
+                self._dirty = self._dirty or bool(self._staged)
+            self._staged = {}
+        cycle, self.cycle = self.cycle, None
+        cycle["completed"] = completed
+        cycle["reasons"] = dict(cycle["reasons"])
+        cycle["seconds"] = round(time.time() - cycle.pop("started_at"), 1)
+        self.cycles.append(cycle)
+        self.save()
+        print(f"[DELTA] Cycle {cycle['run_id']}: {cycle['regenerated']} cohorts regenerated, "
+              f"{cycle['skipped']} unchanged and skipped {cycle['reasons']}")
+
+    def stats(self) -> dict:
+        cycles = list(self.cycles)
+        return {
+            "snapshots": len(self.snapshots),
+            "deltas": self.deltas,
+            "max_age_hours": self.max_age / 3600,
+            "last_cycle": cycles[-1] if cycles else None,
+            "regenerated_total": sum(c["regenerated"] for c in cycles),
+            "skipped_total": sum(c["skipped"] for c in cycles),
+            "cycles": len(cycles),
+        }
@@ -0,0 +1,381 @@
+"""
+Scheduled notification fan-out over every user.
+
+Pages through users/ with a Firestore cursor (ordered by document id, only
+PROFILE_FIELDS selected) and groups each page by cohort: farmers with the
+same location and crops get identical weather and news, so those are fetched
+once per cohort per run and shared. With NOTIF_COHORT_GENERATION (default on)
+the LLM also runs once per cohort and each farmer gets a templated copy (see
+cohort_engine.py); otherwise it runs once per farmer. LLM generation runs
+concurrently, bounded by NOTIF_FANOUT_CONCURRENCY (default:
+LLM_MAX_CONCURRENCY), because Ollama only decodes that many requests in
+parallel anyway.
+
+Notifications are written to the store NOTIF_FANOUT_WRITE_BATCH users per
+transaction, and each write is checkpointed: the cursor of the last finished
+page plus the users done on the current one. A run that crashes (or a server
+restart) resumes from there on the next tick instead of starting over, as
+long as the checkpoint is younger than NOTIF_FANOUT_RESUME_HOURS.
+
+With NOTIF_DELTA_TRIGGER (default on) a cohort is only regenerated when its
+weather or news changed meaningfully since its last generation (see
+delta_trigger.py). Members of unchanged cohorts who already have stored
+notifications keep them and count as "unchanged"; members without any (new
+signups, farmers who moved into the cohort, expired notifications) are
+generated for anyway and count as "backfilled". A cohort's snapshot is only
+recorded once the LLM produced its notifications (in per-user mode: for every
+member), so cohorts that only got the generic fallback during an Ollama outage
+are regenerated on the next run.
+
+Usage (from the Backend directory):
+    python -m services.NotificationService.fanout --page-size 200 --concurrency 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from middleware.metrics import metrics
+from services.NotificationService.cohort_engine import CohortNotificationEngine
+from services.NotificationService.delta_trigger import DeltaTrigger
+from services.NotificationService.notification_engine import PROFILE_FIELDS, PROMPT_NEWS_ITEMS, notification_engine
+from services.NotificationService.rules_engine import rules_engine
+
+DEFAULT_CHECKPOINT_PATH = BASE_DIR / 'cache' / 'notification_fanout_checkpoint.json'
+
+
+def cohort_key(engine, profile: dict) -> tuple:
+    """Farmers sharing a cohort key get the same weather and news queries."""
+    crops = tuple(sorted({str(c).strip().lower() for c in profile.get("crops", []) if c}))
+    return engine._get_location_string(profile).lower(), crops
+
+
+class FanoutCheckpoint:
+    """Cursor of the last finished page + users done on the current one, persisted after every write batch."""
+
+    def __init__(self, path, max_age_hours: float):
+        self.path = Path(path)
+        self.max_age = max_age_hours * 3600
+        self.state = None
+
+    def load(self):
+        """Resume state of an unfinished run, or None to start a new one."""
+        if not self.path.exists():
+            return None
+        try:
+            state = json.loads(self.path.read_text(encoding='utf-8'))
+        except Exception as e:
+            print(f"[FANOUT] Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+        if time.time() - state.get("updated_at", 0) > self.max_age:
+            print(f"[FANOUT] Checkpoint of run {state.get('run_id')} is stale, starting a new run")
+            return None
+        return state
+
+    def start(self, state=None):
+        self.state = state or {"run_id": uuid.uuid4().hex[:12], "started_at": time.time(),
+                               "cursor": None, "page_done": [], "stats": {}}
+        self.state["page_done"] = set(self.state.get("page_done", []))
+        return self.state
+
+    def _write(self):
+        self.state["updated_at"] = time.time()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(dict(self.state, page_done=sorted(self.state["page_done"]))), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+    def mark(self, user_ids: list, stats: dict):
+        self.state["page_done"].update(user_ids)
+        self.state["stats"] = stats
+        self._write()
+
+    def advance(self, cursor: str, stats: dict):
+        self.state["cursor"] = cursor
+        self.state["page_done"] = set()
+        self.state["stats"] = stats
+        self._write()
+
+    def finish(self):
+        self.state = None
+        if self.path.exists():
+            self.path.unlink()
+
+
+class NotificationFanout:
+    def __init__(self, engine=None, db=None, page_size: int = None, concurrency: int = None,
+                 checkpoint_path=None, resume_hours: float = None, cohort_mode: bool = None,
+                 write_batch: int = None, delta_trigger: bool = None, snapshot_path=None):
+        self.engine = engine or notification_engine
+        # One LLM call per cohort, personalized per farmer; off = one LLM call per farmer
+        self.cohort_mode = (cohort_mode if cohort_mode is not None
+                            else os.getenv("NOTIF_COHORT_GENERATION", "true").lower() == "true")
+        self.cohort_engine = CohortNotificationEngine(self.engine)
+        # Skip cohorts whose weather/news didn't meaningfully change since their last generation
+        use_trigger = delta_trigger if delta_trigger is not None else os.getenv("NOTIF_DELTA_TRIGGER", "true").lower() == "true"
+        self.trigger = DeltaTrigger(snapshot_path, news_items=PROMPT_NEWS_ITEMS) if use_trigger else None
+        self.store = self.engine.store
+        # Users per store transaction (and checkpoint write)
+        self.write_batch = write_batch or int(os.getenv("NOTIF_FANOUT_WRITE_BATCH", "100"))
+        self._pending = []
+        self._uncommitted = {}
+        self.db = db
+        self.page_size = page_size or int(os.getenv("NOTIF_FANOUT_PAGE_SIZE", "200"))
+        # Keep concurrency low: every generation holds an Ollama slot
+        self.concurrency = concurrency or int(os.getenv("NOTIF_FANOUT_CONCURRENCY", os.getenv("LLM_MAX_CONCURRENCY", "2")))
+        self.checkpoint = FanoutCheckpoint(
+            checkpoint_path or os.getenv("NOTIF_FANOUT_CHECKPOINT_PATH", DEFAULT_CHECKPOINT_PATH),
+            float(resume_hours if resume_hours is not None else os.getenv("NOTIF_FANOUT_RESUME_HOURS", "6"))
+        )
+        self.running = False
+        self.last_run = None
+        self.last_rules_run = None
+
+    def _get_db(self):
+        if self.db is None:
+            self.db = self.engine._get_db()
+        return self.db
+
+    def _fetch_page(self, cursor: str):
+        query = (self._get_db().collection('users')
+                 .select(PROFILE_FIELDS)
+                 .order_by('__name__')
+                 .limit(self.page_size))
+        if cursor:
+            query = query.start_after({'__name__': cursor})
+        with metrics.timer("firestore.users_page"):
+            return [(doc.id, doc.to_dict() or {}) for doc in query.stream()]
+
+    async def _cohort_data(self, key: tuple, profile: dict, slots: asyncio.Semaphore):
+        weather, news = await self.engine.fetch_context(profile)
+        reasons = self.trigger.reasons(key, weather, news) if self.trigger else ["always"]
+        if self.trigger:
+            self.trigger.record(reasons)
+        if not reasons:
+            # Nothing meaningful changed: members keep the notifications they already have
+            return weather, news, None, False
+        insights = None
+        if self.cohort_mode:
+            async with slots:
+                insights = await self.cohort_engine.generate(profile, weather, news)
+            # An empty result means the LLM failed and members get the generic fallback: regenerate next run
+            if insights and self.trigger:
+                self.trigger.commit(key, weather, news)
+        else:
+            # Per-user mode: committed by _commit_cohorts() once every member got LLM notifications
+            self._uncommitted[key] = {"weather": weather, "news": news, "ok": True}
+        return weather, news, insights, True
+
+    async def _cohort_context(self, key: tuple, profile: dict, contexts: dict, stats: dict, slots: asyncio.Semaphore):
+        """Weather + news (+ cohort insights) for a cohort, produced by whichever farmer of it comes first."""
+        if key not in contexts:
+            stats["cohorts"] += 1
+            contexts[key] = asyncio.ensure_future(self._cohort_data(key, profile, slots))
+        return await contexts[key]
+
+    async def _late_insights(self, key: tuple, profile: dict, weather, news, contexts: dict, slots: asyncio.Semaphore):
+        """Cohort insights for an unchanged cohort, generated once if some member has no notifications yet."""
+        late_key = (key, "insights")
+        if late_key not in contexts:
+            async def generate():
+                async with slots:
+                    return await self.cohort_engine.generate(profile, weather, news)
+            contexts[late_key] = asyncio.ensure_future(generate())
+        return await contexts[late_key]
+
+    async def _generate(self, user_id: str, profile: dict, contexts: dict, stats: dict, slots: asyncio.Semaphore,
+                        has_notifications: bool = True):
+        notifications, key = None, None
+        try:
+            key = cohort_key(self.engine, profile)
+            weather, news, insights, changed = await self._cohort_context(key, profile, contexts, stats, slots)
+            if not changed and has_notifications:
+                stats["unchanged"] += 1
+            else:
+                if not changed:
+                    # Unchanged cohort, but this member has nothing stored yet (new signup, moved cohort, expired)
+                    stats["backfilled"] += 1
+                    if self.cohort_mode:
+                        insights = await self._late_insights(key, profile, weather, news, contexts, slots)
+                if insights is not None:
+                    notifications = self.cohort_engine.deliver(user_id, profile, insights, weather, news, store=False)
+                else:
+                    async with slots:
+                        raw_insights = await self.engine._generate_ai_insights(profile, weather, news)
+                    if not raw_insights:
+                        self._member_failed(key)
+                    notifications = self.engine.finalize_notifications(user_id, profile, raw_insights, weather, news,
+                                                                       store=False)
+                stats["generated"] += 1
+        except Exception as e:
+            stats["failed"] += 1
+            self._member_failed(key)
+            print(f"[FANOUT] {user_id} failed: {e}")
+        # Failed users are not retried this run; the next tick regenerates them anyway
+        stats["users"] += 1
+        self._pending.append((user_id, notifications))
+        if len(self._pending) >= self.write_batch:
+            self._flush(stats)
+
+    def _member_failed(self, key):
+        entry = self._uncommitted.get(key)
+        if entry is not None:
+            entry["ok"] = False
+
+    def _commit_cohorts(self):
+        """Per-user mode: record the snapshot of each regenerated cohort whose members all got LLM notifications."""
+        if self.trigger:
+            for key, entry in self._uncommitted.items():
+                if entry["ok"]:
+                    self.trigger.commit(key, entry["weather"], entry["news"])
+        self._uncommitted = {}
+
+    def _flush(self, stats: dict):
+        """Write buffered notifications in one transaction, then checkpoint those users as done."""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self.store.put_many({user_id: notifications for user_id, notifications in batch if notifications})
+        self.checkpoint.mark([user_id for user_id, _ in batch], stats)
+
+    async def run(self, reset: bool = False):
+        if reset:
+            self.checkpoint.finish()
+        resumed = self.checkpoint.load()
+        state = self.checkpoint.start(resumed)
+        stats = {"users": 0, "pages": 0, "cohorts": 0, "generated": 0, "unchanged": 0, "backfilled": 0, "failed": 0}
+        stats.update(state.get("stats", {}))
+        print(f"[FANOUT] {'Resuming' if resumed else 'Starting'} run {state['run_id']} "
+              f"(page_size={self.page_size}, concurrency={self.concurrency})")
+
+        self.running = True
+        started = time.time()
+        # Cohort weather/news is shared across pages for the whole run
+        contexts = {}
+        slots = asyncio.Semaphore(self.concurrency)
+        self._pending = []
+        self._uncommitted = {}
+        completed = False
+        if self.trigger:
+            self.trigger.start_cycle(state["run_id"])
+        try:
+            cursor = state["cursor"]
+            while True:
+                page = await asyncio.to_thread(self._fetch_page, cursor)
+                if not page:
+                    break
+                pending = [(uid, self.engine.profile_from_doc(data)) for uid, data in page
+                           if uid not in state["page_done"]]
+                # Group by cohort so each cohort's context is fetched once and its farmers run back to back
+                pending.sort(key=lambda item: cohort_key(self.engine, item[1]))
+                # Members of unchanged cohorts are only skipped if they already have generated notifications
+                stored = await asyncio.to_thread(self.store.users_with_generated, [uid for uid, _ in pending])
+                await asyncio.gather(*(self._generate(uid, profile, contexts, stats, slots, uid in stored)
+                                       for uid, profile in pending))
+                self._flush(stats)
+
+                stats["pages"] += 1
+                cursor = page[-1][0]
+                self.checkpoint.advance(cursor, stats)
+                print(f"[FANOUT] Page {stats['pages']} done: {stats['users']} users, {stats['cohorts']} cohorts so far")
+                if len(page) < self.page_size:
+                    break
+            self._commit_cohorts()
+            self.checkpoint.finish()
+            completed = True
+        finally:
+            self.running = False
+            if self.trigger:
+                self.trigger.end_cycle(completed)
+            self.last_run = dict(stats, run_id=state["run_id"], resumed=bool(resumed),
+                                 seconds=round(time.time() - started, 1))
+
+        print(f"[FANOUT] Finished run {state['run_id']}: {stats}")
+        return dict(stats)
+
+    async def run_rules(self):
+        """
+        Threshold alerts only (rules_engine.py), no LLM and no news: every user,
+        weather fetched once per location, one vectorized evaluation per page.
+        Cheap enough to run on every weather refresh between the LLM runs. Alerts
+        a user no longer gets are withdrawn, except where the forecast couldn't
+        be fetched.
+        """
+        started = time.time()
+        stats = {"users": 0, "pages": 0, "locations": 0, "alerted_users": 0, "alerts": 0, "no_weather": 0}
+        weathers = {}
+        cursor = None
+        while True:
+            page = await asyncio.to_thread(self._fetch_page, cursor)
+            if not page:
+                break
+            profiles = [(uid, self.engine.profile_from_doc(data)) for uid, data in page]
+            locations = [self.engine._get_location_string(profile) for _, profile in profiles]
+            missing = sorted(set(locations) - set(weathers))
+            fetched = await asyncio.gather(*(self.engine.weather_service.get_weather(loc) for loc in missing))
+            weathers.update(zip(missing, fetched))
+
+            alerts = rules_engine.alerts_batch([profile.get("crops", []) for _, profile in profiles],
+                                               [weathers[loc] for loc in locations])
+            # Every user with a forecast, alerted or not, so cleared alerts are withdrawn
+            batch = {uid: user_alerts for (uid, _), user_alerts, loc in zip(profiles, alerts, locations)
+                     if weathers[loc] and not weathers[loc].get("error")}
+            self.store.put_rule_alerts(batch)
+
+            stats["users"] += len(page)
+            stats["pages"] += 1
+            stats["no_weather"] += len(page) - len(batch)
+            stats["alerted_users"] += sum(1 for a in batch.values() if a)
+            stats["alerts"] += sum(len(a) for a in batch.values())
+            cursor = page[-1][0]
+            if len(page) < self.page_size:
+                break
+        stats["locations"] = len(weathers)
+        self.last_rules_run = dict(stats, seconds=round(time.time() - started, 2))
+        print(f"[FANOUT] Rule alerts: {stats}")
+        return stats
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "page_size": self.page_size,
+            "concurrency": self.concurrency,
+            "cohort_mode": self.cohort_mode,
+            "cohort_engine": self.cohort_engine.stats(),
+            "delta_trigger": self.trigger.stats() if self.trigger else None,
+            "last_run": self.last_run,
+            "last_rules_run": self.last_rules_run,
+        }
+
+
+# Singleton Instance
+notification_fanout = NotificationFanout()
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Generate notifications for every user.")
+    parser.add_argument("--page-size", type=int, default=None, help="Users per Firestore page (default: NOTIF_FANOUT_PAGE_SIZE or 200)")
+    parser.add_argument("--concurrency", type=int, default=None, help="Concurrent LLM generations (default: NOTIF_FANOUT_CONCURRENCY)")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file path")
+    parser.add_argument("--reset", action="store_true", help="Discard an unfinished run and start over")
+    parser.add_argument("--rules-only", action="store_true", help="Only refresh the threshold alerts (no LLM)")
+    args = parser.parse_args()
+
+    fanout = NotificationFanout(page_size=args.page_size, concurrency=args.concurrency, checkpoint_path=args.checkpoint)
+    asyncio.run(fanout.run_rules() if args.rules_only else fanout.run(reset=args.reset))
+
+
+if __name__ == "__main__":
+    main()
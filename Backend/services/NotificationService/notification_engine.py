@@ -13,8 +13,50 @@ from services.WeatherNewsIntegration.news_service import NewsService
 
 # LangChain Imports
 from langchain_ollama import ChatOllama
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from services.LLMCore.prompt_assembly import LAYERED_PROMPT, prompt_assembler, prefill_tracker
+from services.NotificationService.notification_store import notification_store
+from services.NotificationService.rules_engine import rules_engine
+from services.Profiles.profile_repository import profile_repository
+from middleware.structured_logging import get_logger
+from middleware.metrics import metrics
+
+# Shared by every farmer; the profile, weather and news follow it
+NOTIFICATION_RULES = """You are an expert Agricultural Intelligence Engine.
+Your task is to analyze Farmer Profile, Weather Data, and News to generate 1-2 personalized narrative notifications.
+
+STRICT OUTPUT FORMAT:
+Return ONLY a JSON array of objects. No markdown, no conversational text.
+
+Notification Object Structure:
+{
+    "title": "Short, urgent title (Max 6 words)",
+    "message": "Concise explanation (Max 15 words)",
+    "type": "weather" | "pesticide" | "disease" | "market" | "advisory" | "general",
+    "priority": "high" | "medium" | "low",
+    "action": "One specific, actionable step for the farmer",
+    "source": "AI Inference"
+}
+
+RULES:
+1. Rain, heat, wind and weather-driven disease alerts are sent separately; do not repeat them.
+2. If news mentions a pest/disease relevant to the farmer's crops, generate a HIGH priority 'disease' alert.
+3. Include one 'advisory' based on current crop season/weather (e.g., irrigation advice).
+4. Focus on the crops listed under Focus Crops.
+5. DO NOT use emojis in the title or message."""
+
+NOTIFICATION_TURN = "Generate the notification JSON array now."
+
+# users/{uid} fields read by profile_from_doc; bulk reads select only these
+PROFILE_FIELDS = [
+    "name", "village", "district", "state", "crops_grown", "mainCrops",
+    "land_size", "soil_type", "irrigation_source"
+]
+
+# Articles included in the prompt (delta_trigger.py only watches these for changes)
+PROMPT_NEWS_ITEMS = 2
+
+log = get_logger("notifications")
 
 class NotificationEngine:
     def __init__(self):
@@ -33,9 +75,8 @@ class NotificationEngine:
             num_ctx=4096
         )
         
-        # In-memory store for notifications (for now)
-        # Structure: {user_id: [Notification objects]}
-        self.notification_store = {}
+        # Persistent per-user notification store (SQLite)
+        self.store = notification_store
 
     def _get_db(self):
         if not self.db:
@@ -53,60 +94,65 @@ class NotificationEngine:
         Orchestrator: Fetches profile -> weather/news -> LLM -> Notifications
         """
         try:
-            with open("d:/Projects/KrishiSahAI TechFiesta/app_debug.log", "a") as logf:
-                logf.write(f"[NOTIF-ENGINE] Starting generation for {user_id}\n")
-            
+            log.info("Starting generation", extra={"user_id": user_id})
+
             # 1. Fetch Profile
             profile = self._get_farmer_profile(user_id)
             if not profile:
-                with open("d:/Projects/KrishiSahAI TechFiesta/app_debug.log", "a") as logf:
-                    logf.write(f"[NOTIF-ENGINE] Profile not found for {user_id}\n")
+                log.warning("Profile not found", extra={"user_id": user_id})
                 return []
 
             # 2. Fetch Real-time Data
             location_query = self._get_location_string(profile)
             crops = profile.get('crops', [])
             
-            with open("d:/Projects/KrishiSahAI TechFiesta/app_debug.log", "a") as logf:
-                logf.write(f"[NOTIF-ENGINE] Fetching for {location_query} (Crops: {crops})\n")
-                
-            weather_task = self.weather_service.get_weather(location_query)
-            news_task = self.news_service.get_personalized_news(crops, location_query)
-            
-            weather_data, news_data = await asyncio.gather(weather_task, news_task)
-            
-            with open("d:/Projects/KrishiSahAI TechFiesta/app_debug.log", "a") as logf:
-                logf.write(f"[NOTIF-ENGINE] Real-time data gathered for {user_id}. Starting LLM...\n")
-                
-            # 3. Generate Insights via LLM
-            raw_insights = await self._generate_ai_insights(profile, weather_data, news_data)
-            
-            # 4. Parse & Prioritize
-            notifications = self._process_and_prioritize(raw_insights, weather_data, news_data)
+            log.info("Fetching context", extra={"user_id": user_id, "location": location_query, "crops": crops})
+
+            weather_data, news_data = await self.fetch_context(profile)
             
-            # Fallback if no notifications generated by LLM
-            if not notifications:
-                 with open("d:/Projects/KrishiSahAI TechFiesta/app_debug.log", "a") as logf:
-                    logf.write(f"[NOTIF-ENGINE] LLM returned nothing. Using deterministic fallback.\n")
-                 notifications = self._get_fallback_notifications(profile, weather_data)
+            log.info("Context gathered, starting LLM", extra={"user_id": user_id})
 
-            # 5. Store & Return
-            self._store_notifications(user_id, notifications)
+            # 3-5. Generate, prioritize, store
+            notifications = await self.generate_for_profile(user_id, profile, weather_data, news_data)
             
-            with open("d:/Projects/KrishiSahAI TechFiesta/app_debug.log", "a") as logf:
-                logf.write(f"[NOTIF-ENGINE] Success: Generated {len(notifications)} notifications for {user_id}\n")
-                
+            log.info("Generated notifications", extra={"user_id": user_id, "count": len(notifications)})
+
             return notifications
         except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
-            try:
-                with open("d:/Projects/KrishiSahAI TechFiesta/app_debug.log", "a") as logf:
-                    logf.write(f"[NOTIF-ENGINE] ERROR for {user_id}: {str(e)}\n{error_trace}\n")
-            except: pass
+            log.exception("Generation failed", extra={"user_id": user_id})
             print(f"[NOTIF-ENGINE] ERROR: {e}")
             return []
 
+    async def fetch_context(self, profile: Dict):
+        """Weather and news for a profile's location and crops (the same for a whole cohort)."""
+        location_query = self._get_location_string(profile)
+        return await asyncio.gather(
+            metrics.track("weather.fetch", self.weather_service.get_weather(location_query)),
+            metrics.track("news.fetch", self.news_service.get_personalized_news(profile.get('crops', []), location_query))
+        )
+
+    async def generate_for_profile(self, user_id: str, profile: Dict, weather_data, news_data, store: bool = True):
+        """LLM -> Notifications for an already loaded profile and prefetched weather/news."""
+        # 3. Generate Insights via LLM
+        raw_insights = await self._generate_ai_insights(profile, weather_data, news_data)
+        return self.finalize_notifications(user_id, profile, raw_insights, weather_data, news_data, store=store)
+
+    def finalize_notifications(self, user_id: str, profile: Dict, raw_insights: List[Dict], weather_data, news_data,
+                               store: bool = True):
+        """Prioritize raw insights (or fall back), then store them for the user unless the caller batches writes."""
+        # 4. Parse & Prioritize
+        notifications = self._process_and_prioritize(raw_insights, weather_data, news_data, profile)
+        
+        # Fallback if no notifications generated by LLM
+        if not notifications:
+            print(f"[NOTIF-ENGINE] LLM returned nothing for {user_id}. Using deterministic fallback.")
+            notifications = self._get_fallback_notifications(profile, weather_data)
+
+        # 5. Store & Return
+        if store:
+            self._store_notifications(user_id, notifications)
+        return notifications
+
     def _get_fallback_notifications(self, profile, weather):
         """Standard high-quality fallback when LLM is unavailable"""
         crops = profile.get('crops', ['Crops'])
@@ -157,151 +203,99 @@ class NotificationEngine:
                     "irrigation": "Drip Irrigation"
                 }
 
-            db = self._get_db()
-            doc = db.collection('users').document(user_id).get()
-            if doc.exists:
-                data = doc.to_dict()
-                return {
-                    "name": data.get("name", "Farmer"),
-                    "location": {
-                        "village": data.get("village"),
-                        "district": data.get("district"),
-                        "state": data.get("state")
-                    },
-                    "crops": data.get("crops_grown", []) or data.get("mainCrops", []) or [],
-                    "land_size": data.get("land_size", "Unknown"),
-                    "soil_type": data.get("soil_type", "Unknown"),
-                    "irrigation": data.get("irrigation_source", "Unknown")
-                }
-            return None
+            data = profile_repository.get(user_id)
+            return self.profile_from_doc(data) if data else None
         except Exception as e:
             print(f"[NOTIF-ENGINE] DB Error: {e}")
             return None
 
+    @staticmethod
+    def profile_from_doc(data: Dict) -> Dict[str, Any]:
+        """Farmer profile from a users/{uid} document (reads only PROFILE_FIELDS)."""
+        return {
+            "name": data.get("name", "Farmer"),
+            "location": {
+                "village": data.get("village"),
+                "district": data.get("district"),
+                "state": data.get("state")
+            },
+            "crops": data.get("crops_grown", []) or data.get("mainCrops", []) or [],
+            "land_size": data.get("land_size", "Unknown"),
+            "soil_type": data.get("soil_type", "Unknown"),
+            "irrigation": data.get("irrigation_source", "Unknown")
+        }
+
     def _get_location_string(self, profile: Dict) -> str:
         loc = profile.get("location", {})
         parts = [loc.get("district"), loc.get("state")]
         return ", ".join([p for p in parts if p]) or "India"
 
-    async def _generate_ai_insights(self, profile, weather, news) -> List[Dict]:
+    async def _generate_ai_insights(self, profile, weather, news, rules: str = NOTIFICATION_RULES,
+                                    site: str = "notifications") -> List[Dict]:
         """
         Uses LLM to analyze data and generate specific notifications.
         Returns a list of raw notification dictionaries.
         """
-        try:
-            with open("d:/Projects/KrishiSahAI TechFiesta/app_debug.log", "a") as logf:
-                logf.write(f"[NOTIF-ENGINE] LLM Method Start for {profile.get('name')}\n")
-        except: pass
-        
+        log.debug("LLM method start", extra={"farmer": profile.get('name'), "site": site})
+
         if "error" in weather: weather = {"condition": "Unknown", "temp": "N/A"}
         
         # Format inputs for Prompt
-        profile_str = json.dumps(profile, indent=2)
-        weather_str = json.dumps(weather, indent=2)
+        profile_str = json.dumps(profile, ensure_ascii=False, default=str)
+        weather_str = json.dumps(weather, ensure_ascii=False, default=str)
         # Take top 2 news items to save tokens
-        news_str = json.dumps(news[:2] if isinstance(news, list) else [], indent=2) 
-        
-        system_prompt = """
-        You are an expert Agricultural Intelligence Engine.
-        Your task is to analyze Farmer Profile, Weather Data, and News to generate 3-4 personalized notifications.
+        news_str = json.dumps(news[:PROMPT_NEWS_ITEMS] if isinstance(news, list) else [], ensure_ascii=False, default=str)
         
-        STRICT OUTPUT FORMAT:
-        Return ONLY a JSON array of objects. No markdown, no conversational text.
-        
-        Notification Object Structure:
-        {
-            "title": "Short, urgent title (Max 6 words)",
-            "message": "Concise explanation (Max 15 words)",
-            "type": "weather" | "pesticide" | "disease" | "market" | "advisory" | "general",
-            "priority": "high" | "medium" | "low",
-            "action": "One specific, actionable step for the farmer",
-            "source": "AI Inference"
-        }
-        
-        RULES:
-        1. If rain probability > 60%, generate a HIGH priority 'weather' alert.
-        2. If news mentions a pest/disease relevant to the farmer's crops, generate a HIGH priority 'disease' alert.
-        3. Include one 'advisory' based on current crop season/weather (e.g., irrigation advice).
-        4. Focus on the specified crops: {crops}.
-        5. DO NOT use emojis in the title or message.
-        """
-        
-        user_prompt = f"""
-        Farmer Profile: {profile_str}
-        Weather Data: {weather_str}
-        News Data: {news_str}
-        
-        Generate the notification JSON array now.
-        """
+        # Farmer-specific data goes after the shared rules so the prefix is reused across users
+        dynamic_context = (
+            f"Farmer Profile: {profile_str}\n"
+            f"Focus Crops: {', '.join(profile.get('crops', []))}\n"
+            f"Weather Data: {weather_str}\n"
+            f"News Data: {news_str}"
+        )
         
         try:
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_prompt),
-                ("user", user_prompt)
-            ])
-            
-            chain = prompt | self.llm | StrOutputParser()
-            
-            with open("d:/Projects/KrishiSahAI TechFiesta/app_debug.log", "a") as logf:
-                logf.write(f"[NOTIF-ENGINE] Chain prepared. Invoking LLM ({self.llm_model})...\n")
-            
-            # Now we only need to pass 'crops' as it's the only {var} in the system/user prompt templates
-            response = await chain.ainvoke({
-                "crops": ", ".join(profile.get('crops', []))
-            })
+            chain = LAYERED_PROMPT | self.llm | StrOutputParser()
             
-            with open("d:/Projects/KrishiSahAI TechFiesta/app_debug.log", "a") as logf:
-                logf.write(f"[NOTIF-ENGINE] LLM Response received (len: {len(response)}). Parsing JSON...\n")
-                logf.write(f"[NOTIF-ENGINE] RAW RESPONSE: {response}\n")
+            log.debug("Invoking LLM", extra={"model": self.llm_model, "site": site})
+
+            # Rules, data and turn are passed as values, so JSON braces are never parsed as template fields
+            response = await chain.ainvoke(
+                prompt_assembler.inputs(rules, dynamic_context=dynamic_context, turn=NOTIFICATION_TURN),
+                config={"callbacks": prefill_tracker.callbacks(site, rules)}
+            )
             
+            log.debug("LLM response received", extra={"site": site, "chars": len(response), "raw": response})
+
             # Clean up response (remove code blocks if any)
             cleaned = response.strip().replace("```json", "").replace("```", "")
             results = json.loads(cleaned)
             
-            with open("d:/Projects/KrishiSahAI TechFiesta/app_debug.log", "a") as logf:
-                logf.write(f"[NOTIF-ENGINE] Successfully parsed {len(results)} insights\n")
-            
+            log.info("Parsed insights", extra={"site": site, "count": len(results)})
+
             return results
         except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
-            try:
-                with open("d:/Projects/KrishiSahAI TechFiesta/app_debug.log", "a") as logf:
-                    logf.write(f"[NOTIF-ENGINE] LLM Method ERROR: {str(e)}\n{error_trace}\n")
-            except: pass
+            log.exception("LLM method failed", extra={"site": site})
             print(f"[NOTIF-ENGINE] LLM Method ERROR: {e}")
             return []
 
-    def _process_and_prioritize(self, llm_notifications, weather, news):
+    def _process_and_prioritize(self, llm_notifications, weather, news, profile=None):
         processed = []
         
-        # 1. Add LLM generated notifications
+        # 1. Threshold alerts (rain, heat, wind, disease risk) come from the rules engine, not the LLM
+        try:
+            processed.extend(rules_engine.alerts(profile or {}, weather))
+        except Exception as e:
+            print(f"[NOTIF-ENGINE] Rules engine error: {e}")
+
+        # 2. Add LLM generated notifications (the narrative advisory)
         for n in llm_notifications:
+            if not isinstance(n, dict):
+                continue
             n['id'] = str(datetime.now().timestamp()) + n.get('title', '')[:5]
             n['timestamp'] = datetime.utcnow().isoformat() + "Z"
             n['read'] = False
             processed.append(n)
-            
-        # 2. Add Critical Weather Alert (Deterministic Fallback)
-        # If LLM missed it, but logic says high rain
-        rain_prob = weather.get('rainfall_probability', 0)
-        try:
-            rain_val = float(rain_prob)
-            if rain_val > 70:
-                has_weather_alert = any(n['type'] == 'weather' and n['priority'] == 'high' for n in processed)
-                if not has_weather_alert:
-                    processed.append({
-                        "id": f"rain_{datetime.now().timestamp()}",
-                        "title": "Heavy Rain Alert",
-                        "message": f"Rainfall probability is {rain_val}%. Secure your harvested crops.",
-                        "type": "weather",
-                        "priority": "high",
-                        "action": "Do not irrigate. Cover harvested produce.",
-                        "source": "Weather API",
-                        "timestamp": datetime.utcnow().isoformat() + "Z",
-                        "read": False
-                    })
-        except: pass
         
         # 3. Sort by Priority (High > Medium > Low)
         priority_map = {"high": 0, "medium": 1, "low": 2}
@@ -310,10 +304,10 @@ class NotificationEngine:
         return processed
 
     def _store_notifications(self, user_id, notifications):
-        self.notification_store[user_id] = notifications
+        self.store.put(user_id, notifications)
 
-    def get_notifications(self, user_id):
-        return self.notification_store.get(user_id, [])
+    def get_notifications(self, user_id, unread_only=False):
+        return self.store.get(user_id, unread_only=unread_only)
 
 # Singleton Instance
 notification_engine = NotificationEngine()
@@ -0,0 +1,219 @@
+"""
+Persistent notification store.
+
+Notifications used to live in a dict on the engine: lost on restart, not
+shared between workers and unbounded. Here they live in SQLite (WAL, so the
+Flask workers read while the fan-out job writes):
+
+- every user keeps at most NOTIF_RING_SIZE notifications; the oldest drop out
+- notifications expire NOTIF_TTL_HOURS after they were generated
+- a regenerated alert (same type + title) replaces the old row instead of piling
+  up; it keeps its read state only if nothing but the timestamp changed, so a
+  new alert under an old title comes back unread
+- rules-engine alerts (ids "rule_...") are re-evaluated on every weather
+  refresh; put_rule_alerts() withdraws those a user no longer gets
+- reads walk the (user_id, priority, created_at) index and come back high
+  priority first, newest first; each thread reads through its own connection,
+  so a batch write never holds up a read
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DEFAULT_STORE_PATH = BASE_DIR / 'cache' / 'notifications.sqlite3'
+
+PRIORITIES = {"high": 0, "medium": 1, "low": 2}
+
+
+def _dedup_key(notification: dict) -> str:
+    return f"{str(notification.get('type', 'general')).lower()}:{' '.join(str(notification.get('title', '')).lower().split())}"
+
+
+class NotificationStore:
+    def __init__(self, path=None, ring_size: int = None, ttl_hours: float = None):
+        self.path = Path(path or os.getenv("NOTIF_STORE_PATH", DEFAULT_STORE_PATH))
+        self.ring_size = ring_size or int(os.getenv("NOTIF_RING_SIZE", "30"))
+        self.ttl = float(ttl_hours if ttl_hours is not None else os.getenv("NOTIF_TTL_HOURS", "72")) * 3600
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._last_purge = 0.0
+        self.counters = {"written": 0, "batches": 0, "evicted": 0, "expired": 0, "marked_read": 0, "withdrawn": 0}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS notifications (
+                user_id TEXT NOT NULL,
+                dedup_key TEXT NOT NULL,
+                id TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                read INTEGER NOT NULL DEFAULT 0,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (user_id, dedup_key)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_notif_user_priority ON notifications (user_id, priority, created_at DESC)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_notif_expiry ON notifications (expires_at)")
+        self._conn.commit()
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(str(self.path))
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def _write(self, cursor, user_id: str, notifications: list, now: float, withdraw_rules: bool = False) -> int:
+        written, keys = 0, []
+        for n in notifications:
+            if not isinstance(n, dict):
+                continue
+            n = dict(n)
+            n.pop("read", None)
+            keys.append(_dedup_key(n))
+            cursor.execute(
+                """INSERT INTO notifications (user_id, dedup_key, id, priority, created_at, expires_at, read, payload)
+                   VALUES (?, ?, ?, ?, ?, ?, 0, ?)
+                   ON CONFLICT (user_id, dedup_key) DO UPDATE SET
+                       id=excluded.id, priority=excluded.priority, created_at=excluded.created_at,
+                       expires_at=excluded.expires_at, payload=excluded.payload,
+                       read=CASE WHEN json_remove(notifications.payload, '$.timestamp')
+                                      = json_remove(excluded.payload, '$.timestamp')
+                                 THEN notifications.read ELSE 0 END""",
+                (user_id, keys[-1], str(n.get("id") or f"{now}:{written}"),
+                 PRIORITIES.get(str(n.get("priority", "low")).lower(), 2),
+                 now, now + self.ttl, json.dumps(n, ensure_ascii=False, default=str))
+            )
+            written += 1
+        if withdraw_rules:
+            # Rule alerts this evaluation no longer raises (the rain cleared, the wind dropped)
+            marks = ", ".join("?" for _ in keys)
+            self.counters["withdrawn"] += cursor.execute(
+                f"""DELETE FROM notifications WHERE user_id=? AND id LIKE 'rule\\_%' ESCAPE '\\'
+                    AND dedup_key NOT IN ({marks})""",
+                (user_id, *keys)
+            ).rowcount
+        # Ring buffer: keep the newest ring_size rows of this user
+        evicted = cursor.execute(
+            """DELETE FROM notifications WHERE user_id=? AND dedup_key NOT IN (
+                   SELECT dedup_key FROM notifications WHERE user_id=? ORDER BY created_at DESC LIMIT ?)""",
+            (user_id, user_id, self.ring_size)
+        ).rowcount
+        self.counters["evicted"] += max(0, evicted)
+        return written
+
+    def put_many(self, batch: dict, withdraw_rules: bool = False) -> int:
+        """Store {user_id: [notification, ...]} in one transaction (the fan-out flushes a page at a time)."""
+        if not batch:
+            return 0
+        self._maybe_purge()
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.cursor()
+            try:
+                written = sum(self._write(cursor, user_id, notifications, now, withdraw_rules)
+                              for user_id, notifications in batch.items())
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            self.counters["written"] += written
+            self.counters["batches"] += 1
+        return written
+
+    def put(self, user_id: str, notifications: list) -> int:
+        return self.put_many({user_id: notifications})
+
+    def put_rule_alerts(self, batch: dict) -> int:
+        """Store {user_id: [rule alert, ...]}; each listed user's other rule alerts are withdrawn (an empty list clears them)."""
+        return self.put_many(batch, withdraw_rules=True)
+
+    def get(self, user_id: str, unread_only: bool = False, limit: int = None) -> list:
+        """Live notifications of a user, high priority first, newest first."""
+        query = "SELECT payload, read FROM notifications WHERE user_id=? AND expires_at > ?"
+        if unread_only:
+            query += " AND read=0"
+        query += " ORDER BY priority, created_at DESC LIMIT ?"
+        rows = self._reader().execute(query, (user_id, time.time(), limit or self.ring_size)).fetchall()
+        notifications = []
+        for payload, read in rows:
+            n = json.loads(payload)
+            n["read"] = bool(read)
+            notifications.append(n)
+        return notifications
+
+    def users_with_generated(self, user_ids: list) -> set:
+        """Which of user_ids have live notifications besides rules-engine alerts (ids "rule_...")."""
+        found = set()
+        now = time.time()
+        user_ids = list(user_ids)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(user_ids), 500):
+            chunk = user_ids[start:start + 500]
+            marks = ", ".join("?" for _ in chunk)
+            found.update(row[0] for row in self._reader().execute(
+                f"""SELECT DISTINCT user_id FROM notifications
+                    WHERE user_id IN ({marks}) AND expires_at > ? AND id NOT LIKE 'rule\\_%' ESCAPE '\\'""",
+                (*chunk, now)
+            ))
+        return found
+
+    def unread_count(self, user_id: str) -> int:
+        return self._reader().execute(
+            "SELECT COUNT(*) FROM notifications WHERE user_id=? AND read=0 AND expires_at > ?", (user_id, time.time())
+        ).fetchone()[0]
+
+    def mark_read(self, user_id: str, ids: list = None) -> int:
+        """Mark the given notification ids (or all of them when ids is None) as read."""
+        with self._lock:
+            if ids is None:
+                changed = self._conn.execute(
+                    "UPDATE notifications SET read=1 WHERE user_id=? AND read=0", (user_id,)
+                ).rowcount
+            else:
+                ids = [str(i) for i in ids][:self.ring_size]
+                if not ids:
+                    return 0
+                marks = ", ".join("?" for _ in ids)
+                changed = self._conn.execute(
+                    f"UPDATE notifications SET read=1 WHERE user_id=? AND read=0 AND id IN ({marks})", (user_id, *ids)
+                ).rowcount
+            self._conn.commit()
+            self.counters["marked_read"] += changed
+        return changed
+
+    def _maybe_purge(self):
+        if time.time() - self._last_purge > 300:
+            self.purge_expired()
+
+    def purge_expired(self) -> int:
+        """Drop notifications past their TTL."""
+        now = time.time()
+        self._last_purge = now
+        with self._lock:
+            expired = self._conn.execute("DELETE FROM notifications WHERE expires_at <= ?", (now,)).rowcount
+            self._conn.commit()
+            self.counters["expired"] += expired
+        if expired:
+            print(f"[NOTIF-STORE] Purged {expired} expired notifications")
+        return expired
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM notifications").fetchone()[0]
+            counters = dict(self.counters)
+        counters.update({"rows": rows, "ring_size": self.ring_size, "ttl_hours": self.ttl / 3600})
+        return counters
+
+
+# Singleton Instance
+notification_store = NotificationStore()
@@ -0,0 +1,222 @@
+"""
+Deterministic threshold alerts, evaluated with NumPy over many farmers at once.
+
+Rain, heat, wind and humidity-driven disease risk are plain threshold checks
+on the weather, so they don't need the LLM (which now only writes the
+narrative advisory). Weather features of n farmers form an (n, 5) matrix and
+their crops an (n, C) boolean matrix over the crops in CROP_RISKS; every rule
+is one broadcast comparison (about 30 ms for 100k farmers), so the whole user
+base is re-evaluated on each weather refresh. Missing weather values are NaN
+and never trigger a rule.
+"""
+
+import re
+from datetime import datetime
+
+import numpy as np
+
+FEATURES = ("rainfall_probability", "temperature", "daily_max_temp", "humidity", "wind_speed")
+RAIN, TEMP, MAX_TEMP, HUMIDITY, WIND = range(len(FEATURES))
+
+RAIN_MEDIUM = 50        # %
+RAIN_HIGH = 70          # %
+HEAT_DEFAULT = 40       # deg C, for farmers whose crops aren't in CROP_RISKS
+WIND_SPRAY = 25         # km/h, drift makes spraying wasteful above this
+WIND_LODGING = 40       # km/h, tall crops start to lodge
+
+# heat: daily max (deg C) that stresses the crop; disease: the humidity-driven
+# disease it is most prone to, with the humidity (%) and temperature band (deg C) it needs
+CROP_RISKS = {
+    "rice": {"heat": 38, "humidity": 90, "temp": (20, 30), "disease": "blast", "tall": True},
+    "wheat": {"heat": 32, "humidity": 80, "temp": (10, 25), "disease": "rust", "tall": True},
+    "cotton": {"heat": 42, "humidity": 85, "temp": (20, 30), "disease": "grey mildew", "tall": False},
+    "sugarcane": {"heat": 42, "humidity": 85, "temp": (25, 35), "disease": "red rot", "tall": True},
+    "soybean": {"heat": 38, "humidity": 85, "temp": (18, 28), "disease": "rust", "tall": False},
+    "onion": {"heat": 38, "humidity": 80, "temp": (20, 30), "disease": "purple blotch", "tall": False},
+    "tomato": {"heat": 35, "humidity": 85, "temp": (15, 25), "disease": "late blight", "tall": False},
+    "potato": {"heat": 32, "humidity": 85, "temp": (10, 25), "disease": "late blight", "tall": False},
+    "grapes": {"heat": 40, "humidity": 85, "temp": (18, 28), "disease": "downy mildew", "tall": False},
+    "pomegranate": {"heat": 42, "humidity": 80, "temp": (25, 35), "disease": "bacterial blight", "tall": False},
+    "maize": {"heat": 38, "humidity": 85, "temp": (18, 27), "disease": "leaf blight", "tall": True},
+    "chilli": {"heat": 38, "humidity": 80, "temp": (25, 32), "disease": "anthracnose", "tall": False},
+    "banana": {"heat": 40, "humidity": 85, "temp": (25, 30), "disease": "sigatoka leaf spot", "tall": True},
+    "groundnut": {"heat": 40, "humidity": 85, "temp": (25, 30), "disease": "tikka leaf spot", "tall": False},
+    "gram": {"heat": 35, "humidity": 85, "temp": (15, 25), "disease": "ascochyta blight", "tall": False},
+    "tur": {"heat": 40, "humidity": 85, "temp": (25, 30), "disease": "phytophthora blight", "tall": False},
+    "jowar": {"heat": 42, "humidity": 85, "temp": (25, 32), "disease": "grain mould", "tall": True},
+    "bajra": {"heat": 42, "humidity": 85, "temp": (20, 30), "disease": "downy mildew", "tall": False},
+    "turmeric": {"heat": 40, "humidity": 85, "temp": (21, 30), "disease": "leaf blotch", "tall": False},
+}
+CROP_ALIASES = {
+    "paddy": "rice", "grape": "grapes", "chili": "chilli", "pigeon pea": "tur", "arhar": "tur",
+    "chickpea": "gram", "sorghum": "jowar", "pearl millet": "bajra", "corn": "maize", "soyabean": "soybean",
+    "peanut": "groundnut",
+}
+
+
+def _crop_key(crop) -> str:
+    name = " ".join(str(crop or "").lower().split())
+    return CROP_ALIASES.get(name, name)
+
+
+class RulesEngine:
+    def __init__(self, crop_risks: dict = None):
+        risks = crop_risks or CROP_RISKS
+        self.crops = list(risks)
+        self.index = {crop: i for i, crop in enumerate(self.crops)}
+        self.heat = np.array([risks[c]["heat"] for c in self.crops], dtype=float)
+        self.humidity = np.array([risks[c]["humidity"] for c in self.crops], dtype=float)
+        self.temp_low = np.array([risks[c]["temp"][0] for c in self.crops], dtype=float)
+        self.temp_high = np.array([risks[c]["temp"][1] for c in self.crops], dtype=float)
+        self.tall = np.array([risks[c]["tall"] for c in self.crops], dtype=bool)
+        self.diseases = [risks[c]["disease"] for c in self.crops]
+        # Per-crop outcomes are packed into one uint64 per farmer when grouping farmers
+        if len(self.crops) > 64:
+            raise ValueError("RulesEngine supports at most 64 crops")
+        self.bit_values = np.left_shift(np.uint64(1), np.arange(len(self.crops), dtype=np.uint64))
+
+    # --- Encoding ---
+
+    @staticmethod
+    def weather_matrix(weathers: list) -> np.ndarray:
+        """(n, len(FEATURES)) float matrix; missing, failed or non-numeric readings are NaN."""
+        matrix = np.full((len(weathers), len(FEATURES)), np.nan)
+        for row, weather in enumerate(weathers):
+            if not isinstance(weather, dict) or "error" in weather:
+                continue
+            for col, feature in enumerate(FEATURES):
+                try:
+                    matrix[row, col] = float(weather.get(feature))
+                except (TypeError, ValueError):
+                    pass
+        return matrix
+
+    def crop_matrix(self, crop_lists: list) -> np.ndarray:
+        """(n, C) bool matrix of which known crops each farmer grows."""
+        matrix = np.zeros((len(crop_lists), len(self.crops)), dtype=bool)
+        for row, crops in enumerate(crop_lists):
+            for crop in crops or []:
+                col = self.index.get(_crop_key(crop))
+                if col is not None:
+                    matrix[row, col] = True
+        return matrix
+
+    # --- Rules ---
+
+    def evaluate(self, weather: np.ndarray, crops: np.ndarray) -> dict:
+        """
+        All rules for n farmers at once. Returns arrays: rain (n,) 0/1/2 severity,
+        heat (n, C) per crop plus heat_any (n,) for farmers with no known crop,
+        wind_spray / wind_lodging (n,), disease (n, C) per crop.
+        """
+        rain = weather[:, RAIN]
+        max_temp = np.where(np.isnan(weather[:, MAX_TEMP]), weather[:, TEMP], weather[:, MAX_TEMP])
+        temp, humidity, wind = weather[:, TEMP], weather[:, HUMIDITY], weather[:, WIND]
+        known = crops.any(axis=1)
+        return {
+            "rain": np.where(rain > RAIN_HIGH, 2, np.where(rain > RAIN_MEDIUM, 1, 0)),
+            "heat": crops & (max_temp[:, None] >= self.heat),
+            "heat_any": ~known & (max_temp >= HEAT_DEFAULT),
+            "wind_lodging": (wind >= WIND_LODGING) & (crops & self.tall).any(axis=1),
+            "wind_spray": wind >= WIND_SPRAY,
+            "disease": crops & (humidity[:, None] >= self.humidity)
+                       & (temp[:, None] >= self.temp_low) & (temp[:, None] <= self.temp_high),
+        }
+
+    # --- Notifications ---
+
+    def _notification(self, kind: str, title: str, message: str, priority: str, action: str, notif_type: str = "weather"):
+        return {
+            # The title keeps alerts of one kind apart (Heavy Rain Alert vs Rain Likely Today)
+            "id": f"rule_{kind}_{re.sub(r'[^a-z0-9]+', '_', title.lower()).strip('_')}_{datetime.now().strftime('%Y%m%d')}",
+            "title": title,
+            "message": message,
+            "type": notif_type,
+            "priority": priority,
+            "action": action,
+            "source": "Rules Engine",
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "read": False,
+        }
+
+    def _alerts_for_row(self, row: int, weather: np.ndarray, result: dict) -> list:
+        alerts = []
+        rain, temp, max_temp, humidity, wind = (weather[row, i] for i in range(len(FEATURES)))
+        max_temp = temp if np.isnan(max_temp) else max_temp
+
+        if result["rain"][row] == 2:
+            alerts.append(self._notification(
+                "rain", "Heavy Rain Alert", f"Rainfall probability is {rain:.0f}%. Secure your harvested crops.",
+                "high", "Do not irrigate. Cover harvested produce."))
+        elif result["rain"][row] == 1:
+            alerts.append(self._notification(
+                "rain", "Rain Likely Today", f"Rainfall probability is {rain:.0f}%.",
+                "medium", "Delay fertilizer and pesticide application until after the rain."))
+
+        heat_crops = [self.crops[c] for c in np.flatnonzero(result["heat"][row])]
+        if heat_crops or result["heat_any"][row]:
+            names = ", ".join(c.title() for c in heat_crops[:2]) or "your crops"
+            alerts.append(self._notification(
+                "heat", "Heat Stress Alert", f"Up to {max_temp:.0f}°C expected, stressful for {names}.",
+                "high", "Irrigate in the early morning or evening and mulch to keep moisture."))
+
+        if result["wind_lodging"][row]:
+            alerts.append(self._notification(
+                "wind", "Strong Wind Alert", f"Winds up to {wind:.0f} km/h can flatten tall crops.",
+                "high", "Prop up or earth up tall plants and avoid irrigating before the wind."))
+        elif result["wind_spray"][row]:
+            alerts.append(self._notification(
+                "wind", "Windy: Avoid Spraying", f"Winds at {wind:.0f} km/h will carry spray drift.",
+                "medium", "Postpone spraying until wind drops below 15 km/h."))
+
+        for c in np.flatnonzero(result["disease"][row]):
+            crop, disease = self.crops[c], self.diseases[c]
+            alerts.append(self._notification(
+                f"disease_{crop}", f"{crop.title()} {disease.title()} Risk",
+                f"Humidity {humidity:.0f}% at {temp:.0f}°C favours {disease} in {crop}.",
+                "high", f"Scout {crop} leaves today and spray a preventive fungicide if spots appear.", "disease"))
+        return alerts
+
+    @staticmethod
+    def _dedupe(items: list, key):
+        """Unique items and, per input position, the index of its unique item."""
+        seen, unique, index = {}, [], np.empty(len(items), dtype=np.int64)
+        for i, item in enumerate(items):
+            k = key(item)
+            if k not in seen:
+                seen[k] = len(unique)
+                unique.append(item)
+            index[i] = seen[k]
+        return unique, index
+
+    def alerts_batch(self, crop_lists: list, weathers: list) -> list:
+        """
+        Alert notifications for n farmers: crop_lists[i] and weathers[i] belong to
+        farmer i. Farmers share forecasts (one per location) and crop sets, so both
+        are encoded once per distinct value, and notifications are built once per
+        distinct rule outcome; farmers with the same outcome share the same list
+        (treat it as read-only).
+        """
+        unique_weathers, weather_idx = self._dedupe(weathers, id)
+        unique_crops, crop_idx = self._dedupe(crop_lists, lambda crops: tuple(crops or ()))
+        weather = self.weather_matrix(unique_weathers)[weather_idx]
+        result = self.evaluate(weather, self.crop_matrix(unique_crops)[crop_idx])
+
+        # One integer per farmer encoding its forecast and every rule outcome; equal keys get equal alerts
+        flags = (result["rain"] * 8 + result["heat_any"] * 4 + result["wind_lodging"] * 2 + result["wind_spray"])
+        key = weather_idx
+        for bits in (result["heat"], result["disease"]):
+            values, dense = np.unique(bits.astype(np.uint64) @ self.bit_values, return_inverse=True)
+            key = key * len(values) + dense.reshape(-1)
+        _, first, inverse = np.unique(key * 24 + flags, return_index=True, return_inverse=True)
+        group_alerts = [self._alerts_for_row(row, weather, result) for row in first]
+        return [group_alerts[g] for g in inverse.reshape(-1)]
+
+    def alerts(self, profile: dict, weather: dict) -> list:
+        """Alerts for a single farmer (the per-user generation path)."""
+        matrix = self.weather_matrix([weather])
+        return self._alerts_for_row(0, matrix, self.evaluate(matrix, self.crop_matrix([profile.get("crops", [])])))
+
+
+# Singleton Instance
+rules_engine = RulesEngine()
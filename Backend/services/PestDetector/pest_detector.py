@@ -6,6 +6,8 @@ import sys
 from pathlib import Path
 from PIL import Image
 
+from middleware.metrics import metrics
+
 # Global model instance
 _model = None
 
@@ -125,7 +127,8 @@ def predict(image_path):
 
         # Load image
         try:
-            img = Image.open(image_path)
+            with metrics.timer("pest.image_load"):
+                img = Image.open(image_path)
         except Exception as e:
             return {
                 'pest_name': 'Error',
@@ -135,10 +138,15 @@ def predict(image_path):
             }
 
         # Run inference
-        results = _model(img)
+        with metrics.timer("pest.model"):
+            results = _model(img)
+        # AutoShape times its own stages with Profile (ms per image)
+        for stage, ms in zip(("pest.preprocess", "pest.inference", "pest.nms"), getattr(results, "t", ())):
+            metrics.observe(stage, ms / 1e3)
 
         # Convert detections to DataFrame
-        df = results.pandas().xyxy[0]  # columns: xmin, ymin, xmax, ymax, confidence, class, name
+        with metrics.timer("pest.pandas"):
+            df = results.pandas().xyxy[0]  # columns: xmin, ymin, xmax, ymax, confidence, class, name
 
         if df.empty:
             return {
@@ -0,0 +1,90 @@
+"""
+Precomputed crop plan store.
+
+Generic (profile-independent) crop lifecycle plans are generated offline by the
+pre-generation job and kept in a local SQLite file. They are built from a guest
+profile, so a request is only answered with one as a placeholder while the
+farmer's personalised plan is generated; it is never saved as their plan.
+Plans are keyed by the crop plan prompt version, so a prompt change makes the
+old ones invisible until the next pre-generation run replaces them.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DEFAULT_STORE_PATH = BASE_DIR / 'cache' / 'precomputed_plans.sqlite3'
+
+
+def _crop_key(crop_name: str) -> str:
+    return " ".join(str(crop_name or "").lower().split())
+
+
+def _lang_key(language: str) -> str:
+    lang = str(language or "en").upper()
+    return lang if lang in ('EN', 'HI', 'MR') else 'EN'
+
+
+class CropPlanStore:
+    """SQLite-backed store of pre-generated crop roadmaps keyed by crop and language."""
+
+    def __init__(self, path=None, version: str = None):
+        if version is None:
+            from services.Planner.planner_service import crop_plan_prompt_version
+            version = crop_plan_prompt_version()
+        self.version = version
+        self.path = Path(path or os.getenv("CROP_PLAN_STORE_PATH", DEFAULT_STORE_PATH))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS crop_plans (
+                crop TEXT NOT NULL,
+                language TEXT NOT NULL,
+                roadmap TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                prompt_version TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (crop, language)
+            )"""
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(crop_plans)")}
+        if "prompt_version" not in columns:
+            # Stores created before plans were versioned; their plans count as stale
+            self._conn.execute("ALTER TABLE crop_plans ADD COLUMN prompt_version TEXT NOT NULL DEFAULT ''")
+        self._conn.commit()
+
+    def get(self, crop_name: str, language: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT roadmap FROM crop_plans WHERE crop=? AND language=? AND prompt_version=?",
+                (_crop_key(crop_name), _lang_key(language), self.version)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def has(self, crop_name: str, language: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM crop_plans WHERE crop=? AND language=? AND prompt_version=?",
+                (_crop_key(crop_name), _lang_key(language), self.version)
+            ).fetchone()
+        return row is not None
+
+    def put(self, crop_name: str, language: str, roadmap: dict):
+        if not roadmap or str(roadmap.get('overview', '')).startswith('Error') or not roadmap.get('years'):
+            return False
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO crop_plans (crop, language, roadmap, created_at, prompt_version) VALUES (?, ?, ?, ?, ?)",
+                (_crop_key(crop_name), _lang_key(language), json.dumps(roadmap, ensure_ascii=False), time.time(), self.version)
+            )
+            self._conn.commit()
+        return True
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM crop_plans WHERE prompt_version=?", (self.version,)).fetchone()[0]
@@ -0,0 +1,260 @@
+"""
+Offline pre-generation of crop-dependent LLM content.
+
+Walks every known crop (crop_disease_data.csv + the disease model CLASS_NAMES)
+x {EN, HI, MR} and pre-generates the Waste-to-Value analysis and the generic
+crop lifecycle plan, so peak-hour requests are served from the precomputed
+stores instead of Ollama. Crop plans built this way are generic (guest
+profile): the crop roadmap route only shows them as a placeholder while the
+farmer's own plan is generated.
+
+The checkpoint belongs to one run: it is keyed by the run date and the prompt
+versions, so a crash resumes the same night's run, the next night's run walks
+every task again (skipping what is still stored), and anything dropped by a
+prompt change is regenerated.
+
+Usage (from the Backend directory):
+    python -m services.Pregeneration.pregeneration_job --workers 2 --off-peak-only
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+CSV_PATH = BASE_DIR / 'services' / 'DiseaseDetector' / 'crop_disease_data.csv'
+DEFAULT_CHECKPOINT_PATH = BASE_DIR / 'cache' / 'pregeneration_checkpoint.json'
+
+LANGUAGES = {
+    # planner code -> waste-to-value language name
+    "EN": "English",
+    "HI": "Hindi",
+    "MR": "Marathi",
+}
+KINDS = ("waste", "crop_plan")
+
+
+def load_known_crops():
+    """Unique crop names from the disease CSV and the disease model labels."""
+    crops = {}
+
+    try:
+        df = pd.read_csv(str(CSV_PATH), usecols=['Crop Name'])
+        for name in df['Crop Name'].dropna().unique():
+            crops.setdefault(str(name).strip().lower(), str(name).strip())
+    except Exception as e:
+        print(f"[PREGEN] Could not read {CSV_PATH}: {e}")
+
+    disease_dir = BASE_DIR / 'services' / 'DiseaseDetector'
+    if str(disease_dir) not in sys.path:
+        sys.path.append(str(disease_dir))
+    try:
+        from disease_detector import CLASS_NAMES
+        for label in CLASS_NAMES:
+            name = label.split("___", 1)[0].replace("_", " ").strip()
+            crops.setdefault(name.lower(), name)
+    except Exception as e:
+        print(f"[PREGEN] Could not load CLASS_NAMES: {e}")
+
+    return sorted(crops.values(), key=str.lower)
+
+
+def parse_window(window: str):
+    """'01:00-05:00' -> (start_minutes, end_minutes)."""
+    start, end = window.split("-")
+    to_min = lambda hhmm: int(hhmm.split(":")[0]) * 60 + int(hhmm.split(":")[1])
+    return to_min(start), to_min(end)
+
+
+def in_window(window: str, now: datetime = None) -> bool:
+    start, end = parse_window(window)
+    now = now or datetime.now()
+    minutes = now.hour * 60 + now.minute
+    if start <= end:
+        return start <= minutes < end
+    # Window wraps midnight, e.g. 22:00-06:00
+    return minutes >= start or minutes < end
+
+
+class Checkpoint:
+    """Set of finished task keys of one run (run_id), persisted to a JSON file after every task."""
+
+    def __init__(self, path, run_id: str = ""):
+        self.path = Path(path)
+        self.run_id = run_id
+        self._lock = threading.Lock()
+        self.done = set()
+        if self.path.exists():
+            try:
+                saved = json.loads(self.path.read_text(encoding='utf-8'))
+                if saved.get("run_id", "") == run_id:
+                    self.done = set(saved.get("done", []))
+                else:
+                    print(f"[PREGEN] Checkpoint is from run {saved.get('run_id') or 'unknown'}; starting run {run_id}")
+            except Exception as e:
+                print(f"[PREGEN] Ignoring unreadable checkpoint {self.path}: {e}")
+
+    def mark(self, key: str):
+        with self._lock:
+            self.done.add(key)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"run_id": self.run_id, "done": sorted(self.done), "updated_at": time.time()}), encoding='utf-8')
+            os.replace(tmp, self.path)
+
+    def reset(self):
+        with self._lock:
+            self.done = set()
+            if self.path.exists():
+                self.path.unlink()
+
+
+class PregenerationJob:
+    def __init__(self, waste_engine=None, crop_planner=None, plan_store=None,
+                 max_workers: int = None, checkpoint_path=None, window: str = None):
+        self.waste_engine = waste_engine
+        self.crop_planner = crop_planner
+        self.plan_store = plan_store
+        # Keep concurrency low: every worker holds an Ollama generation slot
+        self.max_workers = max_workers or int(os.getenv("PREGEN_CONCURRENCY", "2"))
+        self.run_id = self.default_run_id()
+        self.checkpoint = Checkpoint(checkpoint_path or os.getenv("PREGEN_CHECKPOINT_PATH", DEFAULT_CHECKPOINT_PATH), self.run_id)
+        self.window = window
+        self.stats = {"generated": 0, "skipped": 0, "failed": 0, "deferred": 0}
+        self._stats_lock = threading.Lock()
+
+    def default_run_id(self) -> str:
+        """Run date plus the prompt versions of both stores."""
+        waste_version = getattr(getattr(self.waste_engine, "cache", None), "version", "")
+        plan_version = getattr(self.plan_store, "version", "")
+        return f"{datetime.now().date().isoformat()}:{waste_version}:{plan_version}"
+
+    def build_tasks(self, crops=None, kinds=KINDS):
+        crops = crops or load_known_crops()
+        return [(kind, crop, lang) for kind in kinds for crop in crops for lang in LANGUAGES]
+
+    @staticmethod
+    def task_key(kind, crop, lang):
+        return f"{kind}:{crop.lower()}:{lang}"
+
+    def _bump(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _already_stored(self, kind, crop, lang) -> bool:
+        if kind == "waste":
+            cache = getattr(self.waste_engine, "cache", None)
+            return cache is not None and cache.has(crop, LANGUAGES[lang])
+        return self.plan_store is not None and self.plan_store.has(crop, lang)
+
+    def _run_task(self, kind, crop, lang):
+        key = self.task_key(kind, crop, lang)
+        if self.window and not in_window(self.window):
+            # Outside the off-peak window: leave it for the next run
+            self._bump("deferred")
+            return
+        if self._already_stored(kind, crop, lang):
+            self.checkpoint.mark(key)
+            self._bump("skipped")
+            return
+
+        started = time.time()
+        if kind == "waste":
+            result = self.waste_engine.analyze_waste(crop, LANGUAGES[lang])
+            ok = bool(result) and not result.get("error")
+        else:
+            roadmap = self.crop_planner.generate_crop_roadmap(None, crop, lang.lower())
+            ok = self.plan_store.put(crop, lang, roadmap)
+
+        if ok:
+            self.checkpoint.mark(key)
+            self._bump("generated")
+            print(f"[PREGEN] {key} done in {time.time() - started:.1f}s")
+        else:
+            self._bump("failed")
+            print(f"[PREGEN] {key} failed; will retry on the next run")
+
+    def run(self, crops=None, kinds=KINDS):
+        tasks = [t for t in self.build_tasks(crops, kinds) if self.task_key(*t) not in self.checkpoint.done]
+        if "waste" in kinds and self.waste_engine is None:
+            tasks = [t for t in tasks if t[0] != "waste"]
+        if "crop_plan" in kinds and (self.crop_planner is None or self.plan_store is None):
+            tasks = [t for t in tasks if t[0] != "crop_plan"]
+
+        print(f"[PREGEN] {len(tasks)} pending tasks ({len(self.checkpoint.done)} already checkpointed), "
+              f"workers={self.max_workers}, window={self.window or 'any time'}")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._run_task, *task): task for task in tasks}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    self._bump("failed")
+                    print(f"[PREGEN] {self.task_key(*futures[future])} error: {e}")
+
+        print(f"[PREGEN] Finished: {self.stats}")
+        return dict(self.stats)
+
+
+def build_default_job(**kwargs):
+    """Construct engines and stores the same way app.py does."""
+    waste_dir = BASE_DIR / 'services' / 'WasteToValue' / 'src'
+    if str(waste_dir) not in sys.path:
+        sys.path.append(str(waste_dir))
+
+    from services.Planner.planner_service import CropPlannerGenerator
+    from services.Planner.plan_store import CropPlanStore
+
+    waste_engine = None
+    try:
+        from waste_service import WasteToValueEngine
+        waste_engine = WasteToValueEngine()
+    except Exception as e:
+        print(f"[PREGEN] Waste-to-Value engine unavailable: {e}")
+
+    return PregenerationJob(
+        waste_engine=waste_engine,
+        crop_planner=CropPlannerGenerator(),
+        plan_store=CropPlanStore(),
+        **kwargs
+    )
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Pre-generate Waste-to-Value analyses and crop plans.")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent Ollama generations (default: PREGEN_CONCURRENCY or 2)")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--crops", nargs="+", default=None, help="Limit to these crops")
+    parser.add_argument("--off-peak-only", action="store_true", help="Only generate inside PREGEN_WINDOW")
+    parser.add_argument("--window", default=os.getenv("PREGEN_WINDOW", "01:00-05:00"), help="Off-peak window HH:MM-HH:MM")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file path")
+    parser.add_argument("--reset", action="store_true", help="Discard the checkpoint and start over")
+    args = parser.parse_args()
+
+    job = build_default_job(
+        max_workers=args.workers,
+        checkpoint_path=args.checkpoint,
+        window=args.window if args.off_peak_only else None,
+    )
+    if args.reset:
+        job.checkpoint.reset()
+    job.run(crops=args.crops, kinds=tuple(args.kinds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+In-memory stand-in for the slice of firestore.Client that ProfileRepository
+uses: collection().document().get()/set()/delete(), get_all() and
+collection().on_snapshot(). Every round-trip sleeps `latency` seconds and is
+counted, so benchmarks and local runs can see how many reads a code path makes
+without a Firebase project. For the real API surface, point the Firebase SDK
+at the emulator instead (FIRESTORE_EMULATOR_HOST=localhost:8080).
+"""
+
+import copy
+import threading
+import time
+from types import SimpleNamespace
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id: str, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self.exists else None
+
+
+class FakeDocument:
+    def __init__(self, client, collection: str, doc_id: str):
+        self._client, self._collection, self.id = client, collection, doc_id
+
+    def get(self, field_paths=None):
+        self._client._round_trip("get")
+        return FakeSnapshot(self.id, self._client._data(self._collection).get(self.id))
+
+    def set(self, data: dict, merge: bool = False):
+        self._client._round_trip("write")
+        docs = self._client._data(self._collection)
+        current = dict(docs.get(self.id) or {}) if merge else {}
+        current.update(copy.deepcopy(data))
+        docs[self.id] = current
+        self._client._notify(self._collection, self.id, current, "MODIFIED" if merge else "ADDED")
+
+    def delete(self):
+        self._client._round_trip("write")
+        self._client._data(self._collection).pop(self.id, None)
+        self._client._notify(self._collection, self.id, None, "REMOVED")
+
+
+class FakeCollection:
+    def __init__(self, client, name: str):
+        self._client, self.name = client, name
+
+    def document(self, doc_id: str) -> FakeDocument:
+        return FakeDocument(self._client, self.name, doc_id)
+
+    def on_snapshot(self, callback):
+        """Calls callback(snapshots, changes, read_time) on every write, like a Firestore watch."""
+        listeners = self._client._listeners.setdefault(self.name, [])
+        listeners.append(callback)
+        return SimpleNamespace(unsubscribe=lambda: listeners.remove(callback))
+
+
+class FakeFirestore:
+    def __init__(self, collections: dict = None, latency: float = 0.0):
+        self._collections = {name: dict(docs) for name, docs in (collections or {}).items()}
+        self._listeners = {}
+        self._lock = threading.Lock()
+        self.latency = latency
+        self.round_trips = {"get": 0, "get_all": 0, "write": 0}
+
+    def _data(self, collection: str) -> dict:
+        return self._collections.setdefault(collection, {})
+
+    def _round_trip(self, kind: str):
+        with self._lock:
+            self.round_trips[kind] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _notify(self, collection: str, doc_id: str, data, change_type: str):
+        change = SimpleNamespace(document=FakeSnapshot(doc_id, data), type=SimpleNamespace(name=change_type))
+        for callback in list(self._listeners.get(collection, [])):
+            callback([change.document], [change], time.time())
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self, name)
+
+    def get_all(self, references, field_paths=None):
+        self._round_trip("get_all")
+        for ref in references:
+            yield FakeSnapshot(ref.id, ref._client._data(ref._collection).get(ref.id))
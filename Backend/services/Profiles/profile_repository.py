@@ -0,0 +1,247 @@
+"""
+Shared, cached access to users/{uid} profile documents.
+
+The notification engine, both roadmap generators and the personalized news
+route each used to do their own document(uid).get() round-trip per request.
+They now all go through ProfileRepository:
+
+- profiles are cached in-process for PROFILE_CACHE_TTL seconds (LRU bounded
+  by PROFILE_CACHE_SIZE); missing users are cached too, so an unknown uid
+  doesn't hit Firestore on every request
+- cache misses from concurrent requests are coalesced: the first caller waits
+  PROFILE_BATCH_WINDOW_MS for others and reads them all with one get_all(),
+  and callers asking for a uid that is already being read just wait for it
+- get_many() reads any number of profiles in get_all() chunks
+- with PROFILE_CACHE_LISTEN=true a snapshot listener on users/ refreshes or
+  drops cached profiles as soon as they change, so the TTL is only a backstop.
+  The listener streams the whole collection once when it attaches; it is off
+  by default for that reason
+- invalidate() drops a user explicitly (called after a profile edit)
+
+Any client with the firestore.Client surface works: the real one (which
+talks to the local emulator when FIRESTORE_EMULATOR_HOST is set) or
+FakeFirestore from fake_client.py.
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from middleware.metrics import metrics
+
+_MISSING = object()
+
+
+class _PendingRead:
+    """A uid being read by some batch; other callers wait on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.data = None
+        self.error = None
+
+
+class ProfileRepository:
+    def __init__(self, db=None, ttl_seconds: float = None, max_entries: int = None,
+                 batch_window_ms: float = None, max_batch: int = None, listen: bool = None):
+        self.db = db
+        self.ttl = float(ttl_seconds if ttl_seconds is not None else os.getenv("PROFILE_CACHE_TTL", "300"))
+        self.max_entries = max_entries or int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+        self.batch_window = float(batch_window_ms if batch_window_ms is not None
+                                  else os.getenv("PROFILE_BATCH_WINDOW_MS", "5")) / 1000
+        # get_all() accepts more, but large batches delay the first caller for little gain
+        self.max_batch = max_batch or int(os.getenv("PROFILE_BATCH_SIZE", "100"))
+        self.listen = listen if listen is not None else os.getenv("PROFILE_CACHE_LISTEN", "false").lower() == "true"
+
+        self._cache = OrderedDict()  # uid -> (data or None, expires_at)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._queue = []
+        self._leader = False
+        self._watch = None
+        self.counters = {"hits": 0, "misses": 0, "reads": 0, "batches": 0, "coalesced": 0,
+                         "invalidations": 0, "listener_updates": 0, "errors": 0}
+
+    def _get_db(self):
+        if self.db is None:
+            try:
+                from firebase_admin import firestore
+                self.db = firestore.client()
+            except Exception as e:
+                print(f"[PROFILES] Firestore client initialization failed: {e}")
+                return None
+            if self.listen:
+                self.start_listener()
+        return self.db
+
+    # --- Cache ---
+
+    def _cached(self, user_id: str):
+        entry = self._cache.get(user_id)
+        if entry is None:
+            return _MISSING
+        if entry[1] < time.time():
+            del self._cache[user_id]
+            return _MISSING
+        self._cache.move_to_end(user_id)
+        return entry[0]
+
+    def _put(self, user_id: str, data):
+        self._cache[user_id] = (data, time.time() + self.ttl)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    # --- Reads ---
+
+    def _read_batch(self, user_ids: list) -> dict:
+        """One get_all() round-trip per max_batch uids; absent users map to None."""
+        db = self._get_db()
+        if db is None:
+            raise RuntimeError("Firestore not initialized")
+        found = {}
+        collection = db.collection('users')
+        for start in range(0, len(user_ids), self.max_batch):
+            chunk = user_ids[start:start + self.max_batch]
+            with metrics.timer("firestore.profiles_get_all"):
+                snapshots = list(db.get_all([collection.document(uid) for uid in chunk]))
+            for snapshot in snapshots:
+                found[snapshot.id] = snapshot.to_dict() if snapshot.exists else None
+            with self._lock:
+                self.counters["batches"] += 1
+                self.counters["reads"] += len(chunk)
+        return {uid: found.get(uid) for uid in user_ids}
+
+    def _drain(self):
+        """Leader loop: read queued uids in batches until nobody is waiting."""
+        while True:
+            with self._lock:
+                batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+                if not batch:
+                    self._leader = False
+                    return
+            try:
+                results, error = self._read_batch(batch), None
+            except Exception as e:
+                results, error = {}, e
+            with self._lock:
+                if error is not None:
+                    self.counters["errors"] += 1
+                for uid in batch:
+                    pending = self._inflight.pop(uid)
+                    if error is None:
+                        self._put(uid, results.get(uid))
+                    pending.data, pending.error = results.get(uid), error
+                    pending.done.set()
+
+    def get(self, user_id: str):
+        """The users/{uid} document as a dict (a copy), or None if it doesn't exist or can't be read."""
+        if not user_id:
+            return None
+        with self._lock:
+            data = self._cached(user_id)
+            if data is not _MISSING:
+                self.counters["hits"] += 1
+                return copy.deepcopy(data)
+            self.counters["misses"] += 1
+            pending = self._inflight.get(user_id)
+            if pending is not None:
+                self.counters["coalesced"] += 1
+                leader = False
+            else:
+                pending = self._inflight[user_id] = _PendingRead()
+                self._queue.append(user_id)
+                leader = not self._leader
+                self._leader = self._leader or leader
+
+        if leader:
+            # Give concurrent requests a moment to join this round-trip
+            if self.batch_window > 0:
+                time.sleep(self.batch_window)
+            self._drain()
+        pending.done.wait()
+        if pending.error is not None:
+            print(f"[PROFILES] Error fetching profile {user_id}: {pending.error}")
+            return None
+        return copy.deepcopy(pending.data)
+
+    def get_many(self, user_ids: list) -> dict:
+        """uid -> document dict (or None) for every uid, with one get_all() per chunk of misses."""
+        result, missing = {}, []
+        with self._lock:
+            for uid in dict.fromkeys(user_ids):
+                data = self._cached(uid)
+                if data is _MISSING:
+                    missing.append(uid)
+                else:
+                    self.counters["hits"] += 1
+                    result[uid] = copy.deepcopy(data)
+            self.counters["misses"] += len(missing)
+        if missing:
+            try:
+                fetched = self._read_batch(missing)
+            except Exception as e:
+                print(f"[PROFILES] Error fetching {len(missing)} profiles: {e}")
+                with self._lock:
+                    self.counters["errors"] += 1
+                fetched = dict.fromkeys(missing)
+            else:
+                with self._lock:
+                    for uid, data in fetched.items():
+                        self._put(uid, data)
+            result.update({uid: copy.deepcopy(data) for uid, data in fetched.items()})
+        return result
+
+    # --- Invalidation ---
+
+    def invalidate(self, user_id: str = None) -> int:
+        """Drop one user (or everyone) from the cache; returns how many entries went."""
+        with self._lock:
+            if user_id is None:
+                removed = len(self._cache)
+                self._cache.clear()
+            else:
+                removed = 1 if self._cache.pop(user_id, None) is not None else 0
+            self.counters["invalidations"] += removed
+        return removed
+
+    def _on_snapshot(self, snapshots, changes, read_time):
+        with self._lock:
+            for change in changes:
+                uid = change.document.id
+                # Only refresh users we already hold; the initial snapshot lists every user
+                if uid not in self._cache:
+                    continue
+                if getattr(change.type, "name", str(change.type)) == "REMOVED":
+                    self._put(uid, None)
+                else:
+                    self._put(uid, change.document.to_dict())
+                self.counters["listener_updates"] += 1
+
+    def start_listener(self):
+        """Keep cached profiles in sync with users/ through a Firestore snapshot listener."""
+        if self._watch is not None or self.db is None:
+            return
+        try:
+            self._watch = self.db.collection('users').on_snapshot(self._on_snapshot)
+            print("[PROFILES] Snapshot listener attached to users/")
+        except Exception as e:
+            print(f"[PROFILES] Could not attach snapshot listener: {e}")
+
+    def stop_listener(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return dict(self.counters, entries=len(self._cache), ttl_seconds=self.ttl,
+                        listening=self._watch is not None,
+                        hit_rate=round(self.counters["hits"] / lookups, 3) if lookups else None)
+
+
+# Singleton Instance
+profile_repository = ProfileRepository()
@@ -4,6 +4,7 @@ import uuid
 import threading
 from pathlib import Path
 from flask import jsonify
+from middleware.structured_logging import get_logger
 
 # Configure paths
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -11,6 +12,8 @@ UPLOAD_FOLDER = BASE_DIR / 'uploads'
 AUDIO_FOLDER = BASE_DIR / 'uploads' / 'audio'
 os.makedirs(AUDIO_FOLDER, exist_ok=True)
 
+log = get_logger("voice")
+
 # Try imports
 try:
     import whisper
@@ -34,11 +37,7 @@ class VoiceService:
         self.model = None
 
     def _log(self, message):
-        try:
-            with open("stt_debug.log", "a", encoding='utf-8') as f:
-                f.write(f"{message}\n")
-        except:
-            print(message)
+        log.info(message)
 
     def _load_model(self):
         self._log("Loading model...")
@@ -0,0 +1,217 @@
+"""
+Persistent response cache for Waste-to-Value analyses.
+
+The analysis only depends on the crop, the output language and the system
+prompt, so identical questions ("ganna", "Sugarcane", "गन्ना") are folded onto
+one normalized key and served from an on-disk SQLite store that survives
+restarts. A small in-process dict sits in front of SQLite so hot keys are
+answered without touching the disk.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from prompts import WASTE_TO_VALUE_SYSTEM_PROMPT, GUARDRAIL_PROMPT
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
+DEFAULT_CACHE_PATH = BASE_DIR / 'cache' / 'waste_analysis.sqlite3'
+
+# Synonyms and common transliterations (Hindi / Marathi / Hinglish) folded onto
+# the English crop name the prompt knowledge base uses.
+CROP_SYNONYMS = {
+    # Sugarcane
+    "ganna": "sugarcane", "ganne": "sugarcane", "oos": "sugarcane",
+    "गन्ना": "sugarcane", "गन्ने": "sugarcane", "ऊस": "sugarcane",
+    # Rice / paddy
+    "paddy": "rice", "dhan": "rice", "dhaan": "rice", "chawal": "rice", "bhat": "rice",
+    "धान": "rice", "चावल": "rice", "भात": "rice", "तांदूळ": "rice",
+    # Wheat
+    "gehu": "wheat", "gehun": "wheat", "gahu": "wheat",
+    "गेहूं": "wheat", "गेहूँ": "wheat", "गहू": "wheat",
+    # Banana
+    "kela": "banana", "keli": "banana", "केला": "banana", "केळी": "banana", "केळ": "banana",
+    # Mango
+    "aam": "mango", "amba": "mango", "aamba": "mango", "आम": "mango", "आंबा": "mango",
+    # Cotton
+    "kapas": "cotton", "kapus": "cotton", "कपास": "cotton", "कापूस": "cotton",
+    # Maize
+    "maize": "corn", "makka": "corn", "makai": "corn", "मक्का": "corn", "मका": "corn",
+    # Soybean
+    "soya": "soybean", "soyabean": "soybean", "सोयाबीन": "soybean",
+    # Onion / tomato
+    "pyaz": "onion", "kanda": "onion", "प्याज": "onion", "कांदा": "onion",
+    "tamatar": "tomato", "टमाटर": "tomato", "टोमॅटो": "tomato",
+    # Coconut
+    "nariyal": "coconut", "naral": "coconut", "नारियल": "coconut", "नारळ": "coconut",
+    # Dung
+    "gobar": "dung", "shen": "dung", "cowdung": "dung", "गोबर": "dung", "शेण": "dung",
+    # Waste qualifiers
+    "parali": "straw", "paral": "straw", "bhusa": "husk", "bhusi": "husk",
+    "पराली": "straw", "भूसा": "husk", "भुसा": "husk",
+}
+
+LANGUAGE_CODES = {
+    "english": "en", "en": "en",
+    "hindi": "hi", "hi": "hi",
+    "marathi": "mr", "mr": "mr",
+}
+
+
+def prompt_version() -> str:
+    """Short fingerprint of the prompts that shape the analysis output."""
+    digest = hashlib.sha256((WASTE_TO_VALUE_SYSTEM_PROMPT + GUARDRAIL_PROMPT).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def normalize_crop(crop_name: str) -> str:
+    """Lowercase, strip punctuation and fold synonyms token by token."""
+    # Keep the Devanagari block intact: its vowel signs are not matched by \w
+    text = re.sub(r"[^\w\s\u0900-\u097F]", " ", str(crop_name or "").lower())
+    tokens = [CROP_SYNONYMS.get(tok, tok) for tok in text.split()]
+    return " ".join(tokens)
+
+
+def normalize_language(language: str) -> str:
+    return LANGUAGE_CODES.get(str(language or "english").strip().lower(), "en")
+
+
+class WasteAnalysisCache:
+    """Two-level (memory + SQLite) cache of successful analyses."""
+
+    def __init__(self, path=None, version: str = None):
+        self.path = Path(path or os.getenv("WASTE_CACHE_PATH", DEFAULT_CACHE_PATH))
+        self.version = version or prompt_version()
+        self._memory = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS waste_analysis (
+                crop TEXT NOT NULL,
+                language TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (crop, language, prompt_version)
+            )"""
+        )
+        self._conn.commit()
+        # Entries produced by an older prompt can never be served again
+        self.invalidate(stale_only=True)
+
+    def make_key(self, crop_name: str, language: str):
+        return (normalize_crop(crop_name), normalize_language(language), self.version)
+
+    def get(self, crop_name: str, language: str):
+        key = self.make_key(crop_name, language)
+        if not key[0]:
+            return None
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is None:
+                row = self._conn.execute(
+                    "SELECT result FROM waste_analysis WHERE crop=? AND language=? AND prompt_version=?",
+                    key
+                ).fetchone()
+                if row:
+                    cached = row[0]
+                    self._memory[key] = cached
+            if cached is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # Hand out a fresh copy so callers can't mutate the cached entry
+        return json.loads(cached)
+
+    def has(self, crop_name: str, language: str) -> bool:
+        """Whether an analysis is stored, without counting a hit or miss (for the pre-generation job)."""
+        key = self.make_key(crop_name, language)
+        if not key[0]:
+            return False
+        with self._lock:
+            if key in self._memory:
+                return True
+            return self._conn.execute(
+                "SELECT 1 FROM waste_analysis WHERE crop=? AND language=? AND prompt_version=?", key
+            ).fetchone() is not None
+
+    def put(self, crop_name: str, language: str, result: dict):
+        key = self.make_key(crop_name, language)
+        if not key[0] or not result or result.get("error"):
+            return
+        payload = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            self._memory[key] = payload
+            self._conn.execute(
+                "INSERT OR REPLACE INTO waste_analysis (crop, language, prompt_version, result, created_at) VALUES (?, ?, ?, ?, ?)",
+                (*key, payload, time.time())
+            )
+            self._conn.commit()
+
+    def invalidate(self, crop_name: str = None, language: str = None, stale_only: bool = False) -> int:
+        """
+        Drop cached analyses.
+
+        stale_only=True removes only entries written under a different prompt
+        version; otherwise the entries of the given crop and/or language are
+        removed, and everything only when neither is given.
+        """
+        where, params = [], []
+        if stale_only:
+            where.append("prompt_version != ?")
+            params.append(self.version)
+        else:
+            if crop_name:
+                where.append("crop=?")
+                params.append(normalize_crop(crop_name))
+            if language:
+                where.append("language=?")
+                params.append(normalize_language(language))
+        query = "DELETE FROM waste_analysis" + (" WHERE " + " AND ".join(where) if where else "")
+        with self._lock:
+            cur = self._conn.execute(query, params)
+            self._conn.commit()
+            self._memory.clear()
+            return cur.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute(
+                "SELECT COUNT(*) FROM waste_analysis WHERE prompt_version=?", (self.version,)
+            ).fetchone()[0]
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "prompt_version": self.version,
+        }
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect or clear the Waste-to-Value analysis cache.")
+    parser.add_argument("--crop", help="only entries of this crop (any synonym)")
+    parser.add_argument("--language", help="only entries in this language")
+    parser.add_argument("--stale", action="store_true", help="only entries of older prompt versions")
+    parser.add_argument("--all", action="store_true", help="clear everything (required without --crop/--language/--stale)")
+    args = parser.parse_args()
+
+    cache = WasteAnalysisCache()
+    if args.crop or args.language or args.stale or args.all:
+        removed = cache.invalidate(args.crop, args.language, stale_only=args.stale)
+        print(f"[WASTE-CACHE] Removed {removed} entries")
+    print(f"[WASTE-CACHE] {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
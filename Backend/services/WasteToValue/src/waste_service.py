@@ -1,11 +1,33 @@
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_ollama import ChatOllama
-from langchain_core.output_parsers import JsonOutputParser
-from prompts import WASTE_TO_VALUE_SYSTEM_PROMPT, GUARDRAIL_PROMPT
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
+from services.LLMCore.chain_registry import chain_registry, SUPPORTED_LANGUAGES, InlineStrOutputParser
+from services.LLMCore.context_store import context_store
+from services.LLMCore.concurrency import chat_client_kwargs
+from services.LLMCore.prompt_assembly import LAYERED_PROMPT, prompt_assembler, prefill_tracker
+from services.LLMCore.json_stream import iter_json_events
+from prompts import WASTE_TO_VALUE_SYSTEM_PROMPT, GUARDRAIL_PROMPT, WASTE_CHAT_SYSTEM_PROMPT, WASTE_CHAT_CONTEXT_LABEL
+from analysis_cache import WasteAnalysisCache
 import json
 
 import os
 
+# Built once; static system rules first, the crop as the human turn
+ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", WASTE_TO_VALUE_SYSTEM_PROMPT + "\n" + GUARDRAIL_PROMPT),
+    ("human", "{input}"),
+])
+
+# Chat turns: frozen per-language rules -> analysis context -> question
+CHAT_PROMPT = LAYERED_PROMPT
+
+
+def chat_rules(language: str) -> str:
+    build = lambda: WASTE_CHAT_SYSTEM_PROMPT.format(language=language)
+    if language not in SUPPORTED_LANGUAGES:
+        return build().strip()
+    return prompt_assembler.static(("waste_chat", language), build)
+
 class WasteToValueEngine:
     def __init__(self):
         model_name = os.getenv("OLLAMA_MODEL", "llama3.2")
@@ -24,21 +46,78 @@ class WasteToValueEngine:
             model=model_name,
             temperature=0.4,
             base_url=base_url,
-            num_predict=1200 # Balanced num_predict for streaming
+            num_predict=1200, # Balanced num_predict for streaming
+            # Keep the model (and its KV cache of the context prefix) loaded between follow-ups
+            keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+            **chat_client_kwargs()
+        )
+
+        # Persistent cache of finished analyses (crop + language + prompt version)
+        self.cache = None
+        try:
+            self.cache = WasteAnalysisCache()
+        except Exception as e:
+            print(f"Warning: Waste analysis cache unavailable: {e}")
+
+        # Compile the analysis and chat chains and freeze the chat rules up front
+        self.warm_chains()
+
+    def warm_chains(self):
+        chain_registry.warm({
+            ("waste", "analysis"): self._build_analysis_chain,
+            ("waste", "analysis_stream"): self._build_analysis_stream_chain,
+            ("waste", "chat"): self._build_chat_chain,
+        })
+        for language in SUPPORTED_LANGUAGES:
+            chat_rules(language)
+
+    def _build_analysis_chain(self):
+        return ANALYSIS_PROMPT | self.json_llm | JsonOutputParser() # Use json_llm for analysis
+
+    def _get_analysis_chain(self):
+        return chain_registry.get(("waste", "analysis"), self._build_analysis_chain)
+
+    def _build_analysis_stream_chain(self):
+        # Raw text out, so options can be parsed incrementally as they are generated
+        return ANALYSIS_PROMPT | self.json_llm | StrOutputParser()
+
+    def _build_chat_chain(self):
+        # Use the non-JSON chat LLM with a plain string output parser
+        return CHAT_PROMPT | self.chat_llm | InlineStrOutputParser()
+
+    def _get_chat_chain(self):
+        return chain_registry.get(("waste", "chat"), self._build_chat_chain)
+
+    def _chat_inputs(self, context, user_question: str, language: str, context_id: str = None):
+        # Stored compact rendering keeps the prompt prefix byte-identical across turns
+        _, context_str = context_store.resolve("waste", context_id, context)
+        if context_str is None:
+            raise ValueError("Unknown or expired context_id and no context provided")
+        rules = chat_rules(language)
+        inputs = prompt_assembler.inputs(
+            rules,
+            dynamic_context=f"{WASTE_CHAT_CONTEXT_LABEL}\n{context_str}",
+            turn=user_question
         )
+        return inputs, {"callbacks": prefill_tracker.callbacks("waste.chat", rules)}
 
     def analyze_waste(self, crop_name: str, language: str = "English") -> dict:
         """
         Analyzes the crop waste and returns structured JSON recommendations.
         """
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", WASTE_TO_VALUE_SYSTEM_PROMPT + "\n" + GUARDRAIL_PROMPT),
-            ("human", "{input}"),
-        ])
-        chain = prompt | self.json_llm | JsonOutputParser() # Use json_llm for analysis
+        if self.cache is not None:
+            cached = self.cache.get(crop_name, language)
+            if cached is not None:
+                print(f"[WASTE] Cache hit -> {crop_name} ({language})")
+                return cached
+
+        chain = self._get_analysis_chain()
 
         try:
-            response = chain.invoke({"input": crop_name, "language": language})
+            response = chain.invoke(
+                {"input": crop_name, "language": language},
+                config={"callbacks": prefill_tracker.callbacks("waste.analysis", f"{WASTE_TO_VALUE_SYSTEM_PROMPT}:{language}")}
+            )
             
             # Accuracy Sanity Check
             self._validate_results(response)
@@ -46,52 +125,76 @@ class WasteToValueEngine:
             
             # Map to legacy schema for frontend compatibility
             legacy_response = self._map_to_legacy_schema(response)
+
+            if self.cache is not None:
+                self.cache.put(crop_name, language, legacy_response)
             
             return legacy_response
         except Exception as e:
             print(f"Error in WasteToValueEngine: {e}")
             import traceback
             traceback.print_exc()
-            # Fallback/Error response structure
-            return {
-                "crop": crop_name,
-                "options": [],
-                "conclusion": {
-                    "title": "Analysis Failed",
-                    "rationale": "Could not generate recommendations at this time. Please try again."
-                },
-                "error": str(e)
-            }
+            return self._error_result(crop_name, e)
+
+    def stream_analyze_waste(self, crop_name: str, language: str = "English"):
+        """
+        Streams the analysis as events: the conclusion and each option as soon as
+        its JSON closes, then "done" with the validated (and cached) full result.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(crop_name, language)
+            if cached is not None:
+                print(f"[WASTE] Cache hit -> {crop_name} ({language})")
+                yield {"type": "conclusion", "conclusion": cached.get("conclusion")}
+                for index, option in enumerate(cached.get("options", [])):
+                    yield {"type": "option", "index": index, "option": option}
+                yield {"type": "done", "result": cached}
+                return
+
+        chain = chain_registry.get(("waste", "analysis_stream"), self._build_analysis_stream_chain)
+        options, conclusion, response = [], None, None
+        try:
+            chunks = chain.stream(
+                {"input": crop_name, "language": language},
+                config={"callbacks": prefill_tracker.callbacks("waste.analysis", f"{WASTE_TO_VALUE_SYSTEM_PROMPT}:{language}")}
+            )
+            for kind, key, value in iter_json_events(chunks, array_key="options"):
+                if kind == "field" and key == "conclusion" and isinstance(value, dict):
+                    conclusion = value
+                    yield {"type": "conclusion", "conclusion": value}
+                elif kind == "item" and isinstance(value, dict) and value.get("title"):
+                    options.append(value)
+                    yield {"type": "option", "index": len(options) - 1, "option": self._map_option_to_legacy(value)}
+                elif kind == "done":
+                    # Fall back to the cards already streamed if the tail was malformed
+                    response = value if isinstance(value, dict) else {
+                        "crop": crop_name, "conclusion": conclusion or {}, "options": options
+                    }
+
+            self._validate_results(response)
+            legacy_response = self._map_to_legacy_schema(response)
+            if self.cache is not None:
+                self.cache.put(crop_name, language, legacy_response)
+            yield {"type": "done", "result": legacy_response}
+        except Exception as e:
+            print(f"Error in WasteToValueEngine stream: {e}")
+            yield {"type": "error", "error": str(e), "result": self._error_result(crop_name, e)}
+
+    def _error_result(self, crop_name: str, error) -> dict:
+        # Fallback/Error response structure
+        return {
+            "crop": crop_name,
+            "options": [],
+            "conclusion": {
+                "title": "Analysis Failed",
+                "rationale": "Could not generate recommendations at this time. Please try again."
+            },
+            "error": str(error)
+        }
 
     def _map_to_legacy_schema(self, response: dict) -> dict:
         """Maps the flattened LLM output back to the nested legacy schema for the frontend"""
-        legacy_options = []
-        for opt in response.get("options", []):
-            section_titles = [
-                "Plant Part", "Pathway Type", "Technical Basis", 
-                "Manufacturing Option (DIY)", "3rd-Party Selling Option", 
-                "Average Recovery Value", "Value Recovery Percentage", 
-                "Equipment Needed", "Action Urgency"
-            ]
-            
-            sections = []
-            for title in section_titles:
-                sections.append({
-                    "title": title,
-                    "content": opt.get(title, ["N/A"])
-                })
-            
-            legacy_opt = {
-                "id": opt.get("id"),
-                "title": opt.get("title"),
-                "subtitle": opt.get("subtitle"),
-                "fullDetails": {
-                    "title": opt.get("title"),
-                    "basicIdea": opt.get("basicIdea", []),
-                    "sections": sections
-                }
-            }
-            legacy_options.append(legacy_opt)
+        legacy_options = [self._map_option_to_legacy(opt) for opt in response.get("options", [])]
         
         # Post-process conclusion highlight to ensure it matches one of the options
         conclusion = response.get("conclusion", {})
@@ -110,6 +213,32 @@ class WasteToValueEngine:
             "options": legacy_options
         }
 
+    def _map_option_to_legacy(self, opt: dict) -> dict:
+        section_titles = [
+            "Plant Part", "Pathway Type", "Technical Basis", 
+            "Manufacturing Option (DIY)", "3rd-Party Selling Option", 
+            "Average Recovery Value", "Value Recovery Percentage", 
+            "Equipment Needed", "Action Urgency"
+        ]
+        
+        sections = []
+        for title in section_titles:
+            sections.append({
+                "title": title,
+                "content": opt.get(title, ["N/A"])
+            })
+        
+        return {
+            "id": opt.get("id"),
+            "title": opt.get("title"),
+            "subtitle": opt.get("subtitle"),
+            "fullDetails": {
+                "title": opt.get("title"),
+                "basicIdea": opt.get("basicIdea", []),
+                "sections": sections
+            }
+        }
+
     def _validate_results(self, response: dict):
         """Internal sanity check for accuracy and technical depth"""
         options = response.get("options", [])
@@ -131,48 +260,15 @@ class WasteToValueEngine:
         if len(options) < 1:
             raise ValueError("Generated 0 options; LLM failed to provide valid recommendations.")
 
-    def chat_waste(self, context: dict, user_question: str, language: str = "English") -> str:
+    def chat_waste(self, context, user_question: str, language: str = "English", context_id: str = None) -> str:
         """
         Answers user questions based on the detailed waste analysis context (Synchronous).
         """
-        chat_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a helpful agricultural expert assistant.
-            The user has just received an analysis for converting specific crop waste into value.
-            
-            CONTEXT (The analysis results):
-            {{context_str}}
-            
-            YOUR GOAL:
-            Answer the user's question specifically based on the options provided in the context.
-            Respond in the specified LANGUAGE: {language}.
-            
-            FORMATTING RULES:
-            - Use **Bold** for key numbers, machine names, and prices.
-            - Use bullet points (•) for lists to make them readable.
-            - **ALWAYS use double newlines** between paragraphs.
-            - Keep responses concise but well-structured.
-            - Be encouraging and practical (Indian context).
-            
-            Do not hallucinate new options not in the context unless asked for alternatives.
-            """),
-            ("human", "{question}"),
-        ])
-        
-        # We use a string output parser for chat, not JSON
-        from langchain_core.output_parsers import StrOutputParser
-        
-        # Use the non-JSON chat LLM
-        chat_chain = chat_prompt.partial(language=language) | self.chat_llm | StrOutputParser()
+        chat_chain = self._get_chat_chain()
         
         try:
-            # Convert context dict to a readable string
-            context_str = json.dumps(context, indent=2)
-            
-            response = chat_chain.invoke({
-                "context_str": context_str, 
-                "question": user_question
-            })
-            
+            inputs, config = self._chat_inputs(context, user_question, language, context_id)
+            response = chat_chain.invoke(inputs, config=config)
             
             return response
         except Exception as e:
@@ -181,42 +277,27 @@ class WasteToValueEngine:
             traceback.print_exc()
             return "I apologize, but I'm having trouble connecting to the knowledge base right now. Please try again."
 
-    def stream_chat_waste(self, context: dict, user_question: str, language: str = "English"):
+    def stream_chat_waste(self, context, user_question: str, language: str = "English", context_id: str = None):
         """
         Answers user questions based on the detailed waste analysis context (Streaming).
         """
-        chat_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a helpful agricultural expert assistant.
-            The user has just received an analysis for converting specific crop waste into value.
-            
-            CONTEXT (The analysis results):
-            {{context_str}}
-            
-            YOUR GOAL:
-            Answer the user's question specifically based on the options provided in the context.
-            Respond in the specified LANGUAGE: {language}.
-            
-            FORMATTING RULES:
-            - Use **Bold** for key numbers, machine names, and prices.
-            - Use bullet points (•) for lists to make them readable.
-            - **ALWAYS use double newlines** between paragraphs.
-            - Keep responses concise but well-structured.
-            - Be encouraging and practical (Indian context).
-            
-            Do not hallucinate new options not in the context unless asked for alternatives.
-            """),
-            ("human", "{question}"),
-        ])
-        
-        from langchain_core.output_parsers import StrOutputParser
-        chat_chain = chat_prompt.partial(language=language) | self.chat_llm | StrOutputParser()
+        chat_chain = self._get_chat_chain()
         
         try:
-            context_str = json.dumps(context, indent=2)
-            for chunk in chat_chain.stream({
-                "context_str": context_str, 
-                "question": user_question
-            }):
+            inputs, config = self._chat_inputs(context, user_question, language, context_id)
+            for chunk in chat_chain.stream(inputs, config=config):
+                yield chunk
+        except Exception as e:
+            print(f"Error in Waste Stream Chat: {e}")
+            yield "I apologize, but I'm having trouble connecting to the knowledge base right now. Please try again."
+
+    async def astream_chat_waste(self, context, user_question: str, language: str = "English", context_id: str = None):
+        """Async twin of stream_chat_waste for the ASGI streaming routes."""
+        chat_chain = self._get_chat_chain()
+
+        try:
+            inputs, config = self._chat_inputs(context, user_question, language, context_id)
+            async for chunk in chat_chain.astream(inputs, config=config):
                 yield chunk
         except Exception as e:
             print(f"Error in Waste Stream Chat: {e}")
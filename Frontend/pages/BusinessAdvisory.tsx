@@ -433,6 +433,19 @@ const BusinessAdvisory: React.FC = () => {
                 setRecommendations(response.recommendations);
                 if (response.session_id) setBackendSessionId(response.session_id);
                 setStep(2);
+                if (response.enrichment?.job_id) {
+                    // Ranked catalogue cards first; swap in the personalised ones when the job finishes
+                    const rankedIds = response.recommendations.map((rec: Recommendation) => rec.id).join(',');
+                    api.waitForJob(response.enrichment.job_id)
+                        .then((result) => {
+                            const enriched: Recommendation[] = result?.recommendations || [];
+                            if (enriched.length === 0) return;
+                            setRecommendations((current) =>
+                                current.map((rec) => rec.id).join(',') === rankedIds ? enriched : current
+                            );
+                        })
+                        .catch((err) => console.warn("Recommendation enrichment not applied:", err));
+                }
             } else {
                 alert(t.advisoryForm.analysisFailed);
             }
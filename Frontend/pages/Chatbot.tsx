@@ -459,8 +459,35 @@ const Chatbot: React.FC = () => {
             let retryCount = 0;
             const MAX_RETRIES = 1;
 
+            const onChunk = (chunk: string) => {
+                responseText += chunk;
+                setMessages(prev => {
+                    const newMsgs = [...prev];
+                    const last = newMsgs[newMsgs.length - 1];
+                    if (last.role === 'assistant') {
+                        last.content = responseText;
+                    }
+                    return newMsgs;
+                });
+            };
+
             const attemptStream = async (): Promise<void> => {
                 try {
+                    if (location.state?.fromFarmHealth && (location.state.farmHealthContextId || location.state.farmHealthContext)) {
+                        // Follow-ups about a soil health report go to the farm health chat, which knows the report
+                        await api.streamWithContext(
+                            '/farm-health/chat/stream',
+                            location.state.farmHealthContextId,
+                            location.state.farmHealthContext,
+                            {
+                                question: text,
+                                language: lang === 'HI' ? 'Hindi' : lang === 'MR' ? 'Marathi' : 'English'
+                            },
+                            onChunk,
+                            (err) => { throw err; }
+                        );
+                        return;
+                    }
                     await api.stream(
                         '/business-advisor/chat/stream',
                         {
@@ -468,17 +495,7 @@ const Chatbot: React.FC = () => {
                             session_id: currentBackendId,
                             language: lang.toLowerCase()
                         },
-                        (chunk) => {
-                            responseText += chunk;
-                            setMessages(prev => {
-                                const newMsgs = [...prev];
-                                const last = newMsgs[newMsgs.length - 1];
-                                if (last.role === 'assistant') {
-                                    last.content = responseText;
-                                }
-                                return newMsgs;
-                            });
-                        },
+                        onChunk,
                         async (err) => {
                             // Check if this is an invalid session error
                             if (err?.message?.includes('Invalid session_id') && retryCount < MAX_RETRIES) {
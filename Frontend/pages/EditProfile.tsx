@@ -7,6 +7,7 @@ import { doc, getDoc, updateDoc } from 'firebase/firestore';
 import { Save, ArrowLeft, User, MapPin, Sprout, RefreshCw, Plus, Trash2, Globe } from 'lucide-react';
 import { useLanguage } from '../src/context/LanguageContext';
 import { useFarm } from '../src/context/FarmContext';
+import { api } from '../src/services/api';
 import en from '../src/locales/en.json';
 import hi from '../src/locales/hi.json';
 import mr from '../src/locales/mr.json';
@@ -144,6 +145,9 @@ const EditProfile: React.FC = () => {
             const userRef = doc(db, "users", auth.currentUser.uid);
             await updateDoc(userRef, { ...formData });
 
+            // Cached business roadmaps were generated for the old profile
+            api.post('/generate-roadmap/cache/invalidate', {}).catch(err => console.warn("Roadmap cache invalidation failed:", err));
+
             // Sync with Global Context
             setGlobalFarms(formData.farms);
 
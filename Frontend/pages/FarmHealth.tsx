@@ -57,6 +57,15 @@ const FarmHealth: React.FC = () => {
         sessionStorage.setItem('farmHealthResults', JSON.stringify(aiResults));
     }, [aiResults]);
 
+    // Server-side handles of each analysis, so follow-up chats don't re-upload it
+    const [contextIds, setContextIds] = useState<Record<string, string>>(() => {
+        try { return JSON.parse(sessionStorage.getItem('farmHealthContextIds') || '{}'); } catch (e) { return {}; }
+    });
+
+    useEffect(() => {
+        sessionStorage.setItem('farmHealthContextIds', JSON.stringify(contextIds));
+    }, [contextIds]);
+
     const initialLoadTriggered = useRef<Set<string>>(new Set(Object.keys(initialAiResults)));
 
     const analyzeSoil = async (farm: any, cropIndex: number, crop: string, key: string) => {
@@ -80,6 +89,9 @@ const FarmHealth: React.FC = () => {
             const data = await res.json();
             if (data.success && data.result) {
                 setAiResults(prev => ({ ...prev, [key]: data.result }));
+                if (data.context_id) {
+                    setContextIds(prev => ({ ...prev, [key]: data.context_id }));
+                }
             }
         } catch (error) {
             console.error("AI Analysis failed", error);
@@ -88,10 +100,12 @@ const FarmHealth: React.FC = () => {
         }
     };
 
-    const openDeepDive = (result: AIResult, crop: string) => {
+    const openDeepDive = (result: AIResult, crop: string, key: string) => {
         const fertilizers = result.fertilizer_options?.map(opt => opt.name || opt.action).filter(Boolean).join(', ') || '';
         const prompt = `Please provide an expert consultation on the fertilizer recommendations for ${crop}, specifically focusing on the use of ${fertilizers}. I require a detailed explanation of the rationale behind this selection, its impact on the growth cycle, and best practices for sustainable application.`;
-        navigate('/chat', { state: { initialMessage: prompt, fromFarmHealth: true } });
+        navigate('/chat', {
+            state: { initialMessage: prompt, fromFarmHealth: true, farmHealthContextId: contextIds[key], farmHealthContext: result }
+        });
     };
 
     // Auto-load analysis
@@ -240,7 +254,7 @@ const FarmHealth: React.FC = () => {
                                                                     ))}
 
                                                                     <button
-                                                                        onClick={() => openDeepDive(result, crop)}
+                                                                        onClick={() => openDeepDive(result, crop, cropKey)}
                                                                         className="w-full mt-2 group relative flex items-center justify-center gap-3 bg-gray-900 text-white px-6 py-4 rounded-2xl overflow-hidden transition-all duration-300 hover:shadow-xl hover:shadow-emerald-900/20 active:scale-[0.98]">
                                                                         <div className="absolute inset-0 bg-gradient-to-r from-emerald-600 to-emerald-800 opacity-0 group-hover:opacity-100 transition-opacity duration-300"></div>
                                                                         <Sparkles className="w-5 h-5 relative z-10 text-emerald-400 group-hover:text-white transition-colors" />
@@ -53,6 +53,7 @@ const Home: React.FC = () => {
 
     // Fetch roadmap when crop or language changes
     useEffect(() => {
+        let cancelled = false;
         const fetchCropRoadmap = async () => {
             if (!selectedCrop) return;
 
@@ -99,7 +100,21 @@ const Home: React.FC = () => {
                 const response = await api.generateCropRoadmap(selectedCrop, lang);
                 if (response.success && response.roadmap) {
                     setRoadmap(response.roadmap);
-                    localStorage.setItem(cacheKey, JSON.stringify(response.roadmap));
+                    if (response.placeholder && response.job_id) {
+                        // Generic precomputed plan: show it, then swap in the personalised one
+                        setLoading(false);
+                        try {
+                            const personalised = await api.waitForJob(response.job_id);
+                            if (!cancelled && personalised) {
+                                setRoadmap(personalised);
+                                localStorage.setItem(cacheKey, JSON.stringify(personalised));
+                            }
+                        } catch (jobErr) {
+                            console.warn("Personalised plan not ready:", jobErr);
+                        }
+                    } else {
+                        localStorage.setItem(cacheKey, JSON.stringify(response.roadmap));
+                    }
                 } else {
                     setError("Failed to generate crop planner.");
                 }
@@ -112,6 +127,7 @@ const Home: React.FC = () => {
         };
 
         fetchCropRoadmap();
+        return () => { cancelled = true; };
     }, [selectedCrop, lang]);
 
     const phaseButtons = [
@@ -45,6 +45,7 @@ const Planner: React.FC = () => {
     }, [activeFarm]);
 
     useEffect(() => {
+        let cancelled = false;
         const fetchCropRoadmap = async () => {
             if (!activeFarm?.crops || activeFarm.crops.length === 0) {
                 setError("No crop found in your active farm. Please add a crop to use the planner.");
@@ -62,6 +63,16 @@ const Planner: React.FC = () => {
                 const response = await api.generateCropRoadmap(selectedCrop, lang);
                 if (response.success && response.roadmap) {
                     setRoadmap(response.roadmap);
+                    if (response.placeholder && response.job_id) {
+                        // Generic precomputed plan: show it, then swap in the personalised one
+                        setLoading(false);
+                        try {
+                            const personalised = await api.waitForJob(response.job_id);
+                            if (!cancelled && personalised) setRoadmap(personalised);
+                        } catch (jobErr) {
+                            console.warn("Personalised plan not ready:", jobErr);
+                        }
+                    }
                 } else {
                     setError("Failed to generate crop planner.");
                 }
@@ -74,6 +85,7 @@ const Planner: React.FC = () => {
         };
 
         fetchCropRoadmap();
+        return () => { cancelled = true; };
     }, [selectedCrop, lang, activeFarm]);
 
     const handleDownloadPDF = async () => {
@@ -49,6 +49,7 @@ const WasteToValue: React.FC = () => {
     // State
     const [cropInput, setCropInput] = useState('');
     const [resultData, setResultData] = useState<any>(null);
+    const [contextId, setContextId] = useState<string | null>(null);
     const [selectedOption, setSelectedOption] = useState<any | null>(null); // For Modal
     const [messages, setMessages] = useState<ChatMessage[]>([]);
     const [chatInput, setChatInput] = useState('');
@@ -137,6 +138,7 @@ const WasteToValue: React.FC = () => {
 
             if (response.success && response.result) {
                 setResultData(response.result);
+                setContextId(response.context_id || null);
                 setView('results');
             } else {
                 throw new Error('Invalid data format');
@@ -162,6 +164,7 @@ const WasteToValue: React.FC = () => {
         }).then(response => {
             if (response.success && response.result) {
                 setResultData(response.result);
+                setContextId(response.context_id || null);
                 setView('results');
             } else {
                 throw new Error('Invalid data format');
@@ -211,13 +214,13 @@ const WasteToValue: React.FC = () => {
         setMessages(prev => [...prev, aiMsgPlaceHolder]);
 
         try {
-            const context = JSON.stringify(resultData);
             let accumulatedResponse = '';
 
-            await api.stream(
+            await api.streamWithContext(
                 '/waste-to-value/chat/stream',
+                contextId,
+                resultData,
                 {
-                    context: context,
                     question: question,
                     language: lang
                 },
@@ -75,7 +75,7 @@ export const api = {
             if (res.status === 401) throw new Error("Unauthorized");
             if (!res.ok) {
                 const errData = await res.json().catch(() => ({}));
-                throw new Error(errData.error || `HTTP Error ${res.status}`);
+                throw Object.assign(new Error(errData.error || `HTTP Error ${res.status}`), { status: res.status });
             }
             if (!res.body) throw new Error("No response body");
 
@@ -114,6 +114,20 @@ export const api = {
         }
     },
 
+    // Follow-up chat about an analysis: sends only its context_id, and the full
+    // context only when the server no longer knows the id (404) or there is none
+    streamWithContext: async (endpoint: string, contextId: string | null | undefined, context: any, body: any,
+                              onChunk: (text: string) => void, onError: (err: any) => void) => {
+        const withContext = () => api.stream(endpoint, { ...body, context: typeof context === 'string' ? context : JSON.stringify(context) }, onChunk, onError);
+        if (!contextId) return withContext();
+        let expired = false;
+        await api.stream(endpoint, { ...body, context_id: contextId }, onChunk, (err) => {
+            if (err?.status === 404 && context) expired = true;
+            else onError(err);
+        });
+        if (expired) await withContext();
+    },
+
     generateRoadmap: async (businessName: string, language: string = 'en') => {
         const headers = await getHeaders();
         const res = await fetch(`${BASE_URL}/generate-roadmap`, {
@@ -150,6 +164,25 @@ export const api = {
         return res.json();
     },
 
+    // Polls a background job (see /api/jobs/<id>) until it finishes and returns its result
+    waitForJob: async (jobId: string, intervalMs: number = 3000, timeoutMs: number = 300000) => {
+        const deadline = Date.now() + timeoutMs;
+        while (Date.now() < deadline) {
+            await new Promise(resolve => setTimeout(resolve, intervalMs));
+            const headers = await getHeaders();
+            const res = await fetch(`${BASE_URL}/jobs/${jobId}`, { headers });
+            if (res.status === 401) throw new Error("Unauthorized");
+            if (!res.ok) {
+                const errData = await res.json().catch(() => ({}));
+                throw new Error(errData.error || `HTTP Error ${res.status}`);
+            }
+            const { job } = await res.json();
+            if (job.status === 'done') return job.result;
+            if (job.status === 'failed') throw new Error(job.error || 'Job failed');
+        }
+        throw new Error('Timed out waiting for job');
+    },
+
     detectPest: async (formData: FormData) => {
         const headers: any = await getHeaders();
         delete headers['Content-Type']; // Let browser set boundary
@@ -192,6 +225,17 @@ export const api = {
         }
     },
 
+    markNotificationsRead: async (ids?: string[]) => {
+        const headers = await getHeaders();
+        const res = await fetch(`${BASE_URL}/notifications/read`, {
+            method: 'POST',
+            headers,
+            body: JSON.stringify(ids ? { ids } : {})
+        });
+        if (!res.ok) throw new Error("Failed to mark notifications read");
+        return res.json();
+    },
+
     getMandiPrices: async (crop: string, district: string) => {
         const headers = await getHeaders();
         const res = await fetch(`${BASE_URL}/mandi/prices?crop=${encodeURIComponent(crop)}&district=${encodeURIComponent(district)}`, { headers });